@@ -1,18 +1,27 @@
 import sys
 import time
 import os
+import logging
 from collections import deque
-import keyboard
+from manipulate import startup
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QLineEdit, QTextEdit, QCheckBox, QSpinBox, QScrollArea, QDialog, QFrame, QGridLayout, QSizePolicy
+    QPushButton, QLineEdit, QPlainTextEdit, QComboBox, QCheckBox, QSpinBox, QScrollArea, QDialog, QFrame, QGridLayout, QSizePolicy
 )
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QCoreApplication, QRectF, QVariantAnimation
 from PyQt5.QtGui import QFont, QPixmap, QIcon, QPainter, QColor, QBrush, QPen
 
-# 导入manipulate模块
-from manipulate import execute_process
-from manipulate.api_client import APIClient
+# 导入manipulate模块（导出按需加载：api_client / executor 在登录窗口显示后于后台预加载，各操作模块第一次执行时导入）
+import manipulate
+from manipulate.log_config import setup_logging
+
+logger = logging.getLogger("app")
+
+# 日志显示：批量刷新间隔（毫秒）与最大保留行数
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_MAX_LINES = 5000
+# 界面日志过滤级别（logging 级别，由日志调用方随消息一起传入）
+LOG_LEVEL_LABELS = [("全部", logging.DEBUG), ("信息", logging.INFO), ("警告", logging.WARNING), ("错误", logging.ERROR)]
 
 # 资源路径解析函数：兼容开发环境与 PyInstaller 打包运行环境
 def resource_path(relative_path: str) -> str:
@@ -47,9 +56,11 @@ except Exception:
         AUTO = None
     FLUENT_AVAILABLE = False
 
+startup.mark("imports")
+
 class ProcessThread(QThread):
     """处理流程执行的线程"""
-    log_signal = pyqtSignal(str)
+    log_signal = pyqtSignal(str, int)  # (消息, logging 级别)
     finished_signal = pyqtSignal(bool)
     
     def __init__(self, task_name, server_url, loop_count=1, loop_interval=0, enable_infinite_loop=False):
@@ -61,6 +72,10 @@ class ProcessThread(QThread):
         self.enable_infinite_loop = enable_infinite_loop  # 新增参数
         self.should_stop = False
     
+    def log(self, message, level=logging.INFO):
+        """日志回调（APIClient.log 传入记录的级别），经 log_signal 发送到界面线程"""
+        self.log_signal.emit(message, level)
+    
     def run(self):
         """执行流程"""
         try:
@@ -82,48 +97,48 @@ class ProcessThread(QThread):
             self.finished_signal.emit(True)
                 
         except Exception as e:
-            self.log_signal.emit(f"💥 流程异常: {str(e)}")
+            self.log(f"💥 流程异常: {str(e)}", level=logging.ERROR)
             self.finished_signal.emit(False)
     
     def _execute_group(self, group_number):
         """执行一组任务"""
-        self.log_signal.emit(f"🔄 开始第 {group_number} 组运行 (每组 {self.loop_count} 次)")
+        self.log(f"🔄 开始第 {group_number} 组运行 (每组 {self.loop_count} 次)")
         
         # 在一组内连续运行指定次数
         for i in range(self.loop_count):
             if self.should_stop:
-                self.log_signal.emit("🛑 循环已被用户停止")
+                self.log("🛑 循环已被用户停止", level=logging.WARNING)
                 return
                 
-            self.log_signal.emit(f"🚀 第 {group_number} 组 - 第 {i+1}/{self.loop_count} 次执行...")
-            self.log_signal.emit("=" * 50)
+            self.log(f"🚀 第 {group_number} 组 - 第 {i+1}/{self.loop_count} 次执行...")
+            self.log("=" * 50)
             
-            success = execute_process(
+            success = manipulate.execute_process(
                 task_name=self.task_name,
-                log_callback=self.log_signal.emit,
+                log_callback=self.log,
                 server_url=self.server_url
             )
             
             if success:
-                self.log_signal.emit("=" * 50)
-                self.log_signal.emit(f"✅ 第 {group_number} 组 - 第 {i+1} 次执行完成!")
+                self.log("=" * 50)
+                self.log(f"✅ 第 {group_number} 组 - 第 {i+1} 次执行完成!")
             else:
-                self.log_signal.emit("=" * 50)
-                self.log_signal.emit(f"❌ 第 {group_number} 组 - 第 {i+1} 次执行失败!")
+                self.log("=" * 50)
+                self.log(f"❌ 第 {group_number} 组 - 第 {i+1} 次执行失败!", level=logging.ERROR)
         
-        self.log_signal.emit(f"🎉 第 {group_number} 组执行完成!")
+        self.log(f"🎉 第 {group_number} 组执行完成!")
     
     def _wait_between_groups(self):
         """组间等待"""
         if self.loop_interval > 0 and not self.should_stop:
-            self.log_signal.emit(f"⏳ 等待 {self.loop_interval} 秒后开始下一组...")
+            self.log(f"⏳ 等待 {self.loop_interval} 秒后开始下一组...")
             
             # 分秒倒计时
             for remaining in range(self.loop_interval, 0, -1):
                 if self.should_stop:
-                    self.log_signal.emit("🛑 循环已被用户停止")
+                    self.log("🛑 循环已被用户停止", level=logging.WARNING)
                     return
-                self.log_signal.emit(f"⏰ 剩余等待时间: {remaining} 秒")
+                self.log(f"⏰ 剩余等待时间: {remaining} 秒")
                 time.sleep(1)
     
     def stop(self):
@@ -194,9 +209,15 @@ class SimpleApp(QWidget):
         self.process_thread = None
         # 标记登录是否成功（用于启动阶段决定是否展示主窗口）
         self.login_ok = False
-        # 日志队列：固定5000条日志
-        self.log_queue = deque(maxlen=5000)
+        # 日志队列：固定5000条日志（保存 (级别, 文本)，切换过滤级别时用于重建显示）
+        self.log_queue = deque(maxlen=LOG_MAX_LINES)
         self.logs_count = 0
+        # 待刷新的日志（由定时器批量追加到界面，避免每条日志都重绘）
+        self._pending_logs = []
+        self.log_level = logging.DEBUG
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_flush_timer.timeout.connect(self._flush_log_display)
         
         self.init_ui()
         # 启动后显示登录对话框，登录成功再加载任务（多用户：X-User）
@@ -205,7 +226,7 @@ class SimpleApp(QWidget):
             # 注册全局热键终止程序
             self.setup_global_hotkeys()
         except Exception as e:
-            print(f"[启动] 登录/加载任务失败: {e}")
+            logger.warning("[启动] 登录/加载任务失败: %s", e)
     
     def init_ui(self):
         # 设置窗口标题和大小
@@ -217,11 +238,11 @@ class SimpleApp(QWidget):
             icon = QIcon(resource_path("public/logo.png"))
             if not icon.isNull():
                 self.setWindowIcon(icon)
-                print("[UI] 窗口图标设置成功")
+                logger.info("[UI] 窗口图标设置成功")
             else:
-                print("[UI] 窗口图标加载失败，使用默认图标")
+                logger.warning("[UI] 窗口图标加载失败，使用默认图标")
         except Exception as e:
-            print(f"[UI] 窗口图标设置异常: {e}")
+            logger.error("[UI] 窗口图标设置异常: %s", e)
 
         # 顶层垂直布局（包含：页头 + 主体分栏）
         layout = QVBoxLayout()
@@ -419,18 +440,25 @@ class SimpleApp(QWidget):
         logs_title.setObjectName("sectionTitle")
         logs_v.addWidget(logs_title)
 
-        # 状态显示区域（沿用原 QTextEdit 与逻辑）
-        self.status_text = QTextEdit()
+        # 状态显示区域（QPlainTextEdit：追加写入 + 文档级行数上限）
+        self.status_text = QPlainTextEdit()
         self.status_text.setReadOnly(True)
+        self.status_text.setMaximumBlockCount(LOG_MAX_LINES)
         self.status_text.setPlaceholderText("状态信息将在这里显示...")
         # 日志顶部工具条（仅展示，不改变功能）
         toolbar = QHBoxLayout()
         self.log_search = QLineEdit()
         self.log_search.setPlaceholderText('搜索日志...')
         self.logs_count_label = QLabel('0 条记录')
+        # 日志级别过滤
+        self.log_level_combo = QComboBox()
+        for label, level in LOG_LEVEL_LABELS:
+            self.log_level_combo.addItem(label, level)
+        self.log_level_combo.currentIndexChanged.connect(self.on_log_level_changed)
         export_btn = FluentButton('导出')
         export_btn.setEnabled(False)  # 仅展示，不改动功能
         toolbar.addWidget(self.log_search)
+        toolbar.addWidget(self.log_level_combo)
         toolbar.addWidget(self.logs_count_label)
         toolbar.addWidget(export_btn)
         logs_v.addLayout(toolbar)
@@ -486,9 +514,9 @@ class SimpleApp(QWidget):
         self.status_text.setFont(status_font)
 
         # 打印当前各区域字号设置，便于调试
-        print(f"[UI] 字号设置: base={base_point_size}pt, title={title_font.pointSize()}pt, "
-              f"groupTitle={group_title_font.pointSize()}pt, button={button_font.pointSize()}pt, "
-              f"status={status_font.pointSize()}pt")
+        logger.debug("[UI] 字号设置: base=%spt, title=%spt, groupTitle=%spt, button=%spt, status=%spt",
+                     base_point_size, title_font.pointSize(), group_title_font.pointSize(),
+                     button_font.pointSize(), status_font.pointSize())
 
         # 设置布局
         self.setLayout(layout)
@@ -502,23 +530,24 @@ class SimpleApp(QWidget):
     def setup_global_hotkeys(self):
         """设置全局热键 Ctrl+Shift+Q 终止程序运行"""
         try:
-            # 注册全局热键：Ctrl+Shift+Q
+            # 注册全局热键：Ctrl+Shift+Q（keyboard 在登录后才导入，不计入启动时间）
+            import keyboard
             keyboard.add_hotkey('ctrl+shift+q', self.emergency_stop)
             self.log_status("🔥 全局终止热键已注册: Ctrl+Shift+Q")
         except Exception as e:
-            self.log_status(f"⚠️ 全局热键注册失败: {e}")
+            self.log_status(f"⚠️ 全局热键注册失败: {e}", level=logging.WARNING)
 
     def emergency_stop(self):
         """紧急停止：通过全局热键触发"""
         try:
-            self.log_status("🚨 检测到紧急停止热键 Ctrl+Shift+Q")
+            self.log_status("🚨 检测到紧急停止热键 Ctrl+Shift+Q", level=logging.WARNING)
             if self.process_thread and self.process_thread.isRunning():
-                self.log_status("🛑 正在紧急终止流程...")
+                self.log_status("🛑 正在紧急终止流程...", level=logging.WARNING)
                 self.stop_process()
             else:
                 self.log_status("ℹ️ 当前没有运行中的流程")
         except Exception as e:
-            self.log_status(f"❌ 紧急停止异常: {e}")
+            self.log_status(f"❌ 紧急停止异常: {e}", level=logging.ERROR)
 
     def _set_global_status_text(self, text: str):
         """更新右上角系统状态文本（纯UI，不改变业务逻辑）"""
@@ -623,11 +652,11 @@ class SimpleApp(QWidget):
             background-color: #01CBCB;
             color: #071A1A;
         }
-        QLineEdit, QSpinBox { 
+        QLineEdit, QSpinBox, QComboBox { 
             background-color: rgba(223,238,238,0.08); 
             border: 1px solid rgba(223,238,238,0.18); 
             border-radius: 8px; padding: 4px 6px; color: #DFEEEE; }
-        QTextEdit { 
+        QTextEdit, QPlainTextEdit { 
             background-color: rgba(7,26,26,0.3); 
             border: 1px solid rgba(223,238,238,0.12); 
             border-radius: 8px; color: #DFEEEE; }
@@ -689,18 +718,18 @@ class SimpleApp(QWidget):
         - 返回 True/False 表示是否登录成功
         """
         self.log_status(f"[登录] 正在登录用户 {username} ...")
-        client = APIClient(base_url="https://www.kuzflow.com", log_callback=self.log_status)
+        client = manipulate.APIClient(base_url="https://www.kuzflow.com", log_callback=self.log_status)
         ok, data = client.call_api("/api/login", {"user": username, "password": password}, method="POST")
         if not ok:
-            self.log_status("❌ 登录失败，请检查账号/密码或后端配置")
+            self.log_status("❌ 登录失败，请检查账号/密码或后端配置", level=logging.ERROR)
             return False
-        APIClient.set_default_user(username)
+        manipulate.APIClient.set_default_user(username)
         self.log_status(f"✅ 登录成功，设置默认用户为 {username}")
         return True
 
     def fetch_and_render_tasks(self):
         """拉取任务并动态渲染按钮"""
-        client = APIClient(base_url="https://www.kuzflow.com", log_callback=self.log_status)
+        client = manipulate.APIClient(base_url="https://www.kuzflow.com", log_callback=self.log_status)
         ok, data = client.call_api("/api/tasks", method="GET")
         tasks = data.get("tasks", []) if ok and isinstance(data, dict) else []
         self.log_status(f"📋 获取到 {len(tasks)} 个流程")
@@ -812,17 +841,18 @@ class SimpleApp(QWidget):
             username = user_edit.text().strip()
             password = pwd_edit.text().strip()
             if not username or not password:
-                self.log_status("⚠️ 请输入账号与密码")
+                self.log_status("⚠️ 请输入账号与密码", level=logging.WARNING)
                 return
             if self.do_login(username, password):
                 dlg.accept()
             else:
-                self.log_status("❌ 登录失败，请重试")
+                self.log_status("❌ 登录失败，请重试", level=logging.ERROR)
 
         btn_login.clicked.connect(on_login)
         btn_cancel.clicked.connect(dlg.reject)
 
         # 显示对话框并等待
+        startup.on_login_window(dlg)
         if dlg.exec_() == QDialog.Accepted:
             self.login_ok = True
             # 启动阶段不立即 show，由 main 统一处理；登出场景需重新显示
@@ -850,7 +880,7 @@ class SimpleApp(QWidget):
             if w:
                 w.setParent(None)
         # 清除默认用户
-        APIClient.set_default_user(None)
+        manipulate.APIClient.set_default_user(None)
         self.log_status("👋 已登出")
         # 隐藏主界面，仅显示登录窗口
         self.hide()
@@ -936,45 +966,58 @@ class SimpleApp(QWidget):
         ok = dlg.exec_() == QDialog.Accepted
         return ok, input_runs.value(), input_itv.value()
     
-    def log_status(self, message):
-        """添加状态信息到显示区域（使用队列限制5000条日志）"""
+    def log_status(self, message, level=logging.INFO):
+        """添加状态信息到日志缓冲区，由定时器批量刷新到显示区域（最多保留5000条）"""
         # 添加时间戳
         timestamp = time.strftime("%H:%M:%S", time.localtime())
         formatted_message = f"[{timestamp}] {message}"
-        
         # 添加到队列（自动维护5000条限制）
-        self.log_queue.append(formatted_message)
+        self.log_queue.append((level, formatted_message))
         self.logs_count += 1
         
-        # 重新构建显示内容
-        self._refresh_log_display()
-        
-        # 更新日志计数徽标
+        # 低于当前过滤级别的日志只计数，不显示
+        if level >= self.log_level:
+            self._pending_logs.append(formatted_message)
+        if not self.log_flush_timer.isActive():
+            self.log_flush_timer.start()
+    
+    def _flush_log_display(self):
+        """定时器回调：把缓冲区中的新日志一次性追加到显示区域"""
+        try:
+            if self._pending_logs:
+                # 只追加新行；超过上限时由 setMaximumBlockCount 自动丢弃最旧的行
+                self.status_text.appendPlainText("\n".join(self._pending_logs))
+                self._pending_logs.clear()
+                self.status_text.ensureCursorVisible()
+            else:
+                # 没有新日志时停掉定时器，下一条日志到来时再启动
+                self.log_flush_timer.stop()
+            self._update_logs_count_label()
+        except Exception as e:
+            logger.warning("[日志] 刷新显示失败: %s", e)
+    
+    def _update_logs_count_label(self):
+        """更新日志计数徽标"""
         try:
             if hasattr(self, 'logs_count_label'):
-                display_count = min(self.logs_count, 5000)
-                total_info = f" (总计:{self.logs_count})" if self.logs_count > 5000 else ""
+                display_count = min(self.logs_count, LOG_MAX_LINES)
+                total_info = f" (总计:{self.logs_count})" if self.logs_count > LOG_MAX_LINES else ""
                 self.logs_count_label.setText(f"{display_count} 条记录{total_info}")
         except Exception:
             pass
     
-    def _refresh_log_display(self):
-        """刷新日志显示区域"""
-        try:
-            # 将队列内容合并为文本
-            log_text = "\n".join(self.log_queue)
-            
-            # 更新显示区域
-            self.status_text.setPlainText(log_text)
-            self.status_text.ensureCursorVisible()
-            QApplication.processEvents()  # 立即更新UI
-        except Exception as e:
-            print(f"[日志] 刷新显示失败: {e}")
+    def on_log_level_changed(self, index):
+        """切换日志过滤级别后，用队列中的历史日志重建显示（仅在用户切换时执行一次）"""
+        self.log_level = self.log_level_combo.itemData(index) or logging.DEBUG
+        visible = [text for level, text in self.log_queue if level >= self.log_level]
+        self._pending_logs.clear()
+        self.status_text.setPlainText("\n".join(visible))
+        self.status_text.ensureCursorVisible()
     
     def _run_process(self, task_name: str):
         """执行流程（支持循环）"""
         if self.process_thread and self.process_thread.isRunning():
-            self.log_status("⚠️ 已有流程正在执行中，请先停止")
+            self.log_status("⚠️ 已有流程正在执行中，请先停止", level=logging.WARNING)
             return
             
         # 获取循环设置
@@ -1013,7 +1056,7 @@ class SimpleApp(QWidget):
     def stop_process(self):
         """停止正在执行的流程"""
         if self.process_thread and self.process_thread.isRunning():
-            self.log_status("🛑 正在停止流程...")
+            self.log_status("🛑 正在停止流程...", level=logging.WARNING)
             self.process_thread.stop()
             self.process_thread.wait()  # 等待线程结束
             self.on_process_finished(False)
@@ -1027,7 +1070,7 @@ class SimpleApp(QWidget):
         if success:
             self.log_status("🎉 流程执行完成!")
         else:
-            self.log_status("❌ 流程执行结束")
+            self.log_status("❌ 流程执行结束", level=logging.ERROR)
         # 更新页头状态
         self._set_global_status_text("待机")
         
@@ -1076,23 +1119,27 @@ class SimpleApp(QWidget):
 
 
 def main():
+    # 0) 初始化日志（级别/JSON 输出通过 LOG_LEVEL / LOG_LEVELS / LOG_JSON 环境变量控制）
+    setup_logging()
+
     # 1) 启用高DPI缩放与高清像素，需在 QApplication 创建前设置
     QCoreApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
     # 2) 创建应用实例
     app = QApplication(sys.argv)
+    startup.mark("qapplication")
     
     # 设置应用程序图标（用于任务栏、Alt+Tab等）
     try:
         app_icon = QIcon(resource_path("public/logo.png"))
         if not app_icon.isNull():
             app.setWindowIcon(app_icon)
-            print("[UI] 应用程序图标设置成功")
+            logger.info("[UI] 应用程序图标设置成功")
         else:
-            print("[UI] 应用程序图标加载失败")
+            logger.warning("[UI] 应用程序图标加载失败")
     except Exception as e:
-        print(f"[UI] 应用程序图标设置异常: {e}")
+        logger.error("[UI] 应用程序图标设置异常: %s", e)
 
     # 3) 根据屏幕DPI设置全局默认字体大小（点数），适度放大但较小于之前
     screen = app.primaryScreen()
@@ -1104,7 +1151,7 @@ def main():
     app.setFont(default_font)
 
     # 打印阶段信息，便于排查
-    print(f"[UI] 高DPI缩放已启用, DPI={dpi:.1f}, 基准字号={base_point}pt")
+    logger.info("[UI] 高DPI缩放已启用, DPI=%.1f, 基准字号=%spt", dpi, base_point)
 
     window = SimpleApp()
     # 若用户在登录对话框中取消/关闭，则直接退出，不显示主窗口
@@ -1,22 +1,51 @@
 # manipulate 模块 - 自动化操作执行模块
-from .executor import execute_process, execute_step
-from .api_client import APIClient
-from .recognition import get_screenshot_coordinates, recognize_screenshot, take_screenshot
-from .input_operations import click_position, input_text, execute_click, execute_input
-from .file_operations import save_result_to_file, append_result_to_file, save_json_result, execute_save_result
-from .wait_operations import execute_wait, wait_for_page_load, wait_for_element_load
-from .llm_operations import execute_llm_process, process_content_with_llm, validate_llm_result
-from .feishu_operations import execute_feishu_write, execute_get_data, execute_write_doc
-from .drag_operations import execute_drag
-from .scroll_operations import execute_scroll
-from .keyboard_operations import execute_keyboard
+# 导出按需加载：第一次访问某个名称时才导入所在子模块（启动时不加载各操作模块及其依赖）
+import importlib
+
+# 导出名称 -> 所在子模块
+_EXPORTS = {
+    'execute_process': 'executor',
+    'execute_step': 'executor',
+    'APIClient': 'api_client',
+    'get_screenshot_coordinates': 'recognition',
+    'recognize_screenshot': 'recognition',
+    'recognize_batch': 'recognition',
+    'take_screenshot': 'recognition',
+    'click_position': 'input_operations',
+    'input_text': 'input_operations',
+    'execute_click': 'input_operations',
+    'execute_input': 'input_operations',
+    'save_result_to_file': 'file_operations',
+    'append_result_to_file': 'file_operations',
+    'save_json_result': 'file_operations',
+    'execute_save_result': 'file_operations',
+    'execute_wait': 'wait_operations',
+    'wait_for_page_load': 'wait_operations',
+    'wait_for_element_load': 'wait_operations',
+    'execute_llm_process': 'llm_operations',
+    'process_content_with_llm': 'llm_operations',
+    'validate_llm_result': 'llm_operations',
+    'execute_feishu_write': 'feishu_operations',
+    'execute_get_data': 'feishu_operations',
+    'execute_write_doc': 'feishu_operations',
+    'execute_drag': 'drag_operations',
+    'execute_scroll': 'scroll_operations',
+    'execute_keyboard': 'keyboard_operations',
+    'execute_ocr_click': 'ocr_click_operations',
+    'execute_template_click': 'template_click_operations',
+    'InputBackend': 'backends',
+    'HeadlessBackend': 'backends',
+    'get_backend': 'backends',
+    'set_backend': 'backends',
+}
 
 __all__ = [
     'execute_process',
-    'execute_step', 
+    'execute_step',
     'APIClient',
     'get_screenshot_coordinates',
     'recognize_screenshot',
+    'recognize_batch',
     'take_screenshot',
     'click_position',
     'input_text',
@@ -34,5 +63,24 @@ __all__ = [
     'validate_llm_result',
     'execute_feishu_write'
     ,
-    'execute_drag'
-]
\ No newline at end of file
+    'execute_drag',
+    'execute_ocr_click',
+    'execute_template_click',
+    'InputBackend',
+    'HeadlessBackend',
+    'get_backend',
+    'set_backend'
+]
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
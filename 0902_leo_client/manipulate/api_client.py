@@ -3,9 +3,16 @@
 提供对服务器API的统一调用接口
 """
 
+import logging
 import requests
+import threading
 import time
+import uuid
 import urllib3
+from .log_config import REQUEST_ID_HEADER, get_log_level, set_request_id, reset_request_id
+from . import tracing
+
+logger = logging.getLogger(__name__)
 
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -14,9 +21,16 @@ class APIClient:
     """API调用客户端
     - 新增多用户支持：每次请求自动附带 X-User 头。
       规则：优先使用实例的 self.user；否则使用类级 DEFAULT_USER。
+    - 每次请求生成关联ID，通过 X-Request-ID 头传给服务端，便于两端日志对照。
+    - 日志分级：低于 LOG_LEVEL 的日志直接丢弃，不做格式化也不推送到界面；
+      log_callback(message, level) 收到记录的级别，界面按级别过滤。
+    - 耗时追踪：每次请求记录一个 network span，并解析服务端 Server-Timing 头细分服务端耗时。
     """
 
     DEFAULT_USER = None  # 类级默认用户（可通过 set_default_user 设定）
+    # 日志级别（与 setup_logging 相同：环境变量 LOG_LEVEL，缺省 log_config.DEFAULT_LOG_LEVEL；
+    # 设为 DEBUG 可输出每次请求的细节）
+    LOG_LEVEL = get_log_level()
 
     # def __init__(self, base_url="https://121.4.65.242", log_callback=None):
     def __init__(self, base_url="http://0.0.0.0", log_callback=None):
@@ -25,6 +39,8 @@ class APIClient:
         self.request_count = 0
         self.total_time = 0
         self.user = None  # 实例级用户名（若设置则覆盖 DEFAULT_USER）
+        # 异步步骤会在线程池中并发调用 call_api，统计数据需要加锁
+        self._stats_lock = threading.Lock()
 
     @classmethod
     def set_default_user(cls, username: str):
@@ -35,12 +51,23 @@ class APIClient:
         """设置实例级用户。"""
         self.user = username
     
-    def log(self, message):
-        """记录日志"""
+    def log(self, message, *args, level=logging.INFO):
+        """
+        记录日志
+        
+        Args:
+            message: 日志内容，可使用 %s 占位符配合 args 延迟格式化
+            args: 格式化参数（级别被过滤时不会格式化）
+            level: 日志级别，默认 INFO
+        """
+        if level < self.LOG_LEVEL:
+            return
+        if args:
+            message = message % args
         if self.log_callback:
-            self.log_callback(message)
+            self.log_callback(message, level)
         else:
-            print(message)
+            logger.log(level, message)
     
     def call_api(self, endpoint, payload=None, method="POST", timeout=5):
         """
@@ -55,66 +82,83 @@ class APIClient:
         Returns:
             (success, data): 成功标志和返回数据
         """
+        with tracing.span(endpoint, "network", endpoint=endpoint):
+            return self._call_api(endpoint, payload, method, timeout)
+    
+    def _call_api(self, endpoint, payload, method, timeout):
         start_time = time.time()
-        self.request_count += 1
+        trace_start = time.perf_counter()
+        with self._stats_lock:
+            self.request_count += 1
+        # 请求关联ID：写入请求头，并绑定到当前线程上下文（本次调用期间的日志都会带上）
+        request_id = uuid.uuid4().hex[:12]
+        token = set_request_id(request_id)
         
         try:
             # 构建完整URL
             url = f"{self.base_url}{endpoint}"
             
             # 记录API调用日志
-            self.log(f"🌐 调用API: {endpoint}")
+            self.log("🌐 调用API: %s [%s]", endpoint, request_id, level=logging.DEBUG)
             
             # 发送请求（忽略SSL验证）
-            headers = {}
+            headers = {REQUEST_ID_HEADER: request_id}
             # 自动附带 X-User：优先实例，其次类级默认
             x_user = self.user or APIClient.DEFAULT_USER
             if x_user:
                 headers["X-User"] = x_user
-                self.log(f"👤 X-User: {x_user}")
+                self.log("👤 X-User: %s", x_user, level=logging.DEBUG)
             if method.upper() == "POST":
                 response = requests.post(url, json=payload, timeout=timeout, verify=False, headers=headers)
             elif method.upper() == "GET":
                 response = requests.get(url, params=payload, timeout=timeout, verify=False, headers=headers)
             else:
-                self.log(f"❌ 不支持的HTTP方法: {method}")
+                self.log("❌ 不支持的HTTP方法: %s", method, level=logging.ERROR)
                 return False, None
             
             # 记录执行时间
             elapsed = time.time() - start_time
-            self.total_time += elapsed
+            self._add_elapsed(elapsed)
+            tracing.record_server_timing(response.headers.get("Server-Timing", ""), trace_start, time.perf_counter() - trace_start)
             
             # 检查响应状态
             if response.status_code == 200:
                 # 尝试解析JSON响应
                 try:
                     data = response.json()
-                    self.log(f"✅ API调用成功: {endpoint} ({elapsed:.3f}s)")
+                    self.log("✅ API调用成功: %s (%.3fs)", endpoint, elapsed, level=logging.DEBUG)
                     return True, data
                 except:
                     # 如果不是JSON，返回文本内容（如rec/rec接口）
                     data = response.text.strip('"')
-                    self.log(f"✅ API调用成功: {endpoint} ({elapsed:.3f}s)")
+                    self.log("✅ API调用成功: %s (%.3fs)", endpoint, elapsed, level=logging.DEBUG)
                     return True, data
             else:
-                self.log(f"❌ API错误 {response.status_code}: {endpoint}")
+                self.log("❌ API错误 %s: %s [%s]", response.status_code, endpoint, request_id, level=logging.ERROR)
                 return False, None
                 
         except requests.exceptions.Timeout:
             elapsed = time.time() - start_time
-            self.total_time += elapsed
-            self.log(f"⏰ API超时: {endpoint} ({elapsed:.3f}s)")
+            self._add_elapsed(elapsed)
+            self.log("⏰ API超时: %s (%.3fs) [%s]", endpoint, elapsed, request_id, level=logging.ERROR)
             return False, None
         except requests.exceptions.ConnectionError:
             elapsed = time.time() - start_time
-            self.total_time += elapsed
-            self.log(f"🔌 连接错误: {endpoint}")
+            self._add_elapsed(elapsed)
+            self.log("🔌 连接错误: %s [%s]", endpoint, request_id, level=logging.ERROR)
             return False, None
         except Exception as e:
             elapsed = time.time() - start_time
-            self.total_time += elapsed
-            self.log(f"💥 API异常: {endpoint} - {str(e)}")
+            self._add_elapsed(elapsed)
+            self.log("💥 API异常: %s - %s [%s]", endpoint, e, request_id, level=logging.ERROR)
             return False, None
+        finally:
+            reset_request_id(token)
+    
+    def _add_elapsed(self, elapsed):
+        """累加请求耗时（线程安全）"""
+        with self._stats_lock:
+            self.total_time += elapsed
     
     def get_process_config(self, task_name):
         """获取任务流程配置"""
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+输入后端模块：所有鼠标、键盘、剪贴板、截图操作统一经由当前后端执行
+- PyAutoGUIBackend：真实桌面（pyautogui + pyperclip，默认）
+- HeadlessBackend：无桌面模拟，记录全部操作，按步骤提供预设的剪贴板内容与截图
+- 回放后端（基于 debug_logs 中的步骤日志）见 replay.py
+
+切换方式:
+    环境变量 INPUT_BACKEND=pyautogui | headless
+    或代码中 set_backend(HeadlessBackend(...))
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ENV = "INPUT_BACKEND"
+
+# 复制快捷键的修饰键（ctrl+c / command+c）
+_COPY_MODIFIERS = {"ctrl", "command", "cmd"}
+
+
+def blank_png(width: int, height: int) -> bytes:
+    """生成纯白 PNG（无桌面环境下的截图占位）"""
+    width, height = max(1, int(width)), max(1, int(height))
+    raw = b"".join(b"\x00" + b"\xff\xff\xff" * width for _ in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+class InputBackend:
+    """输入后端接口（方法与 pyautogui / pyperclip 一一对应）"""
+
+    name = "base"
+
+    def begin_step(self, step_id: Any, step_type: str = "") -> None:
+        """执行器在每个 UI 步骤开始前调用（模拟/回放后端据此选择预设内容）"""
+
+    # 屏幕
+    def size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def screenshot(self, region: Tuple[int, int, int, int]) -> bytes:
+        """截取区域 (x, y, width, height)，返回 PNG 字节"""
+        raise NotImplementedError
+
+    def screenshot_regions(self, regions: List[Tuple[int, int, int, int]]) -> List[bytes]:
+        """截取多个区域，返回与 regions 对应的 PNG 字节列表（支持的后端只抓一帧）"""
+        return [self.screenshot(region) for region in regions]
+
+    # 鼠标
+    def click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        raise NotImplementedError
+
+    def mouse_down(self, x: int, y: int, button: str = "left") -> None:
+        raise NotImplementedError
+
+    def mouse_up(self, x: int, y: int, button: str = "left") -> None:
+        raise NotImplementedError
+
+    def drag_to(self, x: int, y: int, duration: float = 0.0, button: str = "left") -> None:
+        raise NotImplementedError
+
+    def scroll(self, amount: int) -> None:
+        raise NotImplementedError
+
+    def hscroll(self, amount: int) -> None:
+        raise NotImplementedError
+
+    # 键盘
+    def press(self, key: str) -> None:
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def key_down(self, key: str) -> None:
+        raise NotImplementedError
+
+    def key_up(self, key: str) -> None:
+        raise NotImplementedError
+
+    # 剪贴板
+    def copy(self, text: str) -> None:
+        raise NotImplementedError
+
+    def paste(self) -> str:
+        raise NotImplementedError
+
+
+class PyAutoGUIBackend(InputBackend):
+    """真实桌面后端（延迟导入 pyautogui，无桌面环境也能导入本模块）"""
+
+    name = "pyautogui"
+
+    # 原各操作模块分别设置 PAUSE，键盘模块最后导入，实际生效的是 0.05
+    def __init__(self, pause: float = 0.05, failsafe: bool = True):
+        import pyautogui
+        import pyperclip
+        pyautogui.FAILSAFE = failsafe
+        pyautogui.PAUSE = pause
+        self._gui = pyautogui
+        self._clip = pyperclip
+
+    def size(self) -> Tuple[int, int]:
+        width, height = self._gui.size()
+        return width, height
+
+    def screenshot(self, region: Tuple[int, int, int, int]) -> bytes:
+        # 第一次截图时才导入抓取模块（numpy / mss / cv2 不计入启动时间）
+        from . import capture
+        grabber = capture.get_grabber()
+        if grabber is not None:
+            return capture.encode_png(grabber.grab(region))
+        image = self._gui.screenshot(region=region)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def screenshot_regions(self, regions: List[Tuple[int, int, int, int]]) -> List[bytes]:
+        from . import capture
+        grabber = capture.get_grabber()
+        if grabber is None:
+            return super().screenshot_regions(regions)
+        return [capture.encode_png(frame) for frame in grabber.grab_regions(regions)]
+
+    def click(self, x: int, y: int) -> None:
+        self._gui.click(x, y)
+
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        self._gui.moveTo(x, y, duration=duration)
+
+    def mouse_down(self, x: int, y: int, button: str = "left") -> None:
+        self._gui.mouseDown(x=x, y=y, button=button)
+
+    def mouse_up(self, x: int, y: int, button: str = "left") -> None:
+        self._gui.mouseUp(x=x, y=y, button=button)
+
+    def drag_to(self, x: int, y: int, duration: float = 0.0, button: str = "left") -> None:
+        self._gui.dragTo(x, y, duration=duration, button=button)
+
+    def scroll(self, amount: int) -> None:
+        self._gui.scroll(amount)
+
+    def hscroll(self, amount: int) -> None:
+        self._gui.hscroll(amount)
+
+    def press(self, key: str) -> None:
+        self._gui.press(key)
+
+    def hotkey(self, *keys: str) -> None:
+        self._gui.hotkey(*keys)
+
+    def key_down(self, key: str) -> None:
+        self._gui.keyDown(key)
+
+    def key_up(self, key: str) -> None:
+        self._gui.keyUp(key)
+
+    def copy(self, text: str) -> None:
+        self._clip.copy(text)
+
+    def paste(self) -> str:
+        return self._clip.paste()
+
+
+class HeadlessBackend(InputBackend):
+    """
+    无桌面模拟后端
+    - 记录全部操作到 actions（含步骤ID与时间戳），便于断言与统计
+    - 复制快捷键（ctrl/command + c）时，剪贴板内容取 clipboard_script[step_id]，没有则用 default_clipboard
+    - 截图返回 screenshots[step_id]，没有则返回同尺寸空白 PNG
+    """
+
+    name = "headless"
+
+    def __init__(
+        self,
+        clipboard_script: Optional[Dict[Any, str]] = None,
+        screenshots: Optional[Dict[Any, bytes]] = None,
+        default_clipboard: str = "",
+        screen_size: Tuple[int, int] = (1920, 1080),
+        action_delay: float = 0.0,
+    ):
+        """
+        Args:
+            clipboard_script: {步骤ID: 复制得到的文本}
+            screenshots: {步骤ID: PNG 字节}
+            default_clipboard: 未预设时复制得到的文本
+            screen_size: 模拟屏幕尺寸
+            action_delay: 每个操作的模拟耗时（秒）
+        """
+        self.clipboard_script = {str(k): v for k, v in (clipboard_script or {}).items()}
+        self.screenshots = {str(k): v for k, v in (screenshots or {}).items()}
+        self.default_clipboard = default_clipboard
+        self.screen_size = screen_size
+        self.action_delay = action_delay
+        self.actions: List[Dict[str, Any]] = []
+        self.clipboard = ""
+        self.current_step: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def begin_step(self, step_id: Any, step_type: str = "") -> None:
+        self.current_step = str(step_id)
+
+    def _record(self, action: str, *args: Any) -> None:
+        with self._lock:
+            self.actions.append({"step_id": self.current_step, "action": action, "args": list(args), "t": time.time()})
+        if self.action_delay:
+            time.sleep(self.action_delay)
+
+    def size(self) -> Tuple[int, int]:
+        return self.screen_size
+
+    def screenshot(self, region: Tuple[int, int, int, int]) -> bytes:
+        self._record("screenshot", *region)
+        data = self.screenshots.get(self.current_step or "")
+        return data if data is not None else blank_png(region[2], region[3])
+
+    def screenshot_regions(self, regions: List[Tuple[int, int, int, int]]) -> List[bytes]:
+        self._record("screenshot_regions", len(regions))
+        data = self.screenshots.get(self.current_step or "")
+        return [data if data is not None else blank_png(r[2], r[3]) for r in regions]
+
+    def click(self, x: int, y: int) -> None:
+        self._record("click", x, y)
+
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        self._record("move_to", x, y, duration)
+
+    def mouse_down(self, x: int, y: int, button: str = "left") -> None:
+        self._record("mouse_down", x, y, button)
+
+    def mouse_up(self, x: int, y: int, button: str = "left") -> None:
+        self._record("mouse_up", x, y, button)
+
+    def drag_to(self, x: int, y: int, duration: float = 0.0, button: str = "left") -> None:
+        self._record("drag_to", x, y, duration, button)
+
+    def scroll(self, amount: int) -> None:
+        self._record("scroll", amount)
+
+    def hscroll(self, amount: int) -> None:
+        self._record("hscroll", amount)
+
+    def press(self, key: str) -> None:
+        self._record("press", key)
+
+    def hotkey(self, *keys: str) -> None:
+        self._record("hotkey", *keys)
+        lowered = [k.lower() for k in keys]
+        if "c" in lowered and _COPY_MODIFIERS & set(lowered):
+            self.clipboard = self.clipboard_script.get(self.current_step or "", self.default_clipboard)
+
+    def key_down(self, key: str) -> None:
+        self._record("key_down", key)
+
+    def key_up(self, key: str) -> None:
+        self._record("key_up", key)
+
+    def copy(self, text: str) -> None:
+        self._record("copy", len(text))
+        self.clipboard = text
+
+    def paste(self) -> str:
+        self._record("paste")
+        return self.clipboard
+
+
+# ----------------------- 当前后端 -----------------------
+
+_backend: Optional[InputBackend] = None
+_backend_lock = threading.Lock()
+
+_FACTORIES: Dict[str, Callable[[], InputBackend]] = {
+    "pyautogui": PyAutoGUIBackend,
+    "headless": HeadlessBackend,
+}
+
+
+def get_backend() -> InputBackend:
+    """返回当前输入后端（首次调用时按 INPUT_BACKEND 环境变量创建，默认 pyautogui）"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.getenv(BACKEND_ENV, "pyautogui").strip().lower()
+                factory = _FACTORIES.get(name)
+                if factory is None:
+                    raise ValueError(f"未知的输入后端: {name}（可选: {', '.join(_FACTORIES)}）")
+                _backend = factory()
+                logger.info("🖱️ 输入后端: %s", _backend.name)
+    return _backend
+
+
+def set_backend(backend: InputBackend) -> InputBackend:
+    """替换当前输入后端，返回之前的后端（可能为 None）"""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    logger.info("🖱️ 输入后端: %s", backend.name)
+    return previous
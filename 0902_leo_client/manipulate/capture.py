@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+屏幕截图抓取模块（供 PyAutoGUIBackend 截图使用）
+- 抓取器常驻：第一次截图时创建，之后复用（不再每次走 PIL ImageGrab）
+- 返回 numpy 数组（BGR，H x W x 3），不经过 PIL；上传前再编码为 PNG
+- grab_regions：多个区域只抓一帧（取外接矩形），再按区域切片
+
+可选抓取器（环境变量 CAPTURE_BACKEND=auto | dxcam | mss | pyautogui，默认 auto 按顺序选第一个可用的）:
+    dxcam      Windows 桌面复制（DXGI Desktop Duplication）
+    mss        Windows GDI / macOS CoreGraphics / Linux X11（XShm 共享内存）
+    pyautogui  兜底（内部仍走 PIL）
+"""
+
+import logging
+import os
+import sys
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import mss
+    import mss.tools
+    MSS_AVAILABLE = True
+except Exception:
+    mss = None
+    MSS_AVAILABLE = False
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except Exception:
+    cv2 = None
+    CV2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_ENV = "CAPTURE_BACKEND"
+# PNG 压缩级别：截图只用于上传识别，优先编码速度
+PNG_COMPRESSION = 1
+
+Region = Tuple[int, int, int, int]  # (x, y, width, height)，屏幕坐标
+
+
+class Grabber:
+    """截图抓取器接口"""
+
+    name = "base"
+
+    def grab(self, region: Region) -> Any:
+        """抓取区域，返回 BGR numpy 数组（高DPI 屏幕上像素尺寸可能是区域的倍数）"""
+        raise NotImplementedError
+
+    def grab_regions(self, regions: Sequence[Region]) -> List[Any]:
+        """
+        多个区域只抓一帧：抓取外接矩形后按区域切片
+
+        Args:
+            regions: [(x, y, width, height), ...]
+
+        Returns:
+            list: 与 regions 一一对应的 BGR 数组
+        """
+        if not regions:
+            return []
+        left = min(r[0] for r in regions)
+        top = min(r[1] for r in regions)
+        right = max(r[0] + r[2] for r in regions)
+        bottom = max(r[1] + r[3] for r in regions)
+        frame = self.grab((left, top, right - left, bottom - top))
+        # 帧像素 / 屏幕坐标 的比例（Retina 为 2）
+        scale_x = frame.shape[1] / float(right - left)
+        scale_y = frame.shape[0] / float(bottom - top)
+        crops = []
+        for x, y, w, h in regions:
+            x1, y1 = int(round((x - left) * scale_x)), int(round((y - top) * scale_y))
+            x2, y2 = int(round((x - left + w) * scale_x)), int(round((y - top + h) * scale_y))
+            crops.append(frame[y1:y2, x1:x2])
+        return crops
+
+
+class MSSGrabber(Grabber):
+    """mss 抓取器（每个线程一个 mss 实例，mss 句柄不能跨线程使用）"""
+
+    name = "mss"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def grab(self, region: Region) -> Any:
+        x, y, w, h = region
+        shot = self._sct().grab({"left": int(x), "top": int(y), "width": int(w), "height": int(h)})
+        # BGRA -> BGR（切片视图，不复制）
+        return np.asarray(shot)[:, :, :3]
+
+
+class DXCamGrabber(Grabber):
+    """
+    DXGI 桌面复制抓取器（Windows，dxcam）
+    每次抓取整屏帧并缓存，再按区域切片：屏幕没有变化时 dxcam 返回 None，
+    此时沿用缓存的整屏帧（与上次请求的区域无关）
+    """
+
+    name = "dxcam"
+
+    def __init__(self):
+        import dxcam
+        self._camera = dxcam.create(output_color="BGR")
+        self._lock = threading.Lock()
+        self._frame: Any = None
+
+    def grab(self, region: Region) -> Any:
+        x, y, w, h = (int(v) for v in region)
+        with self._lock:
+            frame = self._camera.grab()
+            if frame is not None:
+                self._frame = frame
+            elif self._frame is None:
+                raise RuntimeError("dxcam 未返回帧")
+            return self._frame[y:y + h, x:x + w]
+
+
+class PyAutoGUIGrabber(Grabber):
+    """兜底抓取器（pyautogui / PIL）"""
+
+    name = "pyautogui"
+
+    def grab(self, region: Region) -> Any:
+        import pyautogui
+        image = pyautogui.screenshot(region=tuple(int(v) for v in region))
+        return np.asarray(image.convert("RGB"))[:, :, ::-1]
+
+
+def _create(name: str) -> Grabber:
+    if name == "dxcam":
+        return DXCamGrabber()
+    if name == "mss":
+        if not MSS_AVAILABLE:
+            raise RuntimeError("未安装 mss")
+        return MSSGrabber()
+    if name == "pyautogui":
+        return PyAutoGUIGrabber()
+    raise ValueError(f"未知的截图抓取器: {name}（可选: auto, dxcam, mss, pyautogui）")
+
+
+_grabber: Optional[Grabber] = None
+_grabber_lock = threading.Lock()
+
+
+def get_grabber() -> Optional[Grabber]:
+    """
+    返回常驻抓取器（首次调用时按 CAPTURE_BACKEND 创建）
+
+    Returns:
+        Grabber；未安装 numpy 时返回 None（调用方退回 pyautogui 截图）
+    """
+    global _grabber
+    if not NUMPY_AVAILABLE:
+        return None
+    if _grabber is None:
+        with _grabber_lock:
+            if _grabber is None:
+                name = os.getenv(CAPTURE_ENV, "auto").strip().lower()
+                if name == "auto":
+                    candidates = (["dxcam"] if sys.platform == "win32" else []) + ["mss", "pyautogui"]
+                else:
+                    candidates = [name]
+                for candidate in candidates:
+                    try:
+                        _grabber = _create(candidate)
+                        break
+                    except Exception as e:
+                        logger.debug("截图抓取器 %s 不可用: %s", candidate, e)
+                if _grabber is None:
+                    raise RuntimeError(f"没有可用的截图抓取器: {candidates}")
+                logger.info("📸 截图抓取器: %s", _grabber.name)
+    return _grabber
+
+
+def encode_png(frame: Any) -> bytes:
+    """BGR 数组编码为 PNG（优先 OpenCV，其次 mss.tools 纯 zlib 编码）"""
+    if CV2_AVAILABLE:
+        ok, data = cv2.imencode(".png", frame, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+        if ok:
+            return data.tobytes()
+    if MSS_AVAILABLE:
+        rgb = np.ascontiguousarray(frame[:, :, ::-1])
+        return mss.tools.to_png(rgb.tobytes(), (frame.shape[1], frame.shape[0]), level=PNG_COMPRESSION)
+    from PIL import Image
+    from io import BytesIO
+    buffer = BytesIO()
+    Image.fromarray(np.ascontiguousarray(frame[:, :, ::-1])).save(buffer, format="PNG", compress_level=PNG_COMPRESSION)
+    return buffer.getvalue()
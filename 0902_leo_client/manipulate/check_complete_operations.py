@@ -4,10 +4,11 @@
 负责通过关键字检测判断页面是否加载完成
 """
 
+import logging
 import time
-import pyautogui
-import pyperclip
 from typing import Optional, Dict, Any, List
+from . import tracing
+from .backends import get_backend
 
 def execute_check_complete(params: Dict[str, Any], step_results: Dict[int, Any], api_client, log_callback: Optional[callable] = None) -> tuple[bool, Optional[Dict[str, Any]]]:
     """执行页面加载完成检查"""
@@ -58,24 +59,24 @@ def execute_check_complete(params: Dict[str, Any], step_results: Dict[int, Any],
                 # 点击浏览器准备复制
                 if log_callback:
                     log_callback(f"🖱️ 点击浏览器准备复制位置: {click_coordinates}")
-                pyautogui.click(click_coordinates[0], click_coordinates[1])
-                time.sleep(0.2)
+                get_backend().click(click_coordinates[0], click_coordinates[1])
+                tracing.sleep(0.2)
                 
                 # 全选
-                pyautogui.hotkey('ctrl', 'a')
-                time.sleep(0.2)
+                get_backend().hotkey('ctrl', 'a')
+                tracing.sleep(0.2)
                 
                 # 复制
-                pyautogui.hotkey('ctrl', 'c')
-                time.sleep(0.3)
+                get_backend().hotkey('ctrl', 'c')
+                tracing.sleep(0.3)
                 
                 # 获取剪贴板内容
-                clipboard_content = pyperclip.paste()
+                clipboard_content = get_backend().paste()
                 
                 if not clipboard_content:
                     if log_callback:
-                        log_callback("⚠️ 剪贴板内容为空，继续下次尝试...")
-                    time.sleep(check_interval)
+                        log_callback("⚠️ 剪贴板内容为空，继续下次尝试...", level=logging.WARNING)
+                    tracing.sleep(check_interval)
                     continue
                 
                 if log_callback:
@@ -83,8 +84,8 @@ def execute_check_complete(params: Dict[str, Any], step_results: Dict[int, Any],
                 
             except Exception as e:
                 if log_callback:
-                    log_callback(f"❌ 复制页面内容失败: {str(e)}")
-                time.sleep(check_interval)
+                    log_callback(f"❌ 复制页面内容失败: {str(e)}", level=logging.ERROR)
+                tracing.sleep(check_interval)
                 continue
             
             # 2. 请求服务端检查关键字
@@ -118,19 +119,19 @@ def execute_check_complete(params: Dict[str, Any], step_results: Dict[int, Any],
                             log_callback(f"⏳ 未找到目标关键字，{check_interval}秒后重试...")
                 else:
                     if log_callback:
-                        log_callback(f"❌ 服务端检查失败: {response.get('message', '未知错误') if response else '无响应'}")
+                        log_callback(f"❌ 服务端检查失败: {response.get('message', '未知错误') if response else '无响应'}", level=logging.ERROR)
                 
             except Exception as e:
                 if log_callback:
-                    log_callback(f"❌ 请求服务端异常: {str(e)}")
+                    log_callback(f"❌ 请求服务端异常: {str(e)}", level=logging.ERROR)
             
             # 如果不是最后一次尝试，等待后继续
             if attempt < max_attempts:
-                time.sleep(check_interval)
+                tracing.sleep(check_interval)
         
         # 所有尝试都失败
         if log_callback:
-            log_callback(f"❌ {timeout_message}，已尝试 {max_attempts} 次")
+            log_callback(f"❌ {timeout_message}，已尝试 {max_attempts} 次", level=logging.ERROR)
         
         return False, {
             "keywords_found": False,
@@ -4,14 +4,11 @@
 负责执行拖拽选择和复制操作
 """
 
-import pyautogui
-import time
-import pyperclip
+import logging
 from typing import Optional, Dict, Any
+from . import tracing
+from .backends import get_backend
 
-# 设置pyautogui的安全性
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
 
 def execute_drag(
     params: Dict[str, Any],
@@ -40,7 +37,7 @@ def execute_drag(
         success, data = api_client.call_api("/api/drag", payload)
         
         if not success:
-            api_client.log("❌ 获取拖拽坐标失败")
+            api_client.log("❌ 获取拖拽坐标失败", level=logging.ERROR)
             return False, None
         
         start_position = data['start_position']
@@ -56,14 +53,14 @@ def execute_drag(
         )
         
         if not drag_success:
-            api_client.log("❌ 拖拽操作失败")
+            api_client.log("❌ 拖拽操作失败", level=logging.ERROR)
             return False, None
         
         # 第3步：获取复制的内容
         selected_text = get_clipboard_content(api_client)
         
         if not selected_text:
-            api_client.log("❌ 未获取到复制的内容")
+            api_client.log("❌ 未获取到复制的内容", level=logging.ERROR)
             return False, None
         
         api_client.log(f"✅ 拖拽选择完成，获取内容: {selected_text[:50]}...")
@@ -109,45 +106,45 @@ def perform_drag_and_copy(
         api_client.log(f"🖱️  移动到起始位置: ({start_x}, {start_y})")
         
         # 确保坐标在屏幕范围内
-        screen_width, screen_height = pyautogui.size()
+        screen_width, screen_height = get_backend().size()
         if not (0 <= start_x <= screen_width and 0 <= start_y <= screen_height):
-            api_client.log(f"❌ 起始坐标超出屏幕范围: ({start_x}, {start_y})")
+            api_client.log(f"❌ 起始坐标超出屏幕范围: ({start_x}, {start_y})", level=logging.ERROR)
             return False
             
         if not (0 <= end_x <= screen_width and 0 <= end_y <= screen_height):
-            api_client.log(f"❌ 结束坐标超出屏幕范围: ({end_x}, {end_y})")
+            api_client.log(f"❌ 结束坐标超出屏幕范围: ({end_x}, {end_y})", level=logging.ERROR)
             return False
         
         # 移动到起始位置
-        pyautogui.moveTo(start_x, start_y)
-        time.sleep(0.5)  # 短暂等待
+        get_backend().move_to(start_x, start_y)
+        tracing.sleep(0.5)  # 短暂等待
         
         api_client.log(f"📐 开始拖拽到结束位置: ({end_x}, {end_y})")
         
         # 执行拖拽操作（显式使用左键，避免button参数异常）
         try:
             # 方式一：显式按下-拖动-抬起，兼容性更好
-            pyautogui.mouseDown(x=start_x, y=start_y, button='left')
-            time.sleep(0.1)
-            pyautogui.moveTo(end_x, end_y, duration=duration)
-            time.sleep(0.1)
-            pyautogui.mouseUp(x=end_x, y=end_y, button='left')
+            get_backend().mouse_down(x=start_x, y=start_y, button='left')
+            tracing.sleep(0.1)
+            get_backend().move_to(end_x, end_y, duration=duration)
+            tracing.sleep(0.1)
+            get_backend().mouse_up(x=end_x, y=end_y, button='left')
         except Exception:
             # 方式二：回退到dragTo并指定button
-            pyautogui.dragTo(end_x, end_y, duration=duration, button='left')
-        time.sleep(0.5)  # 等待拖拽完成
+            get_backend().drag_to(end_x, end_y, duration=duration, button='left')
+        tracing.sleep(0.5)  # 等待拖拽完成
         
         api_client.log("📋 执行复制操作...")
         
         # 执行复制操作 (macOS使用command，Windows/Linux使用ctrl)
-        pyautogui.hotkey('command', 'c')
-        time.sleep(1.0)  # 等待复制完成
+        get_backend().hotkey('command', 'c')
+        tracing.sleep(1.0)  # 等待复制完成
         
         api_client.log("✅ 拖拽和复制操作完成")
         return True
         
     except Exception as e:
-        api_client.log(f"❌ 拖拽操作异常: {str(e)}")
+        api_client.log(f"❌ 拖拽操作异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -164,18 +161,18 @@ def get_clipboard_content(api_client) -> Optional[str]:
     try:
         api_client.log("📋 读取剪贴板内容...")
         
-        # 使用pyperclip获取剪贴板内容
-        clipboard_content = pyperclip.paste()
+        # 通过输入后端获取剪贴板内容
+        clipboard_content = get_backend().paste()
         
         if clipboard_content:
             api_client.log(f"✅ 成功获取剪贴板内容: {len(clipboard_content)} 字符")
             return clipboard_content.strip()
         else:
-            api_client.log("⚠️  剪贴板内容为空")
+            api_client.log("⚠️  剪贴板内容为空", level=logging.WARNING)
             return None
             
     except Exception as e:
-        api_client.log(f"❌ 读取剪贴板异常: {str(e)}")
+        api_client.log(f"❌ 读取剪贴板异常: {str(e)}", level=logging.ERROR)
         return None
 
 
@@ -191,11 +188,11 @@ def clear_clipboard(api_client) -> bool:
     """
     try:
         api_client.log("🗑️  清空剪贴板...")
-        pyperclip.copy("")
+        get_backend().copy("")
         api_client.log("✅ 剪贴板已清空")
         return True
     except Exception as e:
-        api_client.log(f"❌ 清空剪贴板异常: {str(e)}")
+        api_client.log(f"❌ 清空剪贴板异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -212,11 +209,11 @@ def copy_text_to_clipboard(text: str, api_client) -> bool:
     """
     try:
         api_client.log(f"📋 复制文本到剪贴板: {text[:50]}...")
-        pyperclip.copy(text)
+        get_backend().copy(text)
         api_client.log("✅ 文本已复制到剪贴板")
         return True
     except Exception as e:
-        api_client.log(f"❌ 复制到剪贴板异常: {str(e)}")
+        api_client.log(f"❌ 复制到剪贴板异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -256,5 +253,5 @@ def drag_with_custom_coordinates(
             return None
             
     except Exception as e:
-        api_client.log(f"❌ 自定义拖拽异常: {str(e)}")
+        api_client.log(f"❌ 自定义拖拽异常: {str(e)}", level=logging.ERROR)
         return None
\ No newline at end of file
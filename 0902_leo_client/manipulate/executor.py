@@ -2,113 +2,76 @@
 流程执行器 - 负责执行完整的自动化流程
 """
 
-import json
-import os
-from datetime import datetime
 from .api_client import APIClient
-from .recognition import get_screenshot_coordinates, recognize_screenshot
-from .input_operations import execute_click, execute_input
-from .file_operations import execute_save_result
-from .wait_operations import execute_wait
-from .drag_operations import execute_drag
-from .llm_operations import execute_llm_process
-# 在导入部分添加
-from .feishu_operations import execute_feishu_write, execute_get_data, execute_write_doc
-from .keyboard_operations import execute_keyboard
-from .scroll_operations import execute_scroll
-from .check_complete_operations import execute_check_complete
+from .recognition import get_screenshot_coordinates, recognize_screenshot, capture_rec_screenshot, upload_rec_screenshot, recognize_batch, capture_rec_batch, upload_rec_batch
+from .scheduler import StepScheduler, build_dependency_graph, DEFAULT_MAX_WORKERS
+from .journal import StepJournal, DEBUG_DIR
+from .backends import get_backend
+from . import tracing
+import importlib
+import logging
+import os
 
-# 全局变量存储当前任务的日志文件路径
-_current_task_log_file = None
-_current_task_start_time = None
+# 步骤类型 -> (操作模块, 函数名)；操作模块在第一次执行该类型的步骤时才导入
+STEP_OPERATIONS = {
+    "click": ("input_operations", "execute_click"),
+    "input": ("input_operations", "execute_input"),
+    "save_result": ("file_operations", "execute_save_result"),
+    "wait": ("wait_operations", "execute_wait"),
+    "drag": ("drag_operations", "execute_drag"),
+    "llm_process": ("llm_operations", "execute_llm_process"),
+    "feishu_write": ("feishu_operations", "execute_feishu_write"),
+    "get_data": ("feishu_operations", "execute_get_data"),
+    "write_doc": ("feishu_operations", "execute_write_doc"),
+    "keyboard": ("keyboard_operations", "execute_keyboard"),
+    "keyboard2": ("keyboard_operations", "execute_keyboard"),
+    "scroll": ("scroll_operations", "execute_scroll"),
+    "check_complete": ("check_complete_operations", "execute_check_complete"),
+    "ocr_click": ("ocr_click_operations", "execute_ocr_click"),
+    "template_click": ("template_click_operations", "execute_template_click"),
+}
+_operations = {}
+
+
+def get_operation(step_type):
+    """按步骤类型取操作函数（第一次使用时导入所在模块）"""
+    operation = _operations.get(step_type)
+    if operation is None:
+        module_name, function_name = STEP_OPERATIONS[step_type]
+        operation = getattr(importlib.import_module(f".{module_name}", __package__), function_name)
+        _operations[step_type] = operation
+    return operation
 
-def save_step_results(step_results, task_name, status="in_progress"):
-    """
-    保存step_results到本地文件，方便调试
-    使用同一个文件进行增量更新，避免产生多个冗余文件
-    
-    Args:
-        step_results: 步骤结果字典
-        task_name: 任务名称
-        status: 执行状态
-    """
-    global _current_task_log_file, _current_task_start_time
-    
-    try:
-        # 确保目录存在
-        debug_dir = "debug_logs"
-        if not os.path.exists(debug_dir):
-            os.makedirs(debug_dir)
-        
-        # 如果是新任务或者文件不存在，创建新的日志文件
-        if (_current_task_log_file is None or 
-            not os.path.exists(_current_task_log_file) or
-            status.startswith("step_1_")):
-            
-            _current_task_start_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"step_results_{task_name}_{_current_task_start_time}.json"
-            _current_task_log_file = os.path.join(debug_dir, filename)
-            print(f"📋 创建新的日志文件: {_current_task_log_file}")
-        
-        # 准备保存的数据
-        debug_data = {
-            "task_name": task_name,
-            "start_timestamp": _current_task_start_time,
-            "last_update": datetime.now().strftime("%Y%m%d_%H%M%S"),
-            "status": status,
-            "total_steps": len(step_results),
-            "step_results": {}
-        }
-        
-        # 转换step_results为可序列化的格式
-        for step_id, result in step_results.items():
-            debug_data["step_results"][str(step_id)] = {
-                "step_id": step_id,
-                "result_type": type(result).__name__,
-                "result_keys": list(result.keys()) if isinstance(result, dict) else "non_dict",
-                "result_data": result
-            }
-        
-        # 写入文件（覆盖更新）
-        with open(_current_task_log_file, 'w', encoding='utf-8') as f:
-            json.dump(debug_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"📋 Step results updated: {_current_task_log_file} (状态: {status})")
-        
-        # 如果任务完成或失败，清空全局变量
-        if status in ["completed", "failed"] or "failed" in status:
-            _current_task_log_file = None
-            _current_task_start_time = None
-            print(f"📋 任务日志记录完成，文件路径已清空")
-        
-        return _current_task_log_file
-        
-    except Exception as e:
-        print(f"❌ Failed to save step results: {e}")
-        return None
 
 # def execute_process(task_name, log_callback=None, server_url="https://121.4.65.242"):
-def execute_process(task_name, log_callback=None, server_url="http://127.0.0.1:8000"):
+def execute_process(task_name, log_callback=None, server_url="http://127.0.0.1:8000", max_workers=DEFAULT_MAX_WORKERS):
     """
     执行完整的自动化流程
+    - UI 步骤按顺序在当前线程执行
+    - 服务端步骤（LLM/飞书/识别上传）提交到线程池，只在后续步骤消费其结果时等待
+    - 每个步骤记录耗时 span，结束后输出耗时分析并导出 trace 文件（debug_logs/trace_*.json）
     
     Args:
         task_name: 任务名称
-        log_callback: 日志回调函数
+        log_callback: 日志回调函数 log_callback(message, level)（level 为 logging 级别）
         server_url: 服务器URL
+        max_workers: 服务端步骤并发数（0 表示全部同步执行；可被流程配置中的 max_workers 覆盖）
     
     Returns:
         bool: 执行是否成功
     """
     # 创建API客户端
     api_client = APIClient(server_url, log_callback)
+    scheduler = None
+    journal = None
+    tracer = tracing.start_trace(task_name)
     
     try:
         # 第1步：获取流程配置
         api_client.log("📋 获取任务流程配置...")
         process_config = api_client.get_process_config(task_name)
         if not process_config:
-            api_client.log("❌ 获取流程配置失败，流程终止")
+            api_client.log("❌ 获取流程配置失败，流程终止", level=logging.ERROR)
             return False
         
         api_client.log(f"✅ 获取配置成功: {process_config['task_name']}")
@@ -117,50 +80,105 @@ def execute_process(task_name, log_callback=None, server_url="http://127.0.0.1:8
         
         # 第2步：执行流程步骤
         step_results = {}  # 存储每步的结果，供后续步骤使用
+        steps = process_config['steps']
+        dependency_graph = build_dependency_graph(steps)
+        # 步骤结果日志：每步只追加一行，方便调试
+        journal = StepJournal(task_name)
+        api_client.log(f"📋 步骤日志文件: {journal.path}")
+        
+        def on_step_complete(step_id, step, success, result):
+            """记录步骤结果（仅在主线程调用）"""
+            step_type = step['step_type']
+            if not success:
+                api_client.log(f"❌ 步骤{step_id}失败，流程终止", level=logging.ERROR)
+                journal.record_step(step_id, step['step_name'], None, f"step_{step_id}_failed")
+                journal.close("failed")
+                return
+            
+            result = with_step_name(step, result)
+            step_results[step_id] = result
+            api_client.log(f"✅ 步骤{step_id}完成")
+            
+            # 每完成一个步骤就追加记录一次，方便调试
+            journal.record_step(step_id, step['step_name'], result, f"step_{step_id}_completed")
+            
+            # 特别关注复制步骤，保存详细信息
+            if step_type in ("keyboard", "keyboard2") and result and result.get("has_clipboard_result"):
+                clipboard_content = result.get("clipboard_content", "")
+                api_client.log(f"🔍 调试信息 - 步骤{step_id}复制内容长度: {len(clipboard_content)}")
+                api_client.log(f"🔍 调试信息 - 步骤{step_id}复制内容预览: {clipboard_content[:100]}...")
+        
+        scheduler = StepScheduler(on_step_complete, process_config.get('max_workers', max_workers))
         
-        for step in process_config['steps']:
+        for step in steps:
             step_id = step['step_id']
             step_type = step['step_type']
             step_name = step['step_name']
             params = step['params']
             
+            # 先收集已完成的后台步骤；UI 步骤在主线程等待依赖的结果，后台步骤的依赖由工作线程等待
+            if not scheduler.collect():
+                return False
+            deps = dependency_graph.get(step_id, [])
+            waiting = [d for d in deps if d in scheduler.pending_ids()]
+            if waiting and not scheduler.is_async(step):
+                api_client.log(f"⏳ 步骤{step_id}等待后台步骤{waiting}完成...")
+                with tracing.span(f"等待步骤{waiting}", "wait", step_id=step_id):
+                    if not scheduler.wait_for(waiting):
+                        return False
+            
             api_client.log(f"⚡ 步骤{step_id}：{step_name} ({step_type})")
+            # 通知输入后端当前步骤（模拟/回放后端按步骤提供剪贴板与截图内容）
+            get_backend().begin_step(step_id, step_type)
             
-            # 根据步骤类型执行对应操作
-            success, result = execute_step(step_type, params, step_results, api_client)
+            if scheduler.is_async(step):
+                if step_type == "rec_rec":
+                    # 截图依赖当前屏幕，必须在主线程完成；上传识别放到后台
+                    with tracing.span(f"步骤{step_id} {step_name}(截图)", "step", step_id=step_id, step_type=step_type):
+                        screenshot_base64 = capture_rec_screenshot(step_results, api_client)
+                    if not screenshot_base64:
+                        on_step_complete(step_id, step, False, None)
+                        return False
+                    scheduler.submit(step, traced_step, step, True, upload_rec_screenshot, screenshot_base64, params['target_description'], api_client, params.get('format', 'text'),
+                                     depends_on=waiting)
+                elif step_type == "rec_batch":
+                    # 同上：多个区域一次截图在主线程完成，一次上传识别放到后台
+                    with tracing.span(f"步骤{step_id} {step_name}(截图)", "step", step_id=step_id, step_type=step_type):
+                        capture = capture_rec_batch(params, api_client)
+                    if not capture:
+                        on_step_complete(step_id, step, False, None)
+                        return False
+                    scheduler.submit(step, traced_step, step, True, upload_rec_batch, capture, params['targets'], api_client, params.get('format', 'text'),
+                                     depends_on=waiting)
+                else:
+                    # 传入结果快照，避免后台线程读取时主线程正在写入；仍在执行的依赖步骤结果由工作线程写入快照
+                    snapshot = dict(step_results)
+                    scheduler.submit(step, traced_step, step, True, execute_step, step_type, params, snapshot, api_client,
+                                     depends_on=waiting, results=snapshot)
+                if waiting:
+                    api_client.log(f"🚀 步骤{step_id}已提交后台执行（等待步骤{waiting}完成后开始）")
+                else:
+                    api_client.log(f"🚀 步骤{step_id}已提交后台执行")
+                continue
             
-            if success:
-                # 将步骤名一并存入结果，便于下游（如多步合并的 LLM）引用显示
-                if isinstance(result, dict):
-                    # 使用下划线前缀，避免与业务字段冲突
-                    result = {**result, "_step_name": step_name}
-                step_results[step_id] = result
-                api_client.log(f"✅ 步骤{step_id}完成")
-                
-                # 每完成一个步骤就保存一次，方便调试
-                save_step_results(step_results, task_name, f"step_{step_id}_completed")
-                
-                # 特别关注复制步骤，保存详细信息
-                if step_type == "keyboard" and result and result.get("has_clipboard_result"):
-                    clipboard_content = result.get("clipboard_content", "")
-                    api_client.log(f"🔍 调试信息 - 步骤{step_id}复制内容长度: {len(clipboard_content)}")
-                    api_client.log(f"🔍 调试信息 - 步骤{step_id}复制内容预览: {clipboard_content[:100]}...")
-
-                if step_type == "keyboard2" and result and result.get("has_clipboard_result"):
-                    clipboard_content = result.get("clipboard_content", "")
-                    api_client.log(f"🔍 调试信息 - 步骤{step_id}复制内容长度: {len(clipboard_content)}")
-                    api_client.log(f"🔍 调试信息 - 步骤{step_id}复制内容预览: {clipboard_content[:100]}...")
-                    
-            else:
-                api_client.log(f"❌ 步骤{step_id}失败，流程终止")
-                save_step_results(step_results, task_name, f"step_{step_id}_failed")
+            # 根据步骤类型执行对应操作
+            success, result = traced_step(step, False, execute_step, step_type, params, step_results, api_client)
+            on_step_complete(step_id, step, success, result)
+            if not success:
+                return False
+        
+        # 等待所有后台步骤完成
+        if scheduler.pending_ids():
+            api_client.log(f"⏳ 等待后台步骤{scheduler.pending_ids()}完成...")
+        with tracing.span("等待全部后台步骤", "wait"):
+            if not scheduler.drain():
                 return False
         
         api_client.log("=" * 50)
         api_client.log("🎉 自动化流程完成!")
         
-        # 保存最终的step_results
-        final_file = save_step_results(step_results, task_name, "completed")
+        # 写入结束记录
+        final_file = journal.close("completed")
         api_client.log(f"📁 Step results已保存到: {final_file}")
         
         # 显示统计信息
@@ -170,8 +188,55 @@ def execute_process(task_name, log_callback=None, server_url="http://127.0.0.1:8
         return True
         
     except Exception as e:
-        api_client.log(f"💥 流程异常: {str(e)}")
+        api_client.log(f"💥 流程异常: {str(e)}", level=logging.ERROR)
+        if journal:
+            journal.close("failed")
         return False
+    finally:
+        if scheduler:
+            scheduler.shutdown()
+        report_trace(tracer, api_client)
+
+
+def with_step_name(step, result):
+    """将步骤名一并存入结果（下划线前缀，避免与业务字段冲突），便于下游（如多步合并的 LLM）引用显示"""
+    if isinstance(result, dict):
+        return {**result, "_step_name": step['step_name']}
+    return result
+
+
+def traced_step(step, background, func, *args):
+    """
+    在步骤 span 中执行步骤函数（主线程与后台线程共用）
+    
+    Args:
+        step: 步骤配置
+        background: 是否在后台线程执行（报告中以 ⇢ 标记）
+        func: 步骤函数
+        args: 步骤函数参数
+    
+    Returns:
+        tuple: (success, 结果)；结果带上 _step_name（后台步骤的结果会被依赖它的后台步骤直接使用）
+    """
+    attrs = {"step_id": step['step_id'], "step_type": step['step_type'], "async": background}
+    with tracing.span(f"步骤{step['step_id']} {step['step_name']}", "step", **attrs):
+        success, result = func(*args)
+    return success, with_step_name(step, result)
+
+
+def report_trace(tracer, api_client):
+    """输出本次运行的耗时分析，并导出 Chrome Trace 文件"""
+    tracer.finish()
+    if not tracer.step_spans():
+        return
+    try:
+        for line in tracer.report():
+            api_client.log(line)
+        path = os.path.join(DEBUG_DIR, f"trace_{tracer.task_name}_{tracer.start_timestamp}.json")
+        tracer.export(path)
+        api_client.log(f"⏱️ 耗时追踪已导出: {path}（可用 chrome://tracing 或 Perfetto 打开）")
+    except Exception as e:
+        api_client.log(f"⚠️ 耗时追踪导出失败: {e}", level=logging.WARNING)
 
 
 def execute_step(step_type, params, step_results, api_client):
@@ -192,32 +257,14 @@ def execute_step(step_type, params, step_results, api_client):
             return get_screenshot_coordinates(params, api_client)
         elif step_type == "rec_rec":
             return recognize_screenshot(params, step_results, api_client)
+        elif step_type == "rec_batch":
+            return recognize_batch(params, step_results, api_client)
         elif step_type == "click":
-            return execute_click(params, api_client)
+            return get_operation(step_type)(params, api_client)
         elif step_type == "input":
-            return execute_input(params, step_results, api_client)
-        elif step_type == "save_result":
-            return execute_save_result(params, step_results, api_client, api_client.log)
-        elif step_type == "wait":
-            return execute_wait(params, step_results, api_client, api_client.log)
-        elif step_type == "drag":
-            return execute_drag(params, step_results, api_client, api_client.log)
-        elif step_type == "llm_process":
-            return execute_llm_process(params, step_results, api_client, api_client.log)
-        elif step_type == "feishu_write":
-            return execute_feishu_write(params, step_results, api_client, api_client.log)
-        elif step_type == "get_data":
-            return execute_get_data(params, step_results, api_client, api_client.log)
-        elif step_type == "write_doc":
-            return execute_write_doc(params, step_results, api_client, api_client.log)
-        elif step_type == "keyboard":
-            return execute_keyboard(params, step_results, api_client, api_client.log)
-        elif step_type == "keyboard2":
-            return execute_keyboard(params, step_results, api_client, api_client.log)
-        elif step_type == "scroll":
-            return execute_scroll(params, step_results, api_client, api_client.log)
-        elif step_type == "check_complete":
-            return execute_check_complete(params, step_results, api_client, api_client.log)
+            return get_operation(step_type)(params, step_results, api_client)
+        elif step_type in STEP_OPERATIONS:
+            return get_operation(step_type)(params, step_results, api_client, api_client.log)
         else:
             api_client.log(f"未知步骤类型: {step_type}")
             return False, None
@@ -6,6 +6,7 @@
 
 from typing import Optional, Dict, Any
 import json
+import logging
 
 
 def execute_feishu_write(
@@ -26,7 +27,7 @@ def execute_feishu_write(
         if params.get('use_previous_result'):
             source_step = params.get('source_step')
             if source_step not in step_results:
-                api_client.log(f"❌ 找不到步骤 {source_step} 的结果，无法写入飞书")
+                api_client.log(f"❌ 找不到步骤 {source_step} 的结果，无法写入飞书", level=logging.ERROR)
                 return False, None
             prev = step_results[source_step] or {}
             processed_json_str = prev.get('processed_result')
@@ -48,13 +49,13 @@ def execute_feishu_write(
         elif processed_json_str:
             payload["processed_result"] = processed_json_str
         else:
-            api_client.log("❌ 未提供可写入飞书的数据（缺少 fields 或 processed_result）")
+            api_client.log("❌ 未提供可写入飞书的数据（缺少 fields 或 processed_result）", level=logging.ERROR)
             return False, None
 
         api_client.log("🚀 提交飞书写入任务（异步）...")
         success, data = api_client.call_api("/api/feishu/write", payload, timeout=5)
         if not success:
-            api_client.log("❌ 提交飞书写入任务失败")
+            api_client.log("❌ 提交飞书写入任务失败", level=logging.ERROR)
             return False, None
 
         api_client.log("✅ 已提交飞书写入任务，服务端将后台处理")
@@ -62,9 +63,9 @@ def execute_feishu_write(
 
     except Exception as e:
         if api_client:
-            api_client.log(f"❌ 飞书写入步骤异常: {str(e)}")
+            api_client.log(f"❌ 飞书写入步骤异常: {str(e)}", level=logging.ERROR)
         elif log_callback:
-            log_callback(f"❌ 飞书写入步骤异常: {str(e)}")
+            log_callback(f"❌ 飞书写入步骤异常: {str(e)}", level=logging.ERROR)
         return False, None
 
 
@@ -81,7 +82,7 @@ def execute_get_data(
     try:
         source = params.get('source')
         if not source:
-            api_client.log("❌ 未指定数据源")
+            api_client.log("❌ 未指定数据源", level=logging.ERROR)
             return False, None
 
         payload = {"source": source}
@@ -90,7 +91,7 @@ def execute_get_data(
         success, data = api_client.call_api("/api/feishu/get_data", payload, timeout=30)
         
         if not success:
-            api_client.log("❌ 获取飞书数据失败")
+            api_client.log("❌ 获取飞书数据失败", level=logging.ERROR)
             return False, None
 
         api_client.log("✅ 成功获取飞书数据")
@@ -98,9 +99,9 @@ def execute_get_data(
 
     except Exception as e:
         if api_client:
-            api_client.log(f"❌ 飞书数据获取异常: {str(e)}")
+            api_client.log(f"❌ 飞书数据获取异常: {str(e)}", level=logging.ERROR)
         elif log_callback:
-            log_callback(f"❌ 飞书数据获取异常: {str(e)}")
+            log_callback(f"❌ 飞书数据获取异常: {str(e)}", level=logging.ERROR)
         return False, None
 
 
@@ -120,7 +121,7 @@ def execute_write_doc(
         if params.get('use_previous_result'):
             source_step = params.get('source_step')
             if source_step not in step_results:
-                api_client.log(f"❌ 找不到步骤 {source_step} 的结果，无法写入文档")
+                api_client.log(f"❌ 找不到步骤 {source_step} 的结果，无法写入文档", level=logging.ERROR)
                 return False, None
             prev = step_results[source_step] or {}
             content = prev.get('processed_result') or prev.get('content')
@@ -130,12 +131,12 @@ def execute_write_doc(
             content = params.get('content')
         
         if not content:
-            api_client.log("❌ 未提供可写入文档的内容")
+            api_client.log("❌ 未提供可写入文档的内容", level=logging.ERROR)
             return False, None
 
         doc_name = params.get('doc_name')
         if not doc_name:
-            api_client.log("❌ 未指定目标文档")
+            api_client.log("❌ 未指定目标文档", level=logging.ERROR)
             return False, None
 
         payload = {
@@ -147,7 +148,7 @@ def execute_write_doc(
         success, data = api_client.call_api("/api/feishu/write_doc", payload, timeout=30)
         
         if not success:
-            api_client.log("❌ 写入飞书文档失败")
+            api_client.log("❌ 写入飞书文档失败", level=logging.ERROR)
             return False, None
 
         api_client.log("✅ 成功写入飞书文档")
@@ -155,9 +156,9 @@ def execute_write_doc(
 
     except Exception as e:
         if api_client:
-            api_client.log(f"❌ 飞书文档写入异常: {str(e)}")
+            api_client.log(f"❌ 飞书文档写入异常: {str(e)}", level=logging.ERROR)
         elif log_callback:
-            log_callback(f"❌ 飞书文档写入异常: {str(e)}")
+            log_callback(f"❌ 飞书文档写入异常: {str(e)}", level=logging.ERROR)
         return False, None
 
 
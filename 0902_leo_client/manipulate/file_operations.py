@@ -4,6 +4,7 @@
 负责处理文件的保存、读取等操作
 """
 
+import logging
 import os
 import time
 from datetime import datetime
@@ -50,7 +51,7 @@ def save_result_to_file(
         
     except Exception as e:
         if log_callback:
-            log_callback(f"❌ 文件保存失败: {str(e)}")
+            log_callback(f"❌ 文件保存失败: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -103,7 +104,7 @@ def append_result_to_file(
         
     except Exception as e:
         if log_callback:
-            log_callback(f"❌ 内容追加失败: {str(e)}")
+            log_callback(f"❌ 内容追加失败: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -150,7 +151,7 @@ def save_json_result(
         
     except Exception as e:
         if log_callback:
-            log_callback(f"❌ JSON文件保存失败: {str(e)}")
+            log_callback(f"❌ JSON文件保存失败: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -176,7 +177,7 @@ def read_file_content(
         
         if not os.path.exists(filename):
             if log_callback:
-                log_callback(f"❌ 文件不存在: {filename}")
+                log_callback(f"❌ 文件不存在: {filename}", level=logging.ERROR)
             return None
         
         with open(filename, 'r', encoding=encoding) as f:
@@ -190,7 +191,7 @@ def read_file_content(
         
     except Exception as e:
         if log_callback:
-            log_callback(f"❌ 文件读取失败: {str(e)}")
+            log_callback(f"❌ 文件读取失败: {str(e)}", level=logging.ERROR)
         return None
 
 
@@ -254,7 +255,7 @@ def execute_save_result(
             source_step = params.get('source_step')
             if source_step not in step_results:
                 if log_callback:
-                    log_callback(f"❌ 找不到步骤 {source_step} 的结果")
+                    log_callback(f"❌ 找不到步骤 {source_step} 的结果", level=logging.ERROR)
                 return False, None
             
             step_result = step_results[source_step]
@@ -262,7 +263,7 @@ def execute_save_result(
             
             if not content:
                 if log_callback:
-                    log_callback("❌ 没有找到LLM处理结果")
+                    log_callback("❌ 没有找到LLM处理结果", level=logging.ERROR)
                 return False, None
         else:
             content = params.get('content', '')
@@ -299,5 +300,5 @@ def execute_save_result(
             
     except Exception as e:
         if log_callback:
-            log_callback(f"❌ 保存结果步骤异常: {str(e)}")
+            log_callback(f"❌ 保存结果步骤异常: {str(e)}", level=logging.ERROR)
         return False, None
\ No newline at end of file
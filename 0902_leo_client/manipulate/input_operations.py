@@ -2,14 +2,13 @@
 点击和输入相关操作
 """
 
-import pyautogui
-import time
+import logging
 from .api_client import APIClient
-import pyperclip
+from . import tracing
+from .backends import get_backend
+
+logger = logging.getLogger(__name__)
 
-# 设置pyautogui的安全性
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
 
 def execute_click(params, api_client):
     """
@@ -92,18 +91,18 @@ def click_position(coordinates, api_client=None):
         if api_client:
             api_client.log(message)
         else:
-            print(message)
+            logger.info(message)
     
     try:
         x, y = coordinates
         log(f"准备点击坐标: ({x}, {y})")
         
-        time.sleep(0.5)  # 短暂等待
+        tracing.sleep(0.5)  # 短暂等待
         
         # 确保点击位置在屏幕范围内
-        screen_width, screen_height = pyautogui.size()
+        screen_width, screen_height = get_backend().size()
         if 0 <= x <= screen_width and 0 <= y <= screen_height:
-            pyautogui.click(x, y)
+            get_backend().click(x, y)
             log(f"✅ 已点击坐标: ({x}, {y})")
             return True
         else:
@@ -131,30 +130,30 @@ def input_text(text, api_client=None, press_enter=False):
         if api_client:
             api_client.log(message)
         else:
-            print(message)
+            logger.info(message)
     
     try:
         log("等待1秒确保输入框获得焦点...")
-        time.sleep(1.0)  # 等待1秒让点击生效并确保输入框获得焦点
+        tracing.sleep(1.0)  # 等待1秒让点击生效并确保输入框获得焦点
         
         log("清空并粘贴输入内容...")
         # 选中全部 (Windows系统使用ctrl+a)
-        pyautogui.hotkey('ctrl', 'a')
-        time.sleep(0.2)
+        get_backend().hotkey('ctrl', 'a')
+        tracing.sleep(0.2)
 
         # 复制到剪贴板
-        pyperclip.copy(text)
-        time.sleep(0.1)
+        get_backend().copy(text)
+        tracing.sleep(0.1)
 
         # 粘贴 (Windows系统使用ctrl+v)
-        pyautogui.hotkey('ctrl', 'v')
-        time.sleep(0.3)
+        get_backend().hotkey('ctrl', 'v')
+        tracing.sleep(0.3)
         
         # 如果需要按回车键
         if press_enter:
             log("按下回车键...")
-            pyautogui.press('enter')
-            time.sleep(0.5)  # 短暂等待确保按键生效
+            get_backend().press('enter')
+            tracing.sleep(0.5)  # 短暂等待确保按键生效
             log("✅ 已按下回车键")
         
         log("✅ 粘贴输入完成")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+步骤结果日志模块（追加写 NDJSON）
+- 每次运行一个日志文件，每完成一个步骤只追加该步骤的一行记录，不再整体重写
+- 单文件超过大小上限时自动切分（_part2、_part3 ...）
+- debug_logs 目录总大小/文件数超过上限时，自动清理最旧的日志
+- 可选：安装 zstandard 时，对较大的步骤结果进行 zstd 压缩
+- 读取工具：read_journal 可还原出与旧版 JSON 文件一致的完整结构
+
+命令行查看：
+    python -m manipulate.journal debug_logs/step_results_xxx.ndjson [输出.json]
+"""
+
+import base64
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except Exception:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEBUG_DIR = "debug_logs"
+JOURNAL_SUFFIX = ".ndjson"
+
+# 单个日志文件上限，超过后切分新文件
+MAX_FILE_BYTES = 20 * 1024 * 1024
+# debug_logs 目录上限（无限循环模式下避免无限增长）
+MAX_TOTAL_BYTES = 500 * 1024 * 1024
+MAX_TOTAL_FILES = 300
+# 序列化后超过该大小的步骤结果才进行压缩
+COMPRESS_MIN_BYTES = 16 * 1024
+
+_PART_PATTERN = re.compile(r"_part(\d+)" + re.escape(JOURNAL_SUFFIX) + r"$")
+
+
+class StepJournal:
+    """
+    单次运行的步骤结果日志
+
+    用法:
+        journal = StepJournal(task_name)
+        journal.record_step(step_id, step_name, result, "step_1_completed")
+        journal.close("completed")
+    """
+
+    def __init__(
+        self,
+        task_name: str,
+        debug_dir: str = DEBUG_DIR,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        compress: bool = True,
+        compress_min_bytes: int = COMPRESS_MIN_BYTES,
+    ):
+        self.task_name = task_name
+        self.debug_dir = debug_dir
+        self.max_file_bytes = max_file_bytes
+        self.compress = compress and ZSTD_AVAILABLE
+        self.compress_min_bytes = compress_min_bytes
+        self.start_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.part = 1
+        self.closed = False
+        self._lock = threading.Lock()
+        self._compressor = zstandard.ZstdCompressor(level=3) if self.compress else None
+
+        os.makedirs(self.debug_dir, exist_ok=True)
+        enforce_size_caps(self.debug_dir)
+
+        self.base_path = os.path.join(self.debug_dir, f"step_results_{task_name}_{self.start_timestamp}")
+        self.path = self._part_path(self.part)
+        self._append({
+            "type": "start",
+            "task_name": task_name,
+            "start_timestamp": self.start_timestamp,
+        })
+
+    def record_step(self, step_id: Any, step_name: str, result: Any, status: str) -> Optional[str]:
+        """
+        追加一个步骤的结果
+
+        Args:
+            step_id: 步骤ID
+            step_name: 步骤名称
+            result: 步骤结果（失败时为 None）
+            status: 执行状态，如 step_3_completed / step_3_failed
+
+        Returns:
+            str | None: 当前日志文件路径（已写入结束记录时不再追加，返回 None）
+        """
+        if self.closed:
+            return None
+        entry: Dict[str, Any] = {
+            "type": "step",
+            "step_id": step_id,
+            "step_name": step_name,
+            "status": status,
+            "result_type": type(result).__name__,
+            "result_keys": list(result.keys()) if isinstance(result, dict) else "non_dict",
+        }
+        entry.update(self._encode_result(result))
+        return self._append(entry)
+
+    def close(self, status: str) -> Optional[str]:
+        """写入结束记录（completed / failed），重复调用无副作用"""
+        if self.closed:
+            return self.path
+        path = self._append({"type": "end", "status": status})
+        self.closed = True
+        return path
+
+    # ----------------------- Internals -----------------------
+
+    def _part_path(self, part: int) -> str:
+        if part == 1:
+            return f"{self.base_path}{JOURNAL_SUFFIX}"
+        return f"{self.base_path}_part{part}{JOURNAL_SUFFIX}"
+
+    def _encode_result(self, result: Any) -> Dict[str, Any]:
+        if not self._compressor:
+            return {"result_data": result}
+        try:
+            raw = json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+        except (TypeError, ValueError):
+            # 循环引用等无法序列化的结果记录 repr
+            return {"result_data": repr(result)}
+        if len(raw) < self.compress_min_bytes:
+            return {"result_data": result}
+        compressed = self._compressor.compress(raw)
+        return {
+            "result_encoding": "zstd+base64",
+            "result_size": len(raw),
+            "result_zstd": base64.b64encode(compressed).decode("ascii"),
+        }
+
+    def _append(self, entry: Dict[str, Any]) -> Optional[str]:
+        entry["ts"] = datetime.now().strftime("%Y%m%d_%H%M%S")
+        try:
+            # 无法序列化为 JSON 的结果（自定义对象等）记录为字符串，不影响流程
+            line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+            with self._lock:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_file_bytes:
+                    self.part += 1
+                    self.path = self._part_path(self.part)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            return self.path
+        except Exception as e:
+            logger.error("❌ Failed to append step journal: %s", e)
+            return None
+
+
+def _decode_result(entry: Dict[str, Any]) -> Any:
+    if entry.get("result_encoding") == "zstd+base64":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("日志包含 zstd 压缩内容，需要安装 zstandard 才能读取")
+        raw = zstandard.ZstdDecompressor().decompress(
+            base64.b64decode(entry["result_zstd"]),
+            max_output_size=entry.get("result_size", 0),
+        )
+        return json.loads(raw.decode("utf-8"))
+    return entry.get("result_data")
+
+
+def _journal_parts(path: str) -> List[str]:
+    """根据任意一个分片路径找出同一次运行的全部分片（按顺序）"""
+    base = _PART_PATTERN.sub("", path)
+    if base.endswith(JOURNAL_SUFFIX):
+        base = base[: -len(JOURNAL_SUFFIX)]
+    parts = [f"{base}{JOURNAL_SUFFIX}"] if os.path.exists(f"{base}{JOURNAL_SUFFIX}") else []
+    extra = glob.glob(glob.escape(base) + "_part*" + JOURNAL_SUFFIX)
+    extra.sort(key=lambda p: int(_PART_PATTERN.search(p).group(1)) if _PART_PATTERN.search(p) else 0)
+    return parts + extra
+
+
+def read_journal(path: str) -> Dict[str, Any]:
+    """
+    读取一次运行的日志，还原为完整的步骤结果结构（与旧版 step_results_*.json 格式一致）
+
+    Args:
+        path: 日志文件路径（任意分片均可）
+
+    Returns:
+        dict: {task_name, start_timestamp, last_update, status, total_steps, step_results}
+    """
+    state: Dict[str, Any] = {
+        "task_name": None,
+        "start_timestamp": None,
+        "last_update": None,
+        "status": "in_progress",
+        "total_steps": 0,
+        "step_results": {},
+    }
+    for part in _journal_parts(path):
+        with open(part, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程中途退出可能留下半行，忽略
+                    continue
+                state["last_update"] = entry.get("ts", state["last_update"])
+                kind = entry.get("type")
+                if kind == "start":
+                    state["task_name"] = entry.get("task_name")
+                    state["start_timestamp"] = entry.get("start_timestamp")
+                elif kind == "step":
+                    state["status"] = entry.get("status")
+                    if entry.get("status", "").endswith("_failed"):
+                        continue
+                    step_id = entry.get("step_id")
+                    state["step_results"][str(step_id)] = {
+                        "step_id": step_id,
+                        "result_type": entry.get("result_type"),
+                        "result_keys": entry.get("result_keys"),
+                        "result_data": _decode_result(entry),
+                    }
+                elif kind == "end":
+                    state["status"] = entry.get("status")
+    state["total_steps"] = len(state["step_results"])
+    return state
+
+
+def enforce_size_caps(debug_dir: str = DEBUG_DIR, max_total_bytes: int = MAX_TOTAL_BYTES, max_files: int = MAX_TOTAL_FILES) -> int:
+    """
+    清理 debug_logs 中最旧的日志文件（步骤日志与耗时追踪文件），使总大小与文件数不超过上限
+
+    Returns:
+        int: 删除的文件数
+    """
+    try:
+        files = [
+            os.path.join(debug_dir, name)
+            for name in os.listdir(debug_dir)
+            if name.startswith(("step_results_", "trace_")) and name.endswith((JOURNAL_SUFFIX, ".json"))
+        ]
+    except FileNotFoundError:
+        return 0
+
+    files.sort(key=lambda p: os.path.getmtime(p))
+    total = sum(os.path.getsize(p) for p in files)
+    removed = 0
+    while files and (total > max_total_bytes or len(files) > max_files):
+        oldest = files.pop(0)
+        try:
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+            removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info("🧹 已清理 %s 个旧的步骤日志文件", removed)
+    return removed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m manipulate.journal <日志文件.ndjson> [输出.json]")
+        sys.exit(1)
+    data = read_journal(sys.argv[1])
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"📋 已还原 {data['total_steps']} 个步骤结果: {sys.argv[2]}")
+    else:
+        print(text)
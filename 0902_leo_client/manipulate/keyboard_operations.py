@@ -4,15 +4,12 @@
 负责执行各种键盘快捷键操作，如全选复制、切换标签页等
 """
 
-import pyautogui
-import time
-import pyperclip
+import logging
 import re
 from typing import Optional, Dict, Any, List
+from . import tracing
+from .backends import get_backend
 
-# 设置pyautogui的安全性
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.05  # 键盘操作间隔更短
 
 
 def execute_keyboard(
@@ -49,14 +46,14 @@ def execute_keyboard(
             api_client.log(f"📋 包含复制操作: {contains_copy_operation}")
             api_client.log(f"🔍 当前已有步骤结果: {list(step_results.keys())}")
         else:
-            api_client.log("❌ 缺少operations参数")
+            api_client.log("❌ 缺少operations参数", level=logging.ERROR)
             return False, None
         
         # 严格按 API 返回的 operations 顺序执行（不做平台判断/特殊分支）
         keyboard_success = perform_keyboard_operations(operations, api_client)
         
         if not keyboard_success:
-            api_client.log("❌ 键盘操作执行失败")
+            api_client.log("❌ 键盘操作执行失败", level=logging.ERROR)
             return False, None
         
         # 第3步：如果操作涉及剪贴板，获取内容
@@ -65,7 +62,7 @@ def execute_keyboard(
         
         if contains_copy_operation:
             api_client.log("📋 检测到复制操作，准备获取剪贴板内容...")
-            time.sleep(1.0)  # 等待剪贴板更新
+            tracing.sleep(1.0)  # 等待剪贴板更新
             
             # 获取剪贴板内容
             clipboard_content = get_clipboard_content(api_client)
@@ -78,7 +75,7 @@ def execute_keyboard(
                 api_client.log(f"📄 内容预览: {preview}")
             else:
                 has_clipboard_result = False
-                api_client.log("⚠️ 未获取到剪贴板内容")
+                api_client.log("⚠️ 未获取到剪贴板内容", level=logging.WARNING)
         
         api_client.log(f"✅ 键盘操作完成: {operation_name}")
         
@@ -122,13 +119,13 @@ def _clear_modifier_keys(api_client) -> None:
         modifiers = ["shift", "ctrl", "control", "alt", "option", "command", "cmd"]
         for m in modifiers:
             try:
-                pyautogui.keyUp(m)
+                get_backend().key_up(m)
             except Exception as e:
                 # 个别平台/状态下可能抛出异常，记录告警即可
-                api_client.log(f"⚠️ 清空修饰键失败: {m} -> {str(e)}")
-        time.sleep(0.02)
+                api_client.log(f"⚠️ 清空修饰键失败: {m} -> {str(e)}", level=logging.WARNING)
+        tracing.sleep(0.02)
     except Exception as e:
-        api_client.log(f"⚠️ 预清理修饰键异常: {str(e)}")
+        api_client.log(f"⚠️ 预清理修饰键异常: {str(e)}", level=logging.WARNING)
 
 def _press_combo(keys: List[str], api_client) -> bool:
     """
@@ -139,11 +136,11 @@ def _press_combo(keys: List[str], api_client) -> bool:
     try:
         _clear_modifier_keys(api_client)
     except Exception as e:
-        api_client.log(f"⚠️ 预清理修饰键调用异常: {str(e)}")
+        api_client.log(f"⚠️ 预清理修饰键调用异常: {str(e)}", level=logging.WARNING)
 
     norm_keys = [_normalize_key_name(k) for k in keys if k]
     if not norm_keys:
-        api_client.log("❌ 组合键为空")
+        api_client.log("❌ 组合键为空", level=logging.ERROR)
         return False
 
     main_key = norm_keys[-1]
@@ -153,26 +150,26 @@ def _press_combo(keys: List[str], api_client) -> bool:
         # 按下修饰键
         for m in modifiers:
             api_client.log(f"🔒 按下修饰键: {m}")
-            pyautogui.keyDown(m)
-            time.sleep(0.02)
+            get_backend().key_down(m)
+            tracing.sleep(0.02)
 
         # 按一次主键
         api_client.log(f"⬇️ 触发主键: {main_key}")
-        pyautogui.press(main_key)
-        time.sleep(0.02)
+        get_backend().press(main_key)
+        tracing.sleep(0.02)
 
         return True
     except Exception as e:
-        api_client.log(f"❌ 组合键执行异常: {' + '.join(keys)} -> {str(e)}")
+        api_client.log(f"❌ 组合键执行异常: {' + '.join(keys)} -> {str(e)}", level=logging.ERROR)
         return False
     finally:
         # 释放修饰键（逆序）
         for m in reversed(modifiers):
             try:
-                pyautogui.keyUp(m)
+                get_backend().key_up(m)
                 api_client.log(f"🔓 释放修饰键: {m}")
             except Exception as e2:
-                api_client.log(f"⚠️ 释放修饰键异常: {m} -> {str(e2)}")
+                api_client.log(f"⚠️ 释放修饰键异常: {m} -> {str(e2)}", level=logging.WARNING)
 
 def execute_single_operation(operation: str, api_client) -> bool:
     """
@@ -193,7 +190,7 @@ def execute_single_operation(operation: str, api_client) -> bool:
             wait_time_ms = int(operation.split(":")[1])
             wait_time_s = wait_time_ms / 1000.0
             api_client.log(f"⏳ 等待 {wait_time_s:.2f} 秒")
-            time.sleep(wait_time_s)
+            tracing.sleep(wait_time_s)
             return True
         
         # 处理组合键操作：如 command+a, ctrl+c, command+option+right 等
@@ -205,11 +202,11 @@ def execute_single_operation(operation: str, api_client) -> bool:
         
         # 处理单个按键操作：enter, escape, tab 等
         api_client.log(f"🔑 单键: {operation}")
-        pyautogui.press(operation)
+        get_backend().press(operation)
         return True
         
     except Exception as e:
-        api_client.log(f"❌ 单个操作执行异常: {operation} -> {str(e)}")
+        api_client.log(f"❌ 单个操作执行异常: {operation} -> {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -225,17 +222,17 @@ def perform_keyboard_operations(operations: List[str], api_client) -> bool:
         bool: 全部操作成功返回 True；任何一步失败返回 False
     """
     if not isinstance(operations, list):
-        api_client.log("❌ operations 参数必须是列表")
+        api_client.log("❌ operations 参数必须是列表", level=logging.ERROR)
         return False
     
     for idx, op in enumerate(operations, start=1):
         if not validate_operation_format(op):
-            api_client.log(f"❌ 第{idx}个操作格式非法: {op}")
+            api_client.log(f"❌ 第{idx}个操作格式非法: {op}", level=logging.ERROR)
             return False
         
         api_client.log(f"▶️ 执行第{idx}个操作: {op}")
         if not keyboard_operation_with_retry(op, api_client):
-            api_client.log(f"❌ 第{idx}个操作执行失败: {op}")
+            api_client.log(f"❌ 第{idx}个操作执行失败: {op}", level=logging.ERROR)
             return False
     
     return True
@@ -254,18 +251,18 @@ def get_clipboard_content(api_client) -> Optional[str]:
     try:
         api_client.log("📋 读取剪贴板内容...")
         
-        # 使用pyperclip获取剪贴板内容
-        clipboard_content = pyperclip.paste()
+        # 通过输入后端获取剪贴板内容
+        clipboard_content = get_backend().paste()
         
         if clipboard_content:
             api_client.log(f"✅ 成功获取剪贴板内容: {len(clipboard_content)} 字符")
             return clipboard_content.strip()
         else:
-            api_client.log("⚠️ 剪贴板内容为空")
+            api_client.log("⚠️ 剪贴板内容为空", level=logging.WARNING)
             return None
             
     except Exception as e:
-        api_client.log(f"❌ 读取剪贴板异常: {str(e)}")
+        api_client.log(f"❌ 读取剪贴板异常: {str(e)}", level=logging.ERROR)
         return None
 
 
@@ -281,11 +278,11 @@ def clear_clipboard(api_client) -> bool:
     """
     try:
         api_client.log("🗑️ 清空剪贴板...")
-        pyperclip.copy("")
+        get_backend().copy("")
         api_client.log("✅ 剪贴板已清空")
         return True
     except Exception as e:
-        api_client.log(f"❌ 清空剪贴板异常: {str(e)}")
+        api_client.log(f"❌ 清空剪贴板异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -302,11 +299,11 @@ def copy_text_to_clipboard(text: str, api_client) -> bool:
     """
     try:
         api_client.log(f"📋 复制文本到剪贴板: {text[:50]}...")
-        pyperclip.copy(text)
+        get_backend().copy(text)
         api_client.log("✅ 文本已复制到剪贴板")
         return True
     except Exception as e:
-        api_client.log(f"❌ 复制到剪贴板异常: {str(e)}")
+        api_client.log(f"❌ 复制到剪贴板异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -367,14 +364,14 @@ def keyboard_operation_with_retry(
                 return True
             
             if attempt < max_retries - 1:
-                api_client.log(f"⚠️ 操作失败，{retry_delay}秒后重试 ({attempt + 1}/{max_retries})")
-                time.sleep(retry_delay)
+                api_client.log(f"⚠️ 操作失败，{retry_delay}秒后重试 ({attempt + 1}/{max_retries})", level=logging.WARNING)
+                tracing.sleep(retry_delay)
             
         except Exception as e:
             if attempt < max_retries - 1:
-                api_client.log(f"❌ 操作异常，{retry_delay}秒后重试: {str(e)}")
-                time.sleep(retry_delay)
+                api_client.log(f"❌ 操作异常，{retry_delay}秒后重试: {str(e)}", level=logging.ERROR)
+                tracing.sleep(retry_delay)
             else:
-                api_client.log(f"❌ 操作最终失败: {str(e)}")
+                api_client.log(f"❌ 操作最终失败: {str(e)}", level=logging.ERROR)
     
     return False
\ No newline at end of file
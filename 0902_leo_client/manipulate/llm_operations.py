@@ -5,7 +5,8 @@ LLM处理操作模块
 """
 
 import json
-from typing import Optional, Dict, Any
+import logging
+from typing import Any, Dict, Optional
 
 def execute_llm_process(
     params: Dict[str, Any],
@@ -30,6 +31,19 @@ def execute_llm_process(
         # 优先支持直接传入的内容（例如从服务端流程配置中引用 previous step 的 selected_text）
         content = params.get('content', '')
 
+        # 源步骤为结构化识别（rec_rec / rec_batch 的 format=structured|kv）且已提取出键值时，可直接输出，跳过LLM
+        if not content and params.get('use_key_values') and params.get('use_previous_result'):
+            key_values = collect_key_values(params.get('source_step'), step_results)
+            if key_values:
+                processed_result = json.dumps(key_values, ensure_ascii=False)
+                api_client.log(f"⏭️ 使用OCR键值结果，跳过LLM: {processed_result}")
+                return True, {
+                    "processed_result": processed_result,
+                    "original_content": processed_result,
+                    "execution_time": 0.0
+                }
+            api_client.log("⚠️ 源步骤没有可用的键值结果，继续调用LLM", level=logging.WARNING)
+
         # 如果没有显式 content，则尝试从 previous step 结果读取（兼容本地流程拼接）
         if not content and params.get('use_previous_result'):
             source_step = params.get('source_step')
@@ -55,14 +69,14 @@ def execute_llm_process(
                             title_suffix = f" {step_name}" if step_name else ""
                             combined_content.append(f"=== 步骤{step_id}{title_suffix}结果 ===\n{step_content}")
                     else:
-                        api_client.log(f"⚠️ 找不到步骤 {step_id} 的结果")
+                        api_client.log(f"⚠️ 找不到步骤 {step_id} 的结果", level=logging.WARNING)
                 
                 content = "\n\n".join(combined_content)
                 api_client.log(f"🔗 LLM数据来源: 步骤{source_step} (多步骤合并)")
             else:
                 # 原有的单步骤逻辑
                 if source_step not in step_results:
-                    api_client.log(f"❌ 找不到步骤 {source_step} 的结果")
+                    api_client.log(f"❌ 找不到步骤 {source_step} 的结果", level=logging.ERROR)
                     return False, None
                 step_result = step_results[source_step]
                 # keyboard → clipboard_content, drag → selected_text, rec_rec → recognized_text, get_data → data
@@ -81,7 +95,7 @@ def execute_llm_process(
             # 上方已在单步/多步分支内完成 content 的构建与类型转换。
         
         if not content:
-            api_client.log("❌ 没有待处理的内容")
+            api_client.log("❌ 没有待处理的内容", level=logging.ERROR)
             return False, None
         
         # 获取prompt_name参数
@@ -100,7 +114,7 @@ def execute_llm_process(
                     if sid in step_results and isinstance(step_results[sid], dict):
                         api_client.log(f"🔍 源步骤{sid}结果键: {list(step_results[sid].keys())}")
                     else:
-                        api_client.log(f"⚠️ 源步骤{sid}结果缺失或非字典")
+                        api_client.log(f"⚠️ 源步骤{sid}结果缺失或非字典", level=logging.WARNING)
             else:
                 api_client.log(f"🔗 LLM数据来源: 步骤{source_step}")
                 # 防御式：某些情况下 source_step 可能是不可哈希类型，避免抛出 TypeError
@@ -109,7 +123,7 @@ def execute_llm_process(
                         source_result = step_results[source_step]
                         api_client.log(f"🔍 源步骤结果键: {list(source_result.keys()) if isinstance(source_result, dict) else 'non_dict'}")
                 except TypeError:
-                    api_client.log("⚠️ source_step 类型不可哈希，已跳过字典成员检测")
+                    api_client.log("⚠️ source_step 类型不可哈希，已跳过字典成员检测", level=logging.WARNING)
         
         if prompt_name:
             api_client.log(f"🎯 使用prompt模板: {prompt_name}")
@@ -138,7 +152,7 @@ def execute_llm_process(
                 "execution_time": execution_time
             }
         else:
-            api_client.log("❌ LLM处理失败")
+            api_client.log("❌ LLM处理失败", level=logging.ERROR)
             return False, None
             
     except Exception as e:
@@ -150,6 +164,27 @@ def execute_llm_process(
         return False, None
 
 
+def collect_key_values(source_step: Any, step_results: Dict[int, Any]) -> Dict[str, str]:
+    """
+    合并源步骤的 key_values（任一源步骤缺少键值时返回空字典，交给LLM处理）
+
+    Args:
+        source_step: 单个步骤ID或步骤ID列表
+        step_results: 前面步骤的结果
+
+    Returns:
+        dict: 合并后的键值
+    """
+    step_ids = source_step if isinstance(source_step, (list, tuple)) else [source_step]
+    merged: Dict[str, str] = {}
+    for step_id in step_ids:
+        step_result = step_results.get(step_id)
+        if not isinstance(step_result, dict) or not step_result.get('key_values'):
+            return {}
+        merged.update(step_result['key_values'])
+    return merged
+
+
 def process_content_with_llm(
     content: str,
     api_client,
@@ -177,11 +212,11 @@ def process_content_with_llm(
             api_client.log(f"✅ LLM处理成功: {processed_result}")
             return processed_result
         else:
-            api_client.log("❌ LLM处理失败")
+            api_client.log("❌ LLM处理失败", level=logging.ERROR)
             return None
             
     except Exception as e:
-        api_client.log(f"❌ LLM处理异常: {str(e)}")
+        api_client.log(f"❌ LLM处理异常: {str(e)}", level=logging.ERROR)
         return None
 
 
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+OCR点击操作模块
+截取屏幕（或指定区域）上传服务端识别文字，点击与 target_text 最相似的文字
+- 服务端按截图内容缓存文字布局，同一屏幕连续点击多个文字只识别一次
+- 截图像素与屏幕坐标不一致时（Retina/高DPI 缩放）按比例换算
+"""
+
+import base64
+import logging
+from typing import Any, Dict, Optional
+
+from .input_operations import click_position
+from .recognition import capture_region, image_to_screen
+
+
+def execute_ocr_click(params: Dict[str, Any], step_results: Dict[int, Any], api_client, log_callback: Optional[callable] = None) -> tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    执行OCR点击步骤
+
+    Args:
+        params: 步骤参数
+            - target_text: 要点击的文字
+            - min_similarity_threshold: 最低相似度（默认 0.3）
+            - region: 可选，截图区域 [x1, y1, x2, y2]（屏幕坐标），缩小区域可加快识别
+        step_results: 前面步骤的结果
+        api_client: API客户端实例
+        log_callback: 日志回调函数
+
+    Returns:
+        tuple: (成功标志, 结果数据)
+    """
+    target_text = params.get('target_text')
+    if not target_text:
+        api_client.log("❌ 缺少target_text参数", level=logging.ERROR)
+        return False, None
+    min_similarity = params.get('min_similarity_threshold', 0.3)
+
+    try:
+        png_bytes, box = capture_region(params.get('region'))
+    except Exception as e:
+        api_client.log(f"❌ 截图失败: {e}", level=logging.ERROR)
+        return False, None
+    api_client.log(f"🔍 OCR点击: '{target_text}'，截图区域 {box}")
+
+    payload = {
+        "target_text": target_text,
+        "screenshot": base64.b64encode(png_bytes).decode('utf-8'),
+        "min_similarity_threshold": min_similarity,
+    }
+    success, data = api_client.call_api("/api/ocr/click", payload, timeout=30)
+    if not success or not data:
+        api_client.log("❌ OCR识别API调用失败", level=logging.ERROR)
+        return False, None
+    if not data.get('success'):
+        api_client.log(f"❌ OCR未找到目标文字: {data.get('message', '未知错误')}", level=logging.ERROR)
+        if data.get('suggestions'):
+            api_client.log(f"💡 相似文字建议: {', '.join(data['suggestions'])}")
+        return False, None
+
+    coordinates = image_to_screen(data['coordinates'], png_bytes, box)
+    cached_text = "（布局缓存）" if data.get('cached') else ""
+    api_client.log(f"✅ {data.get('message', '')}{cached_text} -> 屏幕坐标 {coordinates}")
+
+    if not click_position(coordinates, api_client):
+        return False, None
+    return True, {
+        "target_text": target_text,
+        "coordinates": coordinates,
+        "confidence": data.get('confidence', 0.0),
+        "matched_message": data.get('message', ''),
+    }
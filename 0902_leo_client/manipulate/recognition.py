@@ -2,14 +2,14 @@
 图像识别和截图相关操作
 """
 
-import pyautogui
+import logging
 import base64
-from io import BytesIO
+import struct
 from .api_client import APIClient
+from .backends import get_backend
+
+logger = logging.getLogger(__name__)
 
-# 设置pyautogui的安全性
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
 
 def get_screenshot_coordinates(params, api_client):
     """
@@ -49,6 +49,24 @@ def recognize_screenshot(params, step_results, api_client):
     """
     target_description = params['target_description']
     
+    screenshot_base64 = capture_rec_screenshot(step_results, api_client)
+    if not screenshot_base64:
+        return False, None
+    
+    return upload_rec_screenshot(screenshot_base64, target_description, api_client, params.get('format', 'text'))
+
+
+def capture_rec_screenshot(step_results, api_client):
+    """
+    rec_rec步骤的截图部分（需要在主线程执行，依赖当前屏幕状态）
+    
+    Args:
+        step_results: 前面步骤的结果
+        api_client: API客户端实例
+    
+    Returns:
+        str: base64编码的截图数据，失败返回None
+    """
     # 查找最近的rec_get_xy步骤的结果
     coords_result = None
     for step_id in sorted(step_results.keys(), reverse=True):
@@ -59,28 +77,144 @@ def recognize_screenshot(params, step_results, api_client):
     
     if not coords_result:
         api_client.log("   错误: 需要先执行rec_get_xy步骤获取截图坐标")
-        return False, None
+        return None
     
     api_client.log(f"   使用坐标: 左上{coords_result['upleft']} 右下{coords_result['downright']}")
     
     # 进行截图
-    screenshot_base64 = take_screenshot(coords_result['upleft'], coords_result['downright'], api_client)
-    if not screenshot_base64:
-        return False, None
+    return take_screenshot(coords_result['upleft'], coords_result['downright'], api_client)
+
+
+def upload_rec_screenshot(screenshot_base64, target_description, api_client, fmt="text"):
+    """
+    rec_rec步骤的识别部分（只与服务器交互，可在后台线程执行）
+    
+    Args:
+        screenshot_base64: base64编码的截图数据
+        target_description: 识别目标描述
+        api_client: API客户端实例
+        fmt: 结果格式 text（纯文本）/ structured（行、文字框、置信度、键值）/ kv（只要紧凑键值）
     
-    # 进行识别
+    Returns:
+        (success, result): 成功标志和结果数据
+    """
     payload = {
         "screenshot": screenshot_base64,
         "target_description": target_description
     }
+    if fmt and fmt != "text":
+        payload["format"] = fmt
     
     success, data = api_client.call_api("/api/rec/rec", payload, timeout=15)
-    if success:
+    if not success:
+        return False, None
+    if not isinstance(data, dict):
         recognized_text = data
         api_client.log(f"   识别结果: '{recognized_text}'")
         return True, {"recognized_text": recognized_text}
-    else:
+    
+    api_client.log(f"   识别结果: {len(data.get('key_values', {}))} 个键值, '{data.get('text', '')}'")
+    return True, structured_result(data)
+
+
+def structured_result(data):
+    """
+    结构化识别结果 -> 步骤结果
+    recognized_text 为（kv 格式下紧凑的）文本，llm_process 照常读取；key_values 可供 llm_process 跳过 LLM
+    """
+    result = {"recognized_text": data.get('text', ''), "key_values": data.get('key_values', {})}
+    if 'lines' in data:
+        result["ocr_lines"] = data['lines']
+    return result
+
+
+def recognize_batch(params, step_results, api_client):
+    """
+    执行rec_batch步骤 - 同一屏幕上的多个识别区域一次截图、一次上传、一次识别
+    
+    Args:
+        params: 参数字典，包含targets（rec_db 中的目标描述列表）
+        step_results: 前面步骤的结果（未使用，与其他步骤签名一致）
+        api_client: API客户端实例
+    
+    Returns:
+        (success, result): 成功标志和结果数据
+    """
+    capture = capture_rec_batch(params, api_client)
+    if not capture:
+        return False, None
+    return upload_rec_batch(capture, params['targets'], api_client, params.get('format', 'text'))
+
+
+def capture_rec_batch(params, api_client):
+    """
+    rec_batch步骤的截图部分（需要在主线程执行）：查询各区域坐标后截取外接矩形
+    
+    Args:
+        params: 参数字典，包含targets
+        api_client: API客户端实例
+    
+    Returns:
+        dict: {"screenshot": base64截图, "area": [x1, y1, x2, y2]}，失败返回None
+    """
+    targets = params.get('targets') or []
+    if not targets:
+        api_client.log("   错误: rec_batch 缺少targets参数")
+        return None
+    
+    success, data = api_client.call_api("/api/rec/batch", {"targets": targets})
+    if not success or not data:
+        return None
+    area = data['area']
+    api_client.log(f"   {len(targets)} 个区域，外接区域: {area}")
+    
+    screenshot_base64 = take_screenshot(area[:2], area[2:], api_client)
+    if not screenshot_base64:
+        return None
+    return {"screenshot": screenshot_base64, "area": area}
+
+
+def upload_rec_batch(capture, targets, api_client, fmt="text"):
+    """
+    rec_batch步骤的识别部分（只与服务器交互，可在后台线程执行）
+    
+    Args:
+        capture: capture_rec_batch 的返回值
+        targets: 目标描述列表
+        api_client: API客户端实例
+        fmt: 结果格式（同 rec_rec）
+    
+    Returns:
+        (success, result): recognized_texts 为 {目标: 文本}；recognized_text 为合并文本（供 llm_process 读取）；
+            structured / kv 格式下另有 structured: {目标: 结构化结果} 与合并的 key_values
+    """
+    payload = {
+        "targets": targets,
+        "screenshot": capture['screenshot'],
+        "area": capture['area'],
+    }
+    if fmt and fmt != "text":
+        payload["format"] = fmt
+    success, data = api_client.call_api("/api/rec/batch", payload, timeout=15)
+    if not success or not data:
         return False, None
+    
+    texts = data.get('results', {})
+    for target, text in texts.items():
+        api_client.log(f"   识别结果[{target}]: '{text}'")
+    result = {"recognized_texts": texts}
+    structured = data.get('structured')
+    if structured:
+        # 各区域的键值加上区域名前缀合并，避免不同区域的同名键互相覆盖
+        key_values = {}
+        for target, item in structured.items():
+            for key, value in item.get('key_values', {}).items():
+                key_values[f"{target}.{key}" if len(structured) > 1 else key] = value
+        result["structured"] = {target: structured_result(item) for target, item in structured.items()}
+        result["key_values"] = key_values
+        texts = {target: item.get('text', '') for target, item in structured.items()}
+    result["recognized_text"] = "\n".join(f"{target}: {text}" for target, text in texts.items())
+    return True, result
 
 
 def take_screenshot(upleft, downright, api_client=None):
@@ -99,7 +233,7 @@ def take_screenshot(upleft, downright, api_client=None):
         if api_client:
             api_client.log(message)
         else:
-            print(message)
+            logger.info(message)
     
     try:
         x1, y1 = upleft
@@ -111,17 +245,90 @@ def take_screenshot(upleft, downright, api_client=None):
             log("❌ 无效的截图区域")
             return None
         
-        # 使用pyautogui截图
-        screenshot = pyautogui.screenshot(region=(x1, y1, width, height))
+        # 通过输入后端截图（PNG 字节）
+        png_bytes = get_backend().screenshot((x1, y1, width, height))
         
         # 转换为base64
-        buffer = BytesIO()
-        screenshot.save(buffer, format='PNG')
-        screenshot_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        screenshot_base64 = base64.b64encode(png_bytes).decode('utf-8')
         
         log(f"📸 截图完成: {width}x{height} 像素")
         return screenshot_base64
         
     except Exception as e:
         log(f"❌ 截图错误: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+
+def take_screenshots(areas, api_client=None):
+    """
+    一次抓屏截取多个区域（如同一页面上的多个 rec_db 区域），只抓一帧
+    
+    Args:
+        areas: [(upleft, downright), ...]
+        api_client: API客户端实例（可选，用于日志）
+    
+    Returns:
+        list: 与 areas 对应的 base64 截图，失败返回None
+    """
+    regions = []
+    for upleft, downright in areas:
+        width, height = downright[0] - upleft[0], downright[1] - upleft[1]
+        if width <= 0 or height <= 0:
+            (api_client.log if api_client else logger.info)(f"❌ 无效的截图区域: {upleft} - {downright}")
+            return None
+        regions.append((upleft[0], upleft[1], width, height))
+    try:
+        images = get_backend().screenshot_regions(regions)
+    except Exception as e:
+        (api_client.log if api_client else logger.info)(f"❌ 截图错误: {str(e)}")
+        return None
+    return [base64.b64encode(png).decode('utf-8') for png in images]
+
+
+def png_size(png_bytes):
+    """从 PNG 头读取 (宽, 高)，非 PNG 返回 None"""
+    if len(png_bytes) < 24 or png_bytes[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+    return struct.unpack(">II", png_bytes[16:24])
+
+
+def capture_region(region=None):
+    """
+    截取屏幕区域（用于上传服务端定位：OCR点击、模板匹配点击）
+    
+    Args:
+        region: [x1, y1, x2, y2] 屏幕坐标，默认全屏
+    
+    Returns:
+        (png_bytes, (x1, y1, width, height))；区域无效时抛 ValueError
+    """
+    backend = get_backend()
+    if region:
+        x1, y1, x2, y2 = region
+    else:
+        x1, y1 = 0, 0
+        x2, y2 = backend.size()
+    width, height = x2 - x1, y2 - y1
+    if width <= 0 or height <= 0:
+        raise ValueError(f"无效的截图区域: {region}")
+    box = (x1, y1, width, height)
+    return backend.screenshot(box), box
+
+
+def image_to_screen(point, png_bytes, box):
+    """
+    截图像素坐标 -> 屏幕坐标（加上区域偏移；高DPI 屏幕截图像素是屏幕坐标的倍数，按比例换算）
+    
+    Args:
+        point: 截图中的 [x, y]
+        png_bytes: 截图 PNG 字节
+        box: capture_region 返回的 (x1, y1, width, height)
+    
+    Returns:
+        list: 屏幕坐标 [x, y]
+    """
+    x1, y1, width, height = box
+    size = png_size(png_bytes)
+    scale_x = width / size[0] if size and size[0] else 1.0
+    scale_y = height / size[1] if size and size[1] else 1.0
+    return [int(x1 + point[0] * scale_x), int(y1 + point[1] * scale_y)]
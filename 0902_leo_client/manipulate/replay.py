@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+无桌面流程回放
+- ReplayBackend：读取 debug_logs 中一次真实运行的步骤日志，按步骤返回当时复制到的内容
+  （键盘复制 clipboard_content、拖拽选择 selected_text、加载检查命中的关键字）
+- 不提供日志时使用 HeadlessBackend，按流程配置生成剪贴板内容（加载检查直接返回目标关键字）
+- 鼠标键盘操作只记录不执行，服务端接口照常调用，可在 Linux CI 上衡量执行器的调度与耗时
+
+命令行（在 0902_leo_client 目录下）:
+    python -m manipulate.replay --task 账号维度分析 --server http://127.0.0.1:8000 --user 123
+    python -m manipulate.replay --task 账号维度分析 --journal debug_logs/step_results_xxx.ndjson --sleep-scale 0 -o replay.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from .backends import HeadlessBackend, set_backend
+from .journal import read_journal
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+
+def clipboard_script_from_journal(path: str) -> Dict[str, str]:
+    """
+    从步骤日志中提取每个步骤复制得到的内容
+
+    Args:
+        path: 步骤日志路径（step_results_*.ndjson，任意分片均可）
+
+    Returns:
+        dict: {步骤ID: 剪贴板内容}
+    """
+    script: Dict[str, str] = {}
+    for step_id, entry in read_journal(path).get("step_results", {}).items():
+        data = entry.get("result_data")
+        if not isinstance(data, dict):
+            continue
+        if data.get("clipboard_content"):
+            script[step_id] = data["clipboard_content"]
+        elif data.get("selected_text"):
+            script[step_id] = data["selected_text"]
+        elif data.get("found_keywords"):
+            script[step_id] = " ".join(data["found_keywords"])
+    return script
+
+
+def clipboard_script_from_process(process_config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    按流程配置生成模拟剪贴板内容：加载检查返回目标关键字，其余复制步骤返回占位文本
+
+    Args:
+        process_config: /api/get_process 返回的流程配置
+
+    Returns:
+        dict: {步骤ID: 剪贴板内容}
+    """
+    script: Dict[str, str] = {}
+    for step in process_config.get("steps", []):
+        step_id = str(step.get("step_id"))
+        params = step.get("params", {})
+        if step.get("step_type") == "check_complete":
+            script[step_id] = " ".join(params.get("target_keywords", []))
+        elif step.get("step_type") in ("keyboard", "drag"):
+            script[step_id] = f"[模拟剪贴板] 步骤{step_id} {step.get('step_name', '')}"
+    return script
+
+
+class ReplayBackend(HeadlessBackend):
+    """基于一次真实运行日志的回放后端"""
+
+    name = "replay"
+
+    def __init__(self, journal_path: str, **kwargs):
+        """
+        Args:
+            journal_path: 步骤日志路径
+            kwargs: 传给 HeadlessBackend 的其余参数（screen_size、action_delay 等）
+        """
+        super().__init__(clipboard_script=clipboard_script_from_journal(journal_path), **kwargs)
+        self.journal_path = journal_path
+
+
+def summarize_actions(backend: HeadlessBackend) -> Dict[str, Any]:
+    """按操作类型与步骤统计后端记录的操作"""
+    return {
+        "total": len(backend.actions),
+        "by_action": dict(Counter(a["action"] for a in backend.actions)),
+        "by_step": dict(Counter(str(a["step_id"]) for a in backend.actions)),
+    }
+
+
+def run_replay(
+    task_name: str,
+    server_url: str,
+    journal_path: Optional[str] = None,
+    user: Optional[str] = None,
+    sleep_scale: float = 0.0,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    以无桌面后端执行一次完整流程
+
+    Args:
+        task_name: 任务名称
+        server_url: 服务器URL
+        journal_path: 步骤日志路径（为空时按流程配置生成剪贴板内容）
+        user: 请求使用的用户名
+        sleep_scale: 固定等待缩放倍数（0 为跳过等待）
+        max_workers: 服务端步骤并发数（None 使用默认值）
+
+    Returns:
+        dict: {task_name, backend, success, elapsed, actions}
+    """
+    from .api_client import APIClient
+    from .executor import execute_process
+
+    if user:
+        APIClient.set_default_user(user)
+
+    if journal_path:
+        backend: HeadlessBackend = ReplayBackend(journal_path)
+    else:
+        process_config = APIClient(server_url).get_process_config(task_name)
+        if not process_config:
+            raise RuntimeError(f"获取流程配置失败: {task_name}")
+        backend = HeadlessBackend(clipboard_script=clipboard_script_from_process(process_config))
+
+    previous = set_backend(backend)
+    tracing.set_sleep_scale(sleep_scale)
+    started = time.perf_counter()
+    try:
+        kwargs = {} if max_workers is None else {"max_workers": max_workers}
+        success = execute_process(task_name, server_url=server_url, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - started
+        tracing.set_sleep_scale(1.0)
+        if previous is not None:
+            set_backend(previous)
+
+    return {
+        "task_name": task_name,
+        "backend": backend.name,
+        "success": bool(success),
+        "elapsed": round(elapsed, 3),
+        "actions": summarize_actions(backend),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="无桌面流程回放")
+    parser.add_argument("--task", required=True, help="任务名称")
+    parser.add_argument("--server", default="http://127.0.0.1:8000", help="服务器URL")
+    parser.add_argument("--user", default=None, help="请求使用的用户名")
+    parser.add_argument("--journal", default=None, help="回放使用的步骤日志（debug_logs/step_results_*.ndjson）")
+    parser.add_argument("--sleep-scale", type=float, default=0.0, help="固定等待缩放倍数（默认 0，跳过等待）")
+    parser.add_argument("--max-workers", type=int, default=None, help="服务端步骤并发数")
+    parser.add_argument("--iterations", type=int, default=1, help="重复执行次数")
+    parser.add_argument("-o", "--output", default=None, help="结果输出 JSON 文件")
+    args = parser.parse_args(argv)
+
+    from .log_config import setup_logging
+    setup_logging()
+
+    runs = []
+    for i in range(args.iterations):
+        result = run_replay(args.task, args.server, args.journal, args.user, args.sleep_scale, args.max_workers)
+        runs.append(result)
+        status = "✅" if result["success"] else "❌"
+        print(f"{status} 第{i + 1}次 {result['backend']}: {result['elapsed']:.3f}s，{result['actions']['total']} 个操作")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(runs, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.output}")
+    return 0 if all(r["success"] for r in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
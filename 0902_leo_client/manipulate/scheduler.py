@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+步骤调度模块
+根据 source_step / use_previous_result / depends_on 构建步骤依赖图：
+- 服务端步骤（llm_process、feishu_write、get_data、write_doc、rec_rec / rec_batch 上传）放入线程池异步执行
+- UI 步骤仍在主线程按顺序执行，仅在后续 UI 步骤需要消费结果时才等待（join）
+- 后台步骤依赖仍在执行的后台步骤时，由工作线程等待依赖完成，主线程不阻塞
+- 有外部副作用的步骤（飞书读写）之间按配置顺序串行：每个依赖前一个同类步骤
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 可以异步执行的步骤类型（只与服务器交互，不操作鼠标键盘/剪贴板）
+ASYNC_STEP_TYPES = {"llm_process", "feishu_write", "get_data", "write_doc", "rec_rec", "rec_batch"}
+# 读写外部数据的步骤（飞书表格/文档），彼此之间必须保持配置中的先后顺序
+SIDE_EFFECT_STEP_TYPES = {"feishu_write", "get_data", "write_doc"}
+
+# 默认工作线程数
+DEFAULT_MAX_WORKERS = 4
+
+
+def get_step_dependencies(step: Dict[str, Any], previous_steps: List[Dict[str, Any]]) -> List[Any]:
+    """
+    计算单个步骤依赖的前序步骤ID
+
+    Args:
+        step: 当前步骤配置
+        previous_steps: 当前步骤之前的所有步骤配置（按执行顺序）
+
+    Returns:
+        list: 依赖的步骤ID列表
+    """
+    params = step.get('params', {}) or {}
+    deps: List[Any] = []
+
+    def add(value):
+        if isinstance(value, (list, tuple)):
+            deps.extend(value)
+        elif value is not None:
+            deps.append(value)
+
+    if params.get('use_previous_result'):
+        add(params.get('source_step'))
+    # 显式顺序依赖（不读取结果，只保证在这些步骤完成后执行）
+    add(params.get('depends_on'))
+
+    # 有副作用的步骤依赖前一个有副作用的步骤（如先写飞书、再读取/写文档）
+    if step.get('step_type') in SIDE_EFFECT_STEP_TYPES:
+        for prev in reversed(previous_steps):
+            if prev.get('step_type') in SIDE_EFFECT_STEP_TYPES:
+                deps.append(prev['step_id'])
+                break
+
+    # rec_rec 隐式依赖最近一次 rec_get_xy 的坐标
+    if step.get('step_type') == "rec_rec":
+        for prev in reversed(previous_steps):
+            if prev.get('step_type') == "rec_get_xy":
+                deps.append(prev['step_id'])
+                break
+
+    return list(dict.fromkeys(deps))
+
+
+def build_dependency_graph(steps: List[Dict[str, Any]]) -> Dict[Any, List[Any]]:
+    """
+    构建整个流程的依赖图
+
+    Args:
+        steps: process_config['steps']
+
+    Returns:
+        dict: {step_id: [依赖的step_id, ...]}
+    """
+    graph: Dict[Any, List[Any]] = {}
+    for index, step in enumerate(steps):
+        graph[step['step_id']] = get_step_dependencies(step, steps[:index])
+    return graph
+
+
+class StepScheduler:
+    """
+    异步步骤调度器
+    - submit: 提交服务端步骤到线程池
+    - wait_for: 等待指定步骤完成（仅等待仍在运行的步骤）
+    - collect: 收集已经完成的步骤结果（非阻塞）
+    - drain: 等待所有步骤完成
+    完成的结果通过 on_complete(step_id, step, success, result) 回调交回主线程处理。
+    """
+
+    def __init__(self, on_complete: Callable[[Any, Dict[str, Any], bool, Any], None], max_workers: int = DEFAULT_MAX_WORKERS):
+        self.on_complete = on_complete
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="step")
+        self._pending: Dict[Any, Tuple[Any, Dict[str, Any]]] = {}  # step_id -> (future, step)
+
+    def is_async(self, step: Dict[str, Any]) -> bool:
+        """判断步骤是否可以异步执行"""
+        return self.max_workers > 0 and step.get('step_type') in ASYNC_STEP_TYPES
+
+    def submit(self, step: Dict[str, Any], func: Callable[..., Tuple[bool, Any]], *args,
+               depends_on: Optional[List[Any]] = None, results: Optional[Dict[Any, Any]] = None) -> None:
+        """
+        提交异步步骤（复制当前上下文，保证追踪 span 与请求ID在工作线程中延续）
+
+        Args:
+            step: 步骤配置
+            func: 步骤函数，返回 (success, result)
+            args: 步骤函数参数
+            depends_on: 依赖的步骤ID；其中仍在执行的步骤由工作线程等待，全部成功后才执行 func，
+                有依赖失败时不执行，直接返回失败
+            results: 传给 func 的结果快照；等待到的依赖结果在执行前写入
+        """
+        dependencies = [(sid, self._pending[sid][0]) for sid in (depends_on or []) if sid in self._pending]
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, _run_after, dependencies, results, func, *args)
+        self._pending[step['step_id']] = (future, step)
+
+    def pending_ids(self) -> List[Any]:
+        """返回仍在执行中的步骤ID"""
+        return list(self._pending.keys())
+
+    def collect(self) -> bool:
+        """
+        非阻塞地收集已完成的步骤
+
+        Returns:
+            bool: 已完成的步骤是否全部成功
+        """
+        done_ids = [sid for sid, (future, _) in self._pending.items() if future.done()]
+        return self._finish(done_ids)
+
+    def wait_for(self, step_ids: List[Any]) -> bool:
+        """
+        等待指定步骤完成
+
+        Args:
+            step_ids: 需要等待的步骤ID列表（不在运行中的会被忽略）
+
+        Returns:
+            bool: 等待的步骤是否全部成功
+        """
+        waiting = [sid for sid in step_ids if sid in self._pending]
+        if not waiting:
+            return True
+        wait([self._pending[sid][0] for sid in waiting])
+        return self._finish(waiting)
+
+    def drain(self) -> bool:
+        """等待所有运行中的步骤完成"""
+        return self.wait_for(self.pending_ids())
+
+    def shutdown(self) -> None:
+        """关闭线程池（不等待未完成的步骤）"""
+        self._executor.shutdown(wait=False)
+
+    def _finish(self, step_ids: List[Any]) -> bool:
+        all_success = True
+        # 按步骤ID顺序回调，保证结果记录顺序稳定；某一步失败后流程终止（结果日志已写入结束记录），
+        # 其余步骤只移出等待列表，不再回调
+        for sid in sorted(step_ids, key=lambda x: (str(type(x)), x)):
+            future, step = self._pending.pop(sid)
+            if not all_success:
+                continue
+            try:
+                success, result = future.result()
+            except Exception:
+                success, result = False, None
+            self.on_complete(sid, step, success, result)
+            if not success:
+                all_success = False
+        return all_success
+
+
+def _run_after(dependencies: List[Tuple[Any, Any]], results: Optional[Dict[Any, Any]],
+               func: Callable[..., Tuple[bool, Any]], *args) -> Tuple[bool, Any]:
+    """工作线程中等待依赖步骤完成后执行步骤函数（依赖均先于本步骤提交，线程池按提交顺序取任务，不会互相等待）"""
+    for sid, future in dependencies:
+        try:
+            success, result = future.result()
+        except Exception:
+            success, result = False, None
+        if not success:
+            return False, None
+        if results is not None:
+            results[sid] = result
+    return func(*args)
@@ -4,13 +4,11 @@
 负责执行页面滚动操作，支持自定义滚动次数和距离
 """
 
-import pyautogui
-import time
+import logging
 from typing import Optional, Dict, Any
+from . import tracing
+from .backends import get_backend
 
-# 设置pyautogui的安全性
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
 
 
 def execute_scroll(
@@ -52,7 +50,7 @@ def execute_scroll(
             success, data = api_client.call_api("/api/scroll", payload)
             
             if not success:
-                api_client.log("❌ 获取滚动参数失败")
+                api_client.log("❌ 获取滚动参数失败", level=logging.ERROR)
                 return False, None
             
             scroll_params = data['scroll_params']
@@ -61,7 +59,7 @@ def execute_scroll(
             scroll_distance = scroll_params.get('scroll_distance', 3)
             description = scroll_params.get('description', '')
         else:
-            api_client.log("❌ 缺少滚动参数 (需要 clicks+direction 或 scroll_description)")
+            api_client.log("❌ 缺少滚动参数 (需要 clicks+direction 或 scroll_description)", level=logging.ERROR)
             return False, None
         
         api_client.log(f"📋 滚动参数: 方向={direction}, 次数={clicks}, 距离={scroll_distance}")
@@ -77,7 +75,7 @@ def execute_scroll(
         )
         
         if not scroll_success:
-            api_client.log("❌ 滚动操作执行失败")
+            api_client.log("❌ 滚动操作执行失败", level=logging.ERROR)
             return False, None
         
         api_client.log(f"✅ 滚动操作完成: {description}")
@@ -136,7 +134,7 @@ def perform_scroll_operation(
         elif direction.lower() == "right":
             scroll_amount = -scroll_distance
         else:
-            api_client.log(f"❌ 不支持的滚动方向: {direction}")
+            api_client.log(f"❌ 不支持的滚动方向: {direction}", level=logging.ERROR)
             return False
         
         # 执行滚动操作
@@ -146,28 +144,28 @@ def perform_scroll_operation(
             try:
                 if direction.lower() in ["up", "down"]:
                     # 垂直滚动
-                    pyautogui.scroll(scroll_amount)
+                    get_backend().scroll(scroll_amount)
                 else:
                     # 水平滚动（使用hscroll，如果支持的话）
                     try:
-                        pyautogui.hscroll(scroll_amount)
+                        get_backend().hscroll(scroll_amount)
                     except AttributeError:
-                        api_client.log("⚠️ 当前系统不支持水平滚动，跳过")
+                        api_client.log("⚠️ 当前系统不支持水平滚动，跳过", level=logging.WARNING)
                         continue
                 
                 # 滚动间隔
                 if i < clicks - 1:  # 最后一次滚动后不延迟
-                    time.sleep(scroll_delay)
+                    tracing.sleep(scroll_delay)
                     
             except Exception as scroll_error:
-                api_client.log(f"❌ 第 {i+1} 次滚动失败: {str(scroll_error)}")
+                api_client.log(f"❌ 第 {i+1} 次滚动失败: {str(scroll_error)}", level=logging.ERROR)
                 return False
         
         api_client.log("✅ 所有滚动操作执行完成")
         return True
         
     except Exception as e:
-        api_client.log(f"❌ 滚动操作异常: {str(e)}")
+        api_client.log(f"❌ 滚动操作异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -196,10 +194,10 @@ def scroll_to_load_content(
             api_client.log(f"🔄 滚动加载第 {i+1}/{max_scrolls} 次")
             
             # 向下滚动
-            pyautogui.scroll(-scroll_distance)
+            get_backend().scroll(-scroll_distance)
             
             # 等待内容加载
-            time.sleep(load_delay)
+            tracing.sleep(load_delay)
             
             # 这里可以添加检测页面是否已经加载完成的逻辑
             # 比如检测页面高度变化、特定元素出现等
@@ -208,7 +206,7 @@ def scroll_to_load_content(
         return True
         
     except Exception as e:
-        api_client.log(f"❌ 智能滚动异常: {str(e)}")
+        api_client.log(f"❌ 智能滚动异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -241,7 +239,7 @@ def scroll_with_custom_params(
             delay_between_scrolls
         )
     except Exception as e:
-        api_client.log(f"❌ 自定义滚动异常: {str(e)}")
+        api_client.log(f"❌ 自定义滚动异常: {str(e)}", level=logging.ERROR)
         return False
 
 
@@ -252,7 +250,7 @@ def get_screen_dimensions():
     Returns:
         tuple: (width, height)
     """
-    return pyautogui.size()
+    return get_backend().size()
 
 
 def validate_scroll_parameters(direction: str, clicks: int, scroll_distance: int) -> bool:
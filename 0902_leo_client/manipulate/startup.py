@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+启动耗时
+- app.py 在启动各阶段调用 mark() 记录耗时；环境变量 KUZFLOW_STARTUP_BENCHMARK 指向一个文件时，
+  登录窗口显示后把各阶段耗时写入该文件并关闭窗口退出（用于测量到登录窗口的时间）
+- 登录窗口显示后在后台线程预先导入 PRELOAD_MODULES，登录与第一次执行流程时不再等待导入；
+  各操作模块仍在第一次执行对应步骤时才导入（见 executor.STEP_OPERATIONS）
+
+命令行（在 0902_leo_client 目录下）:
+    python -m manipulate.startup imports --top 25 -o imports.json
+    python -m manipulate.startup launch --runs 5 -o startup.json
+    python -m manipulate.startup launch --runs 5 --command dist/KuzflowApp/KuzflowApp.exe
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_ENV = "KUZFLOW_STARTUP_BENCHMARK"
+# 登录窗口显示后在后台预先导入的模块（登录请求、流程执行都会用到）
+PRELOAD_MODULES = ("manipulate.api_client", "manipulate.executor")
+# 单次启动测量的超时（秒）
+LAUNCH_TIMEOUT = 120
+# 客户端根目录（app.py 所在目录）
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_started = time.perf_counter()
+_marks: Dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """记录启动阶段（距本模块导入的秒数）"""
+    _marks[name] = round(time.perf_counter() - _started, 4)
+
+
+def marks() -> Dict[str, float]:
+    return dict(_marks)
+
+
+def on_login_window(dialog: Any) -> None:
+    """登录窗口即将显示（在 dialog.exec_() 之前调用）"""
+    from PyQt5.QtCore import QTimer
+
+    def shown():
+        mark("login_window")
+        logger.info("[启动] 登录窗口已显示: %.3fs %s", _marks["login_window"], _marks)
+        report_path = os.environ.get(BENCHMARK_ENV)
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump({"shown_at": time.time(), "marks": marks()}, f, ensure_ascii=False)
+            dialog.reject()
+            return
+        preload()
+
+    # 事件循环开始处理时窗口已显示
+    QTimer.singleShot(0, shown)
+
+
+def preload(modules=PRELOAD_MODULES) -> threading.Thread:
+    """后台线程预先导入模块（失败只记录日志，使用时再导入）"""
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logger.warning("[启动] 预加载 %s 失败: %s", name, e)
+        mark("preload")
+
+    thread = threading.Thread(target=run, name="startup-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------- 导入耗时 ----------
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """解析 python -X importtime 输出：[{"module", "depth", "self_us", "cumulative_us"}]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            "module": stripped,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+        })
+    return entries
+
+
+def profile_imports(module: str = "app", top: int = 25) -> Dict[str, Any]:
+    """
+    在子进程中用 -X importtime 导入 module（app.py 只执行模块级导入，不启动界面）
+
+    Returns:
+        dict: {"module", "total_ms", "top_level": 按累计耗时排序的直接导入, "slowest": 按自身耗时排序}
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=CLIENT_DIR, capture_output=True, text=True, timeout=LAUNCH_TIMEOUT)
+    entries = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"导入 {module} 失败: {' '.join(errors[-3:])}")
+
+    def row(entry):
+        return {"module": entry["module"], "self_ms": round(entry["self_us"] / 1000, 1),
+                "cumulative_ms": round(entry["cumulative_us"] / 1000, 1)}
+
+    top_level = [e for e in entries if e["depth"] == 0]
+    return {
+        "module": module,
+        "total_ms": round(sum(e["self_us"] for e in entries) / 1000, 1),
+        "top_level": [row(e) for e in sorted(top_level, key=lambda e: -e["cumulative_us"])[:top]],
+        "slowest": [row(e) for e in sorted(entries, key=lambda e: -e["self_us"])[:top]],
+    }
+
+
+# ---------- 到登录窗口的时间 ----------
+
+def measure_launch(command: List[str]) -> Dict[str, Any]:
+    """启动一次客户端，返回 {"login_window_s": 从启动进程到登录窗口显示的秒数, "marks": 进程内各阶段}"""
+    fd, report_path = tempfile.mkstemp(prefix="kuzflow_startup_", suffix=".json")
+    os.close(fd)
+    os.remove(report_path)
+    env = dict(os.environ, **{BENCHMARK_ENV: report_path})
+    try:
+        launched_at = time.time()
+        process = subprocess.run(command, cwd=CLIENT_DIR, env=env, capture_output=True, timeout=LAUNCH_TIMEOUT)
+        if not os.path.exists(report_path):
+            raise RuntimeError(f"客户端未显示登录窗口（退出码 {process.returncode}）")
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        return {"login_window_s": round(report["shown_at"] - launched_at, 4), "marks": report["marks"]}
+    finally:
+        if os.path.exists(report_path):
+            os.remove(report_path)
+
+
+def benchmark_launch(command: Optional[List[str]] = None, runs: int = 5) -> Dict[str, Any]:
+    """
+    多次启动测量到登录窗口的时间（第一次通常是冷启动，单独列出）
+
+    Args:
+        command: 启动命令（默认 python app.py；打包后传 exe 路径）
+        runs: 启动次数
+    """
+    command = command or [sys.executable, "app.py"]
+    results = [measure_launch(command) for _ in range(max(1, runs))]
+    times = [r["login_window_s"] for r in results]
+    warm = times[1:] or times
+    return {
+        "command": command,
+        "runs": results,
+        "first_s": times[0],
+        "warm_median_s": round(statistics.median(warm), 4),
+        "warm_min_s": min(warm),
+        "warm_max_s": max(warm),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="客户端启动耗时")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    imports = sub.add_parser("imports", help="导入耗时报告（-X importtime）")
+    imports.add_argument("--module", default="app", help="导入的模块（默认 app）")
+    imports.add_argument("--top", type=int, default=25, help="列出的条目数")
+    imports.add_argument("-o", "--output", default=None, help="结果输出 JSON 文件")
+    launch = sub.add_parser("launch", help="测量到登录窗口的时间")
+    launch.add_argument("--command", nargs="+", default=None, help="启动命令（默认 python app.py）")
+    launch.add_argument("--runs", type=int, default=5, help="启动次数")
+    launch.add_argument("-o", "--output", default=None, help="结果输出 JSON 文件")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.mode == "imports":
+            result = profile_imports(args.module, args.top)
+            print(f"📦 导入 {result['module']}: 共 {result['total_ms']:.1f}ms")
+            print("  直接导入（按累计耗时）:")
+            for row in result["top_level"]:
+                print(f"    {row['cumulative_ms']:>8.1f}ms  {row['module']}")
+            print("  最慢的模块（按自身耗时）:")
+            for row in result["slowest"]:
+                print(f"    {row['self_ms']:>8.1f}ms  {row['module']}")
+        else:
+            result = benchmark_launch(args.command, args.runs)
+            for i, run in enumerate(result["runs"]):
+                print(f"⏱️ 第{i + 1}次: {run['login_window_s']:.3f}s  {run['marks']}")
+            print(f"✅ 到登录窗口: 首次 {result['first_s']:.3f}s，之后中位数 {result['warm_median_s']:.3f}s "
+                  f"（{result['warm_min_s']:.3f}s ~ {result['warm_max_s']:.3f}s）")
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
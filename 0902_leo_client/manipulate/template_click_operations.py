@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+模板匹配点击操作模块
+截取屏幕上传服务端，在截图中定位参考图（users/{user}/ref）后点击
+- 服务端多尺度匹配，屏幕分辨率变化后无需重新标定坐标
+- 截图像素与屏幕坐标不一致时（Retina/高DPI 缩放）按比例换算
+- 只截取 region 时同时上传截图区域与屏幕大小，服务端据此把 roi 换算到截图内
+"""
+
+import base64
+import logging
+from typing import Any, Dict, Optional
+
+from .backends import get_backend
+from .input_operations import click_position
+from .recognition import capture_region, image_to_screen
+
+
+def execute_template_click(params: Dict[str, Any], step_results: Dict[int, Any], api_client, log_callback: Optional[callable] = None) -> tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    执行模板匹配点击步骤
+
+    Args:
+        params: 步骤参数
+            - template_name: 参考图名称（template_db 的键或 ref 目录下的文件名主干）
+            - threshold: 可选，匹配阈值（默认取服务端配置）
+            - region: 可选，截图区域 [x1, y1, x2, y2]（屏幕坐标）
+        step_results: 前面步骤的结果
+        api_client: API客户端实例
+        log_callback: 日志回调函数
+
+    Returns:
+        tuple: (成功标志, 结果数据)
+    """
+    template_name = params.get('template_name')
+    if not template_name:
+        api_client.log("❌ 缺少template_name参数", level=logging.ERROR)
+        return False, None
+
+    try:
+        png_bytes, box = capture_region(params.get('region'))
+    except Exception as e:
+        api_client.log(f"❌ 截图失败: {e}", level=logging.ERROR)
+        return False, None
+    api_client.log(f"🖼️ 模板匹配点击: '{template_name}'，截图区域 {box}")
+
+    payload = {
+        "template_name": template_name,
+        "screenshot": base64.b64encode(png_bytes).decode('utf-8'),
+        "region": [box[0], box[1], box[0] + box[2], box[1] + box[3]],
+        "screen_size": list(get_backend().size()),
+    }
+    if params.get('threshold') is not None:
+        payload["threshold"] = params['threshold']
+    success, data = api_client.call_api("/api/template/click", payload, timeout=15)
+    if not success or not data:
+        api_client.log("❌ 模板匹配API调用失败", level=logging.ERROR)
+        return False, None
+    if not data.get('success'):
+        api_client.log(f"❌ {data.get('message', '未匹配到参考图')}", level=logging.ERROR)
+        return False, None
+
+    coordinates = image_to_screen(data['coordinates'], png_bytes, box)
+    api_client.log(f"✅ {data.get('message', '')} -> 屏幕坐标 {coordinates}")
+
+    if not click_position(coordinates, api_client):
+        return False, None
+    return True, {
+        "template_name": template_name,
+        "coordinates": coordinates,
+        "confidence": data.get('confidence', 0.0),
+    }
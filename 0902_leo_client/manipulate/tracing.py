@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+流程耗时追踪模块
+- 每个步骤记录一个 span，内部细分：UI操作、sleep等待、网络请求、服务端处理（含 LLM/OCR/飞书 子项）
+- 服务端通过 Server-Timing 响应头返回处理耗时，客户端解析为子 span
+- 运行结束后输出按步骤排序的耗时报告，并导出 Chrome Trace 格式文件（chrome://tracing 或 Perfetto 打开）
+
+用法:
+    tracer = start_trace(task_name)
+    with span("步骤5 处理账号名称信息", "step", step_id=5):
+        ...
+    tracer.finish()
+    tracer.report()  /  tracer.export("debug_logs/trace_xxx.json")
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# 报告中展示的分类（按顺序）
+REPORT_CATEGORIES = ["ui", "sleep", "wait", "network", "server", "config", "llm", "ocr", "feishu"]
+
+_current_tracer: contextvars.ContextVar = contextvars.ContextVar("tracer", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+# 固定等待的缩放倍数（无桌面回放时设为 0 可跳过等待，只衡量调度与网络耗时）
+SLEEP_SCALE_ENV = "SLEEP_SCALE"
+_sleep_scale = float(os.getenv(SLEEP_SCALE_ENV, "1") or 1)
+
+
+class Span:
+    """单个耗时片段"""
+
+    __slots__ = ("span_id", "name", "category", "start", "end", "parent_id", "thread_id", "attrs")
+
+    def __init__(self, span_id: int, name: str, category: str, start: float, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end: Optional[float] = None
+        self.parent_id = parent_id
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Tracer:
+    """一次流程运行的追踪记录"""
+
+    def __init__(self, task_name: str):
+        self.task_name = task_name
+        self.start_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def begin(self, name: str, category: str, parent_id: Optional[int] = None, start: Optional[float] = None, **attrs) -> Span:
+        with self._lock:
+            span_obj = Span(self._next_id, name, category, start if start is not None else time.perf_counter(), parent_id, attrs)
+            self._next_id += 1
+            self.spans.append(span_obj)
+        return span_obj
+
+    def add(self, name: str, category: str, start: float, duration: float, parent_id: Optional[int] = None, **attrs) -> Span:
+        """直接记录一个已知起点与时长的 span（如服务端返回的耗时）"""
+        span_obj = self.begin(name, category, parent_id, start, **attrs)
+        span_obj.end = start + duration
+        return span_obj
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    # ----------------------- 统计 -----------------------
+
+    def _children(self) -> Dict[Optional[int], List[Span]]:
+        children: Dict[Optional[int], List[Span]] = {}
+        for s in self.spans:
+            children.setdefault(s.parent_id, []).append(s)
+        return children
+
+    def breakdown(self, root: Span, children: Optional[Dict[Optional[int], List[Span]]] = None) -> Dict[str, float]:
+        """
+        统计某个 span 内各分类的耗时（子 span 耗时不重复计入父分类）
+        未被子 span 覆盖的 step 时间计为 ui（鼠标键盘、剪贴板等本地操作）
+        """
+        children = children if children is not None else self._children()
+        totals: Dict[str, float] = {}
+
+        def walk(node: Span) -> None:
+            kids = children.get(node.span_id, [])
+            own = node.duration - sum(k.duration for k in kids)
+            category = "ui" if node.category == "step" else node.category
+            totals[category] = totals.get(category, 0.0) + max(own, 0.0)
+            for k in kids:
+                walk(k)
+
+        walk(root)
+        return totals
+
+    def step_spans(self) -> List[Span]:
+        return [s for s in self.spans if s.category == "step"]
+
+    def report(self, top: int = 0) -> List[str]:
+        """
+        生成按耗时排序的步骤报告（火焰图风格的文本条形图）
+
+        Args:
+            top: 只显示耗时最多的前 N 个步骤，0 表示全部
+
+        Returns:
+            list[str]: 报告文本行
+        """
+        children = self._children()
+        total = (self.end or time.perf_counter()) - self.start
+        steps = sorted(self.step_spans(), key=lambda s: s.duration, reverse=True)
+        if top:
+            steps = steps[:top]
+        width = 30
+        longest = max((s.duration for s in steps), default=0.0) or 1.0
+
+        lines = [f"⏱️ 流程耗时分析: {self.task_name} (总耗时 {total:.2f}秒，{len(self.step_spans())} 个步骤)"]
+        category_totals: Dict[str, float] = {}
+        for s in steps:
+            parts = self.breakdown(s, children)
+            for k, v in parts.items():
+                category_totals[k] = category_totals.get(k, 0.0) + v
+            bar = "█" * max(1, int(round(s.duration / longest * width)))
+            detail = " ".join(f"{k} {parts[k]:.2f}s" for k in REPORT_CATEGORIES if parts.get(k, 0.0) >= 0.005)
+            mode = "⇢" if s.attrs.get("async") else " "
+            lines.append(f"  {mode}{s.name:<24} {s.duration:7.2f}s {bar:<{width}} {detail}")
+        summary = " ".join(f"{k} {category_totals[k]:.2f}s" for k in REPORT_CATEGORIES if category_totals.get(k, 0.0) >= 0.005)
+        lines.append(f"  合计: {summary}")
+        # 主线程等待后台步骤的时间
+        waits = [s for s in self.spans if s.category == "wait" and s.parent_id is None]
+        if waits:
+            lines.append(f"  等待后台步骤: {sum(s.duration for s in waits):.2f}s")
+        return lines
+
+    def export(self, path: str) -> str:
+        """导出 Chrome Trace Event 格式文件"""
+        events = []
+        for s in self.spans:
+            events.append({
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round((s.start - self.start) * 1e6),
+                "dur": round(s.duration * 1e6),
+                "pid": 1,
+                "tid": s.thread_id,
+                "args": {k: v for k, v in s.attrs.items() if isinstance(v, (str, int, float, bool))},
+            })
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"task_name": self.task_name, "start_timestamp": self.start_timestamp},
+            }, f, ensure_ascii=False)
+        return path
+
+
+def start_trace(task_name: str) -> Tracer:
+    """开始一次追踪，并绑定到当前上下文"""
+    tracer = Tracer(task_name)
+    _current_tracer.set(tracer)
+    _current_span.set(None)
+    return tracer
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _current_tracer.get()
+
+
+@contextmanager
+def span(name: str, category: str, **attrs) -> Iterator[Optional[Span]]:
+    """记录一个 span；当前上下文没有追踪时为空操作"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield None
+        return
+    parent = _current_span.get()
+    span_obj = tracer.begin(name, category, parent.span_id if parent else None, **attrs)
+    token = _current_span.set(span_obj)
+    try:
+        yield span_obj
+    finally:
+        span_obj.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def record(name: str, category: str, start: float, duration: float, **attrs) -> None:
+    """在当前 span 下记录一个已知时长的子 span"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return
+    parent = _current_span.get()
+    tracer.add(name, category, start, duration, parent.span_id if parent else None, **attrs)
+
+
+def set_sleep_scale(scale: float) -> None:
+    """设置固定等待的缩放倍数（1 为原始时长，0 为不等待）"""
+    global _sleep_scale
+    _sleep_scale = max(0.0, float(scale))
+
+
+def sleep(seconds: float) -> None:
+    """带追踪的 time.sleep，用于统计流程中固定等待的耗时"""
+    with span("sleep", "sleep", seconds=seconds):
+        if seconds * _sleep_scale > 0:
+            time.sleep(seconds * _sleep_scale)
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    解析 Server-Timing 响应头，返回 {名称: 秒}
+    例: "app;dur=812.4, llm;dur=790.1" -> {"app": 0.8124, "llm": 0.7901}
+    """
+    timings: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        parts = [p.strip() for p in item.split(";")]
+        if not parts or not parts[0]:
+            continue
+        for p in parts[1:]:
+            if p.startswith("dur="):
+                try:
+                    timings[parts[0]] = float(p[4:]) / 1000.0
+                except ValueError:
+                    pass
+    return timings
+
+
+def record_server_timing(header: str, start: float, elapsed: float) -> None:
+    """
+    将服务端 Server-Timing 记录为当前网络 span 下的子 span
+    - app: 服务端总处理时间（记为 server），剩余时间视为网络传输
+    - 其他项（llm/ocr/feishu 等）挂在 server 之下
+    """
+    tracer = _current_tracer.get()
+    timings = parse_server_timing(header)
+    if tracer is None or "app" not in timings:
+        return
+    parent = _current_span.get()
+    server_time = min(timings.pop("app"), elapsed)
+    # 服务端处理时间居中放置（前后各一半视为请求/响应传输）
+    server_start = start + max(elapsed - server_time, 0.0) / 2
+    server_span = tracer.add("server", "server", server_start, server_time, parent.span_id if parent else None)
+    offset = server_start
+    for name, duration in timings.items():
+        duration = min(duration, server_start + server_time - offset)
+        if duration <= 0:
+            break
+        tracer.add(name, name, offset, duration, server_span.span_id)
+        offset += duration
@@ -4,8 +4,12 @@
 负责处理各种等待和延时操作
 """
 
+import logging
 import time
 from typing import Optional, Dict, Any
+from . import tracing
+
+logger = logging.getLogger(__name__)
 
 def execute_wait(params: Dict[str, Any], step_results: Dict[int, Any], api_client, log_callback: Optional[callable] = None) -> tuple[bool, Optional[Dict[str, Any]]]:
     """
@@ -29,7 +33,7 @@ def execute_wait(params: Dict[str, Any], step_results: Dict[int, Any], api_clien
         elif api_client:
             api_client.log(f"⏳ {reason}，等待 {wait_time} 秒...")
         
-        time.sleep(wait_time)
+        tracing.sleep(wait_time)
         
         if log_callback:
             log_callback(f"✅ 等待完成")
@@ -66,11 +70,11 @@ def wait_for_page_load(seconds: float = 3.0, api_client=None) -> bool:
         if api_client:
             api_client.log(message)
         else:
-            print(message)
+            logger.info(message)
     
     try:
         log(f"⏳ 等待页面加载 {seconds} 秒...")
-        time.sleep(seconds)
+        tracing.sleep(seconds)
         log("✅ 页面加载等待完成")
         return True
     except Exception as e:
@@ -94,11 +98,11 @@ def wait_for_element_load(seconds: float = 2.0, element_name: str = "元素", ap
         if api_client:
             api_client.log(message)
         else:
-            print(message)
+            logger.info(message)
     
     try:
         log(f"⏳ 等待{element_name}加载 {seconds} 秒...")
-        time.sleep(seconds)
+        tracing.sleep(seconds)
         log(f"✅ {element_name}加载等待完成")
         return True
     except Exception as e:
@@ -122,13 +126,13 @@ def progressive_wait(initial_wait: float = 1.0, max_attempts: int = 3, api_clien
         if api_client:
             api_client.log(message)
         else:
-            print(message)
+            logger.info(message)
     
     try:
         for attempt in range(1, max_attempts + 1):
             wait_time = initial_wait * attempt
             log(f"⏳ 第{attempt}次等待 {wait_time} 秒...")
-            time.sleep(wait_time)
+            tracing.sleep(wait_time)
             
             # 这里可以添加检查逻辑，比如检查页面是否加载完成
             # 目前只是简单的等待
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+UI 操作 API 压测工具
+- 按 process.json 中的流程回放客户端会发出的请求序列（与 executor 的调用一致）
+- 多个虚拟用户、可配置并发，统计每个接口的 p50/p95/p99
+- --standins：启动本地 LLM/飞书替身服务，并生成指向替身的压测用户配置（users/bench_*），不会访问外部服务
+- --start-server：自动启动 uvicorn（登录走 AUTH_STANDIN_USERS，不连接 MySQL）
+- 结果输出为 JSON，可与基线文件比较，p95 回退超过阈值时以非 0 退出码结束
+
+示例:
+    python bench/benchmark.py --standins --start-server --users 4 --concurrency 8 --iterations 5 -o bench_result.json
+    python bench/benchmark.py --standins --start-server --baseline bench_result.json --max-regression 0.2
+"""
+
+import argparse
+import base64
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from standins import start_standins, DEFAULT_LLM_REPLY
+
+BENCH_DIR = Path(__file__).resolve().parent
+SERVER_DIR = BENCH_DIR.parent / "server"
+USERS_ROOT = SERVER_DIR / "users"
+BENCH_USER_PREFIX = "bench_"
+BENCH_PASSWORD = "bench"
+
+# 会访问外部服务的接口（未使用替身时默认跳过，避免产生费用或写脏数据）
+EXTERNAL_ENDPOINTS = {"/api/llm/process", "/api/feishu/write", "/api/feishu/get_data", "/api/feishu/write_doc"}
+
+# LLM 请求使用的示例文本（可用 --content-file 替换）
+DEFAULT_CONTENT = "抖音\n酷寒怪兽 清灰换硅脂拆机电脑保养\n抖音号：kooling_monster\n关注 12\n粉丝 10.5万\n获赞 98.7万\n" * 20
+
+Request = Tuple[str, Dict[str, Any]]
+
+
+# ===================== 请求序列 =====================
+
+def make_png(width: int = 240, height: int = 60) -> bytes:
+    """生成纯白 PNG（未提供截图时用于 /api/rec/rec）"""
+    raw = b"".join(b"\x00" + b"\xff\xff\xff" * width for _ in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def build_flow_requests(task_name: str, process: Dict[str, Any], content: str, screenshot_b64: str) -> List[Request]:
+    """
+    将一个流程转换为客户端会发出的请求序列
+
+    Args:
+        task_name: 流程名称
+        process: process_db 中的流程配置
+        content: llm_process / check_complete 使用的文本
+        screenshot_b64: rec_rec 使用的截图
+
+    Returns:
+        list: [(endpoint, payload), ...]
+    """
+    requests_seq: List[Request] = [("/api/get_process", {"task_name": task_name})]
+    for step in process.get("steps", []):
+        step_type = step.get("step_type")
+        params = step.get("params", {}) or {}
+        if step_type == "click":
+            requests_seq.append(("/api/click/xy", {"target_description": params.get("target_description", "")}))
+        elif step_type == "scroll":
+            requests_seq.append(("/api/scroll", {"scroll_description": params.get("scroll_description", "")}))
+        elif step_type == "drag":
+            requests_seq.append(("/api/drag", {"target_description": params.get("target_description", "")}))
+        elif step_type == "rec_get_xy":
+            requests_seq.append(("/api/rec/get_xy", {"target_description": params.get("target_description", "")}))
+        elif step_type == "rec_rec":
+            requests_seq.append(("/api/rec/rec", {"screenshot": screenshot_b64, "target_description": params.get("target_description", "")}))
+        elif step_type == "rec_batch":
+            targets = params.get("targets", [])
+            requests_seq.append(("/api/rec/batch", {"targets": targets}))
+            requests_seq.append(("/api/rec/batch", {"targets": targets, "screenshot": screenshot_b64}))
+        elif step_type == "ocr_click":
+            requests_seq.append(("/api/ocr/click", {"screenshot": screenshot_b64, "target_text": params.get("target_text", "")}))
+        elif step_type == "template_click":
+            requests_seq.append(("/api/template/click", {"screenshot": screenshot_b64, "template_name": params.get("template_name", "")}))
+        elif step_type == "check_complete":
+            requests_seq.append(("/api/check_complete", {
+                "content": content,
+                "target_keywords": params.get("target_keywords", []),
+                "click_position": params.get("click_position"),
+            }))
+        elif step_type == "llm_process":
+            payload = {"content": content}
+            if params.get("prompt_name"):
+                payload["prompt_name"] = params["prompt_name"]
+            requests_seq.append(("/api/llm/process", payload))
+        elif step_type == "feishu_write":
+            payload = {"source": params.get("source"), "processed_result": DEFAULT_LLM_REPLY}
+            if params.get("table_name"):
+                payload["table_name"] = params["table_name"]
+            requests_seq.append(("/api/feishu/write", payload))
+        elif step_type == "get_data":
+            requests_seq.append(("/api/feishu/get_data", {"source": params.get("source", "")}))
+        elif step_type == "write_doc":
+            requests_seq.append(("/api/feishu/write_doc", {"doc_name": params.get("doc_name", ""), "content": content[:200]}))
+        # input / keyboard / wait / save_result 只在客户端本地执行，不产生请求
+    return requests_seq
+
+
+# ===================== 压测用户 =====================
+
+def load_user_config(username: str, filename: str) -> Dict[str, Any]:
+    path = USERS_ROOT / username / "configs" / filename
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def provision_bench_users(source_user: str, count: int, standin_url: str, llm_stream: bool = False) -> List[str]:
+    """
+    复制 source_user 的配置生成压测用户，LLM 与飞书地址改为替身服务
+
+    Returns:
+        list: 压测用户名
+    """
+    source_dir = USERS_ROOT / source_user / "configs"
+    if not source_dir.exists():
+        raise FileNotFoundError(f"源用户配置不存在: {source_dir}")
+    users = []
+    for i in range(count):
+        username = f"{BENCH_USER_PREFIX}{i + 1}"
+        target_dir = USERS_ROOT / username / "configs"
+        if target_dir.parent.exists():
+            shutil.rmtree(target_dir.parent)
+        shutil.copytree(source_dir, target_dir)
+
+        llm = load_user_config(username, "llm.json")
+        llm["llm_service_config"] = {
+            "provider": "openai",
+            "api_key": "standin",
+            "base_url": f"{standin_url}/v1",
+            "model": "standin",
+            "stream": llm_stream,
+        }
+        feishu = load_user_config(username, "feishu.json")
+        credentials = feishu.setdefault("credentials", {})
+        credentials["api_base"] = f"{standin_url}/open-apis"
+        credentials["auth_url"] = f"{standin_url}/open-apis/auth/v3/tenant_access_token/internal"
+        for filename, data in (("llm.json", llm), ("feishu.json", feishu)):
+            with open(target_dir / filename, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        users.append(username)
+    return users
+
+
+def remove_bench_users(users: List[str]) -> None:
+    for username in users:
+        if username.startswith(BENCH_USER_PREFIX):
+            shutil.rmtree(USERS_ROOT / username, ignore_errors=True)
+
+
+# ===================== 服务进程 =====================
+
+def start_server(port: int, users: List[str]) -> subprocess.Popen:
+    """启动 uvicorn（不开启 reload），等待根路径可访问"""
+    env = dict(os.environ)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["AUTH_STANDIN_USERS"] = ",".join(f"{u}:{BENCH_PASSWORD}" for u in users)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "start:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=str(SERVER_DIR),
+        env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务启动失败，退出码 {proc.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("服务启动超时")
+
+
+# ===================== 执行与统计 =====================
+
+class Recorder:
+    """线程安全的耗时记录"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, endpoint: str, elapsed: float, ok: bool) -> None:
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+_thread_local = threading.local()
+
+
+def _session() -> requests.Session:
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+def run_flow(server: str, user: str, flow: List[Request], recorder: Optional[Recorder], timeout: float, login: bool) -> None:
+    """按顺序执行一个流程的全部请求（与真实客户端一样串行）"""
+    session = _session()
+    headers = {"X-User": user}
+    seq = list(flow)
+    if login:
+        seq = [("/api/login", {"user": user, "password": BENCH_PASSWORD}), ("/api/tasks", None)] + seq
+    for endpoint, payload in seq:
+        start = time.perf_counter()
+        try:
+            if payload is None:
+                resp = session.get(f"{server}{endpoint}", headers=headers, timeout=timeout)
+            else:
+                resp = session.post(f"{server}{endpoint}", json=payload, headers=headers, timeout=timeout)
+            ok = resp.status_code == 200
+        except requests.RequestException:
+            ok = False
+        if recorder:
+            recorder.add(endpoint, time.perf_counter() - start, ok)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5 - 1e-9)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values: List[float], errors: int, wall_time: float) -> Dict[str, Any]:
+    values = sorted(values)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / wall_time, 2) if wall_time else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 2) if count else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def compare_baseline(result: Dict[str, Any], baseline: Dict[str, Any], max_regression: float, min_delta_ms: float = 5.0) -> List[str]:
+    """比较 p95，返回回退说明列表"""
+    regressions = []
+    for endpoint, stats in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base or not base.get("p95_ms"):
+            continue
+        limit = base["p95_ms"] * (1 + max_regression)
+        if stats["p95_ms"] > limit and stats["p95_ms"] - base["p95_ms"] > min_delta_ms:
+            regressions.append(f"{endpoint}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms（阈值 {limit:.1f}ms）")
+    return regressions
+
+
+def print_table(result: Dict[str, Any]) -> None:
+    print(f"\n{'接口':<26}{'次数':>7}{'错误':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'rps':>8}")
+    rows = sorted(result["endpoints"].items()) + [("总计", result["total"])]
+    for endpoint, s in rows:
+        print(f"{endpoint:<26}{s['count']:>7}{s['errors']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}{s['throughput_rps']:>8.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="回放 process.json 流程压测 UI 操作 API")
+    parser.add_argument("--server", default=None, help="服务地址（默认 http://127.0.0.1:8000；--start-server 时自动）")
+    parser.add_argument("--start-server", action="store_true", help="自动启动本地 uvicorn")
+    parser.add_argument("--port", type=int, default=8765, help="--start-server 使用的端口")
+    parser.add_argument("--standins", action="store_true", help="启动 LLM/飞书替身并生成压测用户")
+    parser.add_argument("--standin-url", help="使用已独立运行的替身服务（python bench/standins.py），不在进程内启动")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="LLM 替身延迟（秒）")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="LLM 替身延迟抖动（±秒）")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="LLM 替身注入错误的比例")
+    parser.add_argument("--llm-stream", action="store_true", help="LLM 使用流式输出")
+    parser.add_argument("--feishu-latency", type=float, default=0.05, help="飞书替身延迟（秒）")
+    parser.add_argument("--feishu-qps", type=float, default=0.0, help="飞书替身限流 QPS（0 不限流）")
+    parser.add_argument("--source-user", default="123", help="压测用户配置的来源用户")
+    parser.add_argument("--user", action="append", default=[], help="不使用替身时的用户名（可多次指定）")
+    parser.add_argument("--users", type=int, default=2, help="虚拟用户数（--standins 时生效）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发执行的流程数")
+    parser.add_argument("--iterations", type=int, default=3, help="每个用户执行每个流程的次数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热轮数（不计入统计）")
+    parser.add_argument("--task", action="append", default=[], help="要回放的流程（默认全部）")
+    parser.add_argument("--content-file", help="llm_process 使用的文本文件")
+    parser.add_argument("--screenshot", help="rec_rec 使用的截图文件（默认生成空白 PNG）")
+    parser.add_argument("--allow-external", action="store_true", help="未使用替身时也压测 LLM/飞书接口")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求超时（秒）")
+    parser.add_argument("-o", "--output", help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", help="基线结果 JSON，用于检测回退")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="允许的 p95 回退比例")
+    parser.add_argument("--keep-users", action="store_true", help="结束后保留生成的压测用户")
+    args = parser.parse_args()
+
+    content = Path(args.content_file).read_text(encoding="utf-8") if args.content_file else DEFAULT_CONTENT
+    screenshot = Path(args.screenshot).read_bytes() if args.screenshot else make_png()
+    screenshot_b64 = base64.b64encode(screenshot).decode("ascii")
+
+    standin_server = None
+    server_proc = None
+    users: List[str] = []
+    try:
+        if args.standins:
+            if args.standin_url:
+                standin_url = args.standin_url.rstrip("/")
+            else:
+                standin_server, standin_url = start_standins(
+                    llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, llm_error_rate=args.llm_error_rate,
+                    feishu_latency=args.feishu_latency, feishu_qps=args.feishu_qps,
+                )
+            users = provision_bench_users(args.source_user, args.users, standin_url, args.llm_stream)
+            print(f"🧪 替身服务: {standin_url}，压测用户: {', '.join(users)}")
+        else:
+            users = args.user or [args.source_user]
+
+        if args.start_server:
+            server_proc = start_server(args.port, users)
+            server = f"http://127.0.0.1:{args.port}"
+        else:
+            server = (args.server or "http://127.0.0.1:8000").rstrip("/")
+
+        process_db = load_user_config(users[0], "process.json").get("process_db", {})
+        tasks = args.task or list(process_db.keys())
+        flows: Dict[str, List[Request]] = {}
+        for task in tasks:
+            if task not in process_db:
+                print(f"⚠️ 跳过未知流程: {task}")
+                continue
+            flow = build_flow_requests(task, process_db[task], content, screenshot_b64)
+            if not (args.standins or args.allow_external):
+                flow = [r for r in flow if r[0] not in EXTERNAL_ENDPOINTS]
+            flows[task] = flow
+        if not flows:
+            print("❌ 没有可回放的流程")
+            return 2
+
+        login = args.start_server
+        jobs = [(user, task) for _ in range(args.iterations) for user in users for task in flows]
+        print(f"🚀 {server}: {len(flows)} 个流程 × {len(users)} 个用户 × {args.iterations} 轮，并发 {args.concurrency}")
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            warmup = [(user, task) for _ in range(args.warmup) for user in users for task in flows]
+            list(pool.map(lambda job: run_flow(server, job[0], flows[job[1]], None, args.timeout, login), warmup))
+
+            recorder = Recorder()
+            started = time.perf_counter()
+            list(pool.map(lambda job: run_flow(server, job[0], flows[job[1]], recorder, args.timeout, login), jobs))
+            wall_time = time.perf_counter() - started
+
+        all_values = [v for values in recorder.samples.values() for v in values]
+        result = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "server": server,
+                "standins": args.standins,
+                "llm_latency": args.llm_latency if args.standins else None,
+                "llm_error_rate": args.llm_error_rate if args.standins else None,
+                "llm_stream": args.llm_stream,
+                "feishu_latency": args.feishu_latency if args.standins else None,
+                "feishu_qps": args.feishu_qps if args.standins else None,
+                "users": len(users),
+                "concurrency": args.concurrency,
+                "iterations": args.iterations,
+                "tasks": list(flows.keys()),
+                "wall_time_s": round(wall_time, 3),
+            },
+            "endpoints": {
+                endpoint: summarize(values, recorder.errors.get(endpoint, 0), wall_time)
+                for endpoint, values in recorder.samples.items()
+            },
+            "total": summarize(all_values, sum(recorder.errors.values()), wall_time),
+        }
+        print_table(result)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"\n📁 结果已保存: {args.output}")
+
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+            regressions = compare_baseline(result, baseline, args.max_regression)
+            if regressions:
+                print("\n❌ 性能回退:")
+                for line in regressions:
+                    print(f"  {line}")
+                return 1
+            print("\n✅ 与基线相比无明显回退")
+        return 0
+    finally:
+        if server_proc:
+            server_proc.terminate()
+            server_proc.wait(timeout=10)
+        if standin_server:
+            standin_server.shutdown()
+        if args.standins and not args.keep_users:
+            remove_bench_users(users)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+本地替身服务（仅依赖标准库），用于离线压测与吞吐测试
+- LLM：OpenAI 兼容 /v1/chat/completions
+  - 可配置延迟与抖动、流式输出（SSE，stream=true）、按比例注入 429/500 错误
+- 飞书：tenant_access_token、多维表格记录、docx 文档
+  - records：列表分页（page_size/page_token）、search、增删改、batch_create/batch_update/batch_delete/batch_get
+  - 按 QPS 限流，超出时返回 HTTP 429 + 错误码 99991400（与开放平台一致）
+数据保存在内存中，进程退出即丢失。
+
+嵌入使用:
+    server, base_url = start_standins(llm_latency=0.5)
+    ...  # LLM base_url = f"{base_url}/v1"，飞书 api_base = f"{base_url}/open-apis"
+    server.shutdown()
+
+独立运行（服务端通过 MOCK_LLM_BASE_URL / MOCK_FEISHU_BASE_URL 指向它）:
+    python bench/standins.py --port 9100 --llm-latency 0.8 --llm-stream-delay 0.02 --llm-error-rate 0.05 --feishu-qps 50
+    MOCK_LLM_BASE_URL=http://127.0.0.1:9100/v1 MOCK_FEISHU_BASE_URL=http://127.0.0.1:9100/open-apis python start.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# LLM 替身的默认回复（与服务端 mock 回退保持一致）
+DEFAULT_LLM_REPLY = '{"用户名称":"测试用户","粉丝数":"10.5万"}'
+
+# 飞书限流错误码
+FEISHU_RATE_LIMIT_CODE = 99991400
+# 飞书列表接口的 page_size 上限
+FEISHU_MAX_PAGE_SIZE = 500
+
+_RECORDS_PATH = re.compile(r"^/open-apis/bitable/v1/apps/([^/]+)/tables/([^/]+)/records(?:/([^/]+))?$")
+_DOC_PATH = re.compile(r"^/open-apis/docx/v1/documents/([^/]+)(/blocks(?:/([^/]+)/children)?)?$")
+
+
+class RateLimiter:
+    """令牌桶限流（qps<=0 表示不限流）"""
+
+    def __init__(self, qps: float):
+        self.qps = qps
+        self.tokens = qps
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if self.qps <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.qps, self.tokens + (now - self.updated) * self.qps)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class StandinState:
+    """替身服务的配置、内存数据与统计"""
+
+    def __init__(
+        self,
+        llm_latency: float = 0.5,
+        llm_jitter: float = 0.0,
+        llm_stream_delay: float = 0.01,
+        llm_error_rate: float = 0.0,
+        llm_reply: str = DEFAULT_LLM_REPLY,
+        feishu_latency: float = 0.05,
+        feishu_qps: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.llm_stream_delay = llm_stream_delay
+        self.llm_error_rate = llm_error_rate
+        self.llm_reply = llm_reply
+        self.feishu_latency = feishu_latency
+        self.feishu_limiter = RateLimiter(feishu_qps)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tables: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {}
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """按路径分发到 LLM / 飞书替身"""
+
+    server_version = "Standin/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StandinState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # 压测时不输出访问日志
+        pass
+
+    # ----------------------- HTTP -----------------------
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_PATCH(self) -> None:
+        self._dispatch("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        body = self._read_json()
+        try:
+            if parsed.path.endswith("/chat/completions"):
+                self.state.count("llm")
+                self._chat_completions(body)
+                return
+            if parsed.path == "/_stats":
+                status, data = 200, dict(self.state.stats)
+            elif parsed.path.startswith("/open-apis/"):
+                self.state.count("feishu")
+                if not self.state.feishu_limiter.acquire():
+                    self.state.count("feishu_rate_limited")
+                    status, data = 429, {"code": FEISHU_RATE_LIMIT_CODE, "msg": "request trigger frequency limit"}
+                else:
+                    time.sleep(self.state.feishu_latency)
+                    query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                    status, data = self._feishu(method, parsed.path, query, body)
+            else:
+                status, data = 404, {"error": f"unknown path: {parsed.path}"}
+        except Exception as e:
+            status, data = 500, {"error": str(e)}
+        self._send_json(status, data)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except Exception:
+            return {}
+
+    def _send_json(self, status: int, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # ----------------------- LLM -----------------------
+
+    def _chat_completions(self, body: Dict[str, Any]) -> None:
+        state = self.state
+        latency = max(0.0, state.llm_latency + state.random.uniform(-state.llm_jitter, state.llm_jitter))
+        time.sleep(latency)
+
+        if state.llm_error_rate and state.random.random() < state.llm_error_rate:
+            state.count("llm_errors")
+            status, kind = state.random.choice([(429, "rate_limit_exceeded"), (500, "server_error")])
+            self._send_json(status, {"error": {"message": f"standin injected {kind}", "type": kind, "code": kind}})
+            return
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "standin")
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        reply = state.llm_reply
+        # 粗略估算 token：中文约 1 字 1 token
+        usage = {"prompt_tokens": prompt_chars, "completion_tokens": len(reply), "total_tokens": prompt_chars + len(reply)}
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        # 流式：SSE，每个分片 4 个字符；include_usage 时最后附带 usage 分片
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send_chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+            }
+            if extra:
+                chunk.update(extra)
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send_chunk({"role": "assistant", "content": ""})
+        for i in range(0, len(reply), 4):
+            time.sleep(state.llm_stream_delay)
+            send_chunk({"content": reply[i:i + 4]})
+        send_chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send_chunk(None, extra={"usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    # ----------------------- Feishu -----------------------
+
+    def _feishu(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if path.endswith("/auth/v3/tenant_access_token/internal"):
+            return 200, {"code": 0, "msg": "ok", "tenant_access_token": "t-standin", "expire": 7200}
+
+        match = _RECORDS_PATH.match(path)
+        if match:
+            return self._records(method, (match.group(1), match.group(2)), match.group(3), query, body)
+
+        match = _DOC_PATH.match(path)
+        if match:
+            return self._docx(method, match.group(1), match.group(2), body)
+
+        return 404, {"code": 404, "msg": f"unknown feishu path: {path}"}
+
+    def _page(self, items: List[Dict[str, Any]], query: Dict[str, Any]) -> Dict[str, Any]:
+        """分页：page_token 为起始下标"""
+        page_size = min(int(query.get("page_size") or 20), FEISHU_MAX_PAGE_SIZE)
+        start = int(query.get("page_token") or 0)
+        page = items[start:start + page_size]
+        has_more = start + page_size < len(items)
+        data: Dict[str, Any] = {"items": page, "has_more": has_more, "total": len(items)}
+        if has_more:
+            data["page_token"] = str(start + page_size)
+        return data
+
+    def _records(self, method: str, table_key: Tuple[str, str], action: Optional[str], query: Dict[str, str], body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self.state.lock:
+            table = self.state.tables.setdefault(table_key, {})
+
+            def as_record(rid: str) -> Dict[str, Any]:
+                return {"record_id": rid, "fields": table[rid]}
+
+            def create(fields: Dict[str, Any]) -> Dict[str, Any]:
+                rid = f"rec{uuid.uuid4().hex[:10]}"
+                table[rid] = dict(fields)
+                return as_record(rid)
+
+            if action is None:
+                if method == "GET":
+                    return 200, {"code": 0, "data": self._page([as_record(rid) for rid in table], query)}
+                if method == "POST":
+                    return 200, {"code": 0, "data": {"record": create(body.get("fields", {}))}}
+            elif action == "search" and method == "POST":
+                items = [as_record(rid) for rid in table]
+                for cond in ((body.get("filter") or {}).get("conditions") or []):
+                    if cond.get("operator", "is") == "is":
+                        expected = (cond.get("value") or [None])[0]
+                        items = [r for r in items if str(r["fields"].get(cond.get("field_name"))) == str(expected)]
+                page_query = {"page_size": body.get("page_size") or query.get("page_size"), "page_token": query.get("page_token")}
+                return 200, {"code": 0, "data": self._page(items, page_query)}
+            elif action == "batch_create" and method == "POST":
+                records = [create(r.get("fields", {})) for r in body.get("records", [])]
+                return 200, {"code": 0, "data": {"records": records}}
+            elif action == "batch_update" and method == "POST":
+                records = []
+                for r in body.get("records", []):
+                    if r.get("record_id") not in table:
+                        return 400, {"code": 1254043, "msg": f"RecordIdNotFound: {r.get('record_id')}"}
+                    table[r["record_id"]].update(r.get("fields", {}))
+                    records.append(as_record(r["record_id"]))
+                return 200, {"code": 0, "data": {"records": records}}
+            elif action == "batch_delete" and method == "POST":
+                results = [{"record_id": rid, "deleted": table.pop(rid, None) is not None} for rid in body.get("records", [])]
+                return 200, {"code": 0, "data": {"records": results}}
+            elif action == "batch_get" and method == "POST":
+                records = [as_record(rid) for rid in body.get("record_ids", []) if rid in table]
+                return 200, {"code": 0, "data": {"records": records}}
+            elif action in table:
+                if method == "GET":
+                    return 200, {"code": 0, "data": {"record": as_record(action)}}
+                if method in ("PUT", "PATCH"):
+                    table[action].update(body.get("fields", {}))
+                    return 200, {"code": 0, "data": {"record": as_record(action)}}
+                if method == "DELETE":
+                    del table[action]
+                    return 200, {"code": 0, "data": {"deleted": True, "record_id": action}}
+            else:
+                return 404, {"code": 1254043, "msg": "RecordIdNotFound"}
+        return 405, {"code": 405, "msg": "method not allowed"}
+
+    def _docx(self, method: str, doc_token: str, blocks_part: Optional[str], body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self.state.lock:
+            doc = self.state.docs.setdefault(doc_token, {"revision_id": 1, "children": []})
+            if blocks_part is None:
+                return 200, {"code": 0, "data": {"document": {"document_id": doc_token, "revision_id": doc["revision_id"]}}}
+            if method == "GET":
+                items = [{"block_id": doc_token, "block_type": 1, "children": [c["block_id"] for c in doc["children"]]}]
+                return 200, {"code": 0, "data": {"items": items + doc["children"], "has_more": False}}
+            if method == "POST":
+                children = [{**child, "block_id": f"blk{uuid.uuid4().hex[:10]}"} for child in body.get("children", [])]
+                index = body.get("index", len(doc["children"]))
+                index = len(doc["children"]) if index == -1 else index
+                doc["children"][index:index] = children
+                doc["revision_id"] += 1
+                return 200, {"code": 0, "data": {"children": children, "document_revision_id": doc["revision_id"]}}
+        return 405, {"code": 405, "msg": "method not allowed"}
+
+
+def start_standins(host: str = "127.0.0.1", port: int = 0, **state_kwargs: Any) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动替身服务
+
+    Args:
+        host: 监听地址
+        port: 端口，0 表示自动分配
+        state_kwargs: StandinState 参数（llm_latency / llm_jitter / llm_stream_delay / llm_error_rate /
+                      llm_reply / feishu_latency / feishu_qps / seed）
+
+    Returns:
+        (server, base_url): 调用 server.shutdown() 停止
+    """
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.state = StandinState(**state_kwargs)  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, name="standins", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LLM / 飞书本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="LLM 首包前延迟（秒）")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="LLM 延迟随机抖动（±秒）")
+    parser.add_argument("--llm-stream-delay", type=float, default=0.01, help="流式输出每个分片的间隔（秒）")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="LLM 注入错误（429/500）的比例")
+    parser.add_argument("--llm-reply", default=DEFAULT_LLM_REPLY, help="LLM 固定回复内容")
+    parser.add_argument("--feishu-latency", type=float, default=0.05, help="飞书接口延迟（秒）")
+    parser.add_argument("--feishu-qps", type=float, default=0.0, help="飞书限流 QPS（0 不限流）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（错误注入/抖动可复现）")
+    args = parser.parse_args()
+
+    server, base_url = start_standins(
+        args.host, args.port,
+        llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, llm_stream_delay=args.llm_stream_delay,
+        llm_error_rate=args.llm_error_rate, llm_reply=args.llm_reply,
+        feishu_latency=args.feishu_latency, feishu_qps=args.feishu_qps, seed=args.seed,
+    )
+    print(f"🧪 替身服务已启动: {base_url}")
+    print(f"   MOCK_LLM_BASE_URL={base_url}/v1")
+    print(f"   MOCK_FEISHU_BASE_URL={base_url}/open-apis")
+    print(f"   统计: GET {base_url}/_stats")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
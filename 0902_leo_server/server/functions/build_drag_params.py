@@ -1,7 +1,8 @@
 import time
-import difflib
 from typing import Any, Dict, List, Optional, Tuple
 
+from .target_index import resolve_target
+
 
 def _normalize_drag_entry(entry: Any) -> Optional[Tuple[List[int], List[int]]]:
     """
@@ -47,17 +48,18 @@ def build_drag_params(
     """
     start_time = time.time()
 
-    # 1) 优先从 drag_db 命中（若提供）
+    # 1) 从 drag_db 命中（精确或模糊匹配，若提供）
     if drag_db:
-        if target_description in drag_db:
-            normalized = _normalize_drag_entry(drag_db[target_description])
+        key, score, suggestions = resolve_target(target_description, drag_db, "drag")
+        if key is not None:
+            normalized = _normalize_drag_entry(drag_db[key])
             if normalized:
                 exec_time = time.time() - start_time
-                return True, normalized[0], normalized[1], f"拖拽: {target_description}", exec_time, None
+                return True, normalized[0], normalized[1], f"拖拽: {key}", exec_time, None
 
         # 没命中时给出相似建议（Top-3）
-        candidates = list(drag_db.keys())
-        suggestions = difflib.get_close_matches(target_description, candidates, n=3, cutoff=0.5)
+        exec_time = time.time() - start_time
+        return False, [], [], f"未找到拖拽区域: {target_description}", exec_time, suggestions or None
     else:
         suggestions = None
         return False, [], [], f"缺少drag参数", -100, None
@@ -1,6 +1,7 @@
 from typing import Optional, List, Dict, Any, Tuple
 import time
-from difflib import get_close_matches
+
+from .target_index import resolve_target
 
 def _auto_detect_clipboard(operations: List[str]) -> bool:
     ops_lower = [str(op).strip().lower() for op in operations]
@@ -14,7 +15,7 @@ def build_keyboard_operations(
     """
     去平台化版本：
     - 如果传入 operations_override，则直接使用该序列，自动判断是否包含复制操作；
-    - 否则如果传入 operation_name，则从配置中直接取默认 operations（忽略 platform_variants）；
+    - 否则如果传入 operation_name，则从配置中直接取默认 operations（忽略 platform_variants，名称支持模糊匹配）；
     - 两者都没有则返回失败。
     """
     start_time = time.time()
@@ -35,15 +36,15 @@ def build_keyboard_operations(
 
         # 路径2：从配置中取默认 operations（忽略平台差异）
         if operation_name:
-            if operation_name not in keyboard_db:
+            key, score, suggestions = resolve_target(operation_name, keyboard_db, "keyboard")
+            if key is None:
                 available = list(keyboard_db.keys())
                 # 提供相似项建议
-                suggestions = get_close_matches(operation_name, available, n=3, cutoff=0.6)
                 suggest_text = f"；相似项: {suggestions}" if suggestions else ""
                 exec_time = float(time.time() - start_time)
                 return False, {}, f"未找到键盘操作: {operation_name}，可用操作: {available}{suggest_text}", exec_time
 
-            cfg = keyboard_db[operation_name]
+            cfg = keyboard_db[key]
             operations = cfg["operations"]
             has_clipboard_result = cfg.get("has_clipboard_result")
             if has_clipboard_result is None:
@@ -56,7 +57,7 @@ def build_keyboard_operations(
                 "description": cfg["description"],
             }
             exec_time = float(time.time() - start_time)
-            return True, payload, f"操作: {operation_name}", exec_time
+            return True, payload, f"操作: {key}", exec_time
 
         # 路径3：参数不足
         exec_time = float(time.time() - start_time)
@@ -1,7 +1,8 @@
 import time
-import difflib
 from typing import Any, Dict, List, Optional, Tuple
 
+from .target_index import resolve_target
+
 
 def build_scroll_params(
     scroll_description: str,
@@ -10,16 +11,13 @@ def build_scroll_params(
     """
     根据滚动描述从配置中构建滚动参数。
     - 命中：返回 success=True, scroll_params，message="滚动: xxx"
+    - 描述不完全一致时使用模糊匹配索引，分数达到自动采纳阈值且明显领先其他候选时视为命中
     - 未命中：返回 success=False，并给出相似匹配建议 suggestions
     """
     start_time = time.time()
     try:
-        if scroll_description not in scroll_db:
-            # 相似匹配建议（Top-3）
-            candidates = list(scroll_db.keys())
-            suggestions = difflib.get_close_matches(
-                scroll_description, candidates, n=3, cutoff=0.5
-            )
+        key, score, suggestions = resolve_target(scroll_description, scroll_db, "scroll")
+        if key is None:
             exec_time = time.time() - start_time
             return (
                 False,
@@ -29,7 +27,7 @@ def build_scroll_params(
                 suggestions or None,
             )
 
-        cfg = scroll_db[scroll_description]
+        cfg = scroll_db[key]
         scroll_params = {
             "clicks": cfg["clicks"],
             "x": None,
@@ -39,7 +37,7 @@ def build_scroll_params(
             "description": cfg.get("description", ""),
         }
         exec_time = time.time() - start_time
-        return True, scroll_params, f"滚动: {scroll_description}", exec_time, None
+        return True, scroll_params, f"滚动: {key}", exec_time, None
 
     except Exception as e:
         exec_time = time.time() - start_time
@@ -1,9 +1,17 @@
 from typing import Optional, Dict, Any
 from pathlib import Path
 import json
+import logging
 import os
 import time
 
+from .metrics import LLM_REQUESTS, LLM_LATENCY, LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# 设置后所有 LLM 调用改为请求本地替身服务（bench/standins.py），忽略用户配置中的 base_url/api_key
+MOCK_LLM_ENV = "MOCK_LLM_BASE_URL"
+
 def _load_llm_prompt_db() -> Dict[str, str]:
     """从 configs/llm.json 加载 llm_prompt_db"""
     current_dir = Path(__file__).parent  # server/functions
@@ -32,6 +40,15 @@ def _load_llm_config() -> Dict[str, Any]:
     except Exception:
         return {}
 
+def _record_llm_metrics(prompt_name: Optional[str], model_used: str, success: bool, exec_time: float, usage: Any = None) -> None:
+    """记录 LLM 调用指标（次数、耗时、token 用量）"""
+    prompt_label = prompt_name or ""
+    LLM_REQUESTS.inc(prompt_name=prompt_label, model=model_used, result="success" if success else "fallback")
+    LLM_LATENCY.observe(exec_time, prompt_name=prompt_label)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, prompt_name=prompt_label, type="prompt")
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, prompt_name=prompt_label, type="completion")
+
 def _process_user_info_mock(_: str) -> str:
     """与现有 start.py 的 mock 对齐"""
     return '{"用户名称":"测试用户","粉丝数":"10.5万"}'
@@ -48,7 +65,9 @@ def call_llm_service(content: Optional[str], prompt_name: Optional[str], model_c
         content: 待处理文本
         prompt_name: llm.json 中 llm_prompt_db 的键名
         model_config: 可选模型配置，覆盖环境变量，示例：
-            { "provider": "qwen" | "openai", "api_key": "...", "base_url": "...", "model": "..." }
+            { "provider": "qwen" | "openai", "api_key": "...", "base_url": "...", "model": "...", "stream": false }
+            - stream: 是否使用流式输出（逐块拼接结果）
+            - 环境变量 MOCK_LLM_BASE_URL 设置时，统一改为请求该地址
 
     Returns:
         {
@@ -83,8 +102,10 @@ def call_llm_service(content: Optional[str], prompt_name: Optional[str], model_c
 
         # 如无可用 prompt，直接走 Mock 回退
         if not prompt:
+            logger.warning("LLM 跳过调用，使用Mock: %s", message or "无可用prompt")
             processed_result = _process_user_info_mock(content)
             exec_time = time.time() - start_ts
+            _record_llm_metrics(prompt_name, model_used, False, exec_time)
             return {
                 "processed_result": processed_result,
                 "execution_time": exec_time,
@@ -127,6 +148,12 @@ def call_llm_service(content: Optional[str], prompt_name: Optional[str], model_c
                     base_url = (os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
                     model = os.getenv("OPENAI_MODEL") or "gpt-4o-mini"
 
+        mock_base_url = os.getenv(MOCK_LLM_ENV)
+        if mock_base_url:
+            base_url = mock_base_url.rstrip("/")
+            api_key = "mock"
+            model = model or "mock"
+
         if not api_key:
             raise RuntimeError("未配置可用的 LLM API Key")
 
@@ -138,17 +165,37 @@ def call_llm_service(content: Optional[str], prompt_name: Optional[str], model_c
             {"role": "system", "content": "You are a helpful assistant for extracting user information."},
             {"role": "user", "content": prompt},
         ]
-        completion = client.chat.completions.create(
-            model=model,
-            messages=messages,
-        )
+        usage = None
+        if (model_config or {}).get("stream"):
+            # 流式：逐块拼接，最后一个分片携带 usage
+            stream = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            parts = []
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+            processed_result = "".join(parts)
+        else:
+            completion = client.chat.completions.create(
+                model=model,
+                messages=messages,
+            )
+            usage = getattr(completion, "usage", None)
+            processed_result = completion.choices[0].message.content if completion and completion.choices else ""
         model_used = model
-        processed_result = completion.choices[0].message.content if completion and completion.choices else ""
 
         if not processed_result:
             raise RuntimeError("LLM 返回空内容")
 
         exec_time = time.time() - start_ts
+        _record_llm_metrics(prompt_name, model_used, True, exec_time, usage)
+        logger.info("LLM 调用完成: prompt=%s, model=%s, 耗时 %.2fs", prompt_name, model_used, exec_time)
         return {
             "processed_result": processed_result,
             "execution_time": exec_time,
@@ -160,8 +207,10 @@ def call_llm_service(content: Optional[str], prompt_name: Optional[str], model_c
 
     except Exception as e:
         # 全量回退到 Mock
+        logger.warning("LLM 服务调用失败，使用Mock: prompt=%s, 错误: %s", prompt_name, e)
         processed_result = _process_user_info_mock(content or "")
         exec_time = time.time() - start_ts
+        _record_llm_metrics(prompt_name, model_used, False, exec_time)
         return {
             "processed_result": processed_result,
             "execution_time": exec_time,
@@ -1,4 +1,6 @@
 from typing import Any, Dict, List, Optional
+import logging
+import os
 import requests
 import time
 import re
@@ -10,6 +12,50 @@ try:
 except Exception:
     ZoneInfo = None  # 运行环境不支持时，回退到固定偏移
 
+from .metrics import FEISHU_CALLS, FEISHU_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+# 飞书开放平台默认地址（credentials.api_base 可覆盖，用于指向本地替身服务做压测）
+FEISHU_API_BASE = "https://open.feishu.cn/open-apis"
+# 设置后所有用户的飞书请求都改为发往本地替身服务（bench/standins.py），优先级高于 credentials.api_base
+MOCK_FEISHU_ENV = "MOCK_FEISHU_BASE_URL"
+
+# 飞书开放平台限流错误码（HTTP 429 或业务码 99991400）
+FEISHU_RATE_LIMIT_CODE = 99991400
+
+
+def _feishu_api_name(url: str) -> str:
+    """根据 URL 归类接口（用作指标 label，避免把 token/record_id 写进 label）"""
+    if "/auth/" in url:
+        return "auth"
+    if "/bitable/" in url:
+        return "bitable"
+    if "/docx/" in url:
+        return "docx"
+    return "other"
+
+
+def _feishu_request(method: str, url: str, **kwargs: Any) -> requests.Response:
+    """发送飞书请求并记录调用次数与限流次数"""
+    api = _feishu_api_name(url)
+    try:
+        resp = requests.request(method, url, **kwargs)
+    except Exception:
+        FEISHU_CALLS.inc(api=api, method=method.upper(), status="error")
+        raise
+    FEISHU_CALLS.inc(api=api, method=method.upper(), status=str(resp.status_code))
+    rate_limited = resp.status_code == 429
+    if not rate_limited and resp.status_code != 200:
+        try:
+            rate_limited = resp.json().get("code") == FEISHU_RATE_LIMIT_CODE
+        except Exception:
+            pass
+    if rate_limited:
+        FEISHU_RATE_LIMITED.inc(api=api)
+        logger.warning("飞书接口限流: api=%s, url=%s", api, url)
+    return resp
+
 class FeishuService:
     def __init__(self, credentials: Dict[str, Any], table_db: Dict[str, Any], doc_db: Dict[str, Any] = None) -> None:
         """
@@ -18,7 +64,8 @@ class FeishuService:
             "app_secret": "...",
             "app_token": "...",
             "table_id": "...",
-            "auth_url": "..."
+            "auth_url": "...",
+            "api_base": "..."   # 可选，默认 https://open.feishu.cn/open-apis
         }
         table_db: {
             "<table_name>": {
@@ -32,6 +79,10 @@ class FeishuService:
         self.credentials = credentials or {}
         self.table_db = table_db or {}
         self.doc_db = doc_db or {}
+        mock_base = os.getenv(MOCK_FEISHU_ENV)
+        self.api_base = (mock_base or self.credentials.get("api_base") or FEISHU_API_BASE).rstrip("/")
+        default_auth_url = f"{self.api_base}/auth/v3/tenant_access_token/internal"
+        self.auth_url = default_auth_url if mock_base else (self.credentials.get("auth_url") or default_auth_url)
 
     # ----------------------- Public API -----------------------
 
@@ -62,14 +113,14 @@ class FeishuService:
                         else:
                             fields = parsed[0] if parsed else {}
                 except Exception as e:
-                    print(f"解析processed_result失败: {e}")
+                    logger.warning("解析processed_result失败: %s", e)
                     fields = {}
 
             feishu_fields = self.build_feishu_fields(fields, table_name)
             background_tasks.add_task(self.write_background, feishu_fields, source, table_name)
             return {"ok": True}
         except Exception as e:
-            print(f"schedule_write 异常: {e}")
+            logger.error("schedule_write 异常: %s", e)
             return {"ok": False, "error": str(e)}
 
     # ----------------------- Background tasks -----------------------
@@ -77,7 +128,7 @@ class FeishuService:
     def write_array_background(self, records: List[Dict[str, Any]], source: Optional[str] = None, table_name: Optional[str] = None) -> None:
         """处理数组数据的飞书写入后台任务，逐条写入记录"""
         try:
-            print(f"开始处理数组数据写入: {len(records)} 条记录，表格: {table_name}")
+            logger.info("开始处理数组数据写入: %s 条记录，表格: %s", len(records), table_name)
 
             success_count = 0
             failed_count = 0
@@ -89,7 +140,7 @@ class FeishuService:
                 initial_delay = 0.0
 
             if initial_delay > 0:
-                print(f"表格 {table_name} 延迟 {initial_delay} 秒开始写入")
+                logger.info("表格 %s 延迟 %s 秒开始写入", table_name, initial_delay)
                 time.sleep(initial_delay)
 
             for i, record in enumerate(records):
@@ -97,7 +148,7 @@ class FeishuService:
                     record_source = f"{source}_{table_name}_记录{i+1}" if source else None
                     self.write_background(record, record_source, table_name)
                     success_count += 1
-                    print(f"✅ {table_name} 第 {i+1}/{len(records)} 条记录写入成功")
+                    logger.info("✅ %s 第 %s/%s 条记录写入成功", table_name, i+1, len(records))
 
                     # 与原实现保持一致：不同表写入间隔
                     if table_name == "抖音创作者信息1":
@@ -107,25 +158,28 @@ class FeishuService:
 
                 except Exception as e:
                     failed_count += 1
-                    print(f"❌ {table_name} 第 {i+1} 条记录写入失败: {e}")
+                    logger.error("❌ %s 第 %s 条记录写入失败: %s", table_name, i+1, e)
 
-            print(f"📊 {table_name} 数组写入完成: 成功 {success_count}/{len(records)} 条，失败 {failed_count} 条")
+            logger.info("📊 %s 数组写入完成: 成功 %s/%s 条，失败 %s 条", table_name, success_count, len(records), failed_count)
         except Exception as e:
-            print(f"❌ {table_name} 数组数据写入异常: {e}")
+            logger.error("❌ %s 数组数据写入异常: %s", table_name, e)
 
     def write_background(self, fields: Dict[str, Any], source: Optional[str] = None, table_name: Optional[str] = None) -> None:
         """单条记录的飞书写入后台任务，支持防重复（查重+更新）"""
         try:
             token = self.get_tenant_access_token()
             if not token:
-                print("未获取到tenant_access_token，放弃写入飞书")
+                logger.warning("未获取到tenant_access_token，放弃写入飞书")
                 return
 
             table_config = self.resolve_table_config(table_name)
             app_token = table_config["app_token"]
             table_id = table_config["table_id"]
 
-            print(f"使用多维表格配置: {table_name} -> {table_id}" if table_name and table_name in self.table_db else f"使用默认表配置: {table_id}")
+            if table_name and table_name in self.table_db:
+                logger.debug("使用多维表格配置: %s -> %s", table_name, table_id)
+            else:
+                logger.debug("使用默认表配置: %s", table_id)
 
             # 按表的 fields_mapping 过滤/取值，并进行类型转换
             filtered_fields = fields
@@ -144,8 +198,8 @@ class FeishuService:
                 primary_key_value = self._generate_primary_key(fields, table_name)
                 if primary_key_value:
                     filtered_fields[primary_key_field] = primary_key_value
-                    print(f"🔑 生成主键: {primary_key_field} = {primary_key_value}")
-                    print(f"📝 原始数据用于哈希: {[str(fields.get(field, '')) for field in self.table_db[table_name].get('hash_fields', [])]}")
+                    logger.debug("🔑 生成主键: %s = %s", primary_key_field, primary_key_value)
+                    logger.debug("📝 原始数据用于哈希: %s", [str(fields.get(field, '')) for field in self.table_db[table_name].get('hash_fields', [])])
                     
                     # 查询是否存在该主键的记录
                     existing_record = self._query_existing_record(primary_key_value, table_name)
@@ -154,37 +208,38 @@ class FeishuService:
                         # 记录存在，执行更新
                         record_id = existing_record.get("record_id")
                         if record_id:
-                            print(f"🔄 发现重复记录，执行更新: record_id={record_id}")
+                            logger.info("🔄 发现重复记录，执行更新: record_id=%s", record_id)
                             success = self._update_existing_record(record_id, filtered_fields, table_name)
                             if success:
-                                print(f"✅ 更新飞书记录成功: table={table_name}, record_id={record_id}")
+                                logger.info("✅ 更新飞书记录成功: table=%s, record_id=%s", table_name, record_id)
                                 return
                             else:
-                                print(f"❌ 更新失败，尝试删除旧记录并创建新记录")
+                                logger.error("❌ 更新失败，尝试删除旧记录并创建新记录")
                                 # 如果更新失败，尝试删除旧记录
                                 if self._delete_record(record_id, table_name):
-                                    print(f"🗑️ 删除旧记录成功，将创建新记录")
+                                    logger.info("🗑️ 删除旧记录成功，将创建新记录")
                                 else:
-                                    print(f"❌ 删除旧记录也失败，跳过此次写入")
+                                    logger.error("❌ 删除旧记录也失败，跳过此次写入")
                                     return
                         else:
-                            print("⚠️ 查询到记录但缺少record_id，将创建新记录")
+                            logger.warning("⚠️ 查询到记录但缺少record_id，将创建新记录")
                     else:
-                        print(f"🆕 未发现重复记录，将创建新记录")
+                        logger.debug("🆕 未发现重复记录，将创建新记录")
                 else:
-                    print(f"⚠️ 主键生成失败")
+                    logger.warning("⚠️ 主键生成失败")
             else:
-                print(f"⚠️ 表 {table_name} 未配置主键字段")
+                logger.warning("⚠️ 表 %s 未配置主键字段", table_name)
 
             # 执行新增操作
             headers = {
                 "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json; charset=utf-8",
             }
-            record_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records"
+            record_url = f"{self.api_base}/bitable/v1/apps/{app_token}/tables/{table_id}/records"
             body = {"fields": filtered_fields}
 
-            resp = requests.post(
+            resp = _feishu_request(
+                "POST",
                 record_url,
                 headers=headers,
                 json=body,
@@ -194,9 +249,10 @@ class FeishuService:
                 data = resp.json()
             except Exception:
                 data = {"text": resp.text}
-            print(f"写入飞书表格返回: table={table_name}, status={resp.status_code}, data={data}")
+            logger.info("写入飞书表格返回: table=%s, status=%s", table_name, resp.status_code)
+            logger.debug("写入飞书表格返回数据: %s", data)
         except Exception as e:
-            print(f"写入飞书后台任务异常: {e}")
+            logger.error("写入飞书后台任务异常: %s", e)
 
     # ----------------------- Hash and Primary Key -----------------------
 
@@ -226,30 +282,30 @@ class FeishuService:
     def _query_existing_record(self, primary_key_value: str, table_name: Optional[str]) -> Optional[Dict[str, Any]]:
         """查询是否存在指定主键的记录"""
         if not table_name or table_name not in self.table_db:
-            print(f"❌ 查询失败: 表名无效 table_name={table_name}")
+            logger.error("❌ 查询失败: 表名无效 table_name=%s", table_name)
             return None
         
         table_config = self.resolve_table_config(table_name)
         primary_key_field = self.table_db[table_name].get("primary_key_field")
         
         if not primary_key_field or not primary_key_value:
-            print(f"❌ 查询失败: 主键字段或值无效 primary_key_field={primary_key_field}, primary_key_value={primary_key_value}")
+            logger.error("❌ 查询失败: 主键字段或值无效 primary_key_field=%s, primary_key_value=%s", primary_key_field, primary_key_value)
             return None
         
         try:
             token = self.get_tenant_access_token()
             if not token:
-                print("❌ 查询记录时未获取到token")
+                logger.error("❌ 查询记录时未获取到token")
                 return None
             
             app_token = table_config["app_token"]
             table_id = table_config["table_id"]
             
-            print(f"🔍 开始查询记录: {primary_key_field} = {primary_key_value}")
+            logger.debug("🔍 开始查询记录: %s = %s", primary_key_field, primary_key_value)
             
             # 使用飞书查询API，不使用filter，而是获取所有记录然后手动过滤
             # 因为飞书的filter语法可能有问题
-            query_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records"
+            query_url = f"{self.api_base}/bitable/v1/apps/{app_token}/tables/{table_id}/records"
             headers = {
                 "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json; charset=utf-8",
@@ -258,27 +314,27 @@ class FeishuService:
             # 先尝试获取所有记录（分页）
             params = {"page_size": 500}  # 增加页面大小
             
-            resp = requests.get(query_url, headers=headers, params=params, timeout=15)
+            resp = _feishu_request("GET", query_url, headers=headers, params=params, timeout=15)
             
             if resp.status_code == 200:
                 data = resp.json()
                 items = data.get("data", {}).get("items", [])
-                print(f"📊 查询到 {len(items)} 条记录，开始查找匹配的主键")
+                logger.debug("📊 查询到 %s 条记录，开始查找匹配的主键", len(items))
                 
                 # 手动查找匹配的记录
                 for item in items:
                     fields = item.get("fields", {})
                     if fields.get(primary_key_field) == primary_key_value:
-                        print(f"✅ 找到匹配记录: record_id={item.get('record_id')}")
+                        logger.debug("✅ 找到匹配记录: record_id=%s", item.get('record_id'))
                         return item
                 
-                print(f"🔍 未找到匹配的记录: {primary_key_field} = {primary_key_value}")
+                logger.debug("🔍 未找到匹配的记录: %s = %s", primary_key_field, primary_key_value)
                 return None
             else:
-                print(f"❌ 查询记录失败: status={resp.status_code}, response={resp.text}")
+                logger.error("❌ 查询记录失败: status=%s, response=%s", resp.status_code, resp.text)
         
         except Exception as e:
-            print(f"❌ 查询记录异常: {e}")
+            logger.error("❌ 查询记录异常: %s", e)
         
         return None
 
@@ -287,48 +343,48 @@ class FeishuService:
         try:
             token = self.get_tenant_access_token()
             if not token:
-                print("❌ 更新记录时未获取到token")
+                logger.error("❌ 更新记录时未获取到token")
                 return False
             
             table_config = self.resolve_table_config(table_name)
             app_token = table_config["app_token"]
             table_id = table_config["table_id"]
             
-            print(f"🔄 开始更新记录: record_id={record_id}, table={table_name}")
+            logger.info("🔄 开始更新记录: record_id=%s, table=%s", record_id, table_name)
             
             # 使用飞书更新API - 尝试PUT方法
-            update_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records/{record_id}"
+            update_url = f"{self.api_base}/bitable/v1/apps/{app_token}/tables/{table_id}/records/{record_id}"
             headers = {
                 "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json; charset=utf-8",
             }
             
             body = {"fields": fields_data}
-            print(f"📤 更新请求: URL={update_url}")
-            print(f"📤 更新数据: {body}")
+            logger.debug("📤 更新请求: URL=%s", update_url)
+            logger.debug("📤 更新数据: %s", body)
             
             # 先尝试PUT方法
-            resp = requests.put(update_url, headers=headers, json=body, timeout=10)
+            resp = _feishu_request("PUT", update_url, headers=headers, json=body, timeout=10)
             
             if resp.status_code == 200:
-                print(f"✅ 更新记录成功(PUT): record_id={record_id}, table={table_name}")
+                logger.info("✅ 更新记录成功(PUT): record_id=%s, table=%s", record_id, table_name)
                 return True
             elif resp.status_code == 404:
-                print(f"⚠️ PUT方法404，尝试PATCH方法")
+                logger.warning("⚠️ PUT方法404，尝试PATCH方法")
                 # 如果PUT失败，尝试PATCH
-                resp = requests.patch(update_url, headers=headers, json=body, timeout=10)
+                resp = _feishu_request("PATCH", update_url, headers=headers, json=body, timeout=10)
                 if resp.status_code == 200:
-                    print(f"✅ 更新记录成功(PATCH): record_id={record_id}, table={table_name}")
+                    logger.info("✅ 更新记录成功(PATCH): record_id=%s, table=%s", record_id, table_name)
                     return True
                 else:
-                    print(f"❌ PATCH更新失败: status={resp.status_code}, response={resp.text}")
+                    logger.error("❌ PATCH更新失败: status=%s, response=%s", resp.status_code, resp.text)
                     return False
             else:
-                print(f"❌ PUT更新失败: status={resp.status_code}, response={resp.text}")
+                logger.error("❌ PUT更新失败: status=%s, response=%s", resp.status_code, resp.text)
                 return False
         
         except Exception as e:
-            print(f"❌ 更新记录异常: {e}")
+            logger.error("❌ 更新记录异常: %s", e)
             return False
 
     def _delete_record(self, record_id: str, table_name: Optional[str]) -> bool:
@@ -336,33 +392,33 @@ class FeishuService:
         try:
             token = self.get_tenant_access_token()
             if not token:
-                print("❌ 删除记录时未获取到token")
+                logger.error("❌ 删除记录时未获取到token")
                 return False
             
             table_config = self.resolve_table_config(table_name)
             app_token = table_config["app_token"]
             table_id = table_config["table_id"]
             
-            print(f"🗑️ 开始删除记录: record_id={record_id}, table={table_name}")
+            logger.info("🗑️ 开始删除记录: record_id=%s, table=%s", record_id, table_name)
             
             # 使用飞书删除API
-            delete_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records/{record_id}"
+            delete_url = f"{self.api_base}/bitable/v1/apps/{app_token}/tables/{table_id}/records/{record_id}"
             headers = {
                 "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json; charset=utf-8",
             }
             
-            resp = requests.delete(delete_url, headers=headers, timeout=10)
+            resp = _feishu_request("DELETE", delete_url, headers=headers, timeout=10)
             
             if resp.status_code == 200:
-                print(f"✅ 删除记录成功: record_id={record_id}, table={table_name}")
+                logger.info("✅ 删除记录成功: record_id=%s, table=%s", record_id, table_name)
                 return True
             else:
-                print(f"❌ 删除记录失败: status={resp.status_code}, response={resp.text}")
+                logger.error("❌ 删除记录失败: status=%s, response=%s", resp.status_code, resp.text)
                 return False
         
         except Exception as e:
-            print(f"❌ 删除记录异常: {e}")
+            logger.error("❌ 删除记录异常: %s", e)
             return False
 
     # ----------------------- Data Type Conversion -----------------------
@@ -388,15 +444,15 @@ class FeishuService:
                 # 到秒：date 类型优先返回毫秒时间戳；string 类型返回格式化字符串
                 if field_type == "date" or default_marker == "now_tw_ms":
                     ts_ms = self._now_in_taipei_ms()
-                    print(f"⏱️ 字段默认注入台湾时间(毫秒): {ts_ms}")
+                    logger.debug("⏱️ 字段默认注入台湾时间(毫秒): %s", ts_ms)
                     return ts_ms
                 if default_marker == "now_tw_iso":
                     iso_str = self._now_in_taipei_iso()
-                    print(f"⏱️ 字段默认注入台湾时间(ISO): {iso_str}")
+                    logger.debug("⏱️ 字段默认注入台湾时间(ISO): %s", iso_str)
                     return iso_str
                 # 其余情况返回可读字符串（含秒）
                 str_val = self._now_in_taipei_string()
-                print(f"⏱️ 字段默认注入台湾时间(字符串): {str_val}")
+                logger.debug("⏱️ 字段默认注入台湾时间(字符串): %s", str_val)
                 return str_val
         
         if field_type == "string":
@@ -481,7 +537,7 @@ class FeishuService:
         try:
             return int(float(str_value))
         except ValueError:
-            print(f"无法转换为整数: {value}, 使用默认值 0")
+            logger.warning("无法转换为整数: %s, 使用默认值 0", value)
             return 0
     
     def _convert_to_date(self, value: Any, target_format: str) -> int:
@@ -529,7 +585,7 @@ class FeishuService:
                 timestamp_ms = int(dt.timestamp() * 1000)
                 return timestamp_ms
             except ValueError as e:
-                print(f"日期转换失败: {str_value}, 错误: {e}")
+                logger.warning("日期转换失败: %s, 错误: %s", str_value, e)
                 return 0
         
         # 如果匹配失败，尝试其他常见格式
@@ -553,7 +609,7 @@ class FeishuService:
         except ValueError:
             pass
         
-        print(f"无法解析日期格式: {str_value}, 使用默认值 0")
+        logger.warning("无法解析日期格式: %s, 使用默认值 0", str_value)
         return 0
 
     def _convert_to_percent(self, value: Any, as_ratio: bool = True) -> float:
@@ -609,10 +665,11 @@ class FeishuService:
     def get_tenant_access_token(self) -> Optional[str]:
         """根据 credentials 获取 tenant_access_token"""
         try:
-            auth_url = self.credentials.get("auth_url", "")
+            auth_url = self.auth_url
             app_id = self.credentials.get("app_id", "")
             app_secret = self.credentials.get("app_secret", "")
-            resp = requests.post(
+            resp = _feishu_request(
+                "POST",
                 auth_url,
                 json={"app_id": app_id, "app_secret": app_secret},
                 timeout=10,
@@ -620,9 +677,9 @@ class FeishuService:
             data = resp.json() if resp is not None else {}
             if resp.status_code == 200 and data.get("code", 0) == 0:
                 return data.get("tenant_access_token")
-            print(f"获取tenant_access_token失败: status={resp.status_code}, data={data}")
+            logger.warning("获取tenant_access_token失败: status=%s, data=%s", resp.status_code, data)
         except Exception as e:
-            print(f"获取tenant_access_token异常: {e}")
+            logger.error("获取tenant_access_token异常: %s", e)
         return None
 
     def build_feishu_fields(self, fields: Dict[str, Any], table_name: Optional[str]) -> Dict[str, Any]:
@@ -692,9 +749,10 @@ class FeishuService:
             }
             
             # 获取表格记录
-            records_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records"
+            records_url = f"{self.api_base}/bitable/v1/apps/{app_token}/tables/{table_id}/records"
             
-            resp = requests.get(
+            resp = _feishu_request(
+                "GET",
                 records_url,
                 headers=headers,
                 params={"page_size": 500},  # 最大500条记录
@@ -711,7 +769,7 @@ class FeishuService:
                     fields = record.get("fields", {})
                     result_data.append(fields)
                 
-                print(f"从表格 {table_name} 读取到 {len(result_data)} 条记录")
+                logger.info("从表格 %s 读取到 %s 条记录", table_name, len(result_data))
                 return {
                     "ok": True, 
                     "data": result_data,
@@ -719,12 +777,12 @@ class FeishuService:
                 }
             else:
                 error_msg = f"读取表格失败: {resp.status_code}, {resp.text}"
-                print(error_msg)
+                logger.error(error_msg)
                 return {"ok": False, "error": error_msg}
                 
         except Exception as e:
             error_msg = f"get_data 异常: {str(e)}"
-            print(error_msg)
+            logger.error(error_msg)
             return {"ok": False, "error": error_msg}
 
     def write_doc(self, doc_name: str, content: str) -> Dict[str, Any]:
@@ -753,8 +811,9 @@ class FeishuService:
             formatted_content = f"\n\n--- 更新时间: {timestamp} ---\n{content}\n"
             
             # 先获取文档信息以获取document_revision_id
-            doc_info_resp = requests.get(
-                f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_token}",
+            doc_info_resp = _feishu_request(
+                "GET",
+                f"{self.api_base}/docx/v1/documents/{doc_token}",
                 headers=headers,
                 timeout=10,
             )
@@ -769,8 +828,9 @@ class FeishuService:
                 return {"ok": False, "error": "未获取到document_revision_id"}
             
             # 获取文档结构以获取root_block_id
-            get_resp = requests.get(
-                f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_token}/blocks",
+            get_resp = _feishu_request(
+                "GET",
+                f"{self.api_base}/docx/v1/documents/{doc_token}/blocks",
                 headers=headers,
                 timeout=10,
             )
@@ -791,7 +851,7 @@ class FeishuService:
                 return {"ok": False, "error": "未找到文档根块ID"}
             
             # 使用正确的API格式和document_revision_id添加内容
-            doc_url = f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_token}/blocks/{root_block_id}/children?document_revision_id={document_revision_id}"
+            doc_url = f"{self.api_base}/docx/v1/documents/{doc_token}/blocks/{root_block_id}/children?document_revision_id={document_revision_id}"
             
             body = {
                 "index": 0,
@@ -811,7 +871,8 @@ class FeishuService:
                 ]
             }
             
-            resp = requests.post(
+            resp = _feishu_request(
+                "POST",
                 doc_url,
                 headers=headers,
                 json=body,
@@ -819,14 +880,14 @@ class FeishuService:
             )
             
             if resp.status_code in [200, 201]:
-                print(f"成功写入文档 {doc_name}")
+                logger.info("成功写入文档 %s", doc_name)
                 return {"ok": True, "message": f"内容已写入文档 {doc_name}"}
             else:
                 error_msg = f"写入文档失败: {resp.status_code}, {resp.text}"
-                print(error_msg)
+                logger.error(error_msg)
                 return {"ok": False, "error": error_msg}
                 
         except Exception as e:
             error_msg = f"write_doc 异常: {str(e)}"
-            print(error_msg)
+            logger.error(error_msg)
             return {"ok": False, "error": error_msg}
\ No newline at end of file
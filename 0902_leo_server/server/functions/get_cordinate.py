@@ -1,9 +1,11 @@
 from typing import Dict, Tuple
 import time
 
+from .target_index import resolve_target
+
 def get_cordinate(target_description: str, coordinate_db: Dict[str, Tuple[int, int]]):
     """
-    根据目标描述从坐标库中获取坐标。
+    根据目标描述从坐标库中获取坐标（描述不完全一致时模糊匹配，confidence 为匹配分数）。
     返回: (success, coordinates, confidence, message, execution_time)
     """
     start_time = time.time()
@@ -12,13 +14,14 @@ def get_cordinate(target_description: str, coordinate_db: Dict[str, Tuple[int, i
             execution_time = time.time() - start_time
             return (False, (0, 0), 0.0, "目标描述为空", execution_time)
 
-        if target_description not in coordinate_db:
+        key, confidence, suggestions = resolve_target(target_description, coordinate_db, "coordinate")
+        if key is None:
             execution_time = time.time() - start_time
-            return (False, (0, 0), 0.0, f"未找到目标: {target_description}", execution_time)
+            suggest_text = f"，相似项: {suggestions}" if suggestions else ""
+            return (False, (0, 0), 0.0, f"未找到目标: {target_description}{suggest_text}", execution_time)
 
-        coordinates = coordinate_db[target_description]
-        confidence = 1.0
-        message = f"目标: {target_description}"
+        coordinates = coordinate_db[key]
+        message = f"目标: {key}"
         execution_time = time.time() - start_time
         return (True, coordinates, confidence, message, execution_time)
 
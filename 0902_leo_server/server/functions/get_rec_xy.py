@@ -1,9 +1,14 @@
 from typing import Dict, Tuple
+import logging
 import time
 
+from .target_index import resolve_target
+
+logger = logging.getLogger(__name__)
+
 def get_rec_xy(target_description: str, rec_db: Dict[str, Tuple[int, int, int, int]]):
     """
-    根据目标描述从识别坐标库中获取左上右下坐标。
+    根据目标描述从识别坐标库中获取左上右下坐标（描述不完全一致时模糊匹配，confidence 为匹配分数）。
     返回: (success, upleft, downright, confidence, message, execution_time)
     """
     start_time = time.time()
@@ -12,12 +17,13 @@ def get_rec_xy(target_description: str, rec_db: Dict[str, Tuple[int, int, int, i
             execution_time = time.time() - start_time
             return (False, (0, 0), (0, 0), 0.0, "目标描述为空", execution_time)
 
-        if target_description not in rec_db:
+        key, confidence, suggestions = resolve_target(target_description, rec_db, "rec")
+        if key is None:
             execution_time = time.time() - start_time
-            return (False, (0, 0), (0, 0), 0.0, f"未找到目标: {target_description}", execution_time)
+            suggest_text = f"，相似项: {suggestions}" if suggestions else ""
+            return (False, (0, 0), (0, 0), 0.0, f"未找到目标: {target_description}{suggest_text}", execution_time)
 
-        coordinates = rec_db[target_description]
-        print(coordinates)
+        coordinates = rec_db[key]
         # 支持 [x1, y1, x2, y2] 格式
         if len(coordinates) == 4:
             x1, y1, x2, y2 = coordinates
@@ -27,10 +33,9 @@ def get_rec_xy(target_description: str, rec_db: Dict[str, Tuple[int, int, int, i
             execution_time = time.time() - start_time
             return (False, (0, 0), (0, 0), 0.0, f"坐标格式错误: {coordinates}", execution_time)
 
-        confidence = 1.0
-        message = f"目标: {target_description}"
+        message = f"目标: {key}"
         execution_time = time.time() - start_time
-        print(True, upleft, downright, confidence, message, execution_time)
+        logger.debug("识别区域: %s upleft=%s downright=%s (%.4fs)", key, upleft, downright, execution_time)
         return (True, upleft, downright, confidence, message, execution_time)
 
     except Exception as e:
@@ -0,0 +1,137 @@
+"""
+日志配置：统一的分级结构化日志
+- 使用标准库 logging，调用方写 logger.info("xx %s", value) 延迟格式化，级别关闭时不产生格式化开销
+- QueueHandler + QueueListener：业务线程只负责入队，真正的 IO 在后台线程完成
+- 支持 JSON 输出与按模块设置级别
+- request_id（请求关联ID）通过 contextvars 传递，自动写入每条日志
+
+环境变量：
+    LOG_LEVEL=INFO                                  全局级别
+    LOG_LEVELS=functions.feishu=WARNING,uvicorn=INFO  按模块覆盖级别
+    LOG_JSON=1                                      输出 JSON 行
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Dict, Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_request_id() -> str:
+    """获取当前上下文的请求关联ID"""
+    return _request_id.get()
+
+
+def set_request_id(request_id: str) -> contextvars.Token:
+    """设置当前上下文的请求关联ID，返回 token 供 reset_request_id 使用"""
+    return _request_id.set(request_id or "-")
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    """恢复请求关联ID"""
+    _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """把当前请求关联ID写入日志记录（必须在入队前执行，后台线程拿不到上下文）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """单行 JSON 格式，附带 extra 字段"""
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _parse_module_levels(spec: str) -> Dict[str, str]:
+    levels: Dict[str, str] = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    json_output: Optional[bool] = None,
+    module_levels: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    初始化日志（可重复调用，后一次调用覆盖前一次配置）
+
+    Args:
+        level: 全局级别，默认读取 LOG_LEVEL，缺省 INFO
+        json_output: 是否输出 JSON，默认读取 LOG_JSON
+        module_levels: 按模块覆盖级别，默认读取 LOG_LEVELS
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    if json_output is None:
+        json_output = os.getenv("LOG_JSON", "").lower() in ("1", "true", "yes")
+    if module_levels is None:
+        module_levels = _parse_module_levels(os.getenv("LOG_LEVELS", ""))
+
+    if json_output:
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    if _listener:
+        _listener.stop()
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def _stop_listener() -> None:
+    if _listener:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
@@ -0,0 +1,211 @@
+"""
+服务端运行指标（Prometheus 文本格式，由 /metrics 接口输出）
+- 不依赖 prometheus_client，内置 Counter / Gauge / Histogram 三种类型，线程安全
+- 指标按 label 分组；label 取值应为有限集合（路由模板、用户名、prompt_name 等）
+
+已注册指标：
+    http_requests_total / http_request_duration_seconds / http_requests_in_progress   接口请求
+    helper_execution_seconds                                                      各 build_* / get_* 函数的 execution_time
+    ocr_queue_depth / ocr_inference_seconds / ocr_requests_total                   OCR
+    ocr_layout_cache_requests_total                                                OCR 文字布局缓存命中（同一截图不重复推理）
+    llm_requests_total / llm_request_duration_seconds / llm_tokens_total           LLM（按 prompt_name）
+    feishu_api_calls_total / feishu_rate_limited_total                             飞书开放平台调用
+    config_cache_requests_total                                                    用户配置缓存命中
+    target_resolve_total                                                           目标描述解析（精确 / 模糊 / 未命中）
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认耗时分桶（秒）：覆盖本地查表（毫秒级）到 LLM/OCR（数十秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0.0)]
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """分桶统计（累积桶 + sum + count）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [各桶计数(非累积)..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            data[index] += 1
+            data[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, data in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, data[:-1]):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(data[-1])}"
+            yield f"{self.name}_count{labels} {_format_value(cumulative)}"
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render_metrics() -> str:
+    """输出全部指标（Prometheus 文本格式）"""
+    return REGISTRY.render()
+
+
+# ===================== 指标定义 =====================
+
+HTTP_REQUESTS = Counter("http_requests_total", "接口请求数", ("route", "method", "status", "user"))
+# user 与 http_requests_total 相同（users/ 下不存在的用户记为 other），取值有限
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "接口处理耗时（秒）", ("route", "user"))
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "正在处理的请求数")
+
+HELPER_LATENCY = Histogram("helper_execution_seconds", "各处理函数返回的 execution_time（秒）", ("helper",))
+
+OCR_QUEUE_DEPTH = Gauge("ocr_queue_depth", "等待或正在执行的 OCR 请求数")
+OCR_INFERENCE = Histogram("ocr_inference_seconds", "OCR 模型推理耗时（秒）")
+OCR_REQUESTS = Counter("ocr_requests_total", "OCR 请求数", ("result",))
+OCR_LAYOUT_CACHE = Counter("ocr_layout_cache_requests_total", "OCR 文字布局缓存访问（result: hit / miss）", ("result",))
+
+LLM_REQUESTS = Counter("llm_requests_total", "LLM 调用次数（result: success / fallback）", ("prompt_name", "model", "result"))
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "LLM 调用耗时（秒）", ("prompt_name",))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM token 用量（type: prompt / completion）", ("prompt_name", "type"))
+
+FEISHU_CALLS = Counter("feishu_api_calls_total", "飞书开放平台接口调用次数", ("api", "method", "status"))
+FEISHU_RATE_LIMITED = Counter("feishu_rate_limited_total", "飞书接口限流次数", ("api",))
+
+CONFIG_CACHE = Counter("config_cache_requests_total", "用户配置缓存访问（result: hit / miss）", ("result",))
+
+TARGET_RESOLVE = Counter("target_resolve_total", "目标描述解析（result: exact / fuzzy / miss）", ("kind", "result"))
@@ -0,0 +1,276 @@
+"""
+常驻 OCR 引擎与文字布局缓存
+- rec/ocr.py 只加载一次（模块内的 PaddleOCR 模型随之常驻），不再每次请求重新执行模块
+- 推理串行执行（同一模型实例不保证线程安全）
+- 识别结果整理为文字框列表 [{"text", "score", "box": [x1, y1, x2, y2]}]，按截图内容 sha1 缓存（LRU），
+  同一屏幕的重复识别/点击直接使用缓存，不再重新推理
+- find_text：单次遍历为所有文字框打分，返回最佳匹配的中心坐标与相似建议
+- split_by_regions：一次识别的结果按多个区域拆分（/api/rec/batch，多区域只推理一次）
+"""
+
+import base64
+import difflib
+import hashlib
+import importlib.util
+import json
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import OCR_INFERENCE, OCR_LAYOUT_CACHE
+from .target_index import normalize
+
+logger = logging.getLogger(__name__)
+
+# 布局缓存条数（每条为一张截图的文字框列表）
+LAYOUT_CACHE_SIZE = 64
+
+_ocr_module = None
+_ocr_module_lock = threading.Lock()
+_inference_lock = threading.Lock()
+_layout_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+# 与 start.py 的路径逻辑一致：server 目录向上 3 层的 rec 目录
+REC_DIR = SERVER_DIR.parent.parent.parent / "rec"
+TEMP_OUTPUT_DIR = SERVER_DIR / "temp_ocr_output"
+
+
+class OCRError(Exception):
+    """OCR 识别失败（消息可直接返回给客户端）"""
+
+
+def get_ocr_module():
+    """加载 rec/ocr.py（进程内只加载一次）"""
+    global _ocr_module
+    if _ocr_module is None:
+        with _ocr_module_lock:
+            if _ocr_module is None:
+                ocr_path = REC_DIR / "ocr.py"
+                spec = importlib.util.spec_from_file_location("ocr", ocr_path)
+                if spec is None or spec.loader is None:
+                    raise RuntimeError(f"无法加载OCR模块: {ocr_path}")
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                _ocr_module = module
+                logger.info("🔤 OCR模块已加载: %s", ocr_path)
+    return _ocr_module
+
+
+def decode_image(screenshot_b64: str) -> bytes:
+    """base64 截图解码（失败抛 OCRError）"""
+    try:
+        return base64.b64decode(screenshot_b64)
+    except Exception as e:
+        raise OCRError(f"base64解码错误 - {e}")
+
+
+def _to_box(points: Any) -> Optional[List[int]]:
+    """四点多边形 / [x1, y1, x2, y2] 统一为外接矩形 [x1, y1, x2, y2]"""
+    try:
+        if len(points) == 4 and all(isinstance(v, (int, float)) for v in points):
+            return [int(v) for v in points]
+        xs = [float(p[0]) for p in points]
+        ys = [float(p[1]) for p in points]
+        return [int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))]
+    except Exception:
+        return None
+
+
+def parse_ocr_output(ocr_data: Any) -> List[Dict[str, Any]]:
+    """
+    将 ocr_recognize 输出的 JSON 整理为文字框列表（兼容两种结构）
+    - dict: rec_texts / rec_scores / rec_boxes 或 rec_polys（可能包在 "res" 中）
+    - list: [{"text", "score"/"confidence", "box"/"bbox"}]
+    """
+    if isinstance(ocr_data, dict) and "res" in ocr_data and "rec_texts" not in ocr_data:
+        ocr_data = ocr_data["res"]
+
+    layout: List[Dict[str, Any]] = []
+    if isinstance(ocr_data, dict) and "rec_texts" in ocr_data:
+        texts = ocr_data.get("rec_texts") or []
+        scores = ocr_data.get("rec_scores") or []
+        boxes = ocr_data.get("rec_boxes") or ocr_data.get("rec_polys") or ocr_data.get("dt_polys") or []
+        for i, text in enumerate(texts):
+            layout.append({
+                "text": text,
+                "score": round(float(scores[i]), 4) if i < len(scores) else None,
+                "box": _to_box(boxes[i]) if i < len(boxes) else None,
+            })
+    elif isinstance(ocr_data, list):
+        for item in ocr_data:
+            if not isinstance(item, dict) or not item.get("text"):
+                continue
+            score = item.get("score", item.get("confidence"))
+            points = item.get("box") or item.get("bbox")
+            layout.append({
+                "text": item["text"],
+                "score": round(float(score), 4) if score is not None else None,
+                "box": _to_box(points) if points else None,
+            })
+    return layout
+
+
+def _run_ocr(image_bytes: bytes, digest: str) -> List[Dict[str, Any]]:
+    """保存截图（便于调试）并调用 ocr_recognize，返回文字框列表"""
+    try:
+        ocr_module = get_ocr_module()
+    except Exception as e:
+        raise OCRError(f"加载OCR模块失败 - {e}")
+
+    TEMP_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    image_path = TEMP_OUTPUT_DIR / f"received_screenshot_{timestamp}_{digest[:8]}.png"
+    try:
+        with open(image_path, "wb") as f:
+            f.write(image_bytes)
+        logger.debug("截图已保存到: %s", image_path)
+    except Exception as e:
+        raise OCRError(f"保存截图失败 - {e}")
+
+    inference_start = time.perf_counter()
+    try:
+        with _inference_lock:
+            ocr_module.ocr_recognize(str(image_path), str(TEMP_OUTPUT_DIR))
+    except Exception as e:
+        raise OCRError(f"OCR运行异常 - {e}")
+    finally:
+        OCR_INFERENCE.observe(time.perf_counter() - inference_start)
+
+    json_file = TEMP_OUTPUT_DIR / f"{image_path.stem}.json"
+    if not json_file.exists():
+        raise OCRError("未生成识别结果文件")
+    try:
+        with open(json_file, "r", encoding="utf-8") as f:
+            return parse_ocr_output(json.load(f))
+    except Exception as e:
+        raise OCRError(f"结果文件解析失败 - {e}")
+    finally:
+        try:
+            json_file.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def recognize_layout(image_bytes: bytes) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    识别截图中的全部文字框（按截图内容缓存）
+
+    Args:
+        image_bytes: 截图 PNG 字节
+
+    Returns:
+        tuple: (文字框列表, 是否命中缓存)；失败抛 OCRError
+    """
+    digest = hashlib.sha1(image_bytes).hexdigest()
+    with _layout_cache_lock:
+        cached = _layout_cache.get(digest)
+        if cached is not None:
+            _layout_cache.move_to_end(digest)
+    if cached is not None:
+        OCR_LAYOUT_CACHE.inc(result="hit")
+        return cached, True
+
+    OCR_LAYOUT_CACHE.inc(result="miss")
+    layout = _run_ocr(image_bytes, digest)
+    with _layout_cache_lock:
+        _layout_cache[digest] = layout
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return layout, False
+
+
+def _text_similarity(target: str, text: str) -> float:
+    """文本相似度（0~1）：SequenceMatcher 比例，目标完整出现在文字框中时加分"""
+    if not target or not text:
+        return 0.0
+    similarity = difflib.SequenceMatcher(None, target, text).ratio()
+    if target in text:
+        similarity = max(similarity, 0.8 + 0.2 * len(target) / len(text))
+    return similarity
+
+
+def find_text(
+    layout: List[Dict[str, Any]],
+    target_text: str,
+    min_similarity: float = 0.3,
+) -> Tuple[bool, Optional[Tuple[int, int]], float, str, Optional[List[str]]]:
+    """
+    在文字框中查找目标文字（单次遍历打分，取最高分）
+
+    Args:
+        layout: recognize_layout 返回的文字框列表
+        target_text: 目标文字
+        min_similarity: 最低相似度
+
+    Returns:
+        tuple: (success, 中心坐标 (x, y), 相似度, 消息, 相似建议)
+    """
+    target = normalize(target_text)
+    scored = []
+    for item in layout:
+        if not item.get("box"):
+            continue
+        similarity = _text_similarity(target, normalize(item["text"]))
+        scored.append((similarity, item.get("score") or 0.0, item))
+    if not scored:
+        return False, None, 0.0, "OCR未能识别到任何文本", None
+
+    scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+    similarity, ocr_score, best = scored[0]
+    if similarity < min_similarity:
+        suggestions = list(dict.fromkeys(s[2]["text"] for s in scored[:3] if s[0] > 0)) or None
+        return False, None, 0.0, f"未找到与'{target_text}'相似的文本 (最低相似度: {min_similarity})", suggestions
+
+    x1, y1, x2, y2 = best["box"]
+    center = ((x1 + x2) // 2, (y1 + y2) // 2)
+    message = f"找到文字'{best['text']}' (相似度: {similarity:.3f}, OCR置信度: {ocr_score:.3f})"
+    return True, center, round(similarity, 4), message, None
+
+
+def png_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """从 PNG 头读取 (宽, 高)，非 PNG 返回 None"""
+    if len(image_bytes) < 24 or image_bytes[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+    return struct.unpack(">II", image_bytes[16:24])
+
+
+def split_by_regions(
+    layout: List[Dict[str, Any]],
+    regions: Dict[str, List[int]],
+    area: List[int],
+    image_size: Tuple[int, int],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    按文字框中心点把识别结果分配到各区域
+
+    Args:
+        layout: recognize_layout 返回的文字框列表（截图像素坐标）
+        regions: {名称: [x1, y1, x2, y2]}（屏幕坐标）
+        area: 截图对应的屏幕区域 [x1, y1, x2, y2]
+        image_size: 截图像素尺寸 (宽, 高)（高DPI 下为屏幕区域的倍数）
+
+    Returns:
+        dict: {名称: [文字框, ...]}，每个区域内保持识别顺序
+    """
+    ax1, ay1, ax2, ay2 = area
+    scale_x = image_size[0] / float(ax2 - ax1) if ax2 > ax1 else 1.0
+    scale_y = image_size[1] / float(ay2 - ay1) if ay2 > ay1 else 1.0
+    result: Dict[str, List[Dict[str, Any]]] = {name: [] for name in regions}
+    for item in layout:
+        box = item.get("box")
+        if not box:
+            continue
+        cx = ax1 + (box[0] + box[2]) / 2.0 / scale_x
+        cy = ay1 + (box[1] + box[3]) / 2.0 / scale_y
+        for name, (x1, y1, x2, y2) in regions.items():
+            if x1 <= cx <= x2 and y1 <= cy <= y2:
+                result[name].append(item)
+                break
+    return result
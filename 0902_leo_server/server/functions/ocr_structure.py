@@ -0,0 +1,205 @@
+"""
+OCR 结果结构化
+- group_rows：按阅读顺序把文字框分行（纵向中心距离小于行高一半视为同一行），行内从左到右
+- assign_columns：按横向重叠把各行的单元格对齐到列（表格类区域，如粉丝画像面板）
+- extract_key_values：从行/列中提取紧凑的 键: 值（“标签：值”、同行“标签 值”、上下两行“表头/数值”）
+- structure_layout：汇总为接口返回的结构（lines / rows / key_values / text）
+
+输入均为 ocr_engine.recognize_layout 返回的文字框列表 [{"text", "score", "box": [x1, y1, x2, y2]}]。
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+# 同一行判定：纵向中心距离 <= 行高中位数 * ROW_TOLERANCE
+ROW_TOLERANCE = 0.5
+# 同一列判定：横向重叠 >= 较窄单元格宽度 * COLUMN_OVERLAP
+COLUMN_OVERLAP = 0.5
+
+# 数值类文本（60%、1.2万、+35、3,450 等），以及范围（18-24岁、1万~5万 等）
+_NUMBER = r"[\d.,，]+\s*(?:%|％|万|w|W|k|K|亿|岁)?"
+_VALUE_PATTERN = re.compile(rf"^[+\-]?{_NUMBER}(?:\s*[-~～—至]\s*{_NUMBER})?$")
+_KV_SEPARATOR = re.compile(r"[:：]")
+
+FORMATS = ("text", "structured", "kv")
+
+
+def is_value(text: str) -> bool:
+    """是否为数值类文本"""
+    return bool(_VALUE_PATTERN.match(text.strip()))
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2.0
+
+
+def group_rows(layout: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    按阅读顺序分行
+
+    Args:
+        layout: 文字框列表
+
+    Returns:
+        list: [[文字框, ...], ...]，行从上到下、行内从左到右；没有坐标的文字框各自成行排在最后
+    """
+    boxed = [item for item in layout if item.get("box")]
+    unboxed = [item for item in layout if not item.get("box")]
+    if not boxed:
+        return [[item] for item in unboxed]
+
+    tolerance = _median([item["box"][3] - item["box"][1] for item in boxed]) * ROW_TOLERANCE
+    rows: List[List[Dict[str, Any]]] = []
+    row_centers: List[float] = []
+    for item in sorted(boxed, key=lambda i: (i["box"][1] + i["box"][3]) / 2.0):
+        cy = (item["box"][1] + item["box"][3]) / 2.0
+        if rows and abs(cy - row_centers[-1]) <= tolerance:
+            rows[-1].append(item)
+            row_centers[-1] += (cy - row_centers[-1]) / len(rows[-1])
+        else:
+            rows.append([item])
+            row_centers.append(cy)
+    for row in rows:
+        row.sort(key=lambda i: i["box"][0])
+    return rows + [[item] for item in unboxed]
+
+
+def assign_columns(rows: List[List[Dict[str, Any]]]) -> List[List[int]]:
+    """
+    按横向重叠把单元格对齐到列
+
+    Args:
+        rows: group_rows 的结果
+
+    Returns:
+        list: 与 rows 形状一致的列号（从左到右编号，没有坐标的单元格为 -1）
+    """
+    spans: List[List[float]] = []  # 每列的 [x1, x2]
+    cell_span: Dict[int, int] = {}
+    for row in rows:
+        for item in row:
+            box = item.get("box")
+            if not box:
+                continue
+            x1, x2 = box[0], box[2]
+            best, best_overlap = None, 0.0
+            for index, (cx1, cx2) in enumerate(spans):
+                overlap = min(x2, cx2) - max(x1, cx1)
+                if overlap >= COLUMN_OVERLAP * max(1.0, min(x2 - x1, cx2 - cx1)) and overlap > best_overlap:
+                    best, best_overlap = index, overlap
+            if best is None:
+                spans.append([x1, x2])
+                best = len(spans) - 1
+            else:
+                spans[best] = [min(spans[best][0], x1), max(spans[best][1], x2)]
+            cell_span[id(item)] = best
+
+    order = sorted(range(len(spans)), key=lambda i: spans[i][0])
+    rank = {span_index: column for column, span_index in enumerate(order)}
+    return [[rank[cell_span[id(item)]] if id(item) in cell_span else -1 for item in row] for row in rows]
+
+
+def _put(result: Dict[str, str], key: str, value: str) -> None:
+    """写入键值（重复的键加序号）"""
+    key, value = key.strip(), value.strip()
+    if not key or not value:
+        return
+    name, n = key, 2
+    while name in result:
+        name, n = f"{key}_{n}", n + 1
+    result[name] = value
+
+
+def extract_key_values(rows: List[List[Dict[str, Any]]], columns: Optional[List[List[int]]] = None) -> Dict[str, str]:
+    """
+    提取键值对（按阅读顺序）
+    - 单元格内“标签：值”
+    - 同一行“标签 数值 标签 数值 ...”，或只有两个单元格的“标签 值”（下一行是数值行时不适用，两个单元格是表头）
+    - 上一行全是标签、下一行全是数值时按列配对（表头 / 数据行）
+
+    Args:
+        rows: group_rows 的结果
+        columns: assign_columns 的结果（默认现算）
+
+    Returns:
+        dict: {键: 值}
+    """
+    columns = columns if columns is not None else assign_columns(rows)
+    texts = [[item["text"].strip() for item in row] for row in rows]
+    result: Dict[str, str] = {}
+    used = set()
+
+    for r, row in enumerate(texts):
+        if r in used:
+            continue
+        # 表头行 + 数值行
+        if (
+            r + 1 < len(texts) and r + 1 not in used
+            and all(not is_value(t) and not _KV_SEPARATOR.search(t) for t in row)
+            and all(is_value(t) for t in texts[r + 1])
+        ):
+            headers = dict(zip(columns[r], row))
+            for column, value in zip(columns[r + 1], texts[r + 1]):
+                if column in headers:
+                    _put(result, headers[column], value)
+            used.update((r, r + 1))
+            continue
+
+        # 下一行全是数值时，本行的两个标签是表头而不是“标签 值”
+        next_is_values = r + 1 < len(texts) and bool(texts[r + 1]) and all(is_value(t) for t in texts[r + 1])
+        c = 0
+        while c < len(row):
+            text = row[c]
+            parts = _KV_SEPARATOR.split(text, maxsplit=1)
+            if len(parts) == 2 and parts[0].strip() and parts[1].strip():
+                _put(result, parts[0], parts[1])
+                c += 1
+            elif c + 1 < len(row) and not is_value(text) and (is_value(row[c + 1]) or (len(row) == 2 and not next_is_values)):
+                _put(result, text.rstrip(":："), row[c + 1])
+                c += 2
+            else:
+                c += 1
+    return result
+
+
+def structure_layout(layout: List[Dict[str, Any]], fmt: str = "structured") -> Dict[str, Any]:
+    """
+    整理为接口返回的结构
+
+    Args:
+        layout: 文字框列表
+        fmt: structured（行、文字框、置信度、列号与键值）或 kv（只返回键值与紧凑文本）
+
+    Returns:
+        dict:
+            structured: {"text", "lines": [{"text", "score", "box", "row", "col"}], "rows": [行文本], "key_values"}
+            kv: {"text": "键: 值" 逐行, "key_values"}
+    """
+    rows = group_rows(layout)
+    columns = assign_columns(rows)
+    key_values = extract_key_values(rows, columns)
+    if fmt == "kv":
+        return {
+            "text": "\n".join(f"{k}: {v}" for k, v in key_values.items()),
+            "key_values": key_values,
+        }
+
+    lines = []
+    for r, row in enumerate(rows):
+        for item, column in zip(row, columns[r]):
+            lines.append({
+                "text": item["text"],
+                "score": item.get("score"),
+                "box": item.get("box"),
+                "row": r,
+                "col": column,
+            })
+    row_texts = [" ".join(item["text"] for item in row) for row in rows]
+    return {
+        "text": "\n".join(row_texts),
+        "lines": lines,
+        "rows": row_texts,
+        "key_values": key_values,
+    }
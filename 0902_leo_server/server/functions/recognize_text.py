@@ -1,103 +1,73 @@
-from pathlib import Path
-from datetime import datetime
-import importlib.util
-import base64
-import json
-import os
+import logging
+from typing import Any, Dict
 
-def _load_ocr_module_and_server_dir():
-    """
-    动态加载 rec/ocr.py 模块，并返回 (ocr_module, server_dir)
-    为与现有 start.py 的路径逻辑保持一致，这里计算 server_dir 后向上 3 层寻找 rec 目录。
-    """
-    server_dir = Path(__file__).resolve().parent.parent
-    rec_dir = server_dir.parent.parent.parent / "rec"
-    ocr_path = rec_dir / "ocr.py"
+from .metrics import OCR_QUEUE_DEPTH, OCR_REQUESTS
+from .ocr_engine import OCRError, decode_image, recognize_layout
+from .ocr_structure import structure_layout
 
-    spec = importlib.util.spec_from_file_location("ocr", ocr_path)
-    ocr_module = importlib.util.module_from_spec(spec)
-    if spec.loader is None:
-        raise RuntimeError(f"无法加载OCR模块: {ocr_path}")
-    spec.loader.exec_module(ocr_module)
-    return ocr_module, server_dir
+logger = logging.getLogger(__name__)
 
 def recognize_text_from_base64(screenshot_b64: str, target_description: str) -> str:
     """
     从 base64 截图识别文本，返回识别到的字符串（与现有客户端兼容）。
-    - 保存截图到文件（便于调试）
-    - 调用 rec/ocr.py 的 ocr_recognize(image_path, output_dir)
-    - 读取输出 JSON，提取 rec_texts 或 list[text]
-    - 返回 '\n'.join(texts) 或错误描述字符串
+    同时记录 OCR 指标：排队/执行中的请求数、推理耗时、成功/失败次数。
     """
+    OCR_QUEUE_DEPTH.inc()
     try:
-        print(f"接收到截图数据长度: {len(screenshot_b64)} 字符")
-        print(f"识别目标: {target_description}")
-
-        # 解码并保存截图
-        try:
-            image_bytes = base64.b64decode(screenshot_b64)
-        except Exception as e:
-            return f"OCR识别失败: base64解码错误 - {e}"
-
-        server_dir: Path
-        try:
-            ocr_module, server_dir = _load_ocr_module_and_server_dir()
-        except Exception as e:
-            return f"OCR识别失败: 加载OCR模块失败 - {e}"
+        text = _recognize_text_from_base64(screenshot_b64, target_description)
+    finally:
+        OCR_QUEUE_DEPTH.dec()
+    OCR_REQUESTS.inc(result="error" if text.startswith("OCR识别失败") else "ok")
+    return text
 
-        # 准备输出目录（提前创建，确保目录存在）
-        temp_output_dir = server_dir / "temp_ocr_output"
-        temp_output_dir.mkdir(parents=True, exist_ok=True)
+def _recognize_text_from_base64(screenshot_b64: str, target_description: str) -> str:
+    """
+    - 解码截图，交给常驻 OCR 引擎识别（截图保存在 temp_ocr_output 便于调试；同一截图命中布局缓存）
+    - 返回 '\n'.join(texts) 或错误描述字符串
+    """
+    try:
+        logger.debug("接收到截图数据长度: %s 字符", len(screenshot_b64))
+        logger.debug("识别目标: %s", target_description)
 
-        # 保存截图到temp_ocr_output目录（带时间戳，便于调试）
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        image_path = temp_output_dir / f"received_screenshot_{timestamp}.png"
         try:
-            with open(image_path, "wb") as f:
-                f.write(image_bytes)
-            print(f"截图已保存到: {image_path}")
-        except Exception as e:
-            return f"OCR识别失败: 保存截图失败 - {e}"
-
-        # 输出目录已在上面创建
+            layout, cached = recognize_layout(decode_image(screenshot_b64))
+        except OCRError as e:
+            return f"OCR识别失败: {e}"
 
-        # 运行OCR识别
-        try:
-            ocr_module.ocr_recognize(str(image_path), str(temp_output_dir))
-        except Exception as e:
-            return f"OCR识别失败: OCR运行异常 - {e}"
+        recognized_texts = [item["text"] for item in layout]
+        final_text = "\n".join(recognized_texts) if recognized_texts else "未识别到文字内容"
+        logger.info("OCR识别完成: target=%s, %s 行%s", target_description, len(recognized_texts), "（缓存）" if cached else "")
+        logger.debug("OCR识别结果: %s", final_text)
+        return final_text
 
-        # 读取识别结果
-        base_name = image_path.stem
-        json_file = temp_output_dir / f"{base_name}.json"
-        if not json_file.exists():
-            return "OCR识别失败: 未生成识别结果文件"
+    except Exception as e:
+        return f"OCR识别失败: {e}"
 
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                ocr_data = json.load(f)
-        except Exception as e:
-            return f"OCR识别失败: 结果文件解析失败 - {e}"
-        finally:
-            # 清理json临时文件
-            try:
-                json_file.unlink(missing_ok=True)
-            except Exception:
-                pass
+def recognize_structured(screenshot_b64: str, target_description: str, fmt: str = "structured") -> Dict[str, Any]:
+    """
+    从 base64 截图识别文本，返回结构化结果（行、文字框、置信度、行列分组、键值对）。
+    与 recognize_text_from_base64 不同，失败时抛出 OCRError，不再把错误当作识别文本返回。
 
-        # 提取文字内容（兼容两种结构）
-        recognized_texts = []
-        if isinstance(ocr_data, dict) and "rec_texts" in ocr_data:
-            recognized_texts = ocr_data["rec_texts"]
-        elif isinstance(ocr_data, list):
-            for item in ocr_data:
-                text = item.get("text") if isinstance(item, dict) else None
-                if text:
-                    recognized_texts.append(text)
+    Args:
+        screenshot_b64: base64 截图
+        target_description: 识别目标描述（用于日志）
+        fmt: structured 或 kv（只返回紧凑键值）
 
-        final_text = "\n".join(recognized_texts) if recognized_texts else "未识别到文字内容"
-        print(f"OCR识别结果: {final_text}")
-        return final_text
+    Returns:
+        dict: ocr_structure.structure_layout 的结果，附加 cached
+    """
+    OCR_QUEUE_DEPTH.inc()
+    try:
+        layout, cached = recognize_layout(decode_image(screenshot_b64))
+        OCR_REQUESTS.inc(result="ok")
+    except OCRError:
+        OCR_REQUESTS.inc(result="error")
+        raise
+    finally:
+        OCR_QUEUE_DEPTH.dec()
 
-    except Exception as e:
-        return f"OCR识别失败: {e}"
\ No newline at end of file
+    result = structure_layout(layout, fmt)
+    result["cached"] = cached
+    logger.info("OCR结构化识别完成: target=%s, %s 行, %s 个键值%s",
+                target_description, len(layout), len(result["key_values"]), "（缓存）" if cached else "")
+    return result
@@ -0,0 +1,216 @@
+"""
+目标描述模糊匹配索引
+- 对配置中的目标描述（coordinate_db / rec_db / scroll_db / drag_db / keyboard_operations_db 的键）预先计算字符 1/2/3-gram（中文描述短，单字也有区分度）
+- 安装 pypinyin 时额外建立拼音 n-gram，同音字、错别字也能命中
+- 倒排索引：查询只遍历与查询共享 n-gram 的候选，单次匹配亚毫秒级
+- 索引按配置对象缓存：用户配置按 mtime 缓存，文件未变化时为同一对象，变化后自动重建
+
+匹配分数为 Dice 系数（0~1），包含关系额外加分；分数 >= 自动采纳阈值、且领先第二名至少
+AUTO_ACCEPT_MARGIN 时直接使用最佳匹配，否则（包括并列）只返回候选建议。
+阈值通过环境变量 TARGET_AUTO_ACCEPT 配置（默认 0.8，设为 1 关闭模糊采纳）。
+"""
+
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .metrics import TARGET_RESOLVE
+
+try:
+    from pypinyin import lazy_pinyin
+    PINYIN_AVAILABLE = True
+except Exception:
+    lazy_pinyin = None
+    PINYIN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+AUTO_ACCEPT_ENV = "TARGET_AUTO_ACCEPT"
+DEFAULT_AUTO_ACCEPT = 0.8
+# 自动采纳时最佳匹配至少领先第二名的分数（点击/滚动/拖拽不能作用在猜测的目标上）
+AUTO_ACCEPT_MARGIN = 0.1
+# 候选建议的最低分数（与原 difflib cutoff 相当）
+SUGGEST_CUTOFF = 0.5
+# 拼音匹配分数折扣（字面一致优先于读音一致）
+PINYIN_WEIGHT = 0.9
+# 缓存的索引数量上限（每个用户每类配置一个）
+MAX_CACHED_INDEXES = 512
+
+_STRIP_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def get_auto_accept() -> float:
+    """读取自动采纳阈值"""
+    try:
+        return float(os.getenv(AUTO_ACCEPT_ENV, DEFAULT_AUTO_ACCEPT))
+    except ValueError:
+        return DEFAULT_AUTO_ACCEPT
+
+
+def normalize(text: str) -> str:
+    """全角转半角、小写、去掉空白与标点"""
+    return _STRIP_PATTERN.sub("", unicodedata.normalize("NFKC", str(text)).lower())
+
+
+def _to_pinyin(text: str) -> str:
+    return "".join(lazy_pinyin(text)) if PINYIN_AVAILABLE else ""
+
+
+def _ngrams(text: str, unigrams: bool = True) -> Set[str]:
+    """1/2/3-gram；拼音不取单字母（区分度太低），不足 3 个字母时才补充"""
+    grams: Set[str] = set()
+    for n in (2, 3):
+        grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+    if unigrams or len(text) < 3:
+        grams.update(text)
+    return grams
+
+
+def _dice(overlap: int, size_a: int, size_b: int) -> float:
+    return 2.0 * overlap / (size_a + size_b) if size_a + size_b else 0.0
+
+
+class TargetIndex:
+    """单个配置字典的目标描述索引"""
+
+    def __init__(self, keys: List[str]):
+        self.keys: List[str] = [str(k) for k in keys]
+        self.norm_keys: List[str] = []
+        self.normalized: Dict[str, str] = {}
+        self.char_grams: List[Set[str]] = []
+        self.pinyin_grams: List[Set[str]] = []
+        self.char_postings: Dict[str, List[int]] = {}
+        self.pinyin_postings: Dict[str, List[int]] = {}
+
+        for i, key in enumerate(self.keys):
+            norm = normalize(key)
+            self.norm_keys.append(norm)
+            self.normalized.setdefault(norm, key)
+            grams = _ngrams(norm)
+            self.char_grams.append(grams)
+            for g in grams:
+                self.char_postings.setdefault(g, []).append(i)
+            pinyin_grams = _ngrams(_to_pinyin(norm), unigrams=False) if PINYIN_AVAILABLE else set()
+            self.pinyin_grams.append(pinyin_grams)
+            for g in pinyin_grams:
+                self.pinyin_postings.setdefault(g, []).append(i)
+
+    def _score_postings(self, grams: Set[str], postings: Dict[str, List[int]], key_grams: List[Set[str]], weight: float, scores: Dict[int, float]) -> None:
+        overlaps: Dict[int, int] = {}
+        for g in grams:
+            for i in postings.get(g, ()):
+                overlaps[i] = overlaps.get(i, 0) + 1
+        for i, overlap in overlaps.items():
+            score = weight * _dice(overlap, len(grams), len(key_grams[i]))
+            if score > scores.get(i, 0.0):
+                scores[i] = score
+
+    def rank(self, query: str, limit: int = 3, cutoff: float = SUGGEST_CUTOFF) -> List[Tuple[str, float]]:
+        """
+        按相似度排序返回候选
+
+        Args:
+            query: 目标描述
+            limit: 最多返回个数
+            cutoff: 最低分数
+
+        Returns:
+            list: [(配置中的键, 分数)]，分数从高到低
+        """
+        norm = normalize(query)
+        if not norm:
+            return []
+        exact = self.normalized.get(norm)
+        if exact is not None:
+            return [(exact, 1.0)]
+
+        scores: Dict[int, float] = {}
+        self._score_postings(_ngrams(norm), self.char_postings, self.char_grams, 1.0, scores)
+        if PINYIN_AVAILABLE:
+            self._score_postings(_ngrams(_to_pinyin(norm), unigrams=False), self.pinyin_postings, self.pinyin_grams, PINYIN_WEIGHT, scores)
+
+        # 包含关系（如“点击搜索框” vs “搜索框”）：按长度比例加分
+        for i in list(scores):
+            short, long_ = sorted((norm, self.norm_keys[i]), key=len)
+            if short and short in long_:
+                scores[i] = max(scores[i], 0.5 + 0.5 * len(short) / len(long_))
+
+        ranked = sorted(
+            ((self.keys[i], round(s, 4)) for i, s in scores.items() if s >= cutoff),
+            key=lambda item: (-item[1], abs(len(item[0]) - len(query))),
+        )
+        return ranked[:limit]
+
+
+_INDEX_CACHE: "OrderedDict[int, Tuple[Dict[str, Any], TargetIndex]]" = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def get_index(db: Dict[str, Any]) -> TargetIndex:
+    """
+    获取配置字典对应的索引（按对象缓存，配置文件变化后为新对象，自动重建）
+
+    Args:
+        db: 目标描述 -> 配置 的字典
+
+    Returns:
+        TargetIndex
+    """
+    key = id(db)
+    with _INDEX_CACHE_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        # 缓存中持有 db 引用，id 不会被复用；仍校验对象与长度，防止调用方原地修改
+        if cached and cached[0] is db and len(cached[1].keys) == len(db):
+            _INDEX_CACHE.move_to_end(key)
+            return cached[1]
+    index = TargetIndex(list(db.keys()))
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[key] = (db, index)
+        while len(_INDEX_CACHE) > MAX_CACHED_INDEXES:
+            _INDEX_CACHE.popitem(last=False)
+    logger.debug("🔎 目标索引已构建: %s 个目标", len(index.keys))
+    return index
+
+
+def resolve_target(
+    query: str,
+    db: Dict[str, Any],
+    kind: str,
+    auto_accept: Optional[float] = None,
+) -> Tuple[Optional[str], float, List[str]]:
+    """
+    解析目标描述：精确命中直接返回；否则用索引查找最佳匹配，分数达到阈值且明显领先第二名时采纳
+
+    Args:
+        query: 请求中的目标描述
+        db: 目标描述 -> 配置 的字典
+        kind: 配置类别（coordinate / rec / scroll / drag / keyboard，用于指标）
+        auto_accept: 自动采纳阈值（None 时读取 TARGET_AUTO_ACCEPT）
+
+    Returns:
+        tuple: (命中的键或 None, 分数, 候选建议)
+    """
+    if query in db:
+        TARGET_RESOLVE.inc(kind=kind, result="exact")
+        return query, 1.0, []
+    if not query or not db:
+        TARGET_RESOLVE.inc(kind=kind, result="miss")
+        return None, 0.0, []
+
+    threshold = get_auto_accept() if auto_accept is None else auto_accept
+    ranked = get_index(db).rank(query)
+    suggestions = [key for key, _ in ranked]
+    if ranked and ranked[0][1] >= threshold:
+        best, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if score - runner_up >= AUTO_ACCEPT_MARGIN:
+            TARGET_RESOLVE.inc(kind=kind, result="fuzzy")
+            logger.info("🔎 模糊匹配[%s]: %s -> %s (%.2f)", kind, query, best, score)
+            return best, score, suggestions
+        logger.info("🔎 模糊匹配不唯一[%s]: %s -> %s", kind, query, ranked[:3])
+    TARGET_RESOLVE.inc(kind=kind, result="miss")
+    return None, ranked[0][1] if ranked else 0.0, suggestions
@@ -0,0 +1,233 @@
+"""
+参考图模板匹配定位（替代依赖固定分辨率的坐标点击）
+- 参考图放在 users/{user}/ref/ 下，启动时预加载并解码为灰度图缓存（按 mtime 校验，文件更新后自动重新加载）
+- 多尺度 + 图像金字塔：先在 1/2 分辨率上粗搜所有尺度，再在原分辨率上只对最佳位置附近做精修
+- 搜索范围：template_db 中的 roi，或 coordinate_db 中同名坐标附近的区域；都没有时搜索整张截图
+
+operation.json 配置示例:
+    "template_db": {
+        "搜索按钮": {"file": "search.png", "roi": [1200, 60, 1500, 140], "threshold": 0.8, "base_resolution": [1920, 1080]}
+    }
+    - file: 参考图文件名（默认 {名称}.png）
+    - roi: 搜索区域（base_resolution 下的坐标，可选）
+    - base_resolution: 截取参考图时的屏幕像素分辨率（可选，默认与当前截图相同）
+
+客户端只截取屏幕的一部分时同时上传 region（截图对应的屏幕区域）与 screen_size（屏幕大小），
+roi 先换算到整屏像素坐标，再减去区域偏移。
+
+依赖 opencv-python 与 numpy，未安装时接口返回失败信息。
+"""
+
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except Exception:
+    cv2 = None
+    np = None
+    CV2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REF_DIR_NAME = "ref"
+DEFAULT_THRESHOLD = 0.8
+# coordinate_db 只有点坐标时，搜索区域为该点周围的范围（base_resolution 下的像素）
+POINT_ROI_MARGIN = 150
+# 相对预期尺度的搜索范围与步数
+SCALE_RANGE = (0.75, 1.33)
+SCALE_STEPS = 9
+# 金字塔粗搜的缩放比例；模板缩小后短边小于该值时跳过粗搜
+PYRAMID_FACTOR = 0.5
+MIN_PYRAMID_SIDE = 12
+
+# 参考图名称只能是文件名主干（不能包含路径分隔符或 ..）
+_TEMPLATE_NAME_PATTERN = re.compile(r"^[^/\\:]+$")
+
+_template_cache: Dict[str, Tuple[int, Any]] = {}
+_template_cache_lock = threading.Lock()
+
+
+def _load_gray(path: Path) -> Optional[Any]:
+    """读取并缓存参考图灰度数据（按 mtime 校验）"""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = str(path)
+    cached = _template_cache.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    # cv2.imread 不支持中文路径，先读字节再解码
+    data = np.frombuffer(path.read_bytes(), dtype=np.uint8)
+    gray = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        logger.warning("参考图解码失败: %s", path)
+        return None
+    with _template_cache_lock:
+        _template_cache[key] = (mtime, gray)
+    return gray
+
+
+def preload_templates(users_root: Path) -> int:
+    """
+    预加载所有用户的参考图（启动时在后台线程调用）
+
+    Args:
+        users_root: 用户配置根目录（users/）
+
+    Returns:
+        int: 加载的参考图数量
+    """
+    if not CV2_AVAILABLE:
+        return 0
+    count = 0
+    for path in sorted(Path(users_root).glob(f"*/{REF_DIR_NAME}/*")):
+        if path.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp") and _load_gray(path) is not None:
+            count += 1
+    if count:
+        logger.info("🖼️ 已预加载 %s 张参考图", count)
+    return count
+
+
+def is_valid_template_name(name: str) -> bool:
+    """参考图名称是否合法（防止拼出 ref 目录之外的路径）"""
+    return bool(name) and bool(_TEMPLATE_NAME_PATTERN.match(name)) and ".." not in name
+
+
+def _resolve_template(name: str, template_db: Dict[str, Any], coordinate_db: Dict[str, Any], ref_dir: Path) -> Tuple[Path, Dict[str, Any]]:
+    """返回 (参考图路径, 配置)；roi 缺省时使用 coordinate_db 同名坐标附近区域"""
+    entry = dict(template_db.get(name) or {})
+    path = ref_dir / entry.get("file", f"{name}.png")
+    if "roi" not in entry and name in coordinate_db:
+        x, y = coordinate_db[name][:2]
+        entry["roi"] = [x - POINT_ROI_MARGIN, y - POINT_ROI_MARGIN, x + POINT_ROI_MARGIN, y + POINT_ROI_MARGIN]
+    return path, entry
+
+
+def _match(image: Any, template: Any, scales: List[float]) -> Tuple[float, Tuple[int, int], float]:
+    """在 image 中按多个尺度匹配 template，返回 (最高分, 左上角, 尺度)"""
+    best = (-1.0, (0, 0), 1.0)
+    ih, iw = image.shape[:2]
+    for scale in scales:
+        th, tw = int(template.shape[0] * scale), int(template.shape[1] * scale)
+        if th < 4 or tw < 4 or th > ih or tw > iw:
+            continue
+        resized = cv2.resize(template, (tw, th), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        result = cv2.matchTemplate(image, resized, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(result)
+        if score > best[0]:
+            best = (float(score), loc, scale)
+    return best
+
+
+def locate_template(
+    screenshot_bytes: bytes,
+    template_name: str,
+    template_db: Dict[str, Any],
+    coordinate_db: Dict[str, Any],
+    ref_dir: Path,
+    threshold: Optional[float] = None,
+    screen_region: Optional[List[int]] = None,
+    screen_size: Optional[List[int]] = None,
+) -> Tuple[bool, Optional[Tuple[int, int]], float, str, float]:
+    """
+    在截图中定位参考图
+
+    Args:
+        screenshot_bytes: 截图 PNG 字节
+        template_name: 参考图名称（template_db 的键或 ref 目录下的文件名主干）
+        template_db: 参考图配置
+        coordinate_db: 坐标配置（提供搜索区域提示）
+        ref_dir: 参考图目录
+        threshold: 匹配阈值（默认取配置或 0.8）
+        screen_region: 截图对应的屏幕区域 [x1, y1, x2, y2]（整屏截图时为 None）
+        screen_size: 屏幕大小 [宽, 高]（屏幕坐标，screen_region 不为空时用于换算 base_resolution）
+
+    Returns:
+        tuple: (success, 中心坐标 (x, y)（截图像素）, 匹配分数, 消息, execution_time)
+    """
+    start_time = time.time()
+    if not CV2_AVAILABLE:
+        return False, None, 0.0, "模板匹配需要安装 opencv-python 与 numpy", time.time() - start_time
+    if not is_valid_template_name(template_name):
+        return False, None, 0.0, f"参考图名称不合法: {template_name}", time.time() - start_time
+
+    path, entry = _resolve_template(template_name, template_db, coordinate_db, ref_dir)
+    template = _load_gray(path)
+    if template is None:
+        return False, None, 0.0, f"参考图不存在或无法解码: {path.name}", time.time() - start_time
+
+    image = cv2.imdecode(np.frombuffer(screenshot_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return False, None, 0.0, "截图解码失败", time.time() - start_time
+    ih, iw = image.shape[:2]
+
+    # 区域截图：换算整屏的像素大小与区域左上角的像素偏移（截图像素 / 屏幕坐标 可能不为 1）
+    if screen_region and screen_region[2] > screen_region[0] and screen_region[3] > screen_region[1]:
+        sx1, sy1, sx2, sy2 = screen_region
+        density_x, density_y = iw / float(sx2 - sx1), ih / float(sy2 - sy1)
+        screen_w, screen_h = screen_size or (sx2, sy2)
+        full_w, full_h = screen_w * density_x, screen_h * density_y
+        shift_x, shift_y = sx1 * density_x, sy1 * density_y
+    else:
+        full_w, full_h, shift_x, shift_y = iw, ih, 0.0, 0.0
+
+    # 参考图分辨率 -> 当前整屏像素分辨率
+    base_w, base_h = entry.get("base_resolution") or (full_w, full_h)
+    ratio_x, ratio_y = full_w / float(base_w), full_h / float(base_h)
+    expected = (ratio_x + ratio_y) / 2
+    lo, hi = SCALE_RANGE
+    scales = [expected * lo * (hi / lo) ** (i / (SCALE_STEPS - 1)) for i in range(SCALE_STEPS)]
+
+    # 搜索区域（按分辨率换算，并外扩一个模板大小，避免目标压在边界上）
+    ox, oy = 0, 0
+    region = image
+    if entry.get("roi"):
+        x1, y1, x2, y2 = entry["roi"]
+        pad_x, pad_y = int(template.shape[1] * expected), int(template.shape[0] * expected)
+        ox, oy = max(0, int(x1 * ratio_x - shift_x) - pad_x), max(0, int(y1 * ratio_y - shift_y) - pad_y)
+        ex, ey = min(iw, int(x2 * ratio_x - shift_x) + pad_x), min(ih, int(y2 * ratio_y - shift_y) + pad_y)
+        if ex - ox > 0 and ey - oy > 0:
+            region = image[oy:ey, ox:ex]
+        else:
+            ox, oy = 0, 0
+
+    # 金字塔粗搜：1/2 分辨率上遍历全部尺度，确定尺度与大致位置
+    small_side = min(template.shape[:2]) * expected * PYRAMID_FACTOR
+    if small_side >= MIN_PYRAMID_SIDE:
+        small_region = cv2.resize(region, None, fx=PYRAMID_FACTOR, fy=PYRAMID_FACTOR, interpolation=cv2.INTER_AREA)
+        small_template = cv2.resize(template, None, fx=PYRAMID_FACTOR, fy=PYRAMID_FACTOR, interpolation=cv2.INTER_AREA)
+        _, coarse_loc, coarse_scale = _match(small_region, small_template, scales)
+        # 原分辨率精修：只在粗搜位置附近、相邻尺度上匹配
+        step = (hi / lo) ** (1 / (SCALE_STEPS - 1))
+        fine_scales = [coarse_scale / step ** 0.5, coarse_scale, coarse_scale * step ** 0.5]
+        th, tw = int(template.shape[0] * coarse_scale * step), int(template.shape[1] * coarse_scale * step)
+        cx, cy = int(coarse_loc[0] / PYRAMID_FACTOR), int(coarse_loc[1] / PYRAMID_FACTOR)
+        wx1, wy1 = max(0, cx - tw // 2), max(0, cy - th // 2)
+        wx2, wy2 = min(region.shape[1], cx + tw + tw // 2), min(region.shape[0], cy + th + th // 2)
+        score, loc, scale = _match(region[wy1:wy2, wx1:wx2], template, fine_scales)
+        loc = (loc[0] + wx1, loc[1] + wy1)
+        if score < 0:
+            # 精修窗口被边界截断、放不下模板时，退回原分辨率全尺度搜索
+            score, loc, scale = _match(region, template, scales)
+    else:
+        score, loc, scale = _match(region, template, scales)
+
+    execution_time = time.time() - start_time
+    threshold = threshold if threshold is not None else entry.get("threshold", DEFAULT_THRESHOLD)
+    if score < threshold:
+        return False, None, round(max(score, 0.0), 4), f"未匹配到参考图: {template_name} (最高分 {score:.3f} < {threshold})", execution_time
+
+    center = (
+        ox + loc[0] + int(template.shape[1] * scale) // 2,
+        oy + loc[1] + int(template.shape[0] * scale) // 2,
+    )
+    message = f"参考图: {template_name} (分数 {score:.3f}, 尺度 {scale:.2f})"
+    return True, center, round(score, 4), message, execution_time
@@ -0,0 +1,55 @@
+"""
+请求耗时细分：通过 Server-Timing 响应头返回服务端各阶段耗时
+- 中间件在请求开始时调用 start_timing()，结束时用 server_timing_header() 生成响应头
+- 业务代码用 `with timed("llm"):` 包裹耗时操作（llm / ocr / feishu / config）
+- 客户端解析该响应头，将服务端耗时细分到步骤追踪中
+
+响应头示例: Server-Timing: llm;dur=812.4, config;dur=1.2, app;dur=820.0
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_timings: contextvars.ContextVar = contextvars.ContextVar("server_timings", default=None)
+
+
+def start_timing() -> contextvars.Token:
+    """为当前请求创建耗时记录（返回 token 供 reset_timing 使用）"""
+    return _timings.set({})
+
+
+def reset_timing(token: contextvars.Token) -> None:
+    _timings.reset(token)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """累加一个阶段的耗时（不在请求上下文中时忽略）"""
+    timings: Optional[Dict[str, float]] = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def get_timings() -> Dict[str, float]:
+    """返回当前请求已记录的阶段耗时（秒）"""
+    return dict(_timings.get() or {})
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """记录代码块耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+
+def server_timing_header(total_seconds: float) -> str:
+    """生成 Server-Timing 响应头（毫秒），app 为服务端总处理时间"""
+    items = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in get_timings().items()]
+    items.append(f"app;dur={total_seconds * 1000:.1f}")
+    return ", ".join(items)
@@ -1,40 +1,56 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 import requests
 import base64
+import logging
 import os
 import sys
+import threading
+import time
+import uuid
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 # 导入全部的工具函数
 from functions.get_cordinate import get_cordinate
 from functions.build_scroll_params import build_scroll_params
 from functions.build_keyboard_operations import build_keyboard_operations
-from functions.call_llm_service import call_llm_service
-from functions.feishu import FeishuService
+from functions.call_llm_service import call_llm_service, MOCK_LLM_ENV
+from functions.feishu import FeishuService, MOCK_FEISHU_ENV
 from functions.build_drag_params import build_drag_params
 from functions.get_rec_xy import get_rec_xy
-from functions.recognize_text import recognize_text_from_base64
+from functions.recognize_text import recognize_text_from_base64, recognize_structured
+from functions.ocr_structure import FORMATS as OCR_FORMATS, structure_layout
+from functions.ocr_engine import OCRError, decode_image, recognize_layout, find_text, png_size, split_by_regions
+from functions.template_match import locate_template, preload_templates, is_valid_template_name, REF_DIR_NAME
+from functions.log_config import setup_logging, set_request_id, reset_request_id, REQUEST_ID_HEADER
+from functions.timing import timed, start_timing, reset_timing, server_timing_header, SERVER_TIMING_HEADER
+from functions.metrics import (
+    render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_PROGRESS, HELPER_LATENCY, CONFIG_CACHE,
+    OCR_QUEUE_DEPTH, OCR_REQUESTS,
+)
+
+# 初始化日志（级别/JSON 输出通过 LOG_LEVEL / LOG_LEVELS / LOG_JSON 环境变量控制）
+setup_logging()
+logger = logging.getLogger("server")
+for _mock_env in (MOCK_LLM_ENV, MOCK_FEISHU_ENV):
+    if os.getenv(_mock_env):
+        logger.warning("⚠️ %s=%s，对应的外部服务请求将发往本地替身", _mock_env, os.getenv(_mock_env))
+# 压测/离线环境的本地登录校验（设置后 /api/login 不再查询 MySQL），生产环境不得设置
+AUTH_STANDIN_ENV = "AUTH_STANDIN_USERS"
+if os.getenv(AUTH_STANDIN_ENV) is not None:
+    logger.warning("🚨 %s 已设置：/api/login 不再校验 MySQL，只接受环境变量中的 %d 个账号（仅限压测/离线环境）",
+                   AUTH_STANDIN_ENV, len([item for item in os.getenv(AUTH_STANDIN_ENV).split(",") if ":" in item]))
 # 添加OCR模块路径
 current_dir = Path(__file__).parent
 rec_dir = current_dir.parent.parent.parent / "rec"
 sys.path.append(str(rec_dir))
 
-# 导入自定义的OCR函数而不是直接导入PaddleOCR
-import importlib.util
 import json
 import os as _os
 
-def load_ocr_module():
-    """动态加载OCR模块"""
-    ocr_path = rec_dir / "ocr.py"
-    spec = importlib.util.spec_from_file_location("ocr", ocr_path)
-    ocr_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(ocr_module)
-    return ocr_module
-
 # ===================== 配置加载器 =====================
 def load_json_config(config_path: str) -> Dict[str, Any]:
     """加载JSON配置文件"""
@@ -42,7 +58,7 @@ def load_json_config(config_path: str) -> Dict[str, Any]:
         with open(config_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
-        print(f"加载配置文件失败: {config_path}, 错误: {e}")
+        logger.error("加载配置文件失败: %s, 错误: %s", config_path, e)
         return {}
 
 # ===================== 加载所有配置 =====================
@@ -50,6 +66,9 @@ configs_dir = current_dir / "configs"
 # 多用户：用户配置根目录（仅按用户路径读取，不回退全局）
 USERS_ROOT = current_dir / "users"
 
+# 后台预加载各用户参考图（模板匹配点击使用，解码一次后常驻内存）
+threading.Thread(target=preload_templates, args=(USERS_ROOT,), name="preload-templates", daemon=True).start()
+
 # 加载操作配置（坐标、滚动、键盘）
 operation_config = load_json_config(configs_dir / "operation.json")
 COORDINATE_DB = operation_config.get("coordinate_db", {})
@@ -89,34 +108,90 @@ FEISHU_SERVICE = FeishuService(
 )
 app = FastAPI(title="UI操作API服务", description="提供click、drag、scroll、rec等UI操作的坐标计算服务", version="1.0.0")
 
+# 不在 users/ 下的 x-user 在指标中统一记为 other（label 取值保持有限）
+METRICS_OTHER_USER = "other"
+
+def _metrics_user(user: str) -> str:
+    """指标的 user label：只保留 users/ 下存在的用户目录"""
+    if user and "/" not in user and "\\" not in user and user not in (".", "..") and (USERS_ROOT / user).is_dir():
+        return user
+    return METRICS_OTHER_USER
+
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    """为每个请求绑定关联ID（优先使用客户端传入的 X-Request-ID），记录访问日志，并通过 Server-Timing 返回耗时细分"""
+    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex[:12]
+    token = set_request_id(request_id)
+    timing_token = start_timing()
+    start_time = time.time()
+    user = request.headers.get("x-user", "")
+    status = "500"
+    HTTP_IN_PROGRESS.inc()
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        elapsed = time.time() - start_time
+        logger.info(
+            "%s %s -> %s (%.3fs)", request.method, request.url.path, response.status_code, elapsed,
+            extra={"user": user},
+        )
+        response.headers[REQUEST_ID_HEADER] = request_id
+        response.headers[SERVER_TIMING_HEADER] = server_timing_header(elapsed)
+        return response
+    finally:
+        # 路由模板作为 label（未匹配的路径统一归为 unmatched，避免 label 无限增长）
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_IN_PROGRESS.dec()
+        metrics_user = _metrics_user(user)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=status, user=metrics_user)
+        HTTP_LATENCY.observe(time.time() - start_time, route=route, user=metrics_user)
+        reset_timing(timing_token)
+        reset_request_id(token)
+
 # ===================== 多用户：仅从 users/{user}/configs 读取 =====================
+# 用户配置缓存：{路径: (mtime_ns, size, 数据)}，文件修改后自动重新加载（返回值只读，勿修改）
+_USER_CONFIG_CACHE: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+_USER_CONFIG_CACHE_LOCK = threading.Lock()
+
 def _load_json_user_only(username: str, filename: str) -> Dict[str, Any]:
     """从 users/{user}/configs/{filename} 读取 JSON；不存在则返回空字典。
     - 参数:
       - username: 用户名
       - filename: 文件名（如 operation.json）
     - 返回: dict
+    - 按文件 mtime/size 缓存解析结果，命中情况记录到 config_cache_requests_total
     """
     try:
         user_path = USERS_ROOT / username / "configs" / filename
         if user_path.exists():
+            stat = user_path.stat()
+            key = str(user_path)
+            cached = _USER_CONFIG_CACHE.get(key)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                CONFIG_CACHE.inc(result="hit")
+                return cached[2]
+            CONFIG_CACHE.inc(result="miss")
             with open(user_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        print(f"[多用户] 文件不存在: {user_path}")
+                data = json.load(f)
+            with _USER_CONFIG_CACHE_LOCK:
+                _USER_CONFIG_CACHE[key] = (stat.st_mtime_ns, stat.st_size, data)
+            return data
+        logger.warning("[多用户] 文件不存在: %s", user_path)
         return {}
     except Exception as e:
-        print(f"[多用户] 读取用户配置失败: {filename}, user={username}, 错误: {e}")
+        logger.error("[多用户] 读取用户配置失败: %s, user=%s, 错误: %s", filename, username, e)
         return {}
 
 def get_user_ctx(username: str) -> Dict[str, Any]:
-    """组装当前用户的上下文字典 ctx（不缓存，MVP）。
+    """组装当前用户的上下文字典 ctx（各配置文件按 mtime 缓存）。
     - 只读 users/{user}/configs 下的四个 JSON：operation.json / process.json / llm.json / feishu.json
     - 缺失则对应项为空字典
     """
-    operation = _load_json_user_only(username, "operation.json")
-    process   = _load_json_user_only(username, "process.json")
-    llm       = _load_json_user_only(username, "llm.json")
-    feishu    = _load_json_user_only(username, "feishu.json")
+    with timed("config"):
+        operation = _load_json_user_only(username, "operation.json")
+        process   = _load_json_user_only(username, "process.json")
+        llm       = _load_json_user_only(username, "llm.json")
+        feishu    = _load_json_user_only(username, "feishu.json")
 
     ctx: Dict[str, Any] = {
         "COORDINATE_DB": operation.get("coordinate_db", {}),
@@ -124,6 +199,7 @@ def get_user_ctx(username: str) -> Dict[str, Any]:
         "KEYBOARD_OPERATIONS_DB": operation.get("keyboard_operations_db", {}),
         "DRAG_DB": operation.get("drag_db", {}),
         "REC_DB": operation.get("rec_db", {}),
+        "TEMPLATE_DB": operation.get("template_db", {}),
         "PROCESS_DB": process.get("process_db", {}),
         "LLM_PROMPT_DB": llm.get("llm_prompt_db", {}),
         "LLM_SERVICE_CONFIG": llm.get("llm_service_config", {}),
@@ -131,13 +207,13 @@ def get_user_ctx(username: str) -> Dict[str, Any]:
     }
     # 阶段打印，便于排查
     try:
-        print(f"[多用户] ctx加载完成 user={username} keys={list(ctx.keys())}")
+        logger.debug("[多用户] ctx加载完成 user=%s keys=%s", username, list(ctx.keys()))
     except Exception:
         pass
     return ctx
 
 def _get_feishu_service_for_user(username: str) -> FeishuService:
-    """按用户构建 FeishuService（MVP：不缓存）。"""
+    """按用户构建 FeishuService（配置来自缓存，服务对象每次新建）。"""
     ctx = get_user_ctx(username)
     return FeishuService(
         ctx.get("FEISHU_CONFIG", {}).get("credentials", {}),
@@ -177,6 +253,31 @@ class RecRecRequest(BaseModel):
     """截图识别请求模型"""
     screenshot: str
     target_description: str
+    format: Optional[str] = "text"
+    operation_id: Optional[str] = None
+
+class RecBatchRequest(BaseModel):
+    """多区域识别请求模型（一张截图，多个 rec_db 区域）"""
+    targets: List[str]
+    screenshot: Optional[str] = None
+    area: Optional[List[int]] = None
+    format: Optional[str] = "text"
+    operation_id: Optional[str] = None
+
+class OCRClickRequest(BaseModel):
+    """OCR点击请求模型（按截图中的文字定位点击坐标）"""
+    target_text: str
+    screenshot: str
+    min_similarity_threshold: float = 0.3
+    operation_id: Optional[str] = None
+
+class TemplateClickRequest(BaseModel):
+    """模板匹配点击请求模型（在截图中定位参考图）"""
+    template_name: str
+    screenshot: str
+    threshold: Optional[float] = None
+    region: Optional[List[int]] = None  # 截图对应的屏幕区域 [x1, y1, x2, y2]（整屏截图时省略）
+    screen_size: Optional[List[int]] = None  # 屏幕大小 [宽, 高]
     operation_id: Optional[str] = None
 
 class GetProcessRequest(BaseModel):
@@ -275,10 +376,19 @@ async def root():
             "/api/llm/process",
             "/api/get_process",
             "/api/rec/get_xy",
-            "/api/rec/rec"
+            "/api/rec/rec",
+            "/api/rec/batch",
+            "/api/ocr/click",
+            "/api/template/click",
+            "/metrics"
         ]
     }
 
+@app.get("/metrics")
+async def metrics():
+    """运行指标（Prometheus 文本格式），用于容量规划与监控"""
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/api/click/xy", response_model=ClickResponse)
 async def click_by_coordinates(request: ClickXYRequest, x_user: str = Header(...)):
     try:
@@ -286,6 +396,7 @@ async def click_by_coordinates(request: ClickXYRequest, x_user: str = Header(...
         success, coordinates, confidence, message, execution_time = get_cordinate(
             request.target_description, ctx["COORDINATE_DB"]
         )
+        HELPER_LATENCY.observe(execution_time, helper="get_cordinate")
 
         if not success:
             raise HTTPException(status_code=404, detail=message)
@@ -310,9 +421,11 @@ async def get_scroll_params(request: ScrollRequest, x_user: str = Header(...)):
         success, scroll_params, message, execution_time, suggestions = build_scroll_params(
             request.scroll_description, ctx["SCROLL_DB"]
         )
+        HELPER_LATENCY.observe(execution_time, helper="build_scroll_params")
         if not success:
             # 将相似匹配建议附加到 404 的提示文本中（保持 detail 为字符串，避免破坏兼容）
-            raise HTTPException(status_code=404)
+            suggest_text = f"，相似项: {suggestions}" if suggestions else ""
+            raise HTTPException(status_code=404, detail=f"{message}{suggest_text}")
 
         return ScrollResponse(
             success=True,
@@ -343,6 +456,7 @@ async def get_recognition_coordinates(request: RecGetXYRequest, x_user: str = He
         success, upleft, downright, confidence, message, execution_time = get_rec_xy(
             request.target_description, ctx["REC_DB"]
         )
+        HELPER_LATENCY.observe(execution_time, helper="get_rec_xy")
         if success:
             return {
                 "upleft": upleft,
@@ -358,17 +472,159 @@ async def get_recognition_coordinates(request: RecGetXYRequest, x_user: str = He
         raise HTTPException(status_code=500, detail=f"错误: {str(e)}")
 
 # 恢复识别接口：/api/rec/rec
+# OCR 与模板匹配接口（/api/rec/rec、/api/rec/batch、/api/ocr/click、/api/template/click）为同步函数，
+# 由 FastAPI 在线程池中执行，推理期间不阻塞事件循环
 @app.post("/api/rec/rec")
-async def recognize_from_screenshot(request: RecRecRequest, x_user: str = Header(...)):
+def recognize_from_screenshot(request: RecRecRequest, x_user: str = Header(...)):
     """
     根据截图进行识别（第二步）
-    返回字符串（识别文本），与备份文件保持一致
+    - format=text（默认）：返回字符串（识别文本），与备份文件保持一致
+    - format=structured：返回 JSON（行、文字框、置信度、行列分组、键值对）
+    - format=kv：返回 JSON（紧凑键值与“键: 值”文本，可直接写表或缩短 LLM 输入）
     """
+    fmt = request.format or "text"
+    if fmt not in OCR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的format: {fmt}（可选: {', '.join(OCR_FORMATS)}）")
+    start_time = time.time()
     try:
-        return recognize_text_from_base64(request.screenshot, request.target_description)
+        with timed("ocr"):
+            if fmt == "text":
+                return recognize_text_from_base64(request.screenshot, request.target_description)
+            result = recognize_structured(request.screenshot, request.target_description, fmt)
+        result["execution_time"] = time.time() - start_time
+        return result
+    except OCRError as e:
+        raise HTTPException(status_code=500, detail=f"OCR识别失败: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"识别错误: {str(e)}")
 
+@app.post("/api/rec/batch")
+def recognize_batch(request: RecBatchRequest, x_user: str = Header(...)):
+    """
+    多区域识别：一张截图 + 多个 rec_db 区域，只做一次 OCR，按区域返回文本
+    - 不带 screenshot：只返回各区域坐标 regions 与外接区域 area（客户端据此截一张图）
+    - 带 screenshot：area 为截图对应的屏幕区域 [x1, y1, x2, y2]（缺省为各区域的外接矩形）
+    - format=structured / kv 时额外返回 structured: {目标: 结构化结果}（同 /api/rec/rec）
+    """
+    start_time = time.time()
+    fmt = request.format or "text"
+    if fmt not in OCR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的format: {fmt}（可选: {', '.join(OCR_FORMATS)}）")
+    ctx = get_user_ctx(x_user)
+    regions: Dict[str, List[int]] = {}
+    missing = []
+    for target in request.targets:
+        success, upleft, downright, _, message, _ = get_rec_xy(target, ctx["REC_DB"])
+        if success:
+            regions[target] = [upleft[0], upleft[1], downright[0], downright[1]]
+        else:
+            missing.append(message)
+    if missing:
+        raise HTTPException(status_code=404, detail="；".join(missing))
+    if not regions:
+        raise HTTPException(status_code=400, detail="targets 不能为空")
+    area = request.area or [
+        min(r[0] for r in regions.values()), min(r[1] for r in regions.values()),
+        max(r[2] for r in regions.values()), max(r[3] for r in regions.values()),
+    ]
+    if not request.screenshot:
+        return {"regions": regions, "area": area, "execution_time": time.time() - start_time}
+
+    OCR_QUEUE_DEPTH.inc()
+    try:
+        image_bytes = decode_image(request.screenshot)
+        with timed("ocr"):
+            layout, cached = recognize_layout(image_bytes)
+        OCR_REQUESTS.inc(result="ok")
+    except OCRError as e:
+        OCR_REQUESTS.inc(result="error")
+        raise HTTPException(status_code=500, detail=f"OCR识别失败: {e}")
+    finally:
+        OCR_QUEUE_DEPTH.dec()
+
+    image_size = png_size(image_bytes) or (area[2] - area[0], area[3] - area[1])
+    grouped = split_by_regions(layout, regions, area, image_size)
+    results = {name: "\n".join(item["text"] for item in items) for name, items in grouped.items()}
+    response = {"results": results, "regions": regions, "area": area, "cached": cached}
+    if fmt != "text":
+        response["structured"] = {name: structure_layout(items, fmt) for name, items in grouped.items()}
+    execution_time = time.time() - start_time
+    HELPER_LATENCY.observe(execution_time, helper="rec_batch")
+    logger.info("多区域识别完成: %s 个区域, %s 行%s", len(regions), len(layout), "（缓存）" if cached else "")
+    response["execution_time"] = execution_time
+    return response
+
+@app.post("/api/ocr/click")
+def ocr_click(request: OCRClickRequest, x_user: str = Header(...)):
+    """
+    OCR点击：识别截图中的文字，返回与 target_text 最相似的文字框中心坐标（截图像素坐标）
+    同一截图的文字布局有缓存，重复点击同一屏幕的不同文字不再重新识别
+    """
+    start_time = time.time()
+    OCR_QUEUE_DEPTH.inc()
+    try:
+        with timed("ocr"):
+            layout, cached = recognize_layout(decode_image(request.screenshot))
+        OCR_REQUESTS.inc(result="ok")
+    except OCRError as e:
+        OCR_REQUESTS.inc(result="error")
+        raise HTTPException(status_code=500, detail=f"OCR识别失败: {e}")
+    finally:
+        OCR_QUEUE_DEPTH.dec()
+
+    success, coordinates, confidence, message, suggestions = find_text(
+        layout, request.target_text, request.min_similarity_threshold
+    )
+    execution_time = time.time() - start_time
+    HELPER_LATENCY.observe(execution_time, helper="ocr_click")
+    result = {
+        "success": success,
+        "coordinates": coordinates,
+        "confidence": confidence,
+        "message": message,
+        "execution_time": execution_time,
+        "target_text": request.target_text,
+        "cached": cached,
+    }
+    if suggestions:
+        result["suggestions"] = suggestions
+    return result
+
+@app.post("/api/template/click")
+def template_click(request: TemplateClickRequest, x_user: str = Header(...)):
+    """
+    模板匹配点击：在截图中定位 users/{user}/ref 下的参考图，返回中心坐标（截图像素坐标）
+    多尺度匹配，分辨率变化后仍可定位；template_db 的 roi 或 coordinate_db 同名坐标用于缩小搜索范围
+    同步函数，由 FastAPI 在线程池中执行（cv2 匹配不阻塞事件循环）
+    """
+    if not is_valid_template_name(request.template_name):
+        raise HTTPException(status_code=400, detail=f"参考图名称不合法: {request.template_name}")
+    try:
+        ctx = get_user_ctx(x_user)
+        success, coordinates, confidence, message, execution_time = locate_template(
+            decode_image(request.screenshot),
+            request.template_name,
+            ctx["TEMPLATE_DB"],
+            ctx["COORDINATE_DB"],
+            USERS_ROOT / x_user / REF_DIR_NAME,
+            request.threshold,
+            request.region,
+            request.screen_size,
+        )
+        HELPER_LATENCY.observe(execution_time, helper="locate_template")
+        return {
+            "success": success,
+            "coordinates": coordinates,
+            "confidence": confidence,
+            "message": message,
+            "execution_time": execution_time,
+            "template_name": request.template_name,
+        }
+    except OCRError as e:
+        raise HTTPException(status_code=400, detail=f"截图错误: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"模板匹配错误: {str(e)}")
+
 @app.post("/api/keyboard", response_model=KeyboardResponse)
 async def get_keyboard_operations(request: KeyboardRequest, x_user: str = Header(...)):
     """根据请求返回键盘操作序列（优先使用传入的operations，忽略平台）"""
@@ -382,6 +638,7 @@ async def get_keyboard_operations(request: KeyboardRequest, x_user: str = Header
             getattr(request, "operations", None),
             ctx["KEYBOARD_OPERATIONS_DB"],
         )
+        HELPER_LATENCY.observe(execution_time, helper="build_keyboard_operations")
         if not success:
             raise HTTPException(status_code=404, detail=message)
 
@@ -405,10 +662,12 @@ async def get_keyboard_operations(request: KeyboardRequest, x_user: str = Header
 async def llm_process(request: LLMProcessRequest, x_user: str = Header(...)):
     try:
         # 统一交由 LLM Service 处理（含 prompt 构建、模型调用与回退）
-        print(f"接收到LLM处理请求: content={(request.content or '')[:100]}..., prompt_name={request.prompt_name}")
+        logger.info("接收到LLM处理请求: prompt_name=%s, content_len=%s", request.prompt_name, len(request.content or ''))
+        logger.debug("LLM请求内容预览: %s...", (request.content or '')[:100])
         # 这里传入第三个参数：从 llm.json 读取的服务配置
         ctx = get_user_ctx(x_user)
-        svc_res = call_llm_service(request.content, request.prompt_name, ctx["LLM_SERVICE_CONFIG"])
+        with timed("llm"):
+            svc_res = call_llm_service(request.content, request.prompt_name, ctx["LLM_SERVICE_CONFIG"])
 
         # 直接将 service 的结果透传给客户端（仅保留接口需要的字段）
         return {
@@ -430,7 +689,7 @@ async def feishu_write(request: FeishuWriteRequest, background_tasks: Background
         feishu_service = _get_feishu_service_for_user(x_user)
         return feishu_service.schedule_write(request, background_tasks)
     except Exception as e:
-        print(f"/api/feishu/write 处理异常: {e}")
+        logger.error("/api/feishu/write 处理异常: %s", e)
         return {"ok": False, "error": str(e)}
 
 @app.post("/api/drag")
@@ -444,12 +703,18 @@ async def get_drag_coordinates(request: DragRequest, x_user: str = Header(...)):
         success, start_position, end_position, message, execution_time, suggestions = build_drag_params(
             request.target_description, ctx["DRAG_DB"]
         )
+        HELPER_LATENCY.observe(execution_time, helper="build_drag_params")
+        if not success:
+            suggest_text = f"，相似项: {suggestions}" if suggestions else ""
+            raise HTTPException(status_code=404, detail=f"{message}{suggest_text}")
         return {
             "start_position": start_position,
             "end_position": end_position,
             "target_description": request.target_description,
             "execution_time": execution_time
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取拖拽坐标错误: {str(e)}")
 
@@ -562,13 +827,14 @@ async def get_feishu_data(request: GetDataRequest, x_user: str = Header(...)):
     """从飞书表格获取数据"""
     try:
         feishu_service = _get_feishu_service_for_user(x_user)
-        result = feishu_service.get_data(request.source)
+        with timed("feishu"):
+            result = feishu_service.get_data(request.source)
         if result["ok"]:
             return result
         else:
             raise HTTPException(status_code=400, detail=result["error"])
     except Exception as e:
-        print(f"/api/feishu/get_data 处理异常: {e}")
+        logger.error("/api/feishu/get_data 处理异常: %s", e)
         raise HTTPException(status_code=500, detail=f"获取数据错误: {str(e)}")
 
 @app.post("/api/feishu/write_doc")
@@ -576,13 +842,14 @@ async def write_feishu_doc(request: WriteDocRequest, x_user: str = Header(...)):
     """向飞书文档写入内容"""
     try:
         feishu_service = _get_feishu_service_for_user(x_user)
-        result = feishu_service.write_doc(request.doc_name, request.content)
+        with timed("feishu"):
+            result = feishu_service.write_doc(request.doc_name, request.content)
         if result["ok"]:
             return result
         else:
             raise HTTPException(status_code=400, detail=result["error"])
     except Exception as e:
-        print(f"/api/feishu/write_doc 处理异常: {e}")
+        logger.error("/api/feishu/write_doc 处理异常: %s", e)
         raise HTTPException(status_code=500, detail=f"写入文档错误: {str(e)}")
 
 # ===================== 登录与任务接口（多用户并发，无会话） =====================
@@ -592,8 +859,17 @@ class LoginRequest(BaseModel):
 
 @app.post("/api/login")
 async def api_login(req: LoginRequest):
-    """使用 MySQL 校验用户与密码（dotenv 读取连接串）。成功即返回 ok，不创建会话。"""
+    """使用 MySQL 校验用户与密码（dotenv 读取连接串）。成功即返回 ok，不创建会话。
+    - 设置 AUTH_STANDIN_USERS="user1:pwd1,user2:pwd2" 时改为本地校验，不连接 MySQL（压测/离线环境使用）
+    """
     try:
+        standin_users = _os.getenv(AUTH_STANDIN_ENV)
+        if standin_users is not None:
+            pairs = dict(item.split(":", 1) for item in standin_users.split(",") if ":" in item)
+            if pairs.get(req.user) == req.password:
+                return {"ok": True, "user": req.user}
+            raise HTTPException(status_code=401, detail="用户名或密码错误")
+
         from dotenv import load_dotenv  # 延迟导入，避免全局依赖
         load_dotenv()
         import pymysql
@@ -637,7 +913,7 @@ async def api_tasks(x_user: str = Header(...)):
         else:
             raise HTTPException(status_code=400, detail=result["error"])
     except Exception as e:
-        print(f"/api/feishu/write_doc 处理异常: {e}")
+        logger.error("/api/feishu/write_doc 处理异常: %s", e)
         raise HTTPException(status_code=500, detail=f"写入文档错误: {str(e)}")
 
 if __name__ == "__main__":
@@ -645,7 +921,7 @@ if __name__ == "__main__":
     # - reload=True 开启自动重载
     # - reload_dirs 指定仅监听当前 server 目录及其子目录（避免无关目录触发重启）
     # - 这样在此目录下的代码调整都会触发自动重启，不必手动重启
-    print(f"[启动] 使用自动重载，监听目录: {current_dir}")
+    logger.info("[启动] 使用自动重载，监听目录: %s", current_dir)
     uvicorn.run(
         "start:app",
         host="0.0.0.0",
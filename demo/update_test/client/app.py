@@ -1,13 +1,21 @@
 """
 在线更新测试项目 - 客户端主应用 (PyInstaller版本)
 基于 PyQt5 实现，支持exe文件的在线更新
+
+发现新版本后在后台以低优先级、限速预下载（updater.exe --stage），暂存到 temp/staged/；
+下次启动时发现已暂存的新版本，直接交给更新器替换，无需再下载。
+
+启动检查之后通过 /api/version/watch（SSE）等待服务端推送新版本，不再定时轮询。
 """
 
 import sys
 import os
 import time
 import json
+import random
+import shutil
 import subprocess
+import threading
 from pathlib import Path
 
 # PyQt5 imports - 与您的项目保持一致
@@ -15,7 +23,7 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QTextEdit, QDialog, QFrame, QMessageBox, QProgressBar
 )
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QThread, QObject, pyqtSignal
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 
 # 尝试导入 qfluentwidgets（可选，与您的项目保持一致）
@@ -37,6 +45,17 @@ except ImportError:
 from manipulate.api_client import APIClient
 # from manipulate.update_manager import UpdateManager  # PyInstaller模式暂时不用
 
+# 后台预下载的暂存信息（与 updater.py 一致）
+STAGED_INFO_PATH = Path("temp") / "staged" / "staged_update.json"
+# 推送连接断开后的重连等待（秒）：指数退避 + 随机抖动
+WATCH_RETRY_MIN = 5
+WATCH_RETRY_MAX = 300
+
+
+def parse_version(version):
+    """版本号转为可比较的元组"""
+    return tuple(int(part) if part.isdigit() else 0 for part in str(version).split("."))
+
 
 class UpdateCheckThread(QThread):
     """更新检查线程"""
@@ -67,6 +86,49 @@ class UpdateCheckThread(QThread):
             self.check_completed.emit(False, f"检查更新异常: {str(e)}")
 
 
+class UpdateWatcher(QObject):
+    """
+    新版本推送监听（SSE）
+    使用守护线程：长连接阻塞在读取上，退出程序时不需要等待
+    """
+    update_found = pyqtSignal(dict)
+    
+    def __init__(self, api_client, current_version):
+        super().__init__()
+        self.api_client = api_client
+        self.current_version = current_version
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, name="update-watch", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+    
+    def run(self):
+        """保持推送连接，断开后带抖动重连（避免服务重启后所有客户端同时重连）"""
+        last_event_id = None
+        backoff = WATCH_RETRY_MIN
+        while not self._stopped.is_set():
+            try:
+                for event_id, data in self.api_client.watch_updates(
+                        self.current_version, last_event_id=last_event_id, should_stop=self._stopped.is_set):
+                    last_event_id = event_id
+                    self.update_found.emit(data)
+                backoff = WATCH_RETRY_MIN
+            except Exception as e:
+                self.api_client.log(f"推送连接断开: {e}")
+            
+            delay = backoff * random.uniform(0.5, 1.0)
+            backoff = min(backoff * 2, WATCH_RETRY_MAX)
+            self._stopped.wait(delay)
+
+
 class SimpleTestApp(QWidget):
     """简单的测试应用"""
     
@@ -74,16 +136,20 @@ class SimpleTestApp(QWidget):
         super().__init__()
         self.current_version = self.load_current_version()
         self.counter = 0
+        self.config = {}
         self.api_client = None
         self.update_manager = None
         self.update_check_thread = None
+        self.update_watcher = None
+        self.offered_version = None
+        self.prefetch_process = None
         
         self.init_api_client()
         self.init_ui()
         self.init_update_manager()
         
-        # 启动时自动检查更新（延迟3秒）
-        QTimer.singleShot(3000, self.auto_check_update)
+        # 启动时先应用已暂存的更新，否则自动检查更新（延迟3秒）
+        QTimer.singleShot(0, self.startup_update_check)
     
     def load_current_version(self):
         """加载当前版本号"""
@@ -117,8 +183,8 @@ class SimpleTestApp(QWidget):
         config_file = Path(__file__).parent / "config" / "update_config.json"
         try:
             with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                base_url = config["update_server"]["base_url"]
+                self.config = json.load(f)
+                base_url = self.config["update_server"]["base_url"]
         except Exception:
             base_url = "http://127.0.0.1:8000"
         
@@ -357,10 +423,114 @@ class SimpleTestApp(QWidget):
             """
         )
     
+    def startup_update_check(self):
+        """启动时检查是否有已暂存的新版本"""
+        staged = self.load_staged_update()
+        if staged:
+            self.log_message(f"📦 发现已在后台下载好的新版本 v{staged['version']}，正在完成更新...")
+            self.start_pyinstaller_update(staged["update_info"])
+            return
+        
+        QTimer.singleShot(3000, self.auto_check_update)
+    
+    def load_staged_update(self):
+        """
+        读取后台预下载的暂存信息
+        
+        Returns:
+            dict: 比当前版本新且暂存文件完整的暂存信息；否则返回None（过期的暂存文件会被清理）
+        """
+        app_dir, _, _ = self.get_updater_paths()
+        info_path = app_dir / STAGED_INFO_PATH
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                staged = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if parse_version(staged.get("version", "0")) <= parse_version(self.current_version):
+            self.log_message(f"🧹 清理过期的暂存版本 v{staged.get('version')}")
+            shutil.rmtree(info_path.parent, ignore_errors=True)
+            return None
+        
+        staged_file = info_path.parent / staged.get("file", "")
+        if not staged_file.is_file() or staged_file.stat().st_size != staged.get("size"):
+            return None
+        return staged
+    
+    def start_background_prefetch(self, update_info):
+        """
+        在后台以低优先级、限速预下载新版本（更新器 --stage 模式）
+        
+        Returns:
+            bool: 预下载进程已启动或仍在运行
+        """
+        if not self.config.get("download_settings", {}).get("background_prefetch", True):
+            return False
+        if self.prefetch_process and self.prefetch_process.poll() is None:
+            return True
+        
+        app_dir, updater_path, current_exe = self.get_updater_paths()
+        if not updater_path.exists():
+            self.log_message(f"⚠️ 找不到更新器，跳过后台预下载: {updater_path}")
+            return False
+        
+        try:
+            temp_dir = app_dir / "temp"
+            temp_dir.mkdir(exist_ok=True)
+            info_file = temp_dir / "prefetch_info.json"
+            with open(info_file, 'w', encoding='utf-8') as f:
+                json.dump(update_info, f, ensure_ascii=False, indent=2)
+            
+            # Windows 下以空闲优先级、无窗口运行；其他平台由更新器自行降低优先级
+            creationflags = 0
+            if os.name == 'nt':
+                creationflags = subprocess.IDLE_PRIORITY_CLASS | subprocess.CREATE_NO_WINDOW
+            self.prefetch_process = subprocess.Popen(
+                [str(updater_path), str(info_file), Path(current_exe).name, "--stage"],
+                cwd=str(app_dir),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=creationflags
+            )
+            self.log_message(f"📥 已在后台预下载 v{update_info['latest_version']}")
+            return True
+        except Exception as e:
+            self.log_message(f"⚠️ 启动后台预下载失败: {e}")
+            return False
+    
+    def stop_background_prefetch(self):
+        """停止后台预下载（已下载的部分下次续传）"""
+        if self.prefetch_process and self.prefetch_process.poll() is None:
+            self.prefetch_process.terminate()
+            try:
+                self.prefetch_process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.prefetch_process.kill()
+        self.prefetch_process = None
+    
     def auto_check_update(self):
-        """自动检查更新"""
+        """自动检查更新，之后等待服务端推送新版本"""
         self.log_message("🔍 启动时自动检查更新...")
         self.check_for_updates(silent=True)
+        self.start_update_watch()
+    
+    def start_update_watch(self):
+        """连接新版本推送（check_settings.push_updates 为 false 时不连接）"""
+        if not self.config.get("check_settings", {}).get("push_updates", True):
+            return
+        if self.update_watcher is None:
+            self.update_watcher = UpdateWatcher(self.api_client, self.current_version)
+            self.update_watcher.update_found.connect(self.on_update_pushed)
+        self.update_watcher.start()
+    
+    def on_update_pushed(self, update_info):
+        """收到推送的新版本（已提示过的版本只在后台预下载，不重复弹窗）"""
+        self.log_message(f"📣 收到新版本推送: v{update_info['latest_version']}")
+        if update_info["latest_version"] == self.offered_version:
+            self.start_background_prefetch(update_info)
+            return
+        self.on_update_found(update_info)
     
     def check_for_updates(self, silent=False):
         """检查更新"""
@@ -383,6 +553,15 @@ class SimpleTestApp(QWidget):
     def on_update_found(self, update_info):
         """发现更新 - PyInstaller模式"""
         self.log_message(f"⚠️ 发现强制更新: {update_info['latest_version']}")
+        self.offered_version = update_info["latest_version"]
+        
+        staged = self.load_staged_update()
+        if staged and staged["version"] == update_info["latest_version"]:
+            prefetching = False
+            status = "新版本已在后台下载完成，重启即可完成更新。"
+        else:
+            prefetching = self.start_background_prefetch(update_info)
+            status = "新版本正在后台下载，也可以稍后在下次启动时自动完成更新。" if prefetching else ""
         
         # PyInstaller模式：显示更新确认对话框
         reply = QMessageBox.question(
@@ -392,7 +571,7 @@ class SimpleTestApp(QWidget):
             
 当前版本: v{self.current_version}
 文件大小: {self.format_file_size(update_info.get('file_size', 0))}
-
+{status}
 是否立即更新？
 注意：更新过程中程序将会关闭并重启。""",
             QMessageBox.Yes | QMessageBox.No,
@@ -402,6 +581,8 @@ class SimpleTestApp(QWidget):
         if reply == QMessageBox.Yes:
             self.log_message("👍 用户确认更新，启动更新器...")
             self.start_pyinstaller_update(update_info)
+        elif prefetching:
+            self.log_message("用户选择稍后更新，后台继续下载，下次启动时完成更新")
         else:
             self.log_message("用户选择稍后更新")
     
@@ -426,20 +607,28 @@ class SimpleTestApp(QWidget):
         else:
             self.log_message(f"❌ 更新检查失败: {message}")
     
+    def get_updater_paths(self):
+        """
+        确定应用目录、更新器路径与主程序
+        
+        Returns:
+            tuple: (app_dir, updater_path, current_exe)
+        """
+        if getattr(sys, 'frozen', False):
+            # 如果是打包后的exe运行
+            app_dir = Path(sys.executable).parent
+            current_exe = sys.executable
+        else:
+            # 如果是开发环境运行
+            app_dir = Path(__file__).parent
+            current_exe = "KuzflowApp.exe"  # 假设的exe名称
+        return app_dir, app_dir / "updater.exe", current_exe
+    
     def start_pyinstaller_update(self, update_info):
         """启动PyInstaller模式的更新过程"""
         try:
             # 1. 确定更新器路径
-            if getattr(sys, 'frozen', False):
-                # 如果是打包后的exe运行
-                app_dir = Path(sys.executable).parent
-                updater_path = app_dir / "updater.exe"
-                current_exe = sys.executable
-            else:
-                # 如果是开发环境运行
-                app_dir = Path(__file__).parent
-                updater_path = app_dir / "updater.exe"
-                current_exe = "KuzflowApp.exe"  # 假设的exe名称
+            app_dir, updater_path, current_exe = self.get_updater_paths()
             
             # 2. 检查更新器是否存在
             if not updater_path.exists():
@@ -461,7 +650,8 @@ class SimpleTestApp(QWidget):
             
             self.log_message(f"📝 更新信息已保存到: {update_info_file}")
             
-            # 4. 启动更新器
+            # 4. 启动更新器（先停止后台预下载，避免同时下载）
+            self.stop_background_prefetch()
             self.log_message("🚀 启动更新器程序...")
             
             updater_args = [
@@ -498,6 +688,10 @@ class SimpleTestApp(QWidget):
     def close_application(self):
         """安全关闭应用程序"""
         try:
+            # 停止推送监听
+            if self.update_watcher:
+                self.update_watcher.stop()
+            
             # 关闭API客户端
             if self.api_client:
                 self.api_client.close()
@@ -543,6 +737,9 @@ class SimpleTestApp(QWidget):
     
     def closeEvent(self, event):
         """应用关闭事件"""
+        if self.update_watcher:
+            self.update_watcher.stop()
+        
         if self.api_client:
             self.api_client.close()
         
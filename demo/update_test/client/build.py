@@ -17,7 +17,10 @@ BUILD_CONFIG = {
     "app_description": "Kuzflow智能流程自动化管理平台",
     "output_dir": "release",
     "clean_before_build": True,
-    "create_installer": False
+    "create_installer": False,
+    # 目录模式（--onedir）：依赖放在 _internal/，启动时不再解压到临时目录；字节码 optimize=1，不使用 UPX
+    # 更新器只替换单个 exe，目录模式的发布需通过 zip 更新包分发
+    "onedir": False
 }
 
 def print_banner(title):
@@ -86,6 +89,66 @@ def create_spec_file():
     """创建PyInstaller规格文件"""
     print("📝 创建PyInstaller规格文件...")
     
+    app_icon = 'public/logo.ico' if os.path.exists('public/logo.ico') else None
+    if BUILD_CONFIG["onedir"]:
+        # 目录模式：exe 只含启动器与脚本，依赖由 COLLECT 放到 _internal/
+        app_optimize = "\n    optimize=1,"
+        app_bundle = f"""exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='{BUILD_CONFIG["app_name"]}',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    version='version_info.txt',
+    icon={app_icon!r},
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='{BUILD_CONFIG["app_name"]}',
+)
+"""
+    else:
+        app_optimize = ""
+        app_bundle = f"""exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    [],
+    name='{BUILD_CONFIG["app_name"]}',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=False,
+    disable_windowed_traceback=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    version='version_info.txt',
+    icon={app_icon!r},
+)
+"""
+    
     # 主程序规格文件
     app_spec_content = f"""# -*- mode: python ; coding: utf-8 -*-
 
@@ -115,34 +178,12 @@ a = Analysis(
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
-    noarchive=False,
+    noarchive=False,{app_optimize}
 )
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
-    [],
-    name='{BUILD_CONFIG["app_name"]}',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    version='version_info.txt',
-    icon='public/logo.ico' if os.path.exists('public/logo.ico') else None,
-)
-"""
+{app_bundle}"""
     
     # 更新器规格文件
     updater_spec_content = f"""# -*- mode: python ; coding: utf-8 -*-
@@ -289,7 +330,15 @@ def create_release_structure():
     app_exe = dist_dir / f'{BUILD_CONFIG["app_name"]}.exe'
     updater_exe = dist_dir / 'updater.exe'
     
-    if app_exe.exists():
+    if BUILD_CONFIG["onedir"]:
+        # 目录模式：复制 exe 与 _internal/
+        app_dir = dist_dir / BUILD_CONFIG["app_name"]
+        if not app_dir.exists():
+            print(f"  ❌ 主程序目录不存在: {app_dir}")
+            return False
+        shutil.copytree(app_dir, release_dir, dirs_exist_ok=True)
+        print(f"  ✅ 复制主程序目录: {BUILD_CONFIG['app_name']}/ (exe + _internal)")
+    elif app_exe.exists():
         shutil.copy2(app_exe, release_dir / f'{BUILD_CONFIG["app_name"]}.exe')
         print(f"  ✅ 复制主程序: {BUILD_CONFIG['app_name']}.exe")
     else:
@@ -504,6 +553,8 @@ def main():
     """主构建流程"""
     try:
         print_banner(f"构建 {BUILD_CONFIG['app_name']} v{BUILD_CONFIG['app_version']}")
+        if BUILD_CONFIG["onedir"]:
+            print("📁 目录模式：启动时不解压；发布更新请使用 zip 更新包（更新器只替换单个 exe）")
         
         # 检查当前目录
         required_files = ['app.py', 'updater.py']
@@ -563,6 +614,8 @@ def main():
         return False
 
 if __name__ == "__main__":
+    if "--onedir" in sys.argv:
+        BUILD_CONFIG["onedir"] = True
     success = main()
     
     if not success:
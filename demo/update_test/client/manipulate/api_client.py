@@ -4,9 +4,12 @@
 提供对服务器API的统一调用接口
 """
 
+import hashlib
+import json
 import requests
 import time
 import urllib3
+import uuid
 
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -147,6 +150,64 @@ class APIClient:
         }
         return self.call_api("/api/version/check", payload, method="GET")
 
+    def watch_updates(self, current_version, platform="windows", arch="x64",
+                      last_event_id=None, should_stop=None, read_timeout=60):
+        """
+        订阅新版本推送（SSE，/api/version/watch），逐个产出 update 事件
+        
+        Args:
+            current_version: 当前版本号
+            platform: 平台
+            arch: 架构
+            last_event_id: 上次收到的事件id（重连时已通知过的版本不再重复推送）
+            should_stop: 返回True时停止订阅（每收到一行检查一次，服务端约25秒发送一次心跳）
+            read_timeout: 读取超时（秒），应大于服务端心跳间隔
+        
+        Yields:
+            (event_id, data): 事件id（版本号）与版本检查响应
+        
+        Raises:
+            requests.RequestException: 连接失败或断开，由调用方重连
+        """
+        params = {
+            "current_version": current_version,
+            "platform": platform,
+            "arch": arch,
+            # 客户端标识：决定分批推送的延迟（由网卡地址哈希得到，不上传原始地址）
+            "client_id": hashlib.sha256(str(uuid.getnode()).encode("utf-8")).hexdigest()[:16]
+        }
+        headers = dict(self.session.headers)
+        headers["Accept"] = "text/event-stream"
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        
+        # 长连接使用独立的请求，不占用共享会话
+        with requests.get(f"{self.base_url}/api/version/watch", params=params, headers=headers,
+                          stream=True, timeout=(10, read_timeout), verify=False) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            self.log("📡 已连接新版本推送")
+            event, event_id, data = None, None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if should_stop and should_stop():
+                    return
+                if not line:
+                    # 空行：一个事件结束
+                    if event == "update" and data:
+                        yield event_id, json.loads("\n".join(data))
+                    event, data = None, []
+                    continue
+                if line.startswith(":"):
+                    continue  # 心跳注释
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    event = value
+                elif field == "data":
+                    data.append(value)
+                elif field == "id":
+                    event_id = value
+
     def get_version_info(self, version):
         """获取版本详细信息"""
         return self.call_api(f"/api/version/info/{version}", method="GET")
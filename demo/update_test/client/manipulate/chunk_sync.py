@@ -0,0 +1,203 @@
+"""
+分块同步
+供更新器（updater.py）使用，只依赖 requests，不依赖 PyQt5
+
+服务端把发布文件按内容定义分块存储（server/functions/chunk_store.py），分块列表由
+/api/version/chunks/{版本}?base_version={当前版本} 返回：
+- 本地文件与当前版本的分块列表一致（大小与 SHA256 相同）时，已知本地每个分块的位置，直接复用
+- 缺少的分块通过 /api/chunks/pack 批量下载（多个批次并行），逐块校验 SHA256 后暂存到 {输出文件}.chunks/，
+  中断后已下载的分块不再重下
+- 按分块列表顺序拼出新文件，校验整体 SHA256 后替换输出文件
+"""
+
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# 单个批次的分块数 / 字节数上限（服务端单次最多 256 块）
+PACK_MAX_CHUNKS = 256
+PACK_MAX_BYTES = 8 * 1024 * 1024
+# 并行批次数
+DEFAULT_WORKERS = 4
+# 读取本地文件的块大小
+READ_SIZE = 1024 * 1024
+# 读取批量下载响应的块大小
+PACK_READ_SIZE = 64 * 1024
+
+
+class ChunkSyncError(Exception):
+    """分块同步失败"""
+
+
+def file_sha256(file_path):
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b""):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+def plan_packs(chunks):
+    """把待下载分块按数量 / 大小上限分成批次"""
+    packs, current, current_bytes = [], [], 0
+    for chunk in chunks:
+        if current and (len(current) >= PACK_MAX_CHUNKS or current_bytes + chunk["size"] > PACK_MAX_BYTES):
+            packs.append(current)
+            current, current_bytes = [], 0
+        current.append(chunk)
+        current_bytes += chunk["size"]
+    if current:
+        packs.append(current)
+    return packs
+
+
+class ChunkSync:
+    """按分块列表生成新版本文件"""
+
+    def __init__(self, session, base_url, index, output_path, local_path=None,
+                 workers=DEFAULT_WORKERS, progress_callback=None, log_callback=None, timeout=60,
+                 rate_limiter=None):
+        """
+        Args:
+            session: requests.Session
+            base_url: 服务器地址
+            index: 目标版本的分块列表 {"size", "sha256", "chunks", "base": 当前版本的分块列表或 None}
+            output_path: 新文件路径
+            local_path: 本地当前版本文件（与 index["base"] 一致时复用其中的分块）
+            workers: 并行批次数
+            progress_callback: 进度回调 (已下载字节, 需下载字节)
+            log_callback: 日志回调
+            timeout: 单个请求超时（秒）
+            rate_limiter: 限速器（segmented_download.RateLimiter，None 为不限速）
+        """
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.index = index
+        self.output_path = str(output_path)
+        self.local_path = str(local_path) if local_path else None
+        self.workers = max(1, workers)
+        self.progress_callback = progress_callback
+        self.log_callback = log_callback
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache_dir = self.output_path + ".chunks"
+        self._downloaded = 0
+        self._to_download = 0
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def _local_chunks(self):
+        """本地文件中可复用的分块：哈希 -> 偏移"""
+        base = self.index.get("base")
+        if not base or not self.local_path or not os.path.exists(self.local_path):
+            return {}
+        if os.path.getsize(self.local_path) != base["size"] or file_sha256(self.local_path) != base["sha256"]:
+            self.log("⚠️ 本地文件与当前版本的分块列表不一致，不复用本地分块")
+            return {}
+        offsets, offset = {}, 0
+        for chunk in base["chunks"]:
+            offsets.setdefault(chunk["hash"], offset)
+            offset += chunk["size"]
+        return offsets
+
+    def _cache_path(self, chunk_hash):
+        return os.path.join(self.cache_dir, chunk_hash)
+
+    def sync(self):
+        """
+        执行同步
+
+        Returns:
+            dict: {"reused_bytes", "downloaded_bytes", "total_bytes"}
+
+        Raises:
+            ChunkSyncError: 下载或校验失败
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        local = self._local_chunks()
+        cached = set(os.listdir(self.cache_dir))
+
+        unique = {}
+        for chunk in self.index["chunks"]:
+            unique.setdefault(chunk["hash"], chunk)
+        missing = [c for h, c in unique.items() if h not in local and h not in cached]
+        self._to_download = sum(c["size"] for c in missing)
+        reused = sum(c["size"] for h, c in unique.items() if h in local)
+        self.log(f"🧱 分块同步: 共 {len(unique)} 块, 本地复用 {reused:,} 字节, "
+                 f"已缓存 {len(cached & set(unique))} 块, 需下载 {len(missing)} 块 / {self._to_download:,} 字节")
+
+        packs = plan_packs(missing)
+        if packs:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chunk-pack") as pool:
+                for future in [pool.submit(self._download_pack, pack) for pack in packs]:
+                    future.result()
+
+        self._assemble(local)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return {"reused_bytes": reused, "downloaded_bytes": self._to_download, "total_bytes": self.index["size"]}
+
+    def _download_pack(self, pack):
+        """下载一个批次，按分块大小切分并逐块校验"""
+        response = self.session.post(f"{self.base_url}/api/chunks/pack",
+                                     json={"hashes": [c["hash"] for c in pack]},
+                                     stream=True, timeout=self.timeout)
+        if response.status_code != 200:
+            response.close()
+            raise ChunkSyncError(f"批量下载分块失败: HTTP {response.status_code}")
+
+        buffer = bytearray()
+        position = 0
+        try:
+            for data in response.iter_content(chunk_size=PACK_READ_SIZE):
+                if self.rate_limiter:
+                    self.rate_limiter.consume(len(data))
+                buffer += data
+                while position < len(pack) and len(buffer) >= pack[position]["size"]:
+                    chunk = pack[position]
+                    self._save_chunk(chunk, bytes(buffer[:chunk["size"]]))
+                    del buffer[:chunk["size"]]
+                    position += 1
+        finally:
+            response.close()
+        if position != len(pack) or buffer:
+            raise ChunkSyncError(f"批量下载分块不完整: {position}/{len(pack)}")
+
+    def _save_chunk(self, chunk, data):
+        if hashlib.sha256(data).hexdigest() != chunk["hash"]:
+            raise ChunkSyncError(f"分块哈希校验失败: {chunk['hash']}")
+        path = self._cache_path(chunk["hash"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._downloaded += len(data)
+        if self.progress_callback:
+            self.progress_callback(self._downloaded, self._to_download)
+
+    def _assemble(self, local):
+        """按分块列表拼出新文件并校验整体哈希"""
+        tmp_path = self.output_path + ".assemble"
+        sha256_hash = hashlib.sha256()
+        local_file = open(self.local_path, "rb") if local else None
+        try:
+            with open(tmp_path, "wb") as out:
+                for chunk in self.index["chunks"]:
+                    if chunk["hash"] in local:
+                        local_file.seek(local[chunk["hash"]])
+                        data = local_file.read(chunk["size"])
+                    else:
+                        with open(self._cache_path(chunk["hash"]), "rb") as f:
+                            data = f.read()
+                    sha256_hash.update(data)
+                    out.write(data)
+        finally:
+            if local_file:
+                local_file.close()
+
+        if sha256_hash.hexdigest() != self.index["sha256"]:
+            os.remove(tmp_path)
+            raise ChunkSyncError("拼接后的文件哈希校验失败")
+        os.replace(tmp_path, self.output_path)
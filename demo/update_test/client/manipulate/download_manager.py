@@ -1,13 +1,14 @@
 """
 下载管理器
-负责文件下载、断点续传等功能
+负责文件下载、断点续传等功能（分段并行下载见 segmented_download）
 """
 
 import os
-import hashlib
 import time
 from PyQt5.QtCore import QObject, pyqtSignal, QThread
 
+from .segmented_download import SegmentedDownloader, DownloadError, DownloadCancelled
+
 
 class DownloadThread(QThread):
     """下载线程"""
@@ -16,13 +17,17 @@ class DownloadThread(QThread):
     download_completed = pyqtSignal(str, str)  # 文件路径, 文件哈希
     download_failed = pyqtSignal(str)  # 错误消息
     
-    def __init__(self, api_client, version, file_path, expected_size, expected_hash):
+    def __init__(self, api_client, version, file_path, expected_size, expected_hash, segments=None,
+                 compression=None):
         super().__init__()
         self.api_client = api_client
         self.version = version
         self.file_path = file_path
         self.expected_size = expected_size
         self.expected_hash = expected_hash
+        self.segments = segments
+        self.compression = compression
+        self.downloader = None
         self.should_stop = False
     
     def run(self):
@@ -33,111 +38,59 @@ class DownloadThread(QThread):
             self.download_failed.emit(str(e))
     
     def download_with_resume(self):
-        """支持断点续传的下载"""
-        # 检查是否存在部分下载的文件
-        resume_pos = 0
-        if os.path.exists(self.file_path):
-            resume_pos = os.path.getsize(self.file_path)
-            self.progress_updated.emit(
-                int((resume_pos / self.expected_size) * 100) if self.expected_size > 0 else 0,
-                f"发现部分下载文件，从 {resume_pos} 字节处继续下载"
-            )
-        
-        # 设置Range头进行断点续传
-        range_header = f"bytes={resume_pos}-" if resume_pos > 0 else None
-        
-        # 开始下载
-        success, response = self.api_client.download_version(
-            self.version,
-            range_header=range_header
-        )
-        
-        if not success:
-            raise Exception(f"下载请求失败: {response}")
-        
-        # 获取文件总大小
-        if hasattr(response, 'headers'):
-            content_range = response.headers.get('Content-Range')
-            if content_range:
-                # 解析 Content-Range: bytes 1024-2047/2048
-                total_size = int(content_range.split('/')[-1])
-            else:
-                total_size = self.expected_size or int(response.headers.get('Content-Length', 0))
-        else:
-            total_size = self.expected_size
-        
-        # 打开文件进行写入
-        mode = 'ab' if resume_pos > 0 else 'wb'
-        downloaded = resume_pos
-        
+        """分段并行下载（分段哈希与整体哈希边下载边校验，中断后按分段续传）"""
         start_time = time.time()
-        last_update_time = start_time
+        last_update_time = [start_time]
         
-        with open(self.file_path, mode) as f:
-            try:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if self.should_stop:
-                        break
-                    
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # 更新进度（每0.5秒更新一次）
-                        current_time = time.time()
-                        if current_time - last_update_time >= 0.5:
-                            if total_size > 0:
-                                percent = int((downloaded / total_size) * 100)
-                            else:
-                                percent = 0
-                            
-                            # 计算下载速度
-                            elapsed = current_time - start_time
-                            if elapsed > 0:
-                                speed = downloaded / elapsed / 1024 / 1024  # MB/s
-                                eta = (total_size - downloaded) / (downloaded / elapsed) if downloaded > 0 else 0
-                                status_msg = f"已下载 {downloaded}/{total_size} 字节 ({speed:.2f} MB/s, 剩余 {eta:.0f}s)"
-                            else:
-                                status_msg = f"已下载 {downloaded}/{total_size} 字节"
-                            
-                            self.progress_updated.emit(percent, status_msg)
-                            last_update_time = current_time
-                
-                if self.should_stop:
-                    self.download_failed.emit("下载被用户取消")
-                    return
-                
-            except Exception as e:
-                raise Exception(f"下载过程中出错: {str(e)}")
-        
-        # 验证文件完整性
-        if total_size > 0 and downloaded != total_size:
-            raise Exception(f"下载不完整: {downloaded}/{total_size} 字节")
+        def on_progress(downloaded, total_size):
+            # 更新进度（每0.5秒更新一次）
+            current_time = time.time()
+            if current_time - last_update_time[0] < 0.5:
+                return
+            last_update_time[0] = current_time
+            percent = int((downloaded / total_size) * 100) if total_size > 0 else 0
+            elapsed = current_time - start_time
+            if elapsed > 0 and downloaded > 0:
+                speed = downloaded / elapsed / 1024 / 1024  # MB/s
+                eta = (total_size - downloaded) / (downloaded / elapsed)
+                status_msg = f"已下载 {downloaded}/{total_size} 字节 ({speed:.2f} MB/s, 剩余 {eta:.0f}s)"
+            else:
+                status_msg = f"已下载 {downloaded}/{total_size} 字节"
+            self.progress_updated.emit(percent, status_msg)
         
-        # 计算文件哈希
-        file_hash = self.calculate_file_hash()
+        self.downloader = SegmentedDownloader(
+            self.api_client.session,
+            f"{self.api_client.base_url}/api/version/download/{self.version}",
+            self.file_path,
+            total_size=self.expected_size,
+            expected_hash=self.expected_hash,
+            segments=self.segments,
+            params=dict({"platform": "windows", "arch": "x64"},
+                        **({"compression": self.compression} if self.compression else {})),
+            progress_callback=on_progress,
+            log_callback=self.api_client.log
+        )
+        if self.should_stop:
+            self.download_failed.emit("下载被用户取消")
+            return
         
-        # 验证哈希（如果提供了预期哈希）
-        if self.expected_hash and file_hash != self.expected_hash:
-            raise Exception("文件哈希校验失败")
+        try:
+            file_hash = self.downloader.download()
+        except DownloadCancelled:
+            self.download_failed.emit("下载被用户取消")
+            return
+        except DownloadError as e:
+            raise Exception(f"下载过程中出错: {str(e)}")
         
+        downloaded = os.path.getsize(self.file_path)
         self.progress_updated.emit(100, f"下载完成: {downloaded} 字节")
         self.download_completed.emit(self.file_path, file_hash)
     
-    def calculate_file_hash(self):
-        """计算文件哈希"""
-        sha256_hash = hashlib.sha256()
-        try:
-            with open(self.file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(chunk)
-            return sha256_hash.hexdigest()
-        except Exception:
-            return ""
-    
     def stop(self):
         """停止下载"""
         self.should_stop = True
+        if self.downloader:
+            self.downloader.stop()
 
 
 class DownloadManager(QObject):
@@ -161,8 +114,8 @@ class DownloadManager(QObject):
         else:
             print(f"[下载管理器] {message}")
     
-    def download_file(self, version, file_path, expected_size=0, expected_hash=""):
-        """下载文件"""
+    def download_file(self, version, file_path, expected_size=0, expected_hash="", segments=None, compression=None):
+        """下载文件（compression 为 "zstd" 时下载压缩版本的更新包）"""
         if self.download_thread and self.download_thread.isRunning():
             self.log("下载正在进行中...")
             return False
@@ -176,7 +129,9 @@ class DownloadManager(QObject):
                 version,
                 file_path,
                 expected_size,
-                expected_hash
+                expected_hash,
+                segments,
+                compression
             )
             
             # 连接信号
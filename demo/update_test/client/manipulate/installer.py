@@ -1,15 +1,38 @@
 """
 更新安装器
 负责解压和安装更新包
+
+- 条目直接从压缩包流式写入安装目录下的暂存目录，不整体解压到临时目录
+- 与 install_manifest.json 记录一致的文件跳过，只处理变化的文件
+- 包内 update_manifest.json 提供每个文件的SHA256时逐个校验
+- 全部暂存并校验通过后再用重命名替换，失败时回滚
+- 也支持 zstd 固实更新包（zstd_package.SolidPackage）：包头提供每个文件的SHA256，
+  只并行解压包含变化文件的帧，其余流程相同
 """
 
 import os
+import json
 import shutil
+import hashlib
 import zipfile
-import tempfile
 import time
 from pathlib import Path
 
+from .zstd_package import SolidPackage, is_solid_package
+
+# 更新包内的文件清单（{"files": {相对路径: {"sha256", "size"}}}，由 create_update_packages.py 写入）
+PACKAGE_MANIFEST = "update_manifest.json"
+# 安装目录中记录已安装文件摘要的清单
+INSTALLED_MANIFEST = "install_manifest.json"
+# 不覆盖的文件
+PROTECTED_FILES = [
+    'version.txt',  # 版本文件由更新管理器单独处理
+    'temp/*',
+    'backup/*'
+]
+# 流式解压的读取块大小
+COPY_CHUNK_SIZE = 1024 * 1024
+
 
 class UpdateInstaller:
     """更新安装器"""
@@ -37,6 +60,8 @@ class UpdateInstaller:
         Returns:
             bool: 安装是否成功
         """
+        install_dir = Path(install_dir)
+        staging_dir = install_dir / f".staging_{target_version}"
         try:
             self.log(f"开始安装更新: {current_version} -> {target_version}")
             
@@ -44,19 +69,40 @@ class UpdateInstaller:
             if not self.verify_package(package_path):
                 raise Exception("更新包验证失败")
             
-            # 创建临时目录
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-                
-                # 解压更新包
-                self.log("解压更新包...")
-                if not self.extract_package(package_path, temp_path):
-                    raise Exception("解压更新包失败")
-                
-                # 安装文件
-                self.log("安装更新文件...")
-                if not self.install_files(temp_path, Path(install_dir)):
-                    raise Exception("安装文件失败")
+            installed_files = self.load_installed_manifest(install_dir)
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            if is_solid_package(package_path):
+                # zstd 固实包：只解压包含变化文件的帧
+                package = SolidPackage(package_path)
+                entries = self.plan_solid_install(package, install_dir, installed_files)
+                changed = [entry for entry in entries if entry["changed"]]
+                self.log(f"需要更新 {len(changed)} 个文件，跳过 {len(entries) - len(changed)} 个未变化文件")
+                package.extract([entry["path"] for entry in changed], staging_dir)
+            else:
+                with zipfile.ZipFile(package_path, 'r') as zip_ref:
+                    package_manifest = self.read_package_manifest(zip_ref)
+                    
+                    # 只处理与已安装文件不同的条目
+                    entries = self.plan_install(zip_ref, install_dir, package_manifest, installed_files)
+                    changed = [entry for entry in entries if entry["changed"]]
+                    self.log(f"需要更新 {len(changed)} 个文件，跳过 {len(entries) - len(changed)} 个未变化文件")
+                    
+                    # 逐个条目从压缩包流式写入暂存目录（不整体解压）
+                    self.stage_files(zip_ref, changed, staging_dir)
+            
+            # 用重命名替换到安装目录（失败时回滚）
+            self.swap_files(changed, staging_dir, install_dir, target_version)
+            
+            # 记录已安装文件的摘要，下次更新据此跳过未变化的文件
+            for entry in entries:
+                stat = (install_dir / entry["path"]).stat()
+                installed_files[entry["path"]] = {
+                    "sha256": entry["sha256"] or installed_files.get(entry["path"], {}).get("sha256", ""),
+                    "crc32": entry["crc32"],
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns
+                }
+            self.save_installed_manifest(install_dir, target_version, installed_files)
             
             self.log("更新安装完成")
             return True
@@ -64,6 +110,8 @@ class UpdateInstaller:
         except Exception as e:
             self.log(f"安装失败: {e}")
             return False
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
     
     def verify_package(self, package_path):
         """验证更新包"""
@@ -72,22 +120,23 @@ class UpdateInstaller:
                 self.log("更新包文件不存在")
                 return False
             
-            # 检查是否为有效的zip文件
-            if not zipfile.is_zipfile(package_path):
-                self.log("不是有效的zip文件")
+            if is_solid_package(package_path):
+                # zstd 固实包：包头可读且帧表与文件大小一致
+                file_list = list(SolidPackage(package_path).files)
+            elif zipfile.is_zipfile(package_path):
+                with zipfile.ZipFile(package_path, 'r') as zip_ref:
+                    file_list = zip_ref.namelist()
+            else:
+                self.log("不是有效的zip文件或zstd更新包")
                 return False
             
-            # 检查zip文件内容
-            with zipfile.ZipFile(package_path, 'r') as zip_ref:
-                file_list = zip_ref.namelist()
-                
-                # 检查必需的文件
-                required_files = ['app.py']  # 至少要有主程序文件
-                
-                for required_file in required_files:
-                    if not any(f.endswith(required_file) for f in file_list):
-                        self.log(f"缺少必需文件: {required_file}")
-                        return False
+            # 检查必需的文件
+            required_files = ['app.py']  # 至少要有主程序文件
+            
+            for required_file in required_files:
+                if not any(f.endswith(required_file) for f in file_list):
+                    self.log(f"缺少必需文件: {required_file}")
+                    return False
             
             self.log("更新包验证通过")
             return True
@@ -96,73 +145,177 @@ class UpdateInstaller:
             self.log(f"验证更新包时出错: {e}")
             return False
     
-    def extract_package(self, package_path, extract_dir):
-        """解压更新包"""
-        try:
-            with zipfile.ZipFile(package_path, 'r') as zip_ref:
-                # 解压所有文件
-                zip_ref.extractall(extract_dir)
-                
-                # 列出解压的文件
-                extracted_files = list(extract_dir.rglob('*'))
-                self.log(f"解压了 {len(extracted_files)} 个文件")
-                
-                return True
-                
-        except Exception as e:
-            self.log(f"解压失败: {e}")
-            return False
+    def read_package_manifest(self, zip_ref):
+        """
+        读取更新包内的文件清单（update_manifest.json）
+        
+        Returns:
+            dict: {相对路径: {"sha256", "size"}}，旧格式的包没有清单时返回空字典（只依赖zip自带的CRC32校验）
+        """
+        if PACKAGE_MANIFEST not in zip_ref.namelist():
+            self.log("更新包没有文件清单，使用CRC32校验")
+            return {}
+        with zip_ref.open(PACKAGE_MANIFEST) as f:
+            return json.load(f).get("files", {})
     
-    def install_files(self, source_dir, target_dir):
-        """安装文件到目标目录"""
+    def load_installed_manifest(self, install_dir):
+        """读取已安装文件的摘要（install_manifest.json）"""
+        manifest_file = Path(install_dir) / INSTALLED_MANIFEST
         try:
-            # 需要更新的文件模式
-            update_patterns = [
-                'app.py',
-                'manipulate/*.py',
-                'config/*.json',
-                'public/*'
-            ]
-            
-            # 需要保护的文件（不覆盖）
-            protected_files = [
-                'version.txt',  # 版本文件由更新管理器单独处理
-                'temp/*',
-                'backup/*'
-            ]
-            
-            installed_count = 0
-            
-            # 遍历源目录中的所有文件
-            for source_file in source_dir.rglob('*'):
-                if source_file.is_file():
-                    # 计算相对路径
-                    rel_path = source_file.relative_to(source_dir)
-                    target_file = target_dir / rel_path
-                    
-                    # 检查是否为受保护的文件
-                    if self.is_protected_file(rel_path, protected_files):
-                        self.log(f"跳过受保护文件: {rel_path}")
-                        continue
-                    
-                    # 创建目标目录
-                    target_file.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # 复制文件
-                    try:
-                        shutil.copy2(source_file, target_file)
-                        installed_count += 1
-                        self.log(f"安装文件: {rel_path}")
-                    except Exception as e:
-                        self.log(f"安装文件失败 {rel_path}: {e}")
-                        # 继续安装其他文件
-            
-            self.log(f"成功安装 {installed_count} 个文件")
-            return installed_count > 0
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError):
+            return {}
+    
+    def save_installed_manifest(self, install_dir, version, files):
+        """写入已安装文件的摘要（先写临时文件再替换）"""
+        manifest_file = Path(install_dir) / INSTALLED_MANIFEST
+        tmp_file = manifest_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": version, "files": files}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, manifest_file)
+    
+    def plan_install(self, zip_ref, install_dir, package_manifest, installed_files):
+        """
+        对比更新包条目与已安装文件
+        
+        已安装文件的 size / mtime 与记录一致、且 SHA256（包内有清单时）或 CRC32 与条目一致时视为未变化，
+        不需要解压也不需要读取已安装文件。
+        
+        Returns:
+            list: [{"info", "path", "sha256", "crc32", "size", "changed"}]
+        """
+        entries = []
+        for info in zip_ref.infolist():
+            rel_path = info.filename.replace('\\', '/')
+            if info.is_dir() or rel_path == PACKAGE_MANIFEST:
+                continue
+            if not self.check_entry_path(rel_path):
+                continue
             
-        except Exception as e:
-            self.log(f"安装文件时出错: {e}")
+            expected = package_manifest.get(rel_path, {})
+            if expected and expected.get("size") != info.file_size:
+                raise Exception(f"文件清单与压缩包不一致: {rel_path}")
+            entry = {
+                "info": info,
+                "path": rel_path,
+                "sha256": expected.get("sha256", ""),
+                "crc32": info.CRC,
+                "size": info.file_size
+            }
+            entry["changed"] = not self.is_unchanged(entry, install_dir, installed_files)
+            entries.append(entry)
+        return entries
+    
+    def plan_solid_install(self, package, install_dir, installed_files):
+        """
+        对比 zstd 固实包中的文件与已安装文件（规则同 plan_install，包头总是提供SHA256）
+        
+        Returns:
+            list: [{"path", "sha256", "crc32", "size", "changed"}]
+        """
+        entries = []
+        for rel_path, info in package.files.items():
+            if not self.check_entry_path(rel_path):
+                continue
+            entry = {"path": rel_path, "sha256": info["sha256"], "crc32": None, "size": info["size"]}
+            entry["changed"] = not self.is_unchanged(entry, install_dir, installed_files)
+            entries.append(entry)
+        return entries
+    
+    def check_entry_path(self, rel_path):
+        """
+        检查包内路径
+        
+        Returns:
+            bool: 需要安装返回True；受保护文件返回False
+        
+        Raises:
+            Exception: 绝对路径或包含 ..（防止写到安装目录之外）
+        """
+        if rel_path.startswith('/') or '..' in rel_path.split('/') or ':' in rel_path:
+            raise Exception(f"更新包包含非法路径: {rel_path}")
+        if self.is_protected_file(rel_path, PROTECTED_FILES):
+            self.log(f"跳过受保护文件: {rel_path}")
+            return False
+        return True
+    
+    def is_unchanged(self, entry, install_dir, installed_files):
+        """已安装文件的 size / mtime 与记录一致，且 SHA256（或没有SHA256时的 CRC32）与条目一致"""
+        record = installed_files.get(entry["path"])
+        target_file = Path(install_dir) / entry["path"]
+        if not record or not target_file.exists():
             return False
+        stat = target_file.stat()
+        same_file = stat.st_size == record.get("size") and stat.st_mtime_ns == record.get("mtime_ns")
+        if entry["sha256"] and record.get("sha256"):
+            same_content = entry["sha256"] == record["sha256"]
+        else:
+            same_content = entry["crc32"] == record.get("crc32") and entry["size"] == record.get("size")
+        return same_file and same_content
+    
+    def stage_files(self, zip_ref, entries, staging_dir):
+        """
+        把变化的条目从压缩包流式写入暂存目录，边写边校验SHA256（zip读取时同时校验CRC32）
+        
+        Raises:
+            Exception: 校验失败
+        """
+        for entry in entries:
+            staged_file = Path(staging_dir) / entry["path"]
+            staged_file.parent.mkdir(parents=True, exist_ok=True)
+            sha256_hash = hashlib.sha256()
+            with zip_ref.open(entry["info"]) as source, open(staged_file, 'wb') as target:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b""):
+                    sha256_hash.update(chunk)
+                    target.write(chunk)
+            actual = sha256_hash.hexdigest()
+            if entry["sha256"] and actual != entry["sha256"]:
+                raise Exception(f"文件哈希校验失败: {entry['path']}")
+            entry["sha256"] = actual
+            # 保留压缩包中的修改时间（与原 extractall + copy2 行为一致）
+            mtime = time.mktime(entry["info"].date_time + (0, 0, -1))
+            os.utime(staged_file, (mtime, mtime))
+    
+    def swap_files(self, entries, staging_dir, install_dir, version):
+        """
+        用重命名把暂存文件替换到安装目录
+        
+        被替换的文件先重命名到备份目录；任何一步失败都把已替换的文件还原，安装目录保持原样。
+        暂存目录与安装目录在同一磁盘，重命名不复制数据。
+        """
+        backup_dir = Path(install_dir) / f".replaced_{version}"
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        swapped = []
+        rollback_failed = False
+        try:
+            for entry in entries:
+                target_file = Path(install_dir) / entry["path"]
+                backup_file = backup_dir / entry["path"]
+                target_file.parent.mkdir(parents=True, exist_ok=True)
+                had_original = target_file.exists()
+                if had_original:
+                    backup_file.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(target_file, backup_file)
+                swapped.append((target_file, backup_file if had_original else None))
+                os.replace(Path(staging_dir) / entry["path"], target_file)
+                self.log(f"安装文件: {entry['path']}")
+        except Exception:
+            self.log("替换文件失败，回滚已替换的文件")
+            for target_file, backup_file in reversed(swapped):
+                try:
+                    if backup_file is not None:
+                        os.replace(backup_file, target_file)
+                    elif target_file.exists():
+                        target_file.unlink()
+                except OSError as e:
+                    rollback_failed = True
+                    self.log(f"回滚失败 {target_file}: {e}（原文件保留在 {backup_dir}）")
+            raise
+        finally:
+            if not rollback_failed:
+                shutil.rmtree(backup_dir, ignore_errors=True)
+        self.log(f"成功安装 {len(swapped)} 个文件")
     
     def is_protected_file(self, file_path, protected_patterns):
         """检查文件是否受保护"""
@@ -0,0 +1,391 @@
+"""
+分段并行下载器
+供更新器（updater.py）与下载线程（download_manager.py）共用，只依赖 requests，不依赖 PyQt5
+
+- 先用 Range: bytes=0-0 探测文件大小与是否支持断点续传；不支持时退回单连接下载
+- 目标文件预分配后，N 个连接各自请求一个分段（Range），直接写入文件对应位置
+- 服务端提供分段哈希时，每个分段边下载边校验，出错只重下该分段
+- 整体 SHA256 边下载边计算：按文件顺序消费数据，乱序到达的数据先放内存（有上限），
+  超出上限的部分下载完成后才从磁盘读回；正常情况下不需要下载后再整体读一遍文件
+- 已完成的分段记录在 {文件}.parts，中断后按分段续传
+- 可传入 RateLimiter 限速（后台预下载时使用，多个连接共享同一个限额）
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 默认并发连接数与分段大小（服务端提供分段哈希时以服务端的分段大小为准）
+DEFAULT_WORKERS = 4
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+# 每次读取的块大小
+CHUNK_SIZE = 64 * 1024
+# 乱序数据在内存中等待计算整体哈希的上限
+HASH_BUFFER_LIMIT = 64 * 1024 * 1024
+# 单个分段的重试次数
+SEGMENT_RETRIES = 3
+
+
+class DownloadError(Exception):
+    """下载失败"""
+
+
+class DownloadCancelled(DownloadError):
+    """下载被取消（已完成的分段保留，可续传）"""
+
+
+class RateLimiter:
+    """令牌桶限速（线程安全，多个连接共享），rate 为每秒字节数"""
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """取用 amount 字节的额度，不足时等待"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class OrderedHasher:
+    """
+    按文件顺序计算 SHA256
+    - feed(offset, data)：数据到达时调用；正好接在已计算位置之后的直接计算
+    - 乱序数据放入内存等待；超过上限的只记录范围，轮到时从磁盘读回
+    """
+
+    def __init__(self, file_path, buffer_limit=HASH_BUFFER_LIMIT):
+        self.file_path = file_path
+        self.buffer_limit = buffer_limit
+        self.sha256 = hashlib.sha256()
+        self.cursor = 0
+        self.tainted = False
+        self._pending = {}      # offset -> bytes
+        self._pending_bytes = 0
+        self._on_disk = {}      # offset -> length（已写入磁盘、未放入内存的数据）
+        self._lock = threading.Lock()
+
+    def feed(self, offset, data):
+        """数据（已写入磁盘后）到达"""
+        with self._lock:
+            if offset == self.cursor:
+                self.sha256.update(data)
+                self.cursor += len(data)
+            elif offset > self.cursor:
+                if self._pending_bytes + len(data) <= self.buffer_limit:
+                    self._pending[offset] = data
+                    self._pending_bytes += len(data)
+                else:
+                    self._on_disk[offset] = len(data)
+            self._drain()
+
+    def mark_on_disk(self, offset, length):
+        """续传时已完成的分段：轮到时从磁盘读取"""
+        with self._lock:
+            if offset >= self.cursor:
+                self._on_disk[offset] = length
+            self._drain()
+
+    def _drain(self):
+        while True:
+            data = self._pending.pop(self.cursor, None)
+            if data is not None:
+                self._pending_bytes -= len(data)
+            elif self.cursor in self._on_disk:
+                length = self._on_disk.pop(self.cursor)
+                with open(self.file_path, "rb") as f:
+                    f.seek(self.cursor)
+                    data = f.read(length)
+                if len(data) != length:
+                    # 读到的数据不完整（不应发生），留给最终整体校验
+                    self.tainted = True
+                    return
+            else:
+                return
+            self.sha256.update(data)
+            self.cursor += len(data)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def file_sha256(file_path):
+    """整体读取计算 SHA256（仅在异常路径使用）"""
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+class SegmentedDownloader:
+    """分段并行下载器"""
+
+    def __init__(self, session, url, file_path, total_size=0, expected_hash="",
+                 segments=None, workers=DEFAULT_WORKERS, params=None,
+                 progress_callback=None, log_callback=None, timeout=30, rate_limiter=None):
+        """
+        Args:
+            session: requests.Session（多个线程共用连接池）
+            url: 下载地址
+            file_path: 保存路径
+            total_size: 文件大小（0 表示探测）
+            expected_hash: 整体 SHA256（为空时不校验）
+            segments: 服务端提供的分段信息 {"size": 分段大小, "hashes": [每段 SHA256]}
+            workers: 并发连接数
+            params: 请求查询参数
+            progress_callback: 进度回调 (已下载字节, 总字节)
+            log_callback: 日志回调
+            timeout: 单个请求超时（秒）
+            rate_limiter: 限速器（RateLimiter，None 为不限速）
+        """
+        self.session = session
+        self.url = url
+        self.file_path = str(file_path)
+        self.total_size = total_size
+        self.expected_hash = (expected_hash or "").lower()
+        self.segment_size = (segments or {}).get("size") or DEFAULT_SEGMENT_SIZE
+        self.segment_hashes = (segments or {}).get("hashes") or []
+        self.workers = max(1, workers)
+        self.params = params
+        self.progress_callback = progress_callback
+        self.log_callback = log_callback
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.state_path = self.file_path + ".parts"
+        self._stop = threading.Event()
+        self._downloaded = 0
+        self._progress_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._done = set()
+        # 探测响应返回的强 ETag（分段请求的 If-Range 只使用服务端实际返回的值）
+        self.etag = ""
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def stop(self):
+        """取消下载（已完成的分段保留）"""
+        self._stop.set()
+
+    def _progress(self, size):
+        with self._progress_lock:
+            self._downloaded += size
+            downloaded = self._downloaded
+        if self.progress_callback:
+            self.progress_callback(downloaded, self.total_size)
+
+    def _get(self, headers=None):
+        response = self.session.get(self.url, params=self.params, headers=headers or {},
+                                    stream=True, timeout=self.timeout)
+        if response.status_code not in (200, 206):
+            response.close()
+            raise DownloadError(f"HTTP {response.status_code}")
+        return response
+
+    # ===================== 主流程 =====================
+
+    def download(self):
+        """
+        执行下载
+
+        Returns:
+            str: 文件的 SHA256
+
+        Raises:
+            DownloadCancelled: 被取消
+            DownloadError: 下载或校验失败
+        """
+        supports_range = self._probe()
+        if not supports_range or self.total_size <= 0:
+            self.log("服务器不支持分段下载，使用单连接下载")
+            digest = self._download_single()
+        else:
+            digest = self._download_segments()
+
+        if self.expected_hash and digest != self.expected_hash:
+            raise DownloadError(f"文件哈希校验失败: 期望 {self.expected_hash}, 实际 {digest}")
+        return digest
+
+    def _probe(self):
+        """探测文件大小、Range 支持与 ETag"""
+        response = self._get({"Range": "bytes=0-0"})
+        try:
+            etag = response.headers.get("ETag", "")
+            # 弱 ETag 不能用于 If-Range
+            self.etag = etag if etag.startswith('"') else ""
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code == 206 and "/" in content_range:
+                self.total_size = int(content_range.split("/")[-1])
+                return True
+            if not self.total_size:
+                self.total_size = int(response.headers.get("Content-Length", 0))
+            return False
+        finally:
+            response.close()
+
+    def _download_single(self):
+        """单连接下载（边下载边计算哈希）"""
+        sha256_hash = hashlib.sha256()
+        response = self._get()
+        with open(self.file_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if self._stop.is_set():
+                    response.close()
+                    raise DownloadCancelled("下载被用户取消")
+                if chunk:
+                    if self.rate_limiter:
+                        self.rate_limiter.consume(len(chunk))
+                    f.write(chunk)
+                    sha256_hash.update(chunk)
+                    self._progress(len(chunk))
+        return sha256_hash.hexdigest()
+
+    def _load_state(self):
+        """读取续传状态（文件大小、分段大小、目标哈希一致时才使用）"""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if (state.get("size") == self.total_size and state.get("segment_size") == self.segment_size
+                    and state.get("sha256", "") == self.expected_hash
+                    and os.path.getsize(self.file_path) == self.total_size):
+                return set(state.get("done", []))
+        except Exception:
+            pass
+        return set()
+
+    def _save_state(self):
+        with self._state_lock:
+            state = {"size": self.total_size, "segment_size": self.segment_size,
+                     "sha256": self.expected_hash, "done": sorted(self._done)}
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+
+    def _download_segments(self):
+        count = (self.total_size + self.segment_size - 1) // self.segment_size
+        if self.segment_hashes and len(self.segment_hashes) != count:
+            self.log("分段哈希数量与文件大小不符，忽略分段校验")
+            self.segment_hashes = []
+
+        self._done = self._load_state()
+        if not self._done:
+            # 预分配目标文件
+            with open(self.file_path, "wb") as f:
+                f.truncate(self.total_size)
+        hasher = OrderedHasher(self.file_path)
+        for index in sorted(self._done):
+            hasher.mark_on_disk(index * self.segment_size, self._segment_length(index))
+            self._progress(self._segment_length(index))
+        if self._done:
+            self.log(f"续传：{len(self._done)}/{count} 个分段已完成")
+
+        todo = [i for i in range(count) if i not in self._done]
+        self.log(f"分段下载: {self.total_size} 字节, {count} 段, {min(self.workers, max(1, len(todo)))} 个连接")
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="segment") as pool:
+            futures = [pool.submit(self._download_segment, index, hasher) for index in todo]
+            errors = []
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    self._stop.set()
+                    errors.append(e)
+        if errors:
+            # 优先抛出真正的失败原因（其余分段因此被取消）
+            raise next((e for e in errors if not isinstance(e, DownloadCancelled)), errors[0])
+
+        elapsed = time.time() - start_time
+        self.log(f"分段下载完成: {elapsed:.2f}s")
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+        if hasher.tainted or hasher.cursor != self.total_size:
+            self.log("整体哈希未能在下载过程中完成，重新读取文件计算")
+            return file_sha256(self.file_path)
+        return hasher.hexdigest()
+
+    def _segment_length(self, index):
+        start = index * self.segment_size
+        return min(self.segment_size, self.total_size - start)
+
+    def _download_segment(self, index, hasher):
+        """下载单个分段（网络错误从断开处续传，分段哈希不符时整段重下）"""
+        start = index * self.segment_size
+        end = start + self._segment_length(index) - 1
+        expected = self.segment_hashes[index].lower() if self.segment_hashes else ""
+
+        received = 0
+        segment_hash = hashlib.sha256()
+        attempts = 0
+        with open(self.file_path, "r+b", buffering=0) as f:
+            while True:
+                if self._stop.is_set():
+                    raise DownloadCancelled("下载被用户取消")
+                try:
+                    headers = {"Range": f"bytes={start + received}-{end}"}
+                    if self.etag:
+                        # 文件在探测之后被替换时服务端返回完整内容而不是分段，避免新旧数据拼接
+                        headers["If-Range"] = self.etag
+                    response = self._get(headers)
+                    if response.status_code != 206:
+                        response.close()
+                        raise DownloadError("服务器未返回分段内容（文件可能已更新）")
+                    f.seek(start + received)
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if self._stop.is_set():
+                            response.close()
+                            raise DownloadCancelled("下载被用户取消")
+                        if not chunk:
+                            continue
+                        chunk = chunk[:end + 1 - start - received]
+                        if self.rate_limiter:
+                            self.rate_limiter.consume(len(chunk))
+                        f.write(chunk)
+                        segment_hash.update(chunk)
+                        hasher.feed(start + received, chunk)
+                        received += len(chunk)
+                        self._progress(len(chunk))
+                    if received != end - start + 1:
+                        raise DownloadError(f"分段 {index} 不完整: {received}/{end - start + 1}")
+                except DownloadCancelled:
+                    raise
+                except Exception as e:
+                    attempts += 1
+                    if attempts > SEGMENT_RETRIES:
+                        raise DownloadError(f"分段 {index} 下载失败: {e}")
+                    self.log(f"分段 {index} 出错，重试 ({attempts}/{SEGMENT_RETRIES}): {e}")
+                    continue
+
+                if expected and segment_hash.hexdigest() != expected:
+                    # 已送入整体哈希的数据有误，整体哈希改为最后重新读取计算
+                    hasher.tainted = True
+                    attempts += 1
+                    if attempts > SEGMENT_RETRIES:
+                        raise DownloadError(f"分段 {index} 哈希校验失败")
+                    self.log(f"分段 {index} 哈希不符，重新下载 ({attempts}/{SEGMENT_RETRIES})")
+                    self._progress(-received)
+                    received = 0
+                    segment_hash = hashlib.sha256()
+                    continue
+                break
+
+        with self._state_lock:
+            self._done.add(index)
+        self._save_state()
@@ -12,6 +12,7 @@ from PyQt5.QtCore import QObject, pyqtSignal, QThread
 
 from .download_manager import DownloadManager
 from .installer import UpdateInstaller
+from .zstd_package import ZSTD_AVAILABLE
 
 
 class UpdateManager(QObject):
@@ -44,6 +45,8 @@ class UpdateManager(QObject):
         self.app_root = Path(__file__).parent.parent
         self.temp_dir = self.app_root / "temp"
         self.backup_dir = self.app_root / "backup"
+        # 当前下载的更新包（zip 或 zstd 压缩包）的期望哈希
+        self.expected_package_hash = ""
         
         # 确保目录存在
         self.temp_dir.mkdir(exist_ok=True)
@@ -90,19 +93,22 @@ class UpdateManager(QObject):
         try:
             version = self.update_info["latest_version"]
             
-            # 构建下载路径
-            package_filename = f"update_v{version}.zip"
+            # 服务端提供 zstd 压缩包且本地可以解压时下载压缩包，否则下载 deflate zip
+            compressed = self.update_info.get("compressed")
+            if compressed and compressed.get("format") == "solid" and ZSTD_AVAILABLE:
+                package_filename = f"update_v{version}.zst"
+                package = (compressed["size"], compressed["hash"], compressed.get("segments"), compressed["method"])
+            else:
+                package_filename = f"update_v{version}.zip"
+                package = (self.update_info.get("file_size", 0), self.update_info.get("file_hash", ""),
+                           self.update_info.get("segments"), None)
+            self.expected_package_hash = package[1]
             download_path = self.temp_dir / package_filename
             
             self.log(f"开始下载更新包: {package_filename}")
             
             # 开始下载
-            self.download_manager.download_file(
-                version,
-                str(download_path),
-                self.update_info.get("file_size", 0),
-                self.update_info.get("file_hash", "")
-            )
+            self.download_manager.download_file(version, str(download_path), *package)
             
         except Exception as e:
             self.log(f"下载更新包失败: {e}")
@@ -118,8 +124,8 @@ class UpdateManager(QObject):
             self.log(f"下载完成: {file_path}")
             
             # 验证文件完整性
-            if self.update_info.get("file_hash") and file_hash:
-                if file_hash != self.update_info["file_hash"]:
+            if self.expected_package_hash and file_hash:
+                if file_hash != self.expected_package_hash:
                     raise Exception("文件哈希校验失败")
                 self.log("文件完整性验证通过")
             
@@ -256,7 +262,7 @@ class UpdateManager(QObject):
     def cleanup_temp_files(self):
         """清理临时文件"""
         try:
-            for file in self.temp_dir.glob("*.zip"):
+            for file in [*self.temp_dir.glob("*.zip"), *self.temp_dir.glob("*.zst")]:
                 file.unlink()
                 self.log(f"删除临时文件: {file.name}")
         except Exception as e:
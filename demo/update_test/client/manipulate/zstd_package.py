@@ -0,0 +1,229 @@
+"""
+zstd 压缩发布文件的解压
+供更新器（updater.py）与安装器（installer.py）使用，不依赖 PyQt5
+
+两种格式（由 create_update_packages.py 生成）：
+- frames（exe）：文件按固定大小切成相互独立的 zstd 帧依次存放，帧表 [[压缩大小, 原始大小], ...]
+  记录在服务端清单的 "compressed" 中；各帧并行解压后直接写到输出文件的对应位置，
+  整体 SHA256 按文件顺序边解压边计算
+- solid（更新包 update_v{版本}.zst）：包内所有文件首尾相接成一个数据流，再按固定大小切成独立的 zstd 帧
+  （固实压缩，跨文件的重复内容也能压缩；分帧保留并行解压）。文件头之后是包头 JSON：
+  压缩参数、帧表、每个文件在数据流中的偏移 / 大小 / SHA256 / 修改时间，可选的字典紧跟包头之后。
+  安装时只解压包含变化文件的帧
+
+未安装 zstandard 时 ZSTD_AVAILABLE 为 False，客户端不请求压缩格式，服务端返回原始文件 / deflate zip
+"""
+
+import hashlib
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from .segmented_download import OrderedHasher
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# solid 更新包的文件头：魔数 + 包头长度（大端 4 字节）
+SOLID_MAGIC = b"KZSOLID1"
+# 默认并行解压线程数（zstandard 解压时释放 GIL）
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# 读取块大小
+READ_SIZE = 1024 * 1024
+
+
+class DecompressError(Exception):
+    """解压或校验失败"""
+
+
+def _frame_jobs(frames, data_offset=0):
+    """帧表 -> [(压缩数据偏移, 压缩大小, 原始数据偏移, 原始大小)]"""
+    jobs, src_offset, dst_offset = [], data_offset, 0
+    for compressed_size, size in frames:
+        jobs.append((src_offset, compressed_size, dst_offset, size))
+        src_offset += compressed_size
+        dst_offset += size
+    return jobs
+
+
+def _decompress_frame(src_path, job, dictionary=None):
+    """读取并解压一帧"""
+    frame_offset, compressed_size, _, size = job
+    with open(src_path, "rb") as src:
+        src.seek(frame_offset)
+        compressed = src.read(compressed_size)
+    if dictionary:
+        decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+    else:
+        decompressor = zstandard.ZstdDecompressor()
+    try:
+        data = decompressor.decompress(compressed, max_output_size=size)
+    except zstandard.ZstdError as e:
+        raise DecompressError(f"解压失败（偏移 {frame_offset}）: {e}")
+    if len(data) != size:
+        raise DecompressError(f"解压后大小不一致（偏移 {frame_offset}）: {len(data)} != {size}")
+    return data
+
+
+def _run_parallel(func, jobs, workers):
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="zstd") as pool:
+        for future in [pool.submit(func, job) for job in jobs]:
+            future.result()
+
+
+def decompress_frames(src_path, dst_path, frames, expected_size=0, expected_hash="",
+                      workers=DEFAULT_WORKERS, progress_callback=None):
+    """
+    并行解压 frames 格式的文件
+
+    Args:
+        src_path: 压缩文件
+        dst_path: 输出文件（先写 {dst}.tmp，校验通过后替换）
+        frames: 帧表 [[压缩大小, 原始大小], ...]
+        expected_size: 解压后大小（0 表示按帧表计算）
+        expected_hash: 解压后 SHA256（为空时不校验）
+        workers: 并行线程数
+        progress_callback: 进度回调 (已解压字节, 总字节)
+
+    Returns:
+        str: 解压后文件的 SHA256
+
+    Raises:
+        DecompressError: 压缩文件与帧表不一致、解压失败或校验失败
+    """
+    if not ZSTD_AVAILABLE:
+        raise DecompressError("未安装 zstandard，无法解压")
+
+    jobs = _frame_jobs(frames)
+    compressed_total = sum(job[1] for job in jobs)
+    total_size = sum(job[3] for job in jobs)
+    if os.path.getsize(src_path) != compressed_total:
+        raise DecompressError(f"压缩文件大小与帧表不一致: {os.path.getsize(src_path)} != {compressed_total}")
+    if expected_size and expected_size != total_size:
+        raise DecompressError(f"帧表的原始大小与期望大小不一致: {total_size} != {expected_size}")
+
+    tmp_path = f"{dst_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.truncate(total_size)
+    hasher = OrderedHasher(tmp_path)
+    done = [0]
+
+    def run(job):
+        data = _decompress_frame(src_path, job)
+        with open(tmp_path, "r+b") as dst:
+            dst.seek(job[2])
+            dst.write(data)
+        hasher.feed(job[2], data)
+        done[0] += len(data)
+        if progress_callback:
+            progress_callback(done[0], total_size)
+
+    try:
+        _run_parallel(run, jobs, workers)
+        actual_hash = hasher.hexdigest()
+        if hasher.cursor != total_size or hasher.tainted:
+            raise DecompressError("解压后的数据不完整")
+        if expected_hash and actual_hash != expected_hash.lower():
+            raise DecompressError("解压后的文件哈希校验失败")
+        os.replace(tmp_path, dst_path)
+        return actual_hash
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def is_solid_package(package_path):
+    """是否为 solid 格式的 zstd 更新包"""
+    try:
+        with open(package_path, "rb") as f:
+            return f.read(len(SOLID_MAGIC)) == SOLID_MAGIC
+    except OSError:
+        return False
+
+
+class SolidPackage:
+    """solid 格式的 zstd 更新包"""
+
+    def __init__(self, package_path):
+        """
+        Raises:
+            DecompressError: 文件头或包头不合法
+        """
+        self.path = str(package_path)
+        with open(self.path, "rb") as f:
+            if f.read(len(SOLID_MAGIC)) != SOLID_MAGIC:
+                raise DecompressError("不是 zstd 更新包")
+            (header_size,) = struct.unpack(">I", f.read(4))
+            try:
+                self.header = json.loads(f.read(header_size).decode("utf-8"))
+            except ValueError as e:
+                raise DecompressError(f"更新包包头损坏: {e}")
+            dictionary_size = self.header["compression"].get("dictionary_size", 0)
+            self.dictionary = f.read(dictionary_size) if dictionary_size else None
+        self.data_offset = len(SOLID_MAGIC) + 4 + header_size + (dictionary_size or 0)
+        self.jobs = _frame_jobs(self.header["frames"], self.data_offset)
+        if os.path.getsize(self.path) != self.data_offset + sum(job[1] for job in self.jobs):
+            raise DecompressError("更新包大小与帧表不一致")
+
+    @property
+    def files(self):
+        """{相对路径: {"offset", "size", "sha256", "mtime"}}"""
+        return self.header["files"]
+
+    def extract(self, paths, output_dir, workers=DEFAULT_WORKERS):
+        """
+        把指定文件解压到 output_dir（只解压包含这些文件的帧），逐个校验 SHA256
+
+        Args:
+            paths: 需要解压的相对路径
+            output_dir: 输出目录（保持相对路径）
+            workers: 并行线程数
+
+        Raises:
+            DecompressError: 解压失败或校验失败
+        """
+        if not ZSTD_AVAILABLE:
+            raise DecompressError("未安装 zstandard，无法解压")
+
+        targets = {}
+        for path in paths:
+            info = self.files[path]
+            target = os.path.join(str(output_dir), *path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.truncate(info["size"])
+            targets[path] = target
+
+        def run(job):
+            start, end = job[2], job[2] + job[3]
+            overlapping = [(path, self.files[path]) for path in targets
+                           if self.files[path]["offset"] < end
+                           and self.files[path]["offset"] + self.files[path]["size"] > start]
+            if not overlapping:
+                return
+            data = _decompress_frame(self.path, job, self.dictionary)
+            for path, info in overlapping:
+                begin = max(start, info["offset"])
+                finish = min(end, info["offset"] + info["size"])
+                with open(targets[path], "r+b") as f:
+                    f.seek(begin - info["offset"])
+                    f.write(data[begin - start:finish - start])
+
+        _run_parallel(run, self.jobs, workers)
+
+        for path, target in targets.items():
+            info = self.files[path]
+            sha256_hash = hashlib.sha256()
+            with open(target, "rb") as f:
+                for chunk in iter(lambda: f.read(READ_SIZE), b""):
+                    sha256_hash.update(chunk)
+            if sha256_hash.hexdigest() != info["sha256"]:
+                raise DecompressError(f"文件哈希校验失败: {path}")
+            if info.get("mtime"):
+                os.utime(target, (info["mtime"], info["mtime"]))
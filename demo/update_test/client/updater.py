@@ -1,6 +1,18 @@
 """
 独立更新器程序 - PyInstaller版本
 专门负责下载并替换主程序exe文件
+
+分块同步：更新信息中带有 chunk_index 时，复用当前exe中与新版本相同的分块，只下载缺少的分块。
+
+完整下载：分段并行下载（Range），分段哈希与整体SHA256边下载边校验，中断后按分段续传。
+服务端提供 zstd 压缩版本（compressed）且已安装 zstandard 时下载压缩版本并按帧并行解压，失败时回退原文件。
+
+增量更新：更新信息中带有 patch_chain 时，先下载补丁并基于当前exe逐个应用
+（bsdiff4 / zstd 字典补丁），每一步校验哈希；任何一步失败都回退到完整下载。
+
+后台预下载（--stage）：主程序运行期间以低优先级、限速下载新版本，校验后暂存到 temp/staged/
+并写入 staged_update.json，不替换任何文件；之后正常更新时直接使用暂存文件，只需替换。
+用法: updater.exe <update_info.json> <target_exe_name> --stage
 """
 
 import sys
@@ -15,6 +27,30 @@ import tempfile
 from pathlib import Path
 from urllib.parse import urljoin
 
+from manipulate.segmented_download import SegmentedDownloader, RateLimiter
+from manipulate.chunk_sync import ChunkSync
+from manipulate.zstd_package import decompress_frames, DecompressError
+
+try:
+    import bsdiff4
+    BSDIFF_AVAILABLE = True
+except ImportError:
+    bsdiff4 = None
+    BSDIFF_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# 后台预下载的暂存目录与暂存信息文件（相对工作目录）
+STAGED_DIR = Path("temp") / "staged"
+STAGED_INFO_FILE = "staged_update.json"
+# 后台预下载默认限速（字节/秒），配置 download_settings.prefetch_rate_limit 为 0 时不限速
+DEFAULT_PREFETCH_RATE = 2 * 1024 * 1024
+
 
 def log_message(message):
     """输出日志消息"""
@@ -47,72 +83,42 @@ def show_progress(current, total, message=""):
             print()  # 完成后换行
 
 
-def download_file(url, local_path, expected_size=0, expected_hash=""):
-    """下载文件，支持进度显示和断点续传"""
+def download_file(url, local_path, expected_size=0, expected_hash="", segments=None, rate_limiter=None):
+    """
+    下载文件：分段并行下载，边下载边校验（分段哈希 + 整体SHA256），中断后按分段续传
+    
+    Args:
+        url: 下载地址
+        local_path: 保存路径
+        expected_size: 期望大小（0 表示不校验）
+        expected_hash: 期望SHA256（为空时不校验）
+        segments: 服务端提供的分段哈希 {"size", "hashes"}
+        rate_limiter: 限速器（None 为不限速）
+    """
     log_message(f"开始下载: {url}")
     log_message(f"保存到: {local_path}")
     
     try:
-        # 检查是否支持断点续传
-        resume_pos = 0
-        headers = {}
-        
-        if os.path.exists(local_path):
-            resume_pos = os.path.getsize(local_path)
-            if resume_pos > 0:
-                headers['Range'] = f'bytes={resume_pos}-'
-                log_message(f"断点续传，从 {resume_pos} 字节开始")
-        
-        # 发起下载请求
-        response = requests.get(url, headers=headers, stream=True, timeout=30)
-        
-        if response.status_code == 416:  # Range not satisfiable
-            log_message("服务器不支持断点续传，重新下载")
-            resume_pos = 0
-            if os.path.exists(local_path):
-                os.remove(local_path)
-            response = requests.get(url, stream=True, timeout=30)
-        
-        response.raise_for_status()
-        
-        # 获取文件总大小
-        total_size = resume_pos
-        if response.status_code == 206:  # Partial content
-            content_range = response.headers.get('Content-Range', '')
-            if content_range:
-                total_size = int(content_range.split('/')[-1])
-        else:
-            total_size = int(response.headers.get('Content-Length', 0))
-        
-        if expected_size > 0 and total_size > 0 and abs(total_size - expected_size) > 1024:
-            log_message(f"警告: 文件大小不匹配 (期望: {expected_size}, 实际: {total_size})")
-        
-        # 下载文件
-        downloaded = resume_pos
-        mode = 'ab' if resume_pos > 0 else 'wb'
-        
-        with open(local_path, mode) as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    
-                    # 显示进度
-                    if total_size > 0:
-                        show_progress(downloaded, total_size, "下载中...")
-        
-        log_message(f"下载完成: {local_path} ({downloaded} 字节)")
+        with requests.Session() as session:
+            downloader = SegmentedDownloader(
+                session, url, local_path,
+                total_size=expected_size,
+                expected_hash=expected_hash,
+                segments=segments,
+                progress_callback=lambda current, total: show_progress(current, total, "下载中..."),
+                log_callback=log_message,
+                rate_limiter=rate_limiter
+            )
+            downloader.download()
         
         # 验证文件大小
         actual_size = os.path.getsize(local_path)
-        if expected_size > 0 and abs(actual_size - expected_size) > 1024:
+        if expected_size > 0 and actual_size != expected_size:
             raise Exception(f"文件大小验证失败: 期望 {expected_size} 字节, 实际 {actual_size} 字节")
         
-        # 验证文件哈希
+        log_message(f"下载完成: {local_path} ({actual_size} 字节)")
         if expected_hash:
-            if not verify_file_hash(local_path, expected_hash):
-                raise Exception("文件哈希验证失败")
-        
+            log_message("✅ 文件完整性验证通过")
         return True
         
     except requests.exceptions.RequestException as e:
@@ -153,6 +159,365 @@ def verify_file_hash(file_path, expected_hash):
         return False
 
 
+def file_sha256(file_path):
+    """计算文件SHA256"""
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+def apply_patch(old_path, patch_path, new_path, step):
+    """
+    应用单个补丁
+    
+    Args:
+        old_path: 旧版本文件
+        patch_path: 补丁文件
+        new_path: 输出的新版本文件
+        step: 补丁信息（method / window_log / target_size）
+    """
+    method = step.get("method")
+    if method == "bsdiff4":
+        if not BSDIFF_AVAILABLE:
+            raise Exception("未安装 bsdiff4，无法应用补丁")
+        bsdiff4.file_patch(str(old_path), str(new_path), str(patch_path))
+    elif method == "zstd_dict":
+        if not ZSTD_AVAILABLE:
+            raise Exception("未安装 zstandard，无法应用补丁")
+        dictionary = zstandard.ZstdCompressionDict(
+            Path(old_path).read_bytes(), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=dictionary, max_window_size=2 ** step.get("window_log", 27)
+        )
+        with open(patch_path, "rb") as src, open(new_path, "wb") as dst:
+            decompressor.copy_stream(src, dst)
+    else:
+        raise Exception(f"不支持的补丁类型: {method}")
+
+
+def apply_patch_chain(base_path, patch_chain, output_path, temp_dir, base_url, rate_limiter=None):
+    """
+    基于当前文件按顺序应用补丁链，得到新版本文件
+    
+    Args:
+        base_path: 当前版本文件（主程序exe）
+        patch_chain: 服务端下发的补丁链
+        output_path: 新版本文件的输出路径
+        temp_dir: 临时目录
+        base_url: 服务器地址
+        rate_limiter: 限速器（None 为不限速）
+    
+    Returns:
+        bool: 成功返回True；失败返回False（调用方回退完整下载）
+    """
+    try:
+        first = patch_chain[0]
+        if file_sha256(base_path) != first["source_sha256"]:
+            log_message("⚠️ 当前文件与补丁基准版本不一致，无法增量更新")
+            return False
+        
+        current = Path(base_path)
+        for index, step in enumerate(patch_chain):
+            log_message(f"🧩 补丁 {index + 1}/{len(patch_chain)}: v{step['from_version']} -> v{step['to_version']} ({step['size']} 字节)")
+            patch_path = Path(temp_dir) / f"patch_{step['from_version']}_to_{step['to_version']}"
+            if not download_file(resolve_url(base_url, step["download_url"]), patch_path, step["size"], step["sha256"],
+                                 rate_limiter=rate_limiter):
+                return False
+            
+            step_output = Path(output_path) if index == len(patch_chain) - 1 else Path(temp_dir) / f"patched_{step['to_version']}"
+            apply_patch(current, patch_path, step_output, step)
+            patch_path.unlink()
+            if current != Path(base_path):
+                current.unlink()
+            
+            if os.path.getsize(step_output) != step["target_size"] or file_sha256(step_output) != step["target_sha256"]:
+                log_message(f"❌ 补丁应用后哈希不匹配: v{step['to_version']}")
+                step_output.unlink()
+                return False
+            current = step_output
+        
+        log_message("✅ 增量更新文件已生成并通过校验")
+        return True
+        
+    except Exception as e:
+        log_message(f"❌ 增量更新失败: {e}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+
+
+def sync_chunks(base_path, update_info, output_path, base_url, rate_limiter=None):
+    """
+    按分块列表生成新版本文件（复用当前exe中的分块，只下载缺少的分块）
+    
+    Args:
+        base_path: 当前版本文件（主程序exe）
+        update_info: 版本检查返回的更新信息（含 chunk_index、current_version）
+        output_path: 新版本文件的输出路径
+        base_url: 服务器地址
+        rate_limiter: 限速器（None 为不限速）
+    
+    Returns:
+        bool: 成功返回True；失败返回False（调用方回退完整下载）
+    """
+    try:
+        with requests.Session() as session:
+            response = session.get(
+                resolve_url(base_url, update_info['chunk_index']),
+                params={"base_version": update_info.get('current_version', '')},
+                timeout=30
+            )
+            response.raise_for_status()
+            syncer = ChunkSync(
+                session, base_url, response.json(), output_path, base_path,
+                progress_callback=lambda current, total: show_progress(current, total, "下载分块..."),
+                log_callback=log_message,
+                rate_limiter=rate_limiter
+            )
+            stats = syncer.sync()
+        log_message(f"✅ 分块同步完成: 复用 {stats['reused_bytes']:,} 字节, 下载 {stats['downloaded_bytes']:,} 字节 "
+                    f"(完整文件 {stats['total_bytes']:,} 字节)")
+        return True
+        
+    except Exception as e:
+        log_message(f"❌ 分块同步失败: {e}")
+        return False
+
+
+def resolve_url(base_url, url):
+    """相对地址拼接服务器地址"""
+    if url.startswith('http'):
+        return url
+    return urljoin(base_url, url.lstrip('/'))
+
+
+def load_update_config(current_dir):
+    """读取 config/update_config.json（失败时返回空配置）"""
+    config_file = Path(current_dir) / "config" / "update_config.json"
+    try:
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        log_message(f"读取配置文件失败，使用默认配置: {e}")
+    return {}
+
+
+def prepare_new_version(target_exe_path, update_info, output_path, temp_dir, base_url, rate_limiter=None):
+    """
+    生成新版本文件（优先增量补丁，其次分块同步，失败回退完整下载）
+    
+    Args:
+        target_exe_path: 当前版本文件（主程序exe）
+        update_info: 版本检查返回的更新信息
+        output_path: 新版本文件的输出路径
+        temp_dir: 补丁等中间文件的目录
+        base_url: 服务器地址
+        rate_limiter: 限速器（None 为不限速）
+    
+    Returns:
+        bool: 新版本文件已生成并通过校验
+    """
+    expected_size = update_info.get('file_size', 0)
+    patch_chain = update_info.get('patch_chain')
+    if patch_chain:
+        log_message(f"🧩 增量更新: {len(patch_chain)} 个补丁, 共 {update_info.get('patch_size', 0)} 字节 (完整包 {expected_size} 字节)")
+        if apply_patch_chain(target_exe_path, patch_chain, output_path, temp_dir, base_url, rate_limiter):
+            return True
+        log_message("↩️ 增量更新失败")
+    
+    if update_info.get('chunk_index'):
+        if sync_chunks(target_exe_path, update_info, output_path, base_url, rate_limiter):
+            return True
+        log_message("↩️ 分块同步失败")
+    
+    compressed = update_info.get('compressed')
+    if compressed and compressed.get('format') == 'frames' and ZSTD_AVAILABLE:
+        if download_compressed(update_info, output_path, temp_dir, base_url, rate_limiter):
+            return True
+        log_message("↩️ 压缩版本下载失败，下载原文件")
+    
+    log_message("📥 下载新版本...")
+    download_url = resolve_url(base_url, update_info['download_url'])
+    return download_file(download_url, output_path, expected_size, update_info.get('file_hash', ''),
+                         update_info.get('segments'), rate_limiter)
+
+
+def download_compressed(update_info, output_path, temp_dir, base_url, rate_limiter=None):
+    """
+    下载 zstd 压缩版本（frames 格式）并按帧并行解压
+    
+    Args:
+        update_info: 版本检查返回的更新信息（含 compressed）
+        output_path: 新版本文件的输出路径
+        temp_dir: 压缩文件的下载目录
+        base_url: 服务器地址
+        rate_limiter: 限速器（None 为不限速）
+    
+    Returns:
+        bool: 解压后的文件已通过校验
+    """
+    compressed = update_info['compressed']
+    compressed_path = Path(temp_dir) / f"{Path(output_path).name}.zst"
+    log_message(f"🗜️ 下载 zstd 压缩版本: {compressed['size']:,} 字节 (原文件 {update_info.get('file_size', 0):,} 字节)")
+    if not download_file(resolve_url(base_url, compressed['download_url']), compressed_path,
+                         compressed['size'], compressed['hash'], compressed.get('segments'), rate_limiter):
+        return False
+    
+    try:
+        decompress_frames(compressed_path, output_path, compressed['frames'],
+                          update_info.get('file_size', 0), update_info.get('file_hash', ''),
+                          progress_callback=lambda current, total: show_progress(current, total, "解压中..."))
+        log_message(f"✅ 解压完成并通过校验: {len(compressed['frames'])} 帧")
+        return True
+    except DecompressError as e:
+        log_message(f"❌ 解压失败: {e}")
+        return False
+    finally:
+        if compressed_path.exists():
+            compressed_path.unlink()
+
+
+def lower_process_priority():
+    """降低当前进程优先级（后台预下载不与主程序争抢CPU / 磁盘）"""
+    try:
+        if os.name == 'nt':
+            import psutil
+            psutil.Process().nice(psutil.IDLE_PRIORITY_CLASS)
+        else:
+            os.nice(10)
+        log_message("🐢 已降低进程优先级")
+    except Exception as e:
+        log_message(f"降低进程优先级失败: {e}")
+
+
+def read_staged_info(staged_dir):
+    """读取暂存信息（不存在或损坏时返回None）"""
+    info_path = Path(staged_dir) / STAGED_INFO_FILE
+    try:
+        with open(info_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def verify_staged_file(staged_dir, staged):
+    """暂存文件存在且大小、SHA256 与暂存信息一致"""
+    staged_path = Path(staged_dir) / staged['file']
+    return (staged_path.exists()
+            and os.path.getsize(staged_path) == staged['size']
+            and file_sha256(staged_path) == staged['sha256'])
+
+
+def take_staged_update(staged_dir, new_version, expected_hash, output_path):
+    """
+    使用后台预下载好的新版本文件
+    
+    Args:
+        staged_dir: 暂存目录
+        new_version: 目标版本
+        expected_hash: 目标版本的SHA256（为空时只校验暂存信息）
+        output_path: 新版本文件的输出路径
+    
+    Returns:
+        bool: 暂存文件可用并已移动到 output_path
+    """
+    staged = read_staged_info(staged_dir)
+    if not staged or staged.get('version') != new_version:
+        return False
+    if expected_hash and staged['sha256'] != expected_hash.lower():
+        log_message("⚠️ 暂存文件与目标版本哈希不一致，忽略暂存文件")
+        return False
+    if not verify_staged_file(staged_dir, staged):
+        log_message("⚠️ 暂存文件校验失败，重新下载")
+        return False
+    
+    os.replace(Path(staged_dir) / staged['file'], output_path)
+    os.remove(Path(staged_dir) / STAGED_INFO_FILE)
+    log_message(f"📦 使用后台预下载的新版本: v{new_version}")
+    return True
+
+
+def stage_update(update_info_file, target_exe_name):
+    """
+    后台预下载：低优先级、限速生成新版本文件并暂存，不替换主程序
+    
+    Args:
+        update_info_file: 更新信息文件
+        target_exe_name: 主程序文件名
+    
+    Returns:
+        bool: 暂存成功（或已暂存）返回True
+    """
+    log_message("=" * 60)
+    log_message("📦 Kuzflow 后台预下载启动")
+    log_message("=" * 60)
+    lower_process_priority()
+    
+    current_dir = Path.cwd()
+    staged_dir = current_dir / STAGED_DIR
+    try:
+        with open(update_info_file, 'r', encoding='utf-8') as f:
+            update_info = json.load(f)
+        new_version = update_info['latest_version']
+        
+        staged = read_staged_info(staged_dir)
+        if staged and staged.get('version') == new_version and verify_staged_file(staged_dir, staged):
+            log_message(f"✅ v{new_version} 已暂存，无需重复下载")
+            return True
+        
+        # 清理其他版本的暂存文件（同版本的断点续传文件保留）
+        staged_name = f"{Path(target_exe_name).stem}_v{new_version}{Path(target_exe_name).suffix}"
+        staged_dir.mkdir(parents=True, exist_ok=True)
+        for entry in staged_dir.iterdir():
+            if entry.name.startswith(staged_name):
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+        
+        config = load_update_config(current_dir)
+        base_url = config.get("update_server", {}).get("base_url", "http://127.0.0.1:8000")
+        rate = config.get("download_settings", {}).get("prefetch_rate_limit", DEFAULT_PREFETCH_RATE)
+        rate_limiter = RateLimiter(rate) if rate else None
+        log_message(f"目标版本: v{new_version}, 限速: {f'{rate // 1024} KB/s' if rate else '不限速'}")
+        
+        staged_path = staged_dir / staged_name
+        if not prepare_new_version(current_dir / target_exe_name, update_info, staged_path, staged_dir,
+                                   base_url, rate_limiter):
+            raise Exception("下载新版本失败")
+        
+        staged = {
+            "version": new_version,
+            "file": staged_name,
+            "size": os.path.getsize(staged_path),
+            "sha256": file_sha256(staged_path),
+            "update_info": update_info,
+            "staged_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        expected_hash = update_info.get('file_hash', '')
+        if expected_hash and staged['sha256'] != expected_hash.lower():
+            staged_path.unlink()
+            raise Exception("暂存文件哈希校验失败")
+        
+        # 暂存信息最后写入，存在即表示暂存文件完整可用
+        tmp_info = staged_dir / f"{STAGED_INFO_FILE}.tmp"
+        with open(tmp_info, 'w', encoding='utf-8') as f:
+            json.dump(staged, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_info, staged_dir / STAGED_INFO_FILE)
+        
+        log_message(f"✅ v{new_version} 已暂存: {staged_path}，下次启动时完成更新")
+        return True
+        
+    except Exception as e:
+        log_message(f"❌ 后台预下载失败: {e}")
+        return False
+
+
 def backup_current_version(exe_path):
     """备份当前版本的exe文件"""
     try:
@@ -365,27 +730,17 @@ def update_application():
         temp_dir.mkdir(exist_ok=True)
         temp_exe_path = temp_dir / f"new_{target_exe_name}"
         
-        # 5. 构建完整下载URL
+        # 5. 读取服务器地址
+        config = load_update_config(current_dir)
+        base_url = config.get("update_server", {}).get("base_url", "http://127.0.0.1:8000")
+        
         if not download_url.startswith('http'):
-            # 从配置文件读取服务器地址
-            config_file = current_dir / "config" / "update_config.json"
-            base_url = "http://127.0.0.1:8000"
-            
-            try:
-                if config_file.exists():
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        base_url = config.get("update_server", {}).get("base_url", base_url)
-            except Exception as e:
-                log_message(f"读取配置文件失败，使用默认URL: {e}")
-            
-            download_url = urljoin(base_url, download_url.lstrip('/'))
-            log_message(f"完整下载URL: {download_url}")
+            log_message(f"完整下载URL: {resolve_url(base_url, download_url)}")
         
-        # 6. 下载新版本
-        log_message("📥 下载新版本...")
-        if not download_file(download_url, temp_exe_path, expected_size, expected_hash):
-            raise Exception("下载新版本失败")
+        # 6. 准备新版本（优先使用后台预下载的暂存文件，其次增量补丁 / 分块同步 / 完整下载）
+        if not take_staged_update(current_dir / STAGED_DIR, new_version, expected_hash, temp_exe_path):
+            if not prepare_new_version(target_exe_path, update_info, temp_exe_path, temp_dir, base_url):
+                raise Exception("下载新版本失败")
         
         # 7. 替换主程序文件
         log_message("🔄 替换主程序文件...")
@@ -461,6 +816,14 @@ def update_application():
 
 def main():
     """主入口函数"""
+    if "--stage" in sys.argv[1:]:
+        # 后台预下载：无窗口运行，不等待用户输入
+        args = [arg for arg in sys.argv[1:] if arg != "--stage"]
+        if len(args) < 2:
+            log_message("用法: updater.exe <update_info.json> <target_exe_name> --stage")
+            return 1
+        return 0 if stage_update(args[0], args[1]) else 1
+    
     try:
         success = update_application()
         
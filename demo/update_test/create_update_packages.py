@@ -1,25 +1,103 @@
 """
 创建更新包的脚本
-用于生成v1.0.0和v1.1.0的更新包
+用于生成v1.0.0和v1.1.0的更新包，以及旧版本到最新版本的增量补丁
+
+增量补丁（releases/v{最新}/patches/{旧版本}_to_{最新}.*）:
+- 优先 bsdiff4（二进制差分），其次 zstandard（以旧版本文件为字典压缩新版本）；都未安装时跳过
+- 补丁信息写入最新版本 manifest.json 的 "patches"，服务端据此在版本检查时下发最小的补丁链
+
+分块存储（releases/chunks/）:
+- 每个版本的发布文件按内容定义分块入库（server/functions/chunk_store.py），相同分块只存一份
+- 分块列表写入各版本 manifest.json 的 "chunks"
+
+zstd 压缩版本（需要 zstandard，与原文件并存，旧客户端仍下载原文件）:
+- update_v{版本}.zst：固实更新包，包内文件首尾相接后按 4MB 切成独立的 zstd 帧（跨文件的重复内容也能压缩），
+  包头记录帧表与每个文件的偏移 / SHA256；训练的字典只有在总大小更小时才写入。安装器只并行解压包含变化文件的帧
+- KuzflowApp_v{版本}.exe.zst：exe 按 4MB 切成独立的 zstd 帧，更新器并行解压
+- 压缩参数与帧表写入 manifest.json 的 "compressed"（以原文件名为键）
 """
 
 import os
+import sys
 import zipfile
 import shutil
 import json
 import hashlib
+import math
+import struct
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / "server"))
+from functions.chunk_store import ChunkStore
+
+try:
+    import bsdiff4
+    BSDIFF_AVAILABLE = True
+except ImportError:
+    bsdiff4 = None
+    BSDIFF_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# zstd 字典补丁的压缩级别
+ZSTD_PATCH_LEVEL = 19
+# 分段哈希的分段大小（与服务端 file_manager.SEGMENT_SIZE 一致）
+SEGMENT_SIZE = 4 * 1024 * 1024
+# zstd 压缩版本的压缩级别 / 每帧的原始大小 / 训练字典的大小
+ZSTD_PACKAGE_LEVEL = 19
+ZSTD_FRAME_SIZE = 4 * 1024 * 1024
+ZSTD_DICT_SIZE = 112 * 1024
+# 固实更新包的文件头魔数（与客户端 zstd_package.SOLID_MAGIC 一致）
+ZSTD_SOLID_MAGIC = b"KZSOLID1"
+
 
 def calculate_file_hash(file_path):
     """计算文件SHA256哈希"""
     sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
             sha256_hash.update(chunk)
     return sha256_hash.hexdigest()
 
 
+def calculate_segment_hashes(file_path, segment_size=SEGMENT_SIZE):
+    """按分段计算SHA256（客户端分段并行下载逐段校验）"""
+    hashes = []
+    with open(file_path, "rb") as f:
+        for segment in iter(lambda: f.read(segment_size), b""):
+            hashes.append(hashlib.sha256(segment).hexdigest())
+    return hashes
+
+
+def digest_entry(file_path):
+    """服务端摘要索引条目（manifest.json 的 "digests"）"""
+    path = Path(file_path)
+    return {
+        "size": path.stat().st_size,
+        "mtime_ns": path.stat().st_mtime_ns,
+        "sha256": calculate_file_hash(path),
+        "segment_size": SEGMENT_SIZE,
+        "segment_sha256": calculate_segment_hashes(path)
+    }
+
+
+def update_version_manifest(version_dir, section, entries):
+    """合并写入版本目录 manifest.json 的 section"""
+    manifest_path = Path(version_dir) / "manifest.json"
+    manifest = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    manifest.setdefault(section, {}).update(entries)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
 def create_update_package(version, source_files, output_dir):
     """创建更新包"""
     print(f"创建 v{version} 更新包...")
@@ -33,13 +111,20 @@ def create_update_package(version, source_files, output_dir):
     package_path = version_dir / package_name
     
     # 创建zip文件
+    file_manifest = {}
     with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
         for source_file, archive_name in source_files.items():
             if Path(source_file).exists():
                 zipf.write(source_file, archive_name)
+                file_manifest[archive_name] = {
+                    "sha256": calculate_file_hash(source_file),
+                    "size": Path(source_file).stat().st_size
+                }
                 print(f"  添加文件: {archive_name}")
             else:
                 print(f"  警告: 文件不存在 {source_file}")
+        # 包内文件清单：安装器据此跳过未变化的文件并逐个校验
+        zipf.writestr("update_manifest.json", json.dumps({"version": version, "files": file_manifest}, indent=2))
     
     # 计算文件信息
     file_size = package_path.stat().st_size
@@ -59,7 +144,17 @@ def create_update_package(version, source_files, output_dir):
             "platform": "windows",
             "arch": "x64"
         },
-        "files": list(source_files.values())
+        "files": list(source_files.values()),
+        # 摘要索引：服务端按 size / mtime_ns 校验后直接使用，版本检查时不再计算哈希
+        "digests": {
+            package_name: {
+                "size": file_size,
+                "mtime_ns": package_path.stat().st_mtime_ns,
+                "sha256": file_hash,
+                "segment_size": SEGMENT_SIZE,
+                "segment_sha256": calculate_segment_hashes(package_path)
+            }
+        }
     }
     
     manifest_path = version_dir / "manifest.json"
@@ -74,6 +169,238 @@ def create_update_package(version, source_files, output_dir):
     return package_path, file_size, file_hash
 
 
+def compress_frames(data, dictionary=None):
+    """按 ZSTD_FRAME_SIZE 把数据切成相互独立的 zstd 帧，返回 (压缩数据列表, 帧表)"""
+    compressor = zstandard.ZstdCompressor(level=ZSTD_PACKAGE_LEVEL, dict_data=dictionary, write_content_size=True)
+    blobs, frames = [], []
+    for offset in range(0, len(data), ZSTD_FRAME_SIZE):
+        part = data[offset:offset + ZSTD_FRAME_SIZE]
+        blob = compressor.compress(part)
+        blobs.append(blob)
+        frames.append([len(blob), len(part)])
+    return blobs, frames
+
+
+def create_zstd_package(version, source_files, output_dir, train_dictionary=True):
+    """
+    创建 zstd 固实更新包 update_v{版本}.zst（格式见 client/manipulate/zstd_package.py）
+    
+    Args:
+        version: 版本号
+        source_files: {源文件: 包内路径}（与 create_update_package 相同）
+        output_dir: 发布目录
+        train_dictionary: 尝试按包内文件训练字典（只有加上字典后总大小更小时才使用）
+    
+    Returns:
+        Path: 更新包路径；未安装 zstandard 时返回 None
+    """
+    if not ZSTD_AVAILABLE:
+        print("  跳过 zstd 更新包：未安装 zstandard")
+        return None
+    
+    version_dir = Path(output_dir) / f"v{version}"
+    package_path = version_dir / f"update_v{version}.zst"
+    
+    # 包内文件首尾相接成一个数据流，记录每个文件的偏移
+    files, samples, stream = {}, [], bytearray()
+    for source_file, archive_name in source_files.items():
+        path = Path(source_file)
+        if not path.exists():
+            continue
+        data = path.read_bytes()
+        files[archive_name] = {
+            "offset": len(stream),
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "mtime": int(path.stat().st_mtime)
+        }
+        samples.append(data)
+        stream += data
+    stream = bytes(stream)
+    
+    blobs, frames = compress_frames(stream)
+    dictionary = b""
+    if train_dictionary:
+        try:
+            trained = zstandard.train_dictionary(ZSTD_DICT_SIZE, samples, level=ZSTD_PACKAGE_LEVEL)
+            dict_blobs, dict_frames = compress_frames(stream, trained)
+            if len(trained.as_bytes()) + sum(map(len, dict_blobs)) < sum(map(len, blobs)):
+                blobs, frames, dictionary = dict_blobs, dict_frames, trained.as_bytes()
+        except zstandard.ZstdError as e:
+            print(f"  训练字典失败，不使用字典: {e}")
+    
+    header = json.dumps({
+        "version": version,
+        "compression": {
+            "method": "zstd",
+            "level": ZSTD_PACKAGE_LEVEL,
+            "frame_size": ZSTD_FRAME_SIZE,
+            "dictionary_size": len(dictionary)
+        },
+        "frames": frames,
+        "files": files
+    }, ensure_ascii=False).encode("utf-8")
+    with open(package_path, "wb") as f:
+        f.write(ZSTD_SOLID_MAGIC + struct.pack(">I", len(header)) + header + dictionary)
+        for blob in blobs:
+            f.write(blob)
+    
+    update_version_manifest(version_dir, "compressed", {
+        f"update_v{version}.zip": {
+            "filename": package_path.name,
+            "method": "zstd",
+            "format": "solid",
+            "level": ZSTD_PACKAGE_LEVEL
+        }
+    })
+    update_version_manifest(version_dir, "digests", {package_path.name: digest_entry(package_path)})
+    print(f"  {package_path.name}: {package_path.stat().st_size:,} 字节 "
+          f"(原始 {len(stream):,} 字节, {len(files)} 个文件, {len(frames)} 帧, 字典: {'有' if dictionary else '无'})")
+    return package_path
+
+
+def compress_release_exe(releases_dir, version):
+    """
+    生成 exe 的 zstd 压缩版本 KuzflowApp_v{版本}.exe.zst（相互独立的帧，客户端可并行解压）
+    
+    Returns:
+        Path: 压缩文件路径；没有 exe 或未安装 zstandard 时返回 None
+    """
+    version_dir = Path(releases_dir) / f"v{version}"
+    exe_path = version_dir / f"KuzflowApp_v{version}.exe"
+    if not ZSTD_AVAILABLE or not exe_path.exists():
+        return None
+    
+    compressed_path = version_dir / f"{exe_path.name}.zst"
+    compressor = zstandard.ZstdCompressor(level=ZSTD_PACKAGE_LEVEL, write_content_size=True, threads=-1)
+    frames = []
+    with open(exe_path, "rb") as src, open(compressed_path, "wb") as dst:
+        for data in iter(lambda: src.read(ZSTD_FRAME_SIZE), b""):
+            frame = compressor.compress(data)
+            dst.write(frame)
+            frames.append([len(frame), len(data)])
+    
+    update_version_manifest(version_dir, "compressed", {
+        exe_path.name: {
+            "filename": compressed_path.name,
+            "method": "zstd",
+            "format": "frames",
+            "level": ZSTD_PACKAGE_LEVEL,
+            "frame_size": ZSTD_FRAME_SIZE,
+            "frames": frames
+        }
+    })
+    update_version_manifest(version_dir, "digests", {compressed_path.name: digest_entry(compressed_path)})
+    print(f"  {compressed_path.name}: {compressed_path.stat().st_size:,} 字节 "
+          f"(原文件 {exe_path.stat().st_size:,} 字节, {len(frames)} 帧)")
+    return compressed_path
+
+
+def release_artifact(version_dir, version):
+    """版本目录中的发布文件（优先exe，其次zip），与服务端 get_package_info 的选择一致"""
+    exe_path = Path(version_dir) / f"KuzflowApp_v{version}.exe"
+    if exe_path.exists():
+        return exe_path, "exe"
+    zip_path = Path(version_dir) / f"update_v{version}.zip"
+    if zip_path.exists():
+        return zip_path, "zip"
+    return None, None
+
+
+def create_patch(old_path, new_path, patch_stem):
+    """
+    生成二进制补丁
+    
+    Returns:
+        (补丁路径, 补丁信息)；没有可用的差分工具时返回 (None, None)
+    """
+    if BSDIFF_AVAILABLE:
+        patch_path = Path(f"{patch_stem}.bsdiff")
+        bsdiff4.file_diff(str(old_path), str(new_path), str(patch_path))
+        return patch_path, {"method": "bsdiff4"}
+    if ZSTD_AVAILABLE:
+        old_data = Path(old_path).read_bytes()
+        new_data = Path(new_path).read_bytes()
+        # 窗口需要覆盖 字典 + 新文件，解压时按同样的窗口大小放行
+        window_log = min(31, max(10, math.ceil(math.log2(len(old_data) + len(new_data) + 1))))
+        params = zstandard.ZstdCompressionParameters.from_level(
+            ZSTD_PATCH_LEVEL, window_log=window_log, enable_ldm=True
+        )
+        dictionary = zstandard.ZstdCompressionDict(old_data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        compressor = zstandard.ZstdCompressor(dict_data=dictionary, compression_params=params)
+        patch_path = Path(f"{patch_stem}.zst")
+        patch_path.write_bytes(compressor.compress(new_data))
+        return patch_path, {"method": "zstd_dict", "window_log": window_log}
+    return None, None
+
+
+def create_delta_patches(releases_dir, target_version, from_versions):
+    """
+    生成 from_versions 中每个版本到 target_version 的补丁，写入目标版本 manifest.json 的 "patches"
+    
+    Args:
+        releases_dir: 发布目录
+        target_version: 最新版本
+        from_versions: 需要支持增量更新的旧版本列表
+    """
+    if not (BSDIFF_AVAILABLE or ZSTD_AVAILABLE):
+        print("  跳过增量补丁：未安装 bsdiff4 或 zstandard")
+        return {}
+    
+    target_dir = Path(releases_dir) / f"v{target_version}"
+    target_path, file_type = release_artifact(target_dir, target_version)
+    if not target_path:
+        print(f"  跳过增量补丁：v{target_version} 没有发布文件")
+        return {}
+    patch_dir = target_dir / "patches"
+    patch_dir.mkdir(exist_ok=True)
+    
+    patches = {}
+    target_hash = calculate_file_hash(target_path)
+    for from_version in from_versions:
+        if from_version == target_version:
+            continue
+        source_path, source_type = release_artifact(Path(releases_dir) / f"v{from_version}", from_version)
+        if not source_path or source_type != file_type:
+            print(f"  跳过 v{from_version}：没有同类型({file_type})的发布文件")
+            continue
+        
+        patch_path, info = create_patch(source_path, target_path, patch_dir / f"{from_version}_to_{target_version}")
+        patch_size = patch_path.stat().st_size
+        patches[from_version] = {
+            "filename": f"patches/{patch_path.name}",
+            "file_type": file_type,
+            "size": patch_size,
+            "sha256": calculate_file_hash(patch_path),
+            "source_sha256": calculate_file_hash(source_path),
+            "target_size": target_path.stat().st_size,
+            "target_sha256": target_hash,
+            **info
+        }
+        print(f"  补丁 v{from_version} -> v{target_version}: {patch_size:,} 字节 "
+              f"(完整包 {target_path.stat().st_size:,} 字节, {info['method']})")
+    
+    update_version_manifest(target_dir, "patches", patches)
+    return patches
+
+
+def ingest_release_chunks(releases_dir, version):
+    """把版本目录下的 exe / zip 分块写入 releases/chunks，分块列表写入 manifest.json 的 "chunks"（跨版本去重）"""
+    version_dir = Path(releases_dir) / f"v{version}"
+    store = ChunkStore(Path(releases_dir) / "chunks")
+    entries = {}
+    for path in sorted(version_dir.glob("*")):
+        # 压缩版本（*.zst）不入库，分块去重针对原文件
+        if path.suffix.lower() not in (".exe", ".zip"):
+            continue
+        added = store.add_file(str(path))
+        entries[path.name] = {"size": added["size"], "sha256": added["sha256"], "chunks": added["chunks"]}
+        print(f"  {path.name}: {len(added['chunks'])} 块, 新增 {added['new_chunks']} 块 / {added['new_bytes']:,} 字节")
+    
+    update_version_manifest(version_dir, "chunks", entries)
+    return entries
+
+
 def main():
     """主函数"""
     print("=" * 60)
@@ -135,9 +462,25 @@ def main():
         releases_dir
     )
     
+    # zstd 压缩版本（与 zip / exe 并存）
+    print("\n🗜️ 创建 zstd 压缩版本...")
+    create_zstd_package("1.0.0", v1_0_0_files, releases_dir)
+    create_zstd_package("1.1.0", v1_1_0_files, releases_dir)
+    for version in ("1.0.0", "1.1.0"):
+        compress_release_exe(releases_dir, version)
+    
     # 清理临时文件
     v1_1_0_version_file.unlink()
     
+    # 增量补丁（v1.0.0 -> v1.1.0）
+    print("\n🧩 创建增量补丁...")
+    create_delta_patches(releases_dir, "1.1.0", ["1.0.0"])
+    
+    # 分块入库（跨版本去重）
+    print("\n🧱 分块入库...")
+    for version in ("1.0.0", "1.1.0"):
+        ingest_release_chunks(releases_dir, version)
+    
     print("\n" + "=" * 60)
     print("✅ 更新包创建完成!")
     print("=" * 60)
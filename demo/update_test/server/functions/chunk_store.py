@@ -0,0 +1,207 @@
+"""
+内容寻址的分块存储
+- 发布文件按内容定义分块（FastCDC 风格的 gear 滚动哈希），分块边界只取决于附近内容，
+  插入 / 删除只影响附近的分块，其余分块在不同版本、不同平台之间保持一致
+- 分块以 SHA256 命名保存在 releases/chunks/ab/abcdef...，相同分块只存一份
+- 版本清单 manifest.json 的 "chunks" 记录每个发布文件的分块列表；客户端本地文件与某个已发布版本一致时，
+  按该版本的分块列表即可知道本地已有哪些分块，只下载缺少的分块（客户端不需要自己分块）
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+# 分块大小：最小 / 平均 / 最大
+MIN_CHUNK_SIZE = 16 * 1024
+AVG_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+# 归一化分块：未到平均大小前用更严格的掩码，超过后用更宽松的掩码，使分块大小集中在平均值附近
+_MASK_STRICT = ((1 << 18) - 1) << 46
+_MASK_LOOSE = ((1 << 14) - 1) << 50
+_MASK_64 = (1 << 64) - 1
+# 每字节的 gear 随机数（由 SHA256 生成，固定可复现；修改会改变所有分块边界）
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "little") for i in range(256)]
+# 读取文件的块大小
+READ_SIZE = 1024 * 1024
+
+
+def _cut_point(data: bytes, start: int, end: int) -> int:
+    """返回 data[start:end] 中第一个分块的结束位置（不含）"""
+    if end - start <= MIN_CHUNK_SIZE:
+        return end
+    normal = start + min(end - start, AVG_CHUNK_SIZE)
+    limit = start + min(end - start, MAX_CHUNK_SIZE)
+    gear = GEAR
+    h = 0
+    i = start + MIN_CHUNK_SIZE
+    while i < normal:
+        h = ((h << 1) + gear[data[i]]) & _MASK_64
+        if not h & _MASK_STRICT:
+            return i + 1
+        i += 1
+    while i < limit:
+        h = ((h << 1) + gear[data[i]]) & _MASK_64
+        if not h & _MASK_LOOSE:
+            return i + 1
+        i += 1
+    return limit
+
+
+def iter_chunks(file) -> Iterator[bytes]:
+    """按内容定义分块读取文件对象"""
+    buffer = b""
+    while True:
+        data = file.read(READ_SIZE)
+        buffer += data
+        pos = 0
+        # 未到文件末尾时至少保留一个最大分块的数据，保证切点与一次性读取时一致
+        while len(buffer) - pos >= MAX_CHUNK_SIZE or (not data and pos < len(buffer)):
+            cut = _cut_point(buffer, pos, len(buffer))
+            yield buffer[pos:cut]
+            pos = cut
+        buffer = buffer[pos:]
+        if not data:
+            return
+
+
+class ChunkStore:
+    """分块存储"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def chunk_path(self, chunk_hash: str) -> Path:
+        """分块文件路径"""
+        return self.root / chunk_hash[:2] / chunk_hash
+
+    def has(self, chunk_hash: str) -> bool:
+        return self.chunk_path(chunk_hash).exists()
+
+    def put(self, data: bytes) -> str:
+        """保存分块（已存在时跳过），返回哈希"""
+        chunk_hash = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(chunk_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{chunk_hash}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return chunk_hash
+
+    def add_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        分块并写入存储
+
+        Args:
+            file_path: 发布文件路径
+
+        Returns:
+            dict: {"size", "sha256", "chunks": [{"hash", "size"}], "new_chunks", "new_bytes"}
+        """
+        sha256_hash = hashlib.sha256()
+        chunks = []
+        new_chunks = new_bytes = size = 0
+        with open(file_path, "rb") as f:
+            for data in iter_chunks(f):
+                sha256_hash.update(data)
+                chunk_hash = hashlib.sha256(data).hexdigest()
+                if not self.has(chunk_hash):
+                    self.put(data)
+                    new_chunks += 1
+                    new_bytes += len(data)
+                chunks.append({"hash": chunk_hash, "size": len(data)})
+                size += len(data)
+        return {
+            "size": size,
+            "sha256": sha256_hash.hexdigest(),
+            "chunks": chunks,
+            "new_chunks": new_chunks,
+            "new_bytes": new_bytes
+        }
+
+    def read(self, chunk_hash: str) -> bytes:
+        with open(self.chunk_path(chunk_hash), "rb") as f:
+            return f.read()
+
+    def assemble(self, index: Dict[str, Any], output_path: str) -> bool:
+        """
+        按分块列表还原文件（先写临时文件，校验整体哈希后替换）
+
+        Args:
+            index: add_file 的返回值（或清单中的同结构条目）
+            output_path: 输出路径
+
+        Returns:
+            bool: 是否成功
+        """
+        # 临时文件名按线程区分，并发还原同一文件时互不覆盖
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.assemble"
+        sha256_hash = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as out:
+                for chunk in index["chunks"]:
+                    data = self.read(chunk["hash"])
+                    sha256_hash.update(data)
+                    out.write(data)
+            if sha256_hash.hexdigest() != index["sha256"]:
+                print(f"⚠️ 分块还原的文件哈希不符: {output_path}")
+                os.remove(tmp_path)
+                return False
+            os.replace(tmp_path, output_path)
+            return True
+        except OSError as e:
+            print(f"分块还原失败: {output_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def iter_hashes(self) -> Iterable[str]:
+        if not self.root.exists():
+            return
+        for directory in self.root.iterdir():
+            if directory.is_dir():
+                for path in directory.iterdir():
+                    if not path.name.endswith(".tmp"):
+                        yield path.name
+
+    def collect_garbage(self, referenced: Set[str]) -> Dict[str, int]:
+        """
+        删除未被任何清单引用的分块
+
+        Args:
+            referenced: 仍被引用的分块哈希
+
+        Returns:
+            dict: {"removed", "freed_bytes", "kept"}
+        """
+        removed = freed = kept = 0
+        with self._lock:
+            for chunk_hash in list(self.iter_hashes()):
+                if chunk_hash in referenced:
+                    kept += 1
+                    continue
+                path = self.chunk_path(chunk_hash)
+                try:
+                    freed += path.stat().st_size
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return {"removed": removed, "freed_bytes": freed, "kept": kept}
+
+    def stats(self) -> Dict[str, int]:
+        """存储统计：分块数与实际占用"""
+        count = stored = 0
+        for chunk_hash in self.iter_hashes():
+            count += 1
+            stored += self.chunk_path(chunk_hash).stat().st_size
+        return {"chunks": count, "stored_bytes": stored}
+
+
+def chunk_hashes(entries: Iterable[Dict[str, Any]]) -> List[str]:
+    """清单条目中的全部分块哈希"""
+    return [chunk["hash"] for entry in entries for chunk in entry.get("chunks", [])]
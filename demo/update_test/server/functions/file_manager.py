@@ -1,13 +1,94 @@
 """
 文件管理器
 负责更新包的文件操作、哈希计算等功能
+
+摘要索引：
+- 发布时把每个包文件的 size / mtime_ns / sha256 / 分段哈希写入版本目录下 manifest.json 的 "digests"
+- 启动时读入内存；版本检查、包列表只查索引（size 与 mtime 一致即认为文件未变），不再读文件计算哈希
+- 索引缺失或文件已变化时只计算一次，并写回 manifest.json
+- 后台线程定期重新计算哈希校验（reverify_interval 秒，0 为关闭），发现不一致时更新索引并告警
+
+增量补丁：
+- manifest.json 的 "patches" 记录 {源版本: 补丁信息}（由 create_update_packages.py 生成）
+- get_patch_chain 在所有版本的补丁之间按总大小找最短路径，总大小小于完整包时才下发
+
+分块存储（见 chunk_store）：
+- 发布时把 exe / zip 按内容定义分块写入 releases/chunks，manifest.json 的 "chunks" 记录 {文件名: 分块列表}
+- 相同分块在版本、平台之间只存一份；chunk_store.keep_full_files 为 false 时删除完整文件，下载时按需还原
+  （版本检查只读清单，不还原文件；同一文件只还原一次，还原后恢复发布时的 mtime，摘要索引仍然有效）
+- 清理旧版本后回收不再被任何清单引用的分块
+
+zstd 压缩版本（由 create_update_packages.py 生成）：
+- manifest.json 的 "compressed" 记录 {原文件名: {"filename", "method", "format", 压缩参数...}}
+- 压缩文件（*.zst）与原文件并存，只计算摘要、不分块入库；客户端声明支持 zstd 时才下载压缩版本，旧客户端仍下载原文件
 """
 
 import os
+import json
+import heapq
 import hashlib
+import threading
+import time
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 
+from .chunk_store import ChunkStore, chunk_hashes
+
+# 哈希计算的读取块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+# 后台重新校验的默认间隔（秒）
+DEFAULT_REVERIFY_INTERVAL = 3600
+# 分段哈希的分段大小（客户端分段并行下载时逐段校验，需为 HASH_CHUNK_SIZE 的整数倍）
+SEGMENT_SIZE = 4 * 1024 * 1024
+
+
+def file_digest(file_path: str) -> str:
+    """计算文件的SHA256哈希值（大块读取）"""
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+def digest_key(file_path) -> str:
+    """摘要索引的键：绝对路径（配置的相对 releases_path 与接口拼出的绝对路径指向同一文件时键相同）"""
+    return str(Path(file_path).resolve())
+
+
+def compute_digest_entry(file_path: str, segment_size: int = SEGMENT_SIZE) -> Dict[str, Any]:
+    """
+    一次读取同时计算整体 SHA256 与分段 SHA256
+    
+    Returns:
+        dict: {"size", "mtime_ns", "sha256", "segment_size", "segment_sha256": [...]}
+    """
+    stat = os.stat(file_path)
+    sha256_hash = hashlib.sha256()
+    segment_hashes = []
+    segment_hash = hashlib.sha256()
+    segment_filled = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256_hash.update(chunk)
+            while chunk:
+                part = chunk[:segment_size - segment_filled]
+                segment_hash.update(part)
+                segment_filled += len(part)
+                chunk = chunk[len(part):]
+                if segment_filled == segment_size:
+                    segment_hashes.append(segment_hash.hexdigest())
+                    segment_hash, segment_filled = hashlib.sha256(), 0
+    if segment_filled:
+        segment_hashes.append(segment_hash.hexdigest())
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256_hash.hexdigest(),
+        "segment_size": segment_size,
+        "segment_sha256": segment_hashes
+    }
+
 
 class FileManager:
     """文件管理器"""
@@ -15,7 +96,17 @@ class FileManager:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.releases_path = Path(config["releases_path"])
+        # 摘要索引：文件绝对路径（digest_key）-> {"size", "mtime_ns", "sha256", "segment_size", "segment_sha256"}
+        self._digests: Dict[str, Dict[str, Any]] = {}
+        self._digest_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._verifier: Optional[threading.Thread] = None
+        self._stop_verifier = threading.Event()
+        self._manifest_cache: Dict[str, Any] = {}
+        self._assemble_lock = threading.Lock()
+        self.chunk_store = ChunkStore(self.releases_path / "chunks")
         self.ensure_directories()
+        self.load_digest_index()
     
     def ensure_directories(self):
         """确保必要的目录存在"""
@@ -25,17 +116,183 @@ class FileManager:
     
     def calculate_file_hash(self, file_path: str) -> str:
         """计算文件的SHA256哈希值"""
-        sha256_hash = hashlib.sha256()
-        
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(chunk)
-            return sha256_hash.hexdigest()
+            return file_digest(file_path)
         except Exception as e:
             print(f"计算文件哈希失败: {e}")
             return ""
     
+    # ===================== 摘要索引 =====================
+    
+    def load_digest_index(self) -> int:
+        """从各版本的 manifest.json 读入摘要索引，返回条目数"""
+        count = 0
+        for manifest_path in self.releases_path.glob("v*/manifest.json"):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    digests = json.load(f).get("digests") or {}
+            except Exception as e:
+                print(f"读取清单摘要失败: {manifest_path}: {e}")
+                continue
+            with self._digest_lock:
+                for filename, entry in digests.items():
+                    if {"size", "mtime_ns", "sha256"} <= set(entry):
+                        self._digests[digest_key(manifest_path.parent / filename)] = entry
+                        count += 1
+        if count:
+            print(f"📇 已加载 {count} 条包摘要")
+        return count
+    
+    def get_digest_entry(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文件的摘要（优先使用索引；size / mtime 不一致或缺少分段哈希时重新计算并写回清单）
+        
+        Args:
+            file_path: 包文件路径
+        
+        Returns:
+            dict: 摘要条目，失败返回 None
+        """
+        key = digest_key(file_path)
+        try:
+            stat = os.stat(key)
+        except OSError as e:
+            print(f"读取文件信息失败: {e}")
+            return None
+        with self._digest_lock:
+            entry = self._digests.get(key)
+        if (entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                and "segment_sha256" in entry):
+            return entry
+        
+        try:
+            entry = compute_digest_entry(key, self.config.get("digest", {}).get("segment_size", SEGMENT_SIZE))
+        except Exception as e:
+            print(f"计算文件哈希失败: {e}")
+            return None
+        print(f"📇 计算包摘要: {key}")
+        self._store_digest(key, entry)
+        return entry
+    
+    def get_file_digest(self, file_path: str) -> str:
+        """获取文件的SHA256（见 get_digest_entry），失败返回空字符串"""
+        entry = self.get_digest_entry(file_path)
+        return entry["sha256"] if entry else ""
+    
+    def publish_digests(self, version: str) -> Dict[str, Dict[str, Any]]:
+        """
+        发布时计算版本目录下所有包文件（exe / zip）的摘要并写入 manifest.json
+        
+        Args:
+            version: 版本号
+        
+        Returns:
+            dict: 文件名 -> 摘要
+        """
+        version_dir = self.releases_path / f"v{version}"
+        result = {}
+        for path in sorted(version_dir.glob("*")):
+            if path.suffix.lower() in (".exe", ".zip", ".zst"):
+                entry = compute_digest_entry(str(path), self.config.get("digest", {}).get("segment_size", SEGMENT_SIZE))
+                self._store_digest(str(path), entry)
+                result[path.name] = entry
+        return result
+    
+    def _store_digest(self, file_path: str, entry: Dict[str, Any]):
+        """更新内存索引并写回所在版本目录的 manifest.json"""
+        path = Path(file_path)
+        with self._digest_lock:
+            self._digests[digest_key(path)] = entry
+        self._update_manifest(path.parent / "manifest.json", "digests", path.name, entry)
+    
+    def _update_manifest(self, manifest_path: Path, section: str, key: str, entry: Dict[str, Any]):
+        """写入 manifest.json 的 section[key]（先写临时文件再替换，避免写到一半时被读取）"""
+        with self._manifest_lock:
+            try:
+                manifest = {}
+                if manifest_path.exists():
+                    with open(manifest_path, 'r', encoding='utf-8') as f:
+                        manifest = json.load(f)
+                manifest.setdefault(section, {})[key] = entry
+                tmp_path = manifest_path.with_suffix(".json.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, manifest_path)
+            except Exception as e:
+                print(f"写入清单失败: {manifest_path} [{section}]: {e}")
+    
+    def manifest_signature(self) -> tuple:
+        """所有版本 manifest.json 的路径与 mtime（任何清单变化时改变）"""
+        return tuple((str(p), p.stat().st_mtime_ns) for p in sorted(self.releases_path.glob("v*/manifest.json")))
+    
+    def _load_manifest_sections(self, section: str) -> Dict[str, Dict[str, Any]]:
+        """
+        读取所有版本 manifest.json 的同一部分（按 manifest.json 的 mtime 缓存）
+        
+        Returns:
+            dict: {版本: section 内容}（内容为空的版本不包含在内）
+        """
+        signature = self.manifest_signature()
+        manifests = [Path(path) for path, _ in signature]
+        cached = self._manifest_cache.get(section)
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        result: Dict[str, Dict[str, Any]] = {}
+        for manifest_path in manifests:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    content = json.load(f).get(section) or {}
+            except Exception as e:
+                print(f"读取清单失败: {manifest_path} [{section}]: {e}")
+                continue
+            if content:
+                result[manifest_path.parent.name[1:]] = content
+        self._manifest_cache[section] = (signature, result)
+        return result
+    
+    def reverify_digests(self) -> int:
+        """重新计算索引中所有文件的哈希，返回不一致（已更新）的条目数"""
+        with self._digest_lock:
+            items = list(self._digests.items())
+        mismatched = 0
+        for file_path, entry in items:
+            if self._stop_verifier.is_set():
+                break
+            try:
+                fresh = compute_digest_entry(file_path, entry.get("segment_size", SEGMENT_SIZE))
+            except OSError:
+                # 文件已删除
+                with self._digest_lock:
+                    self._digests.pop(file_path, None)
+                continue
+            if (fresh["sha256"] != entry["sha256"] or fresh["size"] != entry["size"]
+                    or fresh["segment_sha256"] != entry.get("segment_sha256")):
+                mismatched += 1
+                print(f"⚠️ 包摘要不一致，已更新: {file_path}")
+                self._store_digest(file_path, fresh)
+        return mismatched
+    
+    def start_digest_verifier(self, interval: Optional[float] = None):
+        """启动后台重新校验线程（interval 默认取配置 digest.reverify_interval）"""
+        if interval is None:
+            interval = self.config.get("digest", {}).get("reverify_interval", DEFAULT_REVERIFY_INTERVAL)
+        if not interval or self._verifier is not None:
+            return
+        
+        def run():
+            while not self._stop_verifier.wait(interval):
+                start = time.time()
+                mismatched = self.reverify_digests()
+                print(f"📇 包摘要校验完成: {len(self._digests)} 个文件, {mismatched} 个不一致, 耗时 {time.time() - start:.1f}s")
+        
+        self._verifier = threading.Thread(target=run, name="digest-verifier", daemon=True)
+        self._verifier.start()
+    
+    def stop_digest_verifier(self):
+        """停止后台重新校验线程"""
+        self._stop_verifier.set()
+    
     def get_package_path(self, version: str, platform: str = "windows", arch: str = "x64") -> str:
         """获取更新包的完整路径"""
         # 简化：所有平台使用同一个包文件
@@ -49,47 +306,269 @@ class FileManager:
         version_dir = self.releases_path / f"v{version}"
         return str(version_dir / exe_name)
     
+    # ===================== 分块存储 =====================
+    
+    def ingest_release(self, version: str) -> Dict[str, Dict[str, Any]]:
+        """
+        发布时把版本目录下的 exe / zip 分块写入存储，并把分块列表写入 manifest.json 的 "chunks"
+        
+        Args:
+            version: 版本号
+        
+        Returns:
+            dict: 文件名 -> 分块条目 {"size", "sha256", "chunks"}
+        """
+        version_dir = self.releases_path / f"v{version}"
+        keep_full_files = self.config.get("chunk_store", {}).get("keep_full_files", True)
+        result = {}
+        for path in sorted(version_dir.glob("*")):
+            if path.suffix.lower() not in (".exe", ".zip"):
+                continue
+            added = self.chunk_store.add_file(str(path))
+            entry = {"size": added["size"], "sha256": added["sha256"], "chunks": added["chunks"]}
+            self._update_manifest(version_dir / "manifest.json", "chunks", path.name, entry)
+            result[path.name] = entry
+            print(f"🧱 分块入库: {path.name} {len(entry['chunks'])} 块, 新增 {added['new_chunks']} 块 / {added['new_bytes']:,} 字节")
+            if not keep_full_files:
+                path.unlink()
+        return result
+    
+    def get_chunk_index(self, version: str, platform: str = "windows", arch: str = "x64") -> Optional[Dict[str, Any]]:
+        """
+        获取发布文件的分块列表（与 get_package_info 一样优先exe）
+        
+        Returns:
+            dict: {"version", "filename", "file_type", "size", "sha256", "chunks"}，没有分块信息时返回 None
+        """
+        entries = self._load_manifest_sections("chunks").get(version, {})
+        for path in (self.get_exe_path(version, platform, arch), self.get_package_path(version, platform, arch)):
+            filename = os.path.basename(path)
+            if filename in entries:
+                return dict(entries[filename], version=version, filename=filename,
+                            file_type=Path(filename).suffix[1:].lower())
+        return None
+    
+    def get_chunk_path(self, chunk_hash: str) -> Optional[str]:
+        """分块文件路径（哈希格式不对或不存在时返回 None）"""
+        chunk_hash = chunk_hash.lower()
+        if len(chunk_hash) != 64 or any(c not in "0123456789abcdef" for c in chunk_hash):
+            return None
+        path = self.chunk_store.chunk_path(chunk_hash)
+        return str(path) if path.exists() else None
+    
+    def _get_chunk_entry(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """清单中发布文件的分块条目 {"size", "sha256", "chunks"}（没有时返回 None）"""
+        path = Path(file_path)
+        return self._load_manifest_sections("chunks").get(path.parent.name[1:], {}).get(path.name)
+    
+    def has_release_file(self, file_path: str) -> bool:
+        """发布文件存在，或可以从分块存储还原（只查清单，不还原）"""
+        return os.path.exists(file_path) or self._get_chunk_entry(file_path) is not None
+    
+    def get_release_digest(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        发布文件的摘要：文件存在时见 get_digest_entry；
+        已删除（只保留分块）时使用摘要索引中发布时的条目，索引没有时退回分块条目的 size / sha256
+        """
+        if os.path.exists(file_path):
+            return self.get_digest_entry(file_path)
+        chunk_entry = self._get_chunk_entry(file_path)
+        if not chunk_entry:
+            return None
+        with self._digest_lock:
+            entry = self._digests.get(digest_key(file_path))
+        if entry and entry["sha256"] == chunk_entry["sha256"]:
+            return entry
+        return {"size": chunk_entry["size"], "sha256": chunk_entry["sha256"]}
+    
+    def ensure_release_file(self, file_path: str) -> bool:
+        """
+        发布文件存在时直接返回；不存在但清单中有分块列表时从分块存储还原（下载时调用）
+        - 加锁还原，并发请求同一文件时只还原一次
+        - 还原后把 mtime 设为摘要索引中发布时的值，索引的 size / mtime 检查仍然命中，不重新计算哈希
+        
+        Returns:
+            bool: 文件是否可用
+        """
+        if os.path.exists(file_path):
+            return True
+        entry = self._get_chunk_entry(file_path)
+        if not entry:
+            return False
+        with self._assemble_lock:
+            if os.path.exists(file_path):
+                return True
+            print(f"🧱 从分块存储还原: {file_path}")
+            if not self.chunk_store.assemble(entry, file_path):
+                return False
+            with self._digest_lock:
+                digest = self._digests.get(digest_key(file_path))
+            if digest and digest["sha256"] == entry["sha256"] and digest["size"] == entry["size"]:
+                os.utime(file_path, ns=(digest["mtime_ns"], digest["mtime_ns"]))
+            return True
+    
+    def collect_chunk_garbage(self) -> Dict[str, int]:
+        """回收不再被任何版本清单引用的分块"""
+        referenced = set()
+        for entries in self._load_manifest_sections("chunks").values():
+            referenced.update(chunk_hashes(entries.values()))
+        result = self.chunk_store.collect_garbage(referenced)
+        if result["removed"]:
+            print(f"🧹 回收分块: {result['removed']} 块, {result['freed_bytes']:,} 字节")
+        return result
+    
+    def get_chunk_stats(self) -> Dict[str, int]:
+        """分块存储统计：实际占用与去重前的逻辑大小"""
+        stats = self.chunk_store.stats()
+        stats["logical_bytes"] = sum(
+            entry["size"] for entries in self._load_manifest_sections("chunks").values() for entry in entries.values()
+        )
+        return stats
+    
+    # ===================== 增量补丁 =====================
+    
+    def load_patch_graph(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        读取所有版本的补丁信息（按 manifest.json 的 mtime 缓存）
+        
+        Returns:
+            dict: {目标版本: {源版本: 补丁信息}}
+        """
+        return self._load_manifest_sections("patches")
+    
+    def get_patch_info(self, version: str, from_version: str) -> Optional[Dict[str, Any]]:
+        """获取 from_version -> version 的补丁信息 + {"path"}（补丁文件不存在返回 None）"""
+        entry = self.load_patch_graph().get(version, {}).get(from_version)
+        if not entry:
+            return None
+        patch_path = self.releases_path / f"v{version}" / entry["filename"]
+        return dict(entry, path=str(patch_path)) if patch_path.exists() else None
+    
+    def get_patch_path(self, version: str, from_version: str) -> Optional[str]:
+        """获取 from_version -> version 补丁文件的路径（不存在返回 None）"""
+        info = self.get_patch_info(version, from_version)
+        return info["path"] if info else None
+    
+    def get_patch_chain(self, current_version: str, target_version: str, file_type: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        查找 current_version -> target_version 总大小最小的补丁链
+        
+        Args:
+            current_version: 客户端当前版本
+            target_version: 目标版本
+            file_type: 发布文件类型（exe / zip），补丁必须基于同类型文件
+        
+        Returns:
+            list: 按应用顺序排列的补丁信息（含 from_version / to_version / download_url），没有可用补丁链时返回 None
+        """
+        edges: Dict[str, List[tuple]] = {}
+        for to_version, patches in self.load_patch_graph().items():
+            for from_version, entry in patches.items():
+                if entry.get("file_type") == file_type and self.get_patch_path(to_version, from_version):
+                    edges.setdefault(from_version, []).append((to_version, entry))
+        
+        # Dijkstra：边权为补丁大小
+        best = {current_version: 0}
+        previous: Dict[str, tuple] = {}
+        queue = [(0, current_version)]
+        while queue:
+            size, version = heapq.heappop(queue)
+            if version == target_version:
+                break
+            if size > best.get(version, float("inf")):
+                continue
+            for to_version, entry in edges.get(version, []):
+                total = size + entry["size"]
+                if total < best.get(to_version, float("inf")):
+                    best[to_version] = total
+                    previous[to_version] = (version, entry)
+                    heapq.heappush(queue, (total, to_version))
+        
+        if target_version not in previous:
+            return None
+        chain = []
+        version = target_version
+        while version != current_version:
+            from_version, entry = previous[version]
+            chain.append({
+                **entry,
+                "from_version": from_version,
+                "to_version": version,
+                "download_url": f"/api/version/patch/{version}/{from_version}"
+            })
+            version = from_version
+        return list(reversed(chain))
+    
+    def get_compressed_info(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        发布文件的 zstd 压缩版本
+        
+        Returns:
+            dict: 清单 "compressed" 中的条目 + {"path", "size", "hash", "segments"}；没有或压缩文件不存在时返回 None
+        """
+        path = Path(file_path)
+        entry = self._load_manifest_sections("compressed").get(path.parent.name[1:], {}).get(path.name)
+        if not entry:
+            return None
+        compressed_path = path.parent / entry["filename"]
+        if not compressed_path.exists():
+            return None
+        digest = self.get_digest_entry(str(compressed_path)) or {}
+        return dict(entry, path=str(compressed_path), size=digest.get("size", 0), hash=digest.get("sha256", ""),
+                    segments={
+                        "size": digest.get("segment_size", SEGMENT_SIZE),
+                        "hashes": digest.get("segment_sha256", [])
+                    })
+    
     def get_package_info(self, version: str, platform: str = "windows", arch: str = "x64") -> Optional[Dict[str, Any]]:
-        """获取更新包信息（优先返回exe文件信息）"""
+        """获取更新包信息（优先返回exe文件信息；只读清单与摘要索引，完整文件已删除时不还原）"""
         # 优先查找exe文件
         exe_path = self.get_exe_path(version, platform, arch)
-        if os.path.exists(exe_path):
+        if self.has_release_file(exe_path):
             try:
-                file_size = os.path.getsize(exe_path)
-                file_hash = self.calculate_file_hash(exe_path)
+                digest = self.get_release_digest(exe_path) or {}
                 
                 return {
                     "path": exe_path,
-                    "size": file_size,
-                    "hash": file_hash,
+                    "size": digest.get("size", 0),
+                    "hash": digest.get("sha256", ""),
+                    "segments": {
+                        "size": digest.get("segment_size", SEGMENT_SIZE),
+                        "hashes": digest.get("segment_sha256", [])
+                    },
                     "platform": platform,
                     "arch": arch,
                     "version": version,
                     "release_date": "2024-09-03T10:00:00Z",
-                    "file_type": "exe"
+                    "file_type": "exe",
+                    "compressed": self.get_compressed_info(exe_path)
                 }
             except Exception as e:
                 print(f"获取exe文件信息失败: {e}")
         
         # 回退到zip包
         package_path = self.get_package_path(version, platform, arch)
-        if not os.path.exists(package_path):
+        if not self.has_release_file(package_path):
             print(f"更新包不存在: {package_path}")
             return None
         
         try:
-            file_size = os.path.getsize(package_path)
-            file_hash = self.calculate_file_hash(package_path)
+            digest = self.get_release_digest(package_path) or {}
             
             return {
                 "path": package_path,
-                "size": file_size,
-                "hash": file_hash,
+                "size": digest.get("size", 0),
+                "hash": digest.get("sha256", ""),
+                "segments": {
+                    "size": digest.get("segment_size", SEGMENT_SIZE),
+                    "hashes": digest.get("segment_sha256", [])
+                },
                 "platform": platform,
                 "arch": arch,
                 "version": version,
                 "release_date": "2024-09-03T10:00:00Z",
-                "file_type": "zip"
+                "file_type": "zip",
+                "compressed": self.get_compressed_info(package_path)
             }
         except Exception as e:
             print(f"获取包信息失败: {e}")
@@ -110,7 +589,7 @@ class FileManager:
                             "filename": package_file.name,
                             "path": str(package_file),
                             "size": package_file.stat().st_size,
-                            "hash": self.calculate_file_hash(str(package_file))
+                            "hash": self.get_file_digest(str(package_file))
                         }
                         packages.append(package_info)
             
@@ -140,10 +619,13 @@ class FileManager:
                 }
             }
             
-            import json
             with open(manifest_path, 'w', encoding='utf-8') as f:
                 json.dump(manifest_data, f, indent=2, ensure_ascii=False)
             
+            # 发布时写入摘要索引，之后的版本检查不再计算哈希
+            self.publish_digests(version)
+            if self.config.get("chunk_store", {}).get("enabled", True):
+                self.ingest_release(version)
             print(f"创建清单文件: {manifest_path}")
             return True
             
@@ -175,6 +657,9 @@ class FileManager:
                 import shutil
                 shutil.rmtree(old_dir)
                 print(f"清理旧版本: {old_dir.name}")
+            
+            # 回收只属于已删除版本的分块（与保留版本共享的分块不受影响）
+            self.collect_chunk_garbage()
                 
         except Exception as e:
             print(f"清理旧包失败: {e}")
@@ -0,0 +1,203 @@
+"""
+文件范围响应（更新包 / exe / 补丁下载）
+- 同一个响应类处理完整下载（200）、单范围（206）、多范围（206 multipart/byteranges）与不可满足（416）
+- 支持 If-Range / If-None-Match（ETag 默认使用清单中的包 SHA256，没有时用 mtime + 大小）
+- 服务器提供 ASGI zerocopy 扩展时用 sendfile 直接发送文件描述符；
+  否则（如 uvicorn）在线程池中以 1MB 大块读取，事件循环不逐块处理小数据
+"""
+
+import os
+import secrets
+from email.utils import formatdate
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+# 非 zerocopy 时每次读取的大小
+READ_SIZE = 1024 * 1024
+# 合并后范围数超过该值时忽略 Range，返回完整文件（防止大量小范围请求）
+MAX_RANGES = 32
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    解析 Range 头
+
+    Args:
+        range_header: 如 "bytes=0-1023, 4096-, -512"
+        file_size: 文件大小
+
+    Returns:
+        list | None: 合并重叠/相邻后的 [(start, end)]（end 含）；
+            格式不合法时返回 None（忽略 Range），没有可满足的范围时返回 []（416）
+    """
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        start_text, sep, end_text = spec.strip().partition("-")
+        start_text, end_text = start_text.strip(), end_text.strip()
+        if not sep or not (start_text or end_text):
+            return None
+        if (start_text and not start_text.isdigit()) or (end_text and not end_text.isdigit()):
+            return None
+        if not start_text:
+            # 后缀范围：最后 N 个字节
+            suffix = int(end_text)
+            if suffix > 0 and file_size > 0:
+                ranges.append((max(0, file_size - suffix), file_size - 1))
+            continue
+        start = int(start_text)
+        end = int(end_text) if end_text else file_size - 1
+        if end_text and end < start:
+            return None
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _read_at(file, offset: int, size: int) -> bytes:
+    file.seek(offset)
+    return file.read(size)
+
+
+class RangeFileResponse(Response):
+    """支持 Range / If-Range / ETag 的文件响应（请求头在 ASGI 调用时从 scope 读取）"""
+
+    def __init__(self, path: str, media_type: str = "application/octet-stream",
+                 filename: Optional[str] = None, etag: Optional[str] = None,
+                 headers: Optional[dict] = None):
+        """
+        Args:
+            path: 文件路径
+            media_type: Content-Type
+            filename: 下载文件名（Content-Disposition）
+            etag: 强 ETag（不含引号，文件内容的 SHA256，下载端点都应传入）；为空时用 mtime + 大小
+            headers: 额外响应头
+        """
+        self.path = path
+        self.media_type = media_type
+        self.filename = filename
+        self.etag = etag
+        self.extra_headers = headers or {}
+        self.status_code = 200
+        self.background = None
+        self.raw_headers = []
+
+    async def __call__(self, scope, receive, send):
+        stat = await run_in_threadpool(os.stat, self.path)
+        file_size = stat.st_size
+        etag = f'"{self.etag or f"{stat.st_mtime_ns:x}-{file_size:x}"}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": last_modified,
+        }
+        if self.filename:
+            headers["content-disposition"] = f'attachment; filename="{self.filename}"'
+        headers.update({k.lower(): v for k, v in self.extra_headers.items()})
+
+        # 条件请求：缓存仍然有效
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            await self._send_head(send, 304, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        ranges = None
+        range_header = request_headers.get("range")
+        if range_header and self._if_range_matches(request_headers.get("if-range"), etag, last_modified):
+            ranges = parse_range_header(range_header, file_size)
+            if ranges is not None and len(ranges) > MAX_RANGES:
+                ranges = None
+
+        if ranges == []:
+            headers.update({"content-range": f"bytes */{file_size}", "content-length": "0"})
+            await self._send_head(send, 416, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if not ranges:
+            status, parts, tail = 200, [(b"", 0, file_size - 1)], b""
+            headers.update({"content-type": self.media_type, "content-length": str(file_size)})
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            status, parts, tail = 206, [(b"", start, end)], b""
+            headers.update({
+                "content-type": self.media_type,
+                "content-range": f"bytes {start}-{end}/{file_size}",
+                "content-length": str(end - start + 1),
+            })
+        else:
+            boundary = secrets.token_hex(16)
+            parts = [(
+                (f"\r\n--{boundary}\r\nContent-Type: {self.media_type}\r\n"
+                 f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n").encode("latin-1"),
+                start, end
+            ) for start, end in ranges]
+            tail = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            length = sum(len(prefix) + end - start + 1 for prefix, start, end in parts) + len(tail)
+            status = 206
+            headers.update({
+                "content-type": f"multipart/byteranges; boundary={boundary}",
+                "content-length": str(length),
+            })
+
+        await self._send_head(send, status, headers)
+        if scope.get("method") == "HEAD" or file_size == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        zerocopy = "http.response.zerocopy" in scope.get("extensions", {})
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            for prefix, start, end in parts:
+                if prefix:
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                await self._send_file_range(send, file, start, end - start + 1, zerocopy)
+            await send({"type": "http.response.body", "body": tail, "more_body": False})
+        finally:
+            await run_in_threadpool(file.close)
+
+    @staticmethod
+    def _if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+        """If-Range 与当前文件一致时才使用 Range（弱 ETag 永不匹配）"""
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == etag
+        return if_range == last_modified
+
+    async def _send_head(self, send, status: int, headers: dict):
+        self.status_code = status
+        self.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+
+    @staticmethod
+    async def _send_file_range(send, file, offset: int, count: int, zerocopy: bool):
+        if zerocopy:
+            # 由服务器调用 sendfile，数据不经过 Python
+            await send({"type": "http.response.zerocopy", "file": file, "offset": offset,
+                        "count": count, "more_body": True})
+            return
+        while count > 0:
+            data = await run_in_threadpool(_read_at, file, offset, min(READ_SIZE, count))
+            if not data:
+                raise RuntimeError(f"文件在发送过程中被截断: {file.name}")
+            await send({"type": "http.response.body", "body": data, "more_body": True})
+            offset += len(data)
+            count -= len(data)
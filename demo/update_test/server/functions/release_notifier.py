@@ -0,0 +1,221 @@
+"""
+新版本推送
+- 后台任务定期检查 config.json 的修改时间（只 stat 本地文件），versions 变化时原地更新 CONFIG，
+  清空预先计算的版本检查响应，并唤醒所有 /api/version/watch 连接
+- 版本检查响应按 (当前版本, 平台, 架构) 缓存，同一发布内只计算一次，轮询与推送共用；
+  发布清单（manifest.json）变化时清空缓存
+- 分批推送：每个客户端按 client_id 与版本号哈希得到 [0, rollout_window) 内固定的延迟，
+  发布后到了各自的时间点才收到通知，避免所有客户端同时下载
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+# 默认分批推送窗口（秒）
+DEFAULT_ROLLOUT_WINDOW = 600
+# 检查 config.json 的间隔（秒）
+DEFAULT_CONFIG_POLL_INTERVAL = 2.0
+# SSE 心跳间隔（秒），防止代理断开空闲连接
+DEFAULT_HEARTBEAT_INTERVAL = 25.0
+# 客户端断线重连等待（毫秒），SSE retry 字段
+RECONNECT_DELAY_MS = 15000
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """格式化 SSE 事件"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ReleaseNotifier:
+    """新版本推送"""
+
+    def __init__(self, config: Dict[str, Any], config_path: Path,
+                 build_response: Callable[[str, str, str], Dict[str, Any]],
+                 compare_versions: Callable[[str, str], int],
+                 release_signature: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            config: 全局配置（versions 变化时原地更新，其他管理器持有同一个对象）
+            config_path: config.json 路径
+            build_response: 计算版本检查响应 (current_version, platform, arch) -> dict
+            compare_versions: 版本比较函数
+            release_signature: 返回发布清单签名的函数，签名变化时清空响应缓存
+        """
+        self.config = config
+        self.config_path = Path(config_path)
+        self.build_response = build_response
+        self.compare_versions = compare_versions
+        self.release_signature = release_signature
+        self._release_signature = None
+        self._responses: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        self._config_mtime = self._stat_mtime()
+        # 发布时间：使用 config.json 的修改时间，服务重启后分批进度不重置
+        self.published_at = self._config_mtime or time.time()
+        self._changed = asyncio.Event()
+        self._loop = None
+        self._task = None
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return self.config.get("notifications", {})
+
+    @property
+    def latest(self) -> str:
+        return self.config["versions"]["latest"]
+
+    def _stat_mtime(self) -> float:
+        try:
+            return self.config_path.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    # ---------- 配置监视 ----------
+
+    def start(self):
+        """启动配置监视任务（需在事件循环中调用）"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._watch_config())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch_config(self):
+        interval = self.settings.get("config_poll_interval", DEFAULT_CONFIG_POLL_INTERVAL)
+        while True:
+            await asyncio.sleep(interval)
+            mtime = self._stat_mtime()
+            if mtime and mtime != self._config_mtime:
+                self._config_mtime = mtime
+                await run_in_threadpool(self.reload, mtime)
+            if self.release_signature:
+                signature = await run_in_threadpool(self.release_signature)
+                if signature != self._release_signature:
+                    self._release_signature = signature
+                    self._responses.clear()
+
+    def reload(self, mtime: Optional[float] = None) -> bool:
+        """
+        重新读取 config.json，versions 变化时发布新版本
+
+        Returns:
+            bool: 版本信息是否变化
+        """
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                new_config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 重新加载配置失败: {e}")
+            return False
+
+        if new_config.get("notifications") is not None:
+            self.config["notifications"] = new_config["notifications"]
+        if new_config.get("versions") == self.config.get("versions"):
+            return False
+
+        previous = self.latest
+        self.config["versions"] = new_config["versions"]
+        self._responses.clear()
+        self.published_at = mtime or time.time()
+        print(f"📣 版本配置已更新: v{previous} -> v{self.latest}，通知已连接的客户端")
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._notify)
+        else:
+            self._notify()
+        return True
+
+    def _notify(self):
+        """唤醒所有等待中的连接，并为之后的等待换一个新的事件（在事件循环线程中调用）"""
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    # ---------- 版本检查响应 ----------
+
+    def get_response(self, current_version: str, platform: str, arch: str) -> Dict[str, Any]:
+        """版本检查响应（同一发布内按当前版本 / 平台 / 架构缓存）"""
+        key = (self.latest, current_version, platform, arch)
+        response = self._responses.get(key)
+        if response is None:
+            response = self.build_response(current_version, platform, arch)
+            self._responses[key] = response
+        return response
+
+    # ---------- 分批推送 ----------
+
+    def rollout_delay(self, client_id: str, version: str) -> float:
+        """客户端距离可以收到通知还需等待的秒数"""
+        window = self.settings.get("rollout_window", DEFAULT_ROLLOUT_WINDOW)
+        if window <= 0:
+            return 0.0
+        digest = hashlib.sha256(f"{client_id}:{version}".encode("utf-8")).digest()
+        offset = int.from_bytes(digest[:8], "big") / 2 ** 64 * window
+        return max(0.0, self.published_at + offset - time.time())
+
+    async def watch(self, current_version: str, platform: str, arch: str,
+                    client_id: Optional[str] = None, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        SSE 事件流：有比 current_version 新的版本时（到达该客户端的分批时间后）发送 update 事件
+
+        Args:
+            current_version: 客户端当前版本
+            platform: 平台
+            arch: 架构
+            client_id: 客户端标识（决定分批延迟；为空时随机）
+            last_event_id: 重连时上次收到的事件 id（已通知过的版本不再重复发送）
+        """
+        client_id = client_id or f"anonymous-{random.getrandbits(64):x}"
+        heartbeat = self.settings.get("heartbeat_interval", DEFAULT_HEARTBEAT_INTERVAL)
+        notified = last_event_id
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+
+        while True:
+            changed = self._changed
+            latest = self.latest
+            if latest != notified and self.compare_versions(current_version, latest) < 0:
+                delay = self.rollout_delay(client_id, latest)
+                if delay > 0:
+                    # 等待本客户端的分批时间；期间版本再次变化则重新计算
+                    if await self._wait(changed, min(delay, heartbeat)):
+                        continue
+                    if delay > heartbeat:
+                        yield ": waiting\n\n"
+                        continue
+                try:
+                    response = await run_in_threadpool(self.get_response, current_version, platform, arch)
+                except Exception as e:
+                    print(f"[错误] 推送版本 v{latest} 失败: {e}")
+                    response = {}
+                if response.get("update_available"):
+                    yield format_event("update", response, event_id=latest)
+                notified = latest
+                continue
+
+            if not await self._wait(changed, heartbeat):
+                yield ": ping\n\n"
+
+    @staticmethod
+    async def _wait(event: asyncio.Event, timeout: float) -> bool:
+        """等待版本变化，返回是否变化（超时返回False）"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
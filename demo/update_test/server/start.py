@@ -5,20 +5,22 @@
 """
 
 from fastapi import FastAPI, HTTPException, Query, Header
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import os
 import json
 import hashlib
 import time
 from pathlib import Path
-from typing import Dict, Any, Optional
-import re
+from typing import Dict, Any, Optional, List
 
 # 导入功能模块
 from functions.version_manager import VersionManager
 from functions.file_manager import FileManager
+from functions.range_response import RangeFileResponse
+from functions.release_notifier import ReleaseNotifier
 
 # 当前目录
 current_dir = Path(__file__).parent
@@ -59,6 +61,80 @@ CONFIG = load_config()
 version_manager = VersionManager(CONFIG)
 file_manager = FileManager(CONFIG)
 
+def build_check_response(current_version: str, platform: str, arch: str) -> Dict[str, Any]:
+    """计算版本检查响应（由 release_notifier 按当前版本 / 平台 / 架构缓存）"""
+    # 获取最新版本信息
+    latest_version = CONFIG["versions"]["latest"]
+    
+    # 比较版本
+    update_available = version_manager.compare_versions(current_version, latest_version) < 0
+    
+    if not update_available:
+        return {
+            "update_available": False,
+            "current_version": current_version,
+            "latest_version": latest_version,
+            "message": "您已经是最新版本"
+        }
+    
+    # 获取更新包信息
+    package_info = file_manager.get_package_info(latest_version, platform, arch)
+    
+    if not package_info:
+        raise HTTPException(status_code=404, detail="找不到对应的更新包")
+    
+    # 确定更新类型
+    update_type = version_manager.get_update_type(current_version, latest_version)
+    
+    # 是否强制更新
+    force_update = version_manager.is_force_update_required(current_version)
+    
+    # 增量补丁链（总大小小于完整包时才下发，客户端失败时回退完整下载）
+    patch_chain = file_manager.get_patch_chain(current_version, latest_version, package_info["file_type"])
+    patch_size = sum(step["size"] for step in patch_chain) if patch_chain else 0
+    if patch_chain and patch_size >= package_info["size"]:
+        patch_chain, patch_size = None, 0
+    
+    # zstd 压缩版本（支持 zstd 的客户端使用；旧客户端忽略该字段，仍下载原文件）
+    compressed = package_info.get("compressed")
+    if compressed:
+        endpoint = "download_exe" if package_info["file_type"] == "exe" else "download"
+        compressed = {
+            "method": compressed["method"],
+            "format": compressed["format"],
+            "level": compressed.get("level"),
+            "frames": compressed.get("frames"),
+            "download_url": f"/api/version/{endpoint}/{latest_version}?compression={compressed['method']}",
+            "size": compressed["size"],
+            "hash": compressed["hash"],
+            "segments": compressed["segments"]
+        }
+    
+    return {
+        "update_available": True,
+        "current_version": current_version,
+        "latest_version": latest_version,
+        "update_type": update_type,
+        "force_update": force_update,
+        "download_url": f"/api/version/download_exe/{latest_version}",  # 下载exe文件
+        "file_size": package_info["size"],
+        "file_hash": package_info["hash"],
+        "segments": package_info.get("segments"),  # 分段哈希，供客户端分段并行下载逐段校验
+        "changelog": f"/api/version/changelog/{latest_version}",
+        "release_date": package_info.get("release_date", "2024-09-03T10:00:00Z"),
+        "message": f"发现新版本 {latest_version}",
+        "update_mode": "pyinstaller_exe",  # 标识这是exe更新模式
+        "patch_chain": patch_chain,
+        "patch_size": patch_size,
+        "compressed": compressed,
+        # 分块列表：客户端只下载本地没有的分块
+        "chunk_index": f"/api/version/chunks/{latest_version}" if file_manager.get_chunk_index(latest_version, platform, arch) else None
+    }
+
+# 新版本推送（监视 config.json，缓存版本检查响应）
+release_notifier = ReleaseNotifier(CONFIG, current_dir / "config.json", build_check_response,
+                                   version_manager.compare_versions, file_manager.manifest_signature)
+
 # Pydantic 模型
 class VersionCheckRequest(BaseModel):
     """版本检查请求模型"""
@@ -66,6 +142,13 @@ class VersionCheckRequest(BaseModel):
     platform: str
     arch: str
 
+class ChunkPackRequest(BaseModel):
+    """分块批量下载请求模型"""
+    hashes: List[str]
+
+# 单次批量下载的分块数上限
+MAX_PACK_CHUNKS = 256
+
 class VersionInfo(BaseModel):
     """版本信息响应模型"""
     current_version: str
@@ -78,6 +161,20 @@ class VersionInfo(BaseModel):
     changelog: str
     release_date: str
 
+# ===================== 生命周期 =====================
+
+@app.on_event("startup")
+async def start_background_jobs():
+    """启动后台任务：定期重新校验包摘要、监视版本配置"""
+    file_manager.start_digest_verifier()
+    release_notifier.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    """停止后台任务"""
+    file_manager.stop_digest_verifier()
+    await release_notifier.stop()
+
 # ===================== API 端点 =====================
 
 @app.get("/")
@@ -88,8 +185,13 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/api/version/check",
+            "/api/version/watch",
             "/api/version/info/{version}",
             "/api/version/download/{version}",
+            "/api/version/patch/{version}/{from_version}",
+            "/api/version/chunks/{version}",
+            "/api/chunks/{chunk_hash}",
+            "/api/chunks/pack",
             "/api/version/changelog/{version}"
         ],
         "supported_versions": CONFIG["versions"]["supported"],
@@ -105,52 +207,28 @@ async def check_version(
     """检查版本更新"""
     try:
         print(f"[版本检查] 当前版本: {current_version}, 平台: {platform}, 架构: {arch}")
-        
-        # 获取最新版本信息
-        latest_version = CONFIG["versions"]["latest"]
-        
-        # 比较版本
-        update_available = version_manager.compare_versions(current_version, latest_version) < 0
-        
-        if not update_available:
-            return {
-                "update_available": False,
-                "current_version": current_version,
-                "latest_version": latest_version,
-                "message": "您已经是最新版本"
-            }
-        
-        # 获取更新包信息
-        package_info = file_manager.get_package_info(latest_version, platform, arch)
-        
-        if not package_info:
-            raise HTTPException(status_code=404, detail="找不到对应的更新包")
-        
-        # 确定更新类型
-        update_type = version_manager.get_update_type(current_version, latest_version)
-        
-        # 是否强制更新
-        force_update = version_manager.is_force_update_required(current_version)
-        
-        return {
-            "update_available": True,
-            "current_version": current_version,
-            "latest_version": latest_version,
-            "update_type": update_type,
-            "force_update": force_update,
-            "download_url": f"/api/version/download_exe/{latest_version}",  # 下载exe文件
-            "file_size": package_info["size"],
-            "file_hash": package_info["hash"],
-            "changelog": f"/api/version/changelog/{latest_version}",
-            "release_date": package_info.get("release_date", "2024-09-03T10:00:00Z"),
-            "message": f"发现新版本 {latest_version}",
-            "update_mode": "pyinstaller_exe"  # 标识这是exe更新模式
-        }
+        # 未命中缓存时会读取包信息（可能计算哈希），与 watch 一样放到线程池执行，不阻塞推送连接
+        return await run_in_threadpool(release_notifier.get_response, current_version, platform, arch)
         
     except Exception as e:
         print(f"[错误] 版本检查失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"版本检查失败: {str(e)}")
 
+@app.get("/api/version/watch")
+async def watch_version(
+    current_version: str = Query(..., description="当前版本号"),
+    platform: str = Query(..., description="平台信息"),
+    arch: str = Query(..., description="架构信息"),
+    client_id: Optional[str] = Query(None, description="客户端标识（决定分批推送的延迟）"),
+    last_event_id: Optional[str] = Header(None, description="重连时上次收到的事件id")
+):
+    """新版本推送（SSE）：有新版本时按分批时间发送 update 事件，内容与版本检查响应相同"""
+    return StreamingResponse(
+        release_notifier.watch(current_version, platform, arch, client_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/version/info/{version}")
 async def get_version_info(version: str):
     """获取指定版本的详细信息"""
@@ -171,6 +249,7 @@ async def download_version(
     version: str,
     platform: str = Query("windows", description="平台信息"),
     arch: str = Query("x64", description="架构信息"),
+    compression: Optional[str] = Query(None, description="压缩格式（zstd），不传时返回 zip"),
     range_header: str = Header(None, alias="range")
 ):
     """下载指定版本的更新包（支持断点续传）"""
@@ -181,50 +260,25 @@ async def download_version(
         # 获取文件路径
         package_path = file_manager.get_package_path(version, platform, arch)
         
-        if not os.path.exists(package_path):
+        # 从分块还原与计算哈希都可能读取整个文件，放到线程池执行，不阻塞其他下载
+        if not await run_in_threadpool(file_manager.ensure_release_file, package_path):
             raise HTTPException(status_code=404, detail="更新包文件不存在")
         
+        if compression:
+            return await run_in_threadpool(compressed_file_response, package_path, compression)
+        
         file_size = os.path.getsize(package_path)
         
-        # 处理 Range 请求（断点续传）
+        # 完整下载 / Range（断点续传、分段并行下载）统一由 RangeFileResponse 处理
         if range_header:
-            range_match = re.match(r'bytes=(\d+)-(\d*)', range_header)
-            if range_match:
-                start = int(range_match.group(1))
-                end = int(range_match.group(2)) if range_match.group(2) else file_size - 1
-                
-                print(f"[断点续传] 下载范围: {start}-{end}/{file_size}")
-                
-                def generate_chunk():
-                    with open(package_path, 'rb') as f:
-                        f.seek(start)
-                        remaining = end - start + 1
-                        while remaining > 0:
-                            chunk_size = min(8192, remaining)
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            remaining -= len(chunk)
-                            yield chunk
-                
-                return StreamingResponse(
-                    generate_chunk(),
-                    status_code=206,
-                    headers={
-                        'Content-Range': f'bytes {start}-{end}/{file_size}',
-                        'Accept-Ranges': 'bytes',
-                        'Content-Length': str(end - start + 1),
-                        'Content-Type': 'application/zip'
-                    }
-                )
-        
-        # 完整文件下载
-        print(f"[完整下载] 文件: {package_path}, 大小: {file_size}")
-        return FileResponse(
+            print(f"[断点续传] 下载范围: {range_header} / {file_size}")
+        else:
+            print(f"[完整下载] 文件: {package_path}, 大小: {file_size}")
+        return RangeFileResponse(
             package_path,
             media_type='application/zip',
             filename=f"update_v{version}_{platform}_{arch}.zip",
-            headers={'Accept-Ranges': 'bytes'}
+            etag=await run_in_threadpool(file_manager.get_file_digest, package_path)
         )
         
     except HTTPException:
@@ -236,6 +290,7 @@ async def download_version(
 @app.get("/api/version/download_exe/{version}")
 async def download_exe_version(
     version: str,
+    compression: Optional[str] = Query(None, description="压缩格式（zstd），不传时返回原始exe"),
     range_header: str = Header(None, alias="range")
 ):
     """下载exe文件版本（PyInstaller专用，支持断点续传）"""
@@ -245,14 +300,15 @@ async def download_exe_version(
         if version not in CONFIG["versions"]["supported"]:
             raise HTTPException(status_code=404, detail=f"不支持的版本: {version}")
         
-        # exe文件路径 - 假设exe文件存储在releases目录
+        # exe文件路径（与版本检查、摘要索引使用 file_manager 的同一路径）
         exe_filename = f"KuzflowApp_v{version}.exe"
-        exe_path = current_dir / "releases" / f"v{version}" / exe_filename
+        exe_path = Path(file_manager.get_exe_path(version))
+        await run_in_threadpool(file_manager.ensure_release_file, str(exe_path))
         
         # 兼容旧的zip包结构（从zip包中提取exe）
         if not exe_path.exists():
             # 尝试从zip包中查找exe文件
-            zip_path = current_dir / "releases" / f"v{version}" / f"update_v{version}.zip"
+            zip_path = Path(file_manager.get_package_path(version))
             if zip_path.exists():
                 # 这里可以实现从zip中提取exe的逻辑
                 # 为了演示，我们直接返回错误
@@ -261,52 +317,21 @@ async def download_exe_version(
         if not exe_path.exists():
             raise HTTPException(status_code=404, detail=f"exe文件不存在: {exe_path}")
         
+        if compression:
+            return await run_in_threadpool(compressed_file_response, str(exe_path), compression)
+        
         file_size = os.path.getsize(exe_path)
         print(f"[exe下载] 文件: {exe_path}, 大小: {file_size}")
         
-        # 处理 Range 请求（断点续传）
         if range_header:
-            range_match = re.match(r'bytes=(\d+)-(\d*)', range_header)
-            if range_match:
-                start = int(range_match.group(1))
-                end = int(range_match.group(2)) if range_match.group(2) else file_size - 1
-                
-                print(f"[断点续传] exe下载范围: {start}-{end}/{file_size}")
-                
-                def generate_chunk():
-                    with open(exe_path, 'rb') as f:
-                        f.seek(start)
-                        remaining = end - start + 1
-                        while remaining > 0:
-                            chunk_size = min(8192, remaining)
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            remaining -= len(chunk)
-                            yield chunk
-                
-                return StreamingResponse(
-                    generate_chunk(),
-                    status_code=206,
-                    headers={
-                        'Content-Range': f'bytes {start}-{end}/{file_size}',
-                        'Accept-Ranges': 'bytes',
-                        'Content-Length': str(end - start + 1),
-                        'Content-Type': 'application/octet-stream',
-                        'Content-Disposition': f'attachment; filename="{exe_filename}"'
-                    }
-                )
-        
-        # 完整文件下载
-        print(f"[完整exe下载] 文件: {exe_path}, 大小: {file_size}")
-        return FileResponse(
-            exe_path,
+            print(f"[断点续传] exe下载范围: {range_header} / {file_size}")
+        else:
+            print(f"[完整exe下载] 文件: {exe_path}, 大小: {file_size}")
+        return RangeFileResponse(
+            str(exe_path),
             media_type='application/octet-stream',
             filename=exe_filename,
-            headers={
-                'Accept-Ranges': 'bytes',
-                'Content-Length': str(file_size)
-            }
+            etag=await run_in_threadpool(file_manager.get_file_digest, str(exe_path))
         )
         
     except HTTPException:
@@ -315,6 +340,84 @@ async def download_exe_version(
         print(f"[错误] exe下载失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"exe下载失败: {str(e)}")
 
+def compressed_file_response(file_path: str, compression: str) -> RangeFileResponse:
+    """发布文件的压缩版本（没有该格式的压缩版本时返回404，客户端回退原文件）"""
+    compressed = file_manager.get_compressed_info(file_path)
+    if not compressed or compressed["method"] != compression:
+        raise HTTPException(status_code=404, detail=f"没有 {compression} 压缩版本: {os.path.basename(file_path)}")
+    print(f"[压缩下载] 文件: {compressed['path']}, 大小: {compressed['size']} (原文件 {os.path.getsize(file_path)})")
+    return RangeFileResponse(
+        compressed["path"],
+        media_type='application/zstd',
+        filename=compressed["filename"],
+        etag=compressed["hash"]
+    )
+
+@app.get("/api/version/patch/{version}/{from_version}")
+async def download_patch(version: str, from_version: str):
+    """下载 from_version -> version 的增量补丁"""
+    patch = file_manager.get_patch_info(version, from_version)
+    if not patch:
+        raise HTTPException(status_code=404, detail=f"补丁不存在: {from_version} -> {version}")
+    
+    print(f"[补丁下载] {from_version} -> {version}: {patch['path']}")
+    return RangeFileResponse(
+        patch['path'],
+        media_type='application/octet-stream',
+        filename=os.path.basename(patch['path']),
+        etag=patch.get('sha256') or await run_in_threadpool(file_manager.get_file_digest, patch['path'])
+    )
+
+@app.get("/api/version/chunks/{version}")
+async def get_chunk_index(
+    version: str,
+    platform: str = Query("windows", description="平台信息"),
+    arch: str = Query("x64", description="架构信息"),
+    base_version: Optional[str] = Query(None, description="客户端当前版本（一并返回其分块列表）")
+):
+    """获取发布文件的分块列表"""
+    index = file_manager.get_chunk_index(version, platform, arch)
+    if not index:
+        raise HTTPException(status_code=404, detail=f"没有分块信息: {version}")
+    if base_version:
+        index["base"] = file_manager.get_chunk_index(base_version, platform, arch)
+    return index
+
+@app.get("/api/chunks/{chunk_hash}")
+async def download_chunk(chunk_hash: str):
+    """下载单个分块（内容寻址，永久可缓存）"""
+    chunk_path = file_manager.get_chunk_path(chunk_hash)
+    if not chunk_path:
+        raise HTTPException(status_code=404, detail=f"分块不存在: {chunk_hash}")
+    return RangeFileResponse(
+        chunk_path,
+        etag=chunk_hash.lower(),
+        headers={'Cache-Control': 'public, max-age=31536000, immutable'}
+    )
+
+@app.post("/api/chunks/pack")
+async def download_chunk_pack(request: ChunkPackRequest):
+    """批量下载分块：按请求顺序拼接返回（客户端按分块列表中的大小切分并逐块校验）"""
+    if len(request.hashes) > MAX_PACK_CHUNKS:
+        raise HTTPException(status_code=400, detail=f"单次最多 {MAX_PACK_CHUNKS} 个分块")
+    chunk_paths = []
+    for chunk_hash in request.hashes:
+        chunk_path = file_manager.get_chunk_path(chunk_hash)
+        if not chunk_path:
+            raise HTTPException(status_code=404, detail=f"分块不存在: {chunk_hash}")
+        chunk_paths.append(chunk_path)
+    
+    def generate_chunks():
+        for chunk_path in chunk_paths:
+            with open(chunk_path, 'rb') as f:
+                yield f.read()
+    
+    return StreamingResponse(
+        generate_chunks(),
+        media_type='application/octet-stream',
+        headers={'Content-Length': str(sum(os.path.getsize(p) for p in chunk_paths))}
+    )
+
 @app.get("/api/version/changelog/{version}")
 async def get_changelog(version: str):
     """获取版本更新日志"""
@@ -341,6 +444,11 @@ async def list_packages():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取包列表失败: {str(e)}")
 
+@app.get("/api/debug/chunks")
+async def get_chunk_stats():
+    """调试用：分块存储统计（实际占用 / 去重前大小）"""
+    return file_manager.get_chunk_stats()
+
 @app.get("/api/debug/config")
 async def get_config():
     """调试用：获取服务器配置"""